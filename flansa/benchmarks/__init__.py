@@ -0,0 +1,13 @@
+"""
+Flansa performance benchmarks
+
+Builds a synthetic workspace (application, tables, relationship, logic fields
+and records) on a local bench site, times the hot paths against it and writes
+a machine-readable JSON result that can be compared with an earlier run:
+
+    bench run-flansa-benchmarks --site mysite.local --records 5000 --fields 20 \\
+        --output bench-results.json --baseline previous.json
+
+Only sites with developer_mode or allow_tests enabled are accepted, since the
+run creates and deletes data.
+"""
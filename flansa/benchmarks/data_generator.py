@@ -0,0 +1,223 @@
+"""
+Synthetic data for the Flansa benchmarks
+
+generate_dataset() creates one workspace with one application holding a
+parent table ("orders") with N generated fields, a child table ("lines")
+linked to it by a One to Many relationship, a few logic fields on the parent
+and M parent records with a fixed number of children each. Records are
+written with bulk inserts so even large datasets are quick to build; their
+logic field values stay empty until the backfill scenario fills them.
+
+All names carry the run id so several datasets can live side by side.
+"""
+
+import json
+import random
+
+import frappe
+from frappe.utils import add_days, getdate, now_datetime
+
+SELECT_OPTIONS = ["Draft", "Open", "In Progress", "Closed", "Cancelled"]
+WORDS = [
+    "alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+    "india", "juliet", "kilo", "lima", "mike", "november", "oscar", "papa"
+]
+
+# Cycle of generated field types (Flansa field type, column prefix)
+FIELD_CYCLE = [
+    ("Data", "text"),
+    ("Number", "qty"),
+    ("Decimal", "amount"),
+    ("Date", "date"),
+    ("Select", "stage"),
+]
+
+INSERT_CHUNK_SIZE = 5000
+
+
+def generate_dataset(run_id, fields=20, records=1000, children_per_record=3, logic_fields=3, seed=42):
+    """
+    Create a benchmark dataset
+
+    Returns:
+        Dict describing the dataset (ids, DocTypes, fieldnames), passed on to
+        the scenarios and to drop_dataset()
+    """
+    rng = random.Random(seed)
+    workspace_id = f"bench-{run_id}"
+
+    workspace = frappe.new_doc("Flansa Workspace")
+    workspace.workspace_id = workspace_id
+    workspace.workspace_name = f"Benchmark {run_id}"
+    workspace.tenant_name = workspace.workspace_name
+    workspace.status = "Active"
+    workspace.insert(ignore_permissions=True)
+
+    app = frappe.new_doc("Flansa Application")
+    app.app_name = f"bench_{run_id}"
+    app.app_title = f"Benchmark {run_id}"
+    app.status = "Active"
+    app.workspace_id = workspace_id
+    app.insert(ignore_permissions=True)
+    frappe.db.commit()
+
+    parent_fields = _field_definitions(fields)
+    parent = _create_table(app.name, f"bench_{run_id}_orders", "Bench Orders", parent_fields)
+    child = _create_table(app.name, f"bench_{run_id}_lines", "Bench Lines", _field_definitions(4))
+
+    relationship = frappe.new_doc("Flansa Relationship")
+    relationship.relationship_name = f"Bench Orders Lines {run_id}"
+    relationship.relationship_type = "One to Many"
+    relationship.status = "Active"
+    relationship.parent_table = parent["table"]
+    relationship.child_table = child["table"]
+    relationship.from_table = parent["table"]
+    relationship.to_table = child["table"]
+    relationship.to_field = "bench_order"
+    relationship.workspace_id = workspace_id
+    relationship.insert(ignore_permissions=True)
+    frappe.db.commit()
+
+    if not frappe.get_meta(child["doctype"]).has_field("bench_order"):
+        frappe.throw(f"Relationship link field was not created on {child['doctype']}")
+
+    # Logic fields first, so adding them does not trigger a backfill of every record
+    logic_field_names = _add_logic_fields(parent["table"], parent_fields, logic_fields)
+
+    parent_names = _insert_records(parent["doctype"], parent_fields, records, rng)
+    child_values = {"bench_order": lambda index: parent_names[index // children_per_record]}
+    _insert_records(child["doctype"], _field_definitions(4), records * children_per_record, rng, child_values)
+    frappe.db.commit()
+
+    return {
+        "run_id": run_id,
+        "workspace_id": workspace_id,
+        "application": app.name,
+        "parent_table": parent["table"],
+        "parent_doctype": parent["doctype"],
+        "child_table": child["table"],
+        "child_doctype": child["doctype"],
+        "relationship": relationship.name,
+        "link_field": "bench_order",
+        "fields": [{"fieldname": f["fieldname"], "fieldtype": f["fieldtype"]} for f in parent_fields],
+        "logic_fields": logic_field_names,
+        "records": records,
+        "child_records": records * children_per_record,
+    }
+
+
+def drop_dataset(dataset):
+    """Remove a dataset through the regular clean delete (records go in a background job)"""
+    from flansa.flansa_core.api.clean_delete import clean_delete_app
+
+    result = clean_delete_app(dataset["application"])
+    if frappe.db.exists("Flansa Workspace", dataset["workspace_id"]):
+        frappe.delete_doc("Flansa Workspace", dataset["workspace_id"], ignore_permissions=True, force=True)
+    frappe.db.commit()
+    return result
+
+
+def _field_definitions(count):
+    """Field definitions in the fields_json format of Flansa Table, plus their Frappe types"""
+    frappe_types = {"Data": "Data", "Number": "Int", "Decimal": "Float", "Date": "Date", "Select": "Select"}
+    definitions = [{"field_name": "title", "field_label": "Title", "field_type": "Data", "fieldname": "title", "fieldtype": "Data"}]
+    for index in range(count):
+        flansa_type, prefix = FIELD_CYCLE[index % len(FIELD_CYCLE)]
+        fieldname = f"{prefix}_{index + 1}"
+        definition = {
+            "field_name": fieldname,
+            "field_label": fieldname.replace("_", " ").title(),
+            "field_type": flansa_type,
+            "display_order": index + 2,
+            "fieldname": fieldname,
+            "fieldtype": frappe_types[flansa_type],
+        }
+        if flansa_type == "Select":
+            definition["options"] = "\n".join(SELECT_OPTIONS)
+        definitions.append(definition)
+    return definitions
+
+
+def _create_table(app_id, table_name, table_label, field_definitions):
+    from flansa.flansa_core.api.table_management import activate_table
+
+    table = frappe.new_doc("Flansa Table")
+    table.name = table_name
+    table.table_name = table_name
+    table.table_label = table_label
+    table.application = app_id
+    table.fields_json = json.dumps([
+        {k: v for k, v in f.items() if k not in ("fieldname", "fieldtype")}
+        for f in field_definitions
+    ])
+    table.insert(ignore_permissions=True)
+    frappe.db.commit()
+
+    result = activate_table(table.name)
+    if not result.get("success"):
+        frappe.throw(f"Could not activate benchmark table {table_name}: {result.get('error')}")
+    return {"table": table.name, "doctype": result["doctype_name"]}
+
+
+def _insert_records(doctype_name, field_definitions, count, rng, extra_values=None):
+    """Bulk insert synthetic rows, returns the generated names"""
+    extra_values = extra_values or {}
+    columns = ["name", "owner", "modified_by", "creation", "modified", "docstatus", "idx"]
+    columns += [f["fieldname"] for f in field_definitions] + list(extra_values)
+
+    timestamp = now_datetime()
+    start_date = getdate("2020-01-01")
+    names = []
+    rows = []
+    for index in range(count):
+        name = frappe.generate_hash(length=12)
+        names.append(name)
+        row = [name, "Administrator", "Administrator", timestamp, timestamp, 0, 0]
+        row += [_value(f, index, rng, start_date) for f in field_definitions]
+        row += [make_value(index) for make_value in extra_values.values()]
+        rows.append(row)
+
+        if len(rows) >= INSERT_CHUNK_SIZE:
+            frappe.db.bulk_insert(doctype_name, columns, rows)
+            rows = []
+
+    if rows:
+        frappe.db.bulk_insert(doctype_name, columns, rows)
+    return names
+
+
+def _value(field, index, rng, start_date):
+    fieldtype = field["fieldtype"]
+    if field["fieldname"] == "title":
+        return f"{rng.choice(WORDS).title()} {index:07d}"
+    if fieldtype == "Int":
+        return rng.randint(1, 1000)
+    if fieldtype == "Float":
+        return round(rng.uniform(1, 10000), 2)
+    if fieldtype == "Date":
+        return add_days(start_date, rng.randint(0, 1500))
+    if fieldtype == "Select":
+        return rng.choice(SELECT_OPTIONS)
+    return " ".join(rng.choice(WORDS) for _ in range(3))
+
+
+def _add_logic_fields(table_id, field_definitions, count):
+    """Formula logic fields over the numeric fields; each one backfills existing records"""
+    from flansa.flansa_core.api.table_api import add_logic_field_to_table
+
+    numeric = [f["fieldname"] for f in field_definitions if f["fieldtype"] in ("Int", "Float")]
+    if len(numeric) < 2:
+        return []
+
+    names = []
+    for index in range(count):
+        left, right = numeric[index % len(numeric)], numeric[(index + 1) % len(numeric)]
+        result = add_logic_field_to_table(table_id, {
+            "field_name": f"bench_calc_{index + 1}",
+            "label": f"Bench Calc {index + 1}",
+            "expression": f"{left} * {right}" if index % 2 == 0 else f"{left} + {right}",
+        })
+        if not result.get("success"):
+            frappe.throw(f"Could not add benchmark logic field: {result.get('error')}")
+        names.append(result["logic_field_name"])
+    return names
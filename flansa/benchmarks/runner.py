@@ -0,0 +1,307 @@
+"""
+Flansa benchmark runner
+
+Each scenario is a function taking the dataset and the iteration number. It
+runs `repeat` times after one warm-up call, inside instrumentation.capture()
+and query_inspector.inspect_queries(), so every result carries wall time,
+database query count/time, query budget overruns and N+1 patterns. Results are
+written as JSON (see RESULT_VERSION) and can be compared against a baseline
+file to flag latency or query-count regressions.
+"""
+
+import json
+import os
+import platform
+import statistics
+import time
+
+import frappe
+from frappe.utils import now_datetime
+
+from flansa.benchmarks.data_generator import generate_dataset, drop_dataset
+from flansa.flansa_core.utils.instrumentation import capture
+from flansa.flansa_core.utils.query_inspector import inspect_queries
+
+RESULT_VERSION = 1
+
+# A scenario regresses when its median time grows by more than this share...
+LATENCY_TOLERANCE = 0.25
+# ...or when it issues more queries than the baseline (query counts are deterministic)
+QUERY_TOLERANCE = 0
+
+
+def _report_fields(dataset, limit=8):
+    return [
+        {"fieldname": f["fieldname"], "fieldtype": f["fieldtype"], "category": "current"}
+        for f in dataset["fields"][:limit]
+    ]
+
+
+def bench_save_with_logic_fields(dataset, iteration):
+    doc = frappe.new_doc(dataset["parent_doctype"])
+    for field in dataset["fields"]:
+        if field["fieldtype"] == "Int":
+            doc.set(field["fieldname"], iteration + 1)
+        elif field["fieldtype"] == "Float":
+            doc.set(field["fieldname"], iteration + 0.5)
+    doc.title = f"Benchmark save {iteration}"
+    doc.insert(ignore_permissions=True)
+
+
+def bench_report_flat(dataset, iteration):
+    from flansa.flansa_core.api.report_builder_api import execute_report
+
+    return execute_report(
+        {"base_table": dataset["parent_table"], "selected_fields": _report_fields(dataset)},
+        {"page": iteration + 1, "page_size": 50, "no_cache": True}
+    )
+
+
+def _grouped_report(dataset, view_options):
+    from flansa.flansa_core.api.report_builder_api import execute_report
+
+    stage_field = next(f["fieldname"] for f in dataset["fields"] if f["fieldtype"] == "Select")
+    return execute_report(
+        {
+            "base_table": dataset["parent_table"],
+            "selected_fields": _report_fields(dataset),
+            "grouping": [{"field": stage_field, "aggregate": "count"}]
+        },
+        view_options
+    )
+
+
+def bench_report_grouped(dataset, iteration):
+    return _grouped_report(dataset, {"page_size": 50, "no_cache": True})
+
+
+def bench_report_grouped_cached(dataset, iteration):
+    # The warm-up call fills the report result cache; measured runs are hits
+    return _grouped_report(dataset, {"page_size": 50})
+
+
+def bench_report_related(dataset, iteration):
+    from flansa.flansa_core.api.report_builder_api import execute_report
+
+    selected_fields = [
+        {"fieldname": "title", "fieldtype": "Data", "category": "current"},
+        {"fieldname": dataset["link_field"], "fieldtype": "Link", "category": "current"},
+        {
+            "fieldname": "order_title",
+            "fieldtype": "Data",
+            "category": "parent",
+            "relationship": dataset["relationship"],
+            "source_field": "title"
+        },
+    ]
+    return execute_report(
+        {"base_table": dataset["child_table"], "selected_fields": selected_fields},
+        {"page": iteration + 1, "page_size": 50, "no_cache": True}
+    )
+
+
+def bench_get_records_deep_page(dataset, iteration):
+    from flansa.flansa_core.api.table_api import get_records
+
+    page_size = 50
+    last_page = max(dataset["records"] // page_size, 1)
+    return get_records(dataset["parent_table"], page=max(last_page - iteration, 1), page_size=page_size)
+
+
+def bench_link_search(dataset, iteration):
+    from flansa.benchmarks.data_generator import WORDS
+    from flansa.flansa_core.api.link_search import search_link_values
+
+    # A different prefix each time, so the short-lived result cache does not answer
+    return search_link_values(dataset["parent_doctype"], WORDS[iteration % len(WORDS)][:3], "title")
+
+
+def bench_bulk_backfill(dataset, iteration):
+    from flansa.flansa_core.api.table_api import populate_cached_field_background
+
+    if dataset["logic_fields"]:
+        populate_cached_field_background(dataset["parent_doctype"], dataset["logic_fields"][0])
+
+
+def bench_export(dataset, iteration):
+    from flansa.api import export_table_data
+
+    return export_table_data(dataset["parent_table"], "csv")
+
+
+SCENARIOS = {
+    "save_with_logic_fields": bench_save_with_logic_fields,
+    "report_flat": bench_report_flat,
+    "report_grouped": bench_report_grouped,
+    "report_grouped_cached": bench_report_grouped_cached,
+    "report_related_columns": bench_report_related,
+    "get_records_deep_page": bench_get_records_deep_page,
+    "link_search": bench_link_search,
+    "bulk_backfill": bench_bulk_backfill,
+    "export_csv": bench_export,
+}
+
+# Scenarios that touch every record run fewer times
+SLOW_SCENARIOS = {"bulk_backfill", "export_csv"}
+
+
+def run_benchmarks(records=1000, fields=20, children_per_record=3, logic_fields=3, repeat=5,
+                   scenarios=None, output=None, baseline=None, keep_data=False, seed=42):
+    """
+    Build a dataset, run the scenarios and return (and optionally write) the results
+
+    Args:
+        scenarios: Names from SCENARIOS to run (all by default)
+        output: Path of the JSON result file
+        baseline: Path of an earlier result file to compare against
+        keep_data: Leave the dataset in place instead of dropping it
+    """
+    if not (frappe.conf.get("developer_mode") or frappe.conf.get("allow_tests")):
+        frappe.throw("Benchmarks create and delete data; enable allow_tests or developer_mode on this site first")
+
+    run_id = now_datetime().strftime("%Y%m%d%H%M%S")
+    selected = scenarios or list(SCENARIOS)
+    unknown = [name for name in selected if name not in SCENARIOS]
+    if unknown:
+        frappe.throw(f"Unknown benchmark scenarios: {', '.join(unknown)}")
+
+    started = time.perf_counter()
+    dataset = generate_dataset(
+        run_id, fields=fields, records=records, children_per_record=children_per_record,
+        logic_fields=logic_fields, seed=seed
+    )
+    setup_seconds = time.perf_counter() - started
+
+    results = {}
+    try:
+        for name in selected:
+            runs = 1 if name in SLOW_SCENARIOS else repeat
+            results[name] = _run_scenario(SCENARIOS[name], dataset, runs)
+    finally:
+        if not keep_data:
+            drop_dataset(dataset)
+
+    report = {
+        "version": RESULT_VERSION,
+        "meta": _environment(),
+        "params": {
+            "records": records,
+            "fields": fields,
+            "children_per_record": children_per_record,
+            "logic_fields": logic_fields,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "setup_seconds": round(setup_seconds, 3),
+        "results": results,
+    }
+
+    if baseline:
+        with open(baseline) as f:
+            report["regressions"] = compare_results(json.load(f), report)
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True, default=str)
+
+    return report
+
+
+def _run_scenario(scenario, dataset, runs):
+    """Warm up once, then measure each run; a failing scenario is reported, not raised"""
+    try:
+        _call(scenario, dataset, 0)
+        frappe.db.commit()
+    except Exception as e:
+        frappe.db.rollback()
+        return {"ok": False, "error": str(e)}
+
+    timings, queries, query_ms = [], [], []
+    findings = []
+    for iteration in range(1, runs + 1):
+        with inspect_queries(scenario.__name__) as inspection, capture() as metrics:
+            started = time.perf_counter()
+            _call(scenario, dataset, iteration)
+            timings.append((time.perf_counter() - started) * 1000)
+        frappe.db.commit()
+        queries.append(metrics.queries)
+        query_ms.append(metrics.query_ms)
+        findings = inspection.summary()["findings"]
+
+    return {
+        "ok": True,
+        "runs": runs,
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+        "max_ms": round(max(timings), 3),
+        "queries": int(statistics.median(queries)),
+        "max_queries": max(queries),
+        "query_ms": round(statistics.median(query_ms), 3),
+        "n_plus_one": [f for f in findings if f["type"] == "n_plus_one"],
+        "over_budget": [f for f in findings if f["type"] == "budget"],
+    }
+
+
+def _call(scenario, dataset, iteration):
+    # Most endpoints report failures as {"success": False} instead of raising
+    result = scenario(dataset, iteration)
+    if isinstance(result, dict) and result.get("success") is False:
+        raise Exception(result.get("error") or "Scenario returned success: False")
+    return result
+
+
+def compare_results(baseline, current):
+    """Scenarios that got slower or issue more queries than in the baseline run"""
+    regressions = []
+    for name, result in current.get("results", {}).items():
+        for finding in result.get("over_budget", []):
+            regressions.append({
+                "scenario": name,
+                "metric": "query_budget",
+                "baseline": finding["budget"],
+                "current": finding["queries"],
+                "function": finding["function"],
+            })
+
+        previous = baseline.get("results", {}).get(name)
+        if not (previous and previous.get("ok") and result.get("ok")):
+            continue
+
+        if result["queries"] > previous["queries"] + QUERY_TOLERANCE:
+            regressions.append({
+                "scenario": name,
+                "metric": "queries",
+                "baseline": previous["queries"],
+                "current": result["queries"],
+            })
+        if result["median_ms"] > previous["median_ms"] * (1 + LATENCY_TOLERANCE):
+            regressions.append({
+                "scenario": name,
+                "metric": "median_ms",
+                "baseline": previous["median_ms"],
+                "current": result["median_ms"],
+            })
+    return regressions
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(int(round(percent / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def _environment():
+    from flansa import __version__ as flansa_version
+
+    return {
+        "timestamp": now_datetime().isoformat(),
+        "site": frappe.local.site,
+        "frappe_version": frappe.__version__,
+        "flansa_version": flansa_version,
+        "db_type": frappe.db.db_type,
+        "db_version": frappe.db.sql("SELECT VERSION()")[0][0],
+        "python": platform.python_version(),
+        "host": platform.node(),
+        "cpu_count": os.cpu_count(),
+    }
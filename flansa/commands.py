@@ -105,8 +105,48 @@ def bump_version(site='mysite.local', version=None):
     
     click.echo("Done! Users will be prompted to refresh on next page load.")
 
+@click.command('run-flansa-benchmarks')
+@click.option('--site', required=True, help='Site name (needs developer_mode or allow_tests)')
+@click.option('--records', default=1000, help='Parent records to generate')
+@click.option('--fields', default=20, help='Generated fields on the parent table')
+@click.option('--children', default=3, help='Child records per parent record')
+@click.option('--logic-fields', default=3, help='Formula logic fields on the parent table')
+@click.option('--repeat', default=5, help='Measured runs per scenario')
+@click.option('--scenario', multiple=True, help='Scenario to run (repeatable, default: all)')
+@click.option('--output', help='Write the JSON result to this file')
+@click.option('--baseline', help='Earlier JSON result to compare against')
+@click.option('--keep-data', is_flag=True, help='Keep the generated dataset')
+def run_flansa_benchmarks(site, records=1000, fields=20, children=3, logic_fields=3, repeat=5,
+                          scenario=None, output=None, baseline=None, keep_data=False):
+    """Generate synthetic data and benchmark Flansa hot paths"""
+    import json
+    from flansa.benchmarks.runner import run_benchmarks
+
+    frappe.init(site=site)
+    frappe.connect()
+    frappe.set_user("Administrator")
+
+    try:
+        report = run_benchmarks(
+            records=records,
+            fields=fields,
+            children_per_record=children,
+            logic_fields=logic_fields,
+            repeat=repeat,
+            scenarios=list(scenario) or None,
+            output=output,
+            baseline=baseline,
+            keep_data=keep_data
+        )
+        click.echo(json.dumps(report, indent=2, sort_keys=True, default=str))
+        if report.get("regressions"):
+            raise SystemExit(1)
+    finally:
+        frappe.destroy()
+
 commands = [
     resync_fields,
     force_client_refresh,
-    bump_version
+    bump_version,
+    run_flansa_benchmarks
 ]
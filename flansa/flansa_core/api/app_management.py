@@ -1,6 +1,9 @@
 import frappe
 
+from flansa.flansa_core.utils.query_inspector import query_budget
+
 @frappe.whitelist()
+@query_budget(10)
 def get_user_applications():
     """Get applications accessible to the current user"""
     try:
@@ -3,7 +3,9 @@ import frappe
 import yaml
 import json
 from frappe import _
-from flansa.flansa_core.workspace_service import apply_tenant_filter, get_workspace_filter
+from frappe.utils import cint
+from flansa.flansa_core.app_provisioning_service import build_application_schema, provision_application
+from flansa.flansa_core.workspace_service import get_workspace_filter
 
 
 def normalize_app_name(name):
@@ -64,103 +66,7 @@ def export_application_schema(app_name, format_type="yaml"):
 	if not frappe.has_permission("Flansa Application", "read"):
 		frappe.throw(_("Not permitted"))
 	
-	app_doc = frappe.get_doc("Flansa Application", app_name)
-	
-	# Build complete schema
-	schema = {
-		"application": {
-			"name": app_doc.app_name,
-			"title": app_doc.app_title,
-			"description": app_doc.description,
-			"type": app_doc.app_type,
-			"theme_color": app_doc.theme_color,
-			"icon": app_doc.icon,
-			"version": "1.0.0",
-			"created": str(app_doc.creation)
-		},
-		"workspaces": [],
-		"tables": [],
-		"relationships": []
-	}
-	
-	# Get workspaces
-	workspaces = frappe.get_all("Flansa Workspace", 
-		filters=apply_tenant_filter({"application": app_name}),
-		fields=["name", "workspace_name", "description", "theme_color", "icon"]
-	)
-	
-	for workspace in workspaces:
-		workspace_schema = {
-			"name": workspace.workspace_name,
-			"description": workspace.description,
-			"theme_color": workspace.theme_color,
-			"icon": workspace.icon
-		}
-		schema["workspaces"].append(workspace_schema)
-	
-	# Get tables
-	tables = frappe.get_all("Flansa Table", 
-		filters=apply_tenant_filter({"application": app_name}),
-		fields=["name", "table_name", "table_label", "workspace", "doctype_name", 
-				"is_submittable", "naming_rule", "autoname_prefix"]
-	)
-	
-	for table in tables:
-		table_doc = frappe.get_doc("Flansa Table", table.name)
-		
-		table_schema = {
-			"name": table.table_name,
-			"label": table.table_label,
-			"workspace": frappe.db.get_value("Flansa Workspace", table.workspace, "workspace_name"),
-			"is_submittable": table.is_submittable,
-			"naming_rule": table.naming_rule,
-			"autoname_prefix": table.autoname_prefix,
-			"fields": []
-		}
-		
-		# Get fields from JSON storage
-		if table_doc.fields_json:
-			try:
-				fields_data = json.loads(table_doc.fields_json)
-				for field in fields_data:
-					field_schema = {
-						"name": field.get("field_name"),
-						"label": field.get("field_label"),
-						"type": field.get("field_type"),
-						"required": field.get("is_required", 0),
-						"unique": field.get("is_unique", 0),
-						"readonly": field.get("is_readonly", 0),
-						"hidden": field.get("is_hidden", 0),
-						"options": field.get("options"),
-						"default": field.get("default_value"),
-						"in_list_view": field.get("in_list_view", 0),
-						"in_standard_filter": field.get("in_standard_filter", 0),
-						"depends_on": field.get("depends_on"),
-						"description": field.get("description")
-					}
-					table_schema["fields"].append(field_schema)
-			except (json.JSONDecodeError, TypeError):
-				pass
-		
-		schema["tables"].append(table_schema)
-	
-	# Get relationships
-	relationships = frappe.get_all("Flansa Relationship",
-		filters=apply_tenant_filter({"application": app_name}),
-		fields=["name", "relationship_name", "relationship_type", "from_table", 
-				"to_table", "from_field", "to_field"]
-	)
-	
-	for rel in relationships:
-		rel_schema = {
-			"name": rel.relationship_name,
-			"type": rel.relationship_type,
-			"from_table": frappe.db.get_value("Flansa Table", rel.from_table, "table_name"),
-			"to_table": frappe.db.get_value("Flansa Table", rel.to_table, "table_name"),
-			"from_field": rel.from_field,
-			"to_field": rel.to_field
-		}
-		schema["relationships"].append(rel_schema)
+	schema = build_application_schema(app_name)
 	
 	if format_type == "yaml":
 		return yaml.dump(schema, default_flow_style=False, allow_unicode=True)
@@ -168,8 +74,12 @@ def export_application_schema(app_name, format_type="yaml"):
 		return json.dumps(schema, indent=2)
 
 @frappe.whitelist()
-def import_application_schema(schema_content, format_type="yaml"):
-	"""Import application from YAML or JSON schema"""
+def import_application_schema(schema_content, format_type="yaml", bulk=0):
+	"""Import application from YAML or JSON schema
+
+	With bulk set, only the metadata is inserted here; DocTypes and relationship
+	fields are generated in one pass by a background job (see app_provisioning_service).
+	"""
 	
 	if not frappe.has_permission("Flansa Application", "create"):
 		frappe.throw(_("Not permitted"))
@@ -182,6 +92,10 @@ def import_application_schema(schema_content, format_type="yaml"):
 	except Exception as e:
 		frappe.throw(_("Invalid schema format: {0}").format(str(e)))
 	
+	if cint(bulk):
+		app_name, job_id = provision_application(schema)
+		return {"success": True, "application": app_name, "job_id": job_id}
+	
 	# Create application
 	app_data = schema.get("application", {})
 	app_doc = frappe.get_doc({
@@ -18,6 +18,11 @@ def force_clear_all_cache(doctype_name=None):
         frappe.clear_cache()
         cleared_caches.append("global_frappe_cache")
         
+        # Report results are cached separately (see report_cache_service)
+        from flansa.flansa_core.report_cache_service import clear_report_cache
+        clear_report_cache()
+        cleared_caches.append("report_results")
+        
         # Clear specific DocType cache if provided
         if doctype_name:
             frappe.clear_cache(doctype=doctype_name)
@@ -1,222 +1,427 @@
 """
 Clean Delete API for Flansa Apps and Tables
 Safely removes apps/tables and all connected resources
+
+Deletion runs in two phases:
+1. Tombstone (inside the request): the Flansa metadata rows are removed with
+   bulk deletes, so the app/table disappears from the UI immediately.
+2. Teardown (background job): data records are deleted in bounded chunks,
+   attachments are removed with batched S3 delete_objects calls, and finally
+   the generated DocType is dropped. The teardown's job record (Flansa Job)
+   is written in the same transaction as the tombstone and checkpointed with
+   every chunk, so an interrupted job resumes where it stopped and no detached
+   DocType can be forgotten.
 """
 
+import os
+
 import frappe
 import json
 from frappe import _
 
+from flansa.flansa_core.job_service import (
+    can_view_job, enqueue_job, get_checkpoint, get_job, report_progress, resume_job, save_checkpoint
+)
+from flansa.flansa_core.report_summary_service import SUMMARY_ROW_DOCTYPE, clear_summary_index
+from flansa.flansa_core.utils.instrumentation import debug_log
+
+RECORD_DELETE_CHUNK_SIZE = 5000
+FILE_DELETE_CHUNK_SIZE = 1000
+
 @frappe.whitelist()
 def clean_delete_app(app_name):
     """
     Completely delete a Flansa Application and all connected resources
+
+    Metadata is removed immediately; records, files and DocTypes are torn
+    down by a background job (see get_teardown_status).
     """
     try:
         # Validate app exists
         if not frappe.db.exists('Flansa Application', app_name):
             return {'success': False, 'error': f'Application {app_name} not found'}
-        
-        print(f"🗑️ Starting clean delete of application: {app_name}", flush=True)
-        
+
+        debug_log(f"Starting clean delete of application: {app_name}")
+
         # Get app details for logging
-        app_doc = frappe.get_doc('Flansa Application', app_name)
-        app_label = app_doc.app_title or app_doc.app_name or app_name
-        
+        app_label = frappe.db.get_value('Flansa Application', app_name, 'app_title') or app_name
+
         deletion_log = []
-        
+
         # Step 1: Find all tables in this app
-        tables = frappe.get_all('Flansa Table', 
-                               filters={'application': app_name}, 
-                               fields=['name', 'table_name', 'doctype_name'])
-        
-        print(f"📋 Found {len(tables)} tables to delete", flush=True)
-        deletion_log.append(f"Found {len(tables)} tables in application")
-        
-        # Step 2: Delete each table cleanly
-        for table in tables:
-            print(f"   Deleting table: {table.name} ({table.table_name})", flush=True)
-            table_result = clean_delete_table(table.name)
-            
-            if table_result.get('success'):
-                deletion_log.append(f"✅ Table {table.table_name}: {table_result.get('summary', 'Deleted successfully')}")
-            else:
-                deletion_log.append(f"❌ Table {table.table_name}: {table_result.get('error', 'Failed to delete')}")
-                print(f"   ⚠️ Warning: Failed to delete table {table.name}: {table_result.get('error')}", flush=True)
-        
-        # Step 3: Delete application-level resources
-        
-        # Delete relationships where this app is involved
-        relationships = frappe.get_all('Flansa Relationship',
-                                     filters=[
-                                         ['parent_table', 'in', [t.name for t in tables]],
-                                         ['child_table', 'in', [t.name for t in tables]]
-                                     ])
-        for rel in relationships:
-            frappe.delete_doc('Flansa Relationship', rel.name, force=True)
-        
-        deletion_log.append(f"✅ Deleted {len(relationships)} relationships")
-        
-        # Delete saved reports for this app's tables
-        reports = frappe.get_all('Flansa Saved Report',
-                               filters={'base_table': ['in', [t.name for t in tables]]})
-        for report in reports:
-            frappe.delete_doc('Flansa Saved Report', report.name, force=True)
-        
-        deletion_log.append(f"✅ Deleted {len(reports)} saved reports")
-        
-        # Delete form configs for this app's tables  
-        form_configs = frappe.get_all('Flansa Form Config',
-                                    filters={'table_name': ['in', [t.name for t in tables]]})
-        for config in form_configs:
-            frappe.delete_doc('Flansa Form Config', config.name, force=True)
-        
-        deletion_log.append(f"✅ Deleted {len(form_configs)} form configurations")
-        
-        # Step 4: Finally delete the application document
+        table_names = frappe.get_all('Flansa Table', filters={'application': app_name}, pluck='name')
+
+        deletion_log.append(f"Found {len(table_names)} tables in application")
+
+        # Step 2: Tombstone - remove table metadata in bulk
+        detached = _detach_tables(table_names, deletion_log)
+
+        # Step 3: Delete the application document (its tables are already detached,
+        # so on_trash has nothing left to clean up)
         frappe.delete_doc('Flansa Application', app_name, force=True)
         deletion_log.append(f"✅ Deleted application document")
-        
-        # Commit all changes
-        frappe.db.commit()
-        
-        print(f"🎉 Successfully deleted application: {app_label}", flush=True)
-        
+
+        # Step 4: Hand data, files and DocTypes to the background teardown
+        job_id = _start_teardown(f'Application "{app_label}"', detached['doctypes'])
+        deletion_log.append(f"⏳ Removing data for {len(detached['doctypes'])} tables in the background")
+
+        debug_log(f"Application {app_label} detached, teardown job {job_id} queued")
+
         return {
             'success': True,
-            'message': f'Application "{app_label}" deleted successfully',
+            'message': f'Application "{app_label}" deleted successfully. Data is being removed in the background.',
+            'job_id': job_id,
             'deletion_log': deletion_log,
-            'summary': f'Deleted application with {len(tables)} tables, {len(relationships)} relationships, {len(reports)} reports, and {len(form_configs)} form configs'
+            'summary': f"Deleted application with {len(table_names)} tables, {detached['relationships']} relationships, {detached['reports']} reports, and {detached['form_configs']} form configs"
         }
-        
+
     except Exception as e:
         frappe.db.rollback()
-        print(f"❌ Error during app deletion: {str(e)}", flush=True)
         frappe.log_error(f"Clean delete app error: {str(e)}")
         return {'success': False, 'error': str(e)}
 
-@frappe.whitelist() 
+@frappe.whitelist()
 def clean_delete_table(table_name):
     """
     Completely delete a Flansa Table and all connected resources
+
+    Metadata is removed immediately; records, files and the DocType are torn
+    down by a background job (see get_teardown_status).
     """
     try:
         # Validate table exists
         if not frappe.db.exists('Flansa Table', table_name):
             return {'success': False, 'error': f'Table {table_name} not found'}
-        
-        print(f"🗑️ Starting clean delete of table: {table_name}", flush=True)
-        
-        # Get table details
-        table_doc = frappe.get_doc('Flansa Table', table_name)
-        table_label = table_doc.table_label or table_doc.table_name
-        doctype_name = table_doc.doctype_name
-        
+
+        debug_log(f"Starting clean delete of table: {table_name}")
+
+        table_info = frappe.db.get_value('Flansa Table', table_name, ['table_label', 'table_name'], as_dict=True)
+        table_label = table_info.table_label or table_info.table_name
+
         deletion_log = []
-        
-        # Step 1: Delete all records in the DocType (if it exists)
-        record_count = 0
-        if doctype_name and frappe.db.exists('DocType', doctype_name):
-            try:
-                # Count records first
-                record_count = frappe.db.count(doctype_name)
-                
-                if record_count > 0:
-                    print(f"   Deleting {record_count} data records...", flush=True)
-                    # Delete all records
-                    frappe.db.sql(f"DELETE FROM `tab{doctype_name}`")
-                    deletion_log.append(f"✅ Deleted {record_count} data records")
-                
-            except Exception as e:
-                deletion_log.append(f"⚠️ Could not delete data records: {str(e)}")
-        
-        # Step 2: Delete connected resources
-        
-        # Delete saved reports for this table
-        reports = frappe.get_all('Flansa Saved Report', filters={'base_table': table_name})
-        for report in reports:
-            frappe.delete_doc('Flansa Saved Report', report.name, force=True)
-        deletion_log.append(f"✅ Deleted {len(reports)} saved reports")
-        
-        # Delete form config for this table
-        if frappe.db.exists('Flansa Form Config', table_name):
-            frappe.delete_doc('Flansa Form Config', table_name, force=True)
-            deletion_log.append(f"✅ Deleted form configuration")
-        
-        # Delete relationships where this table is parent or child
-        parent_rels = frappe.get_all('Flansa Relationship', filters={'parent_table': table_name})
-        child_rels = frappe.get_all('Flansa Relationship', filters={'child_table': table_name})
-        
-        for rel in parent_rels + child_rels:
-            frappe.delete_doc('Flansa Relationship', rel.name, force=True)
-        
-        total_rels = len(parent_rels) + len(child_rels)
-        deletion_log.append(f"✅ Deleted {total_rels} relationships")
-        
-        # Delete logic fields for this table
-        logic_fields = frappe.get_all('Flansa Logic Field', filters={'table_name': table_name})
-        for field in logic_fields:
-            frappe.delete_doc('Flansa Logic Field', field.name, force=True)
-        deletion_log.append(f"✅ Deleted {len(logic_fields)} logic fields")
-        
-        # Step 3: Delete file attachments for this DocType
-        if doctype_name and frappe.db.exists('DocType', doctype_name):
-            try:
-                # Get all files attached to records of this DocType
-                files = frappe.get_all('File', 
-                                     filters={'attached_to_doctype': doctype_name},
-                                     fields=['name', 'file_url', 'file_name'])
-                
-                attachment_count = 0
-                for file_doc in files:
-                    try:
-                        # Delete the file document (this also removes the physical file)
-                        frappe.delete_doc('File', file_doc.name, force=True)
-                        attachment_count += 1
-                        print(f"   Deleted attachment: {file_doc.file_name}", flush=True)
-                    except Exception as e:
-                        print(f"   ⚠️ Could not delete file {file_doc.file_name}: {str(e)}", flush=True)
-                
-                if attachment_count > 0:
-                    deletion_log.append(f"✅ Deleted {attachment_count} file attachments")
-                
-            except Exception as e:
-                deletion_log.append(f"⚠️ Could not delete attachments: {str(e)}")
-        
-        # Step 4: Delete the DocType (if it exists and is managed by Flansa)
-        if doctype_name and frappe.db.exists('DocType', doctype_name):
-            try:
-                # Only delete if it looks like a Flansa-generated DocType
-                if doctype_name.startswith('PersonalTracker_') or doctype_name.startswith('Flansa'):
-                    frappe.delete_doc('DocType', doctype_name, force=True)
-                    deletion_log.append(f"✅ Deleted DocType: {doctype_name}")
-                else:
-                    deletion_log.append(f"⚠️ Preserved external DocType: {doctype_name}")
-            except Exception as e:
-                deletion_log.append(f"⚠️ Could not delete DocType: {str(e)}")
-        
-        # Step 5: Finally delete the table document
-        frappe.delete_doc('Flansa Table', table_name, force=True)
-        deletion_log.append(f"✅ Deleted table document")
-        
-        # Commit all changes
-        frappe.db.commit()
-        
-        print(f"🎉 Successfully deleted table: {table_label}", flush=True)
-        
+        detached = _detach_tables([table_name], deletion_log)
+
+        job_id = _start_teardown(f'Table "{table_label}"', detached['doctypes'])
+        if detached['doctypes']:
+            deletion_log.append(f"⏳ Removing data records, attachments and DocType in the background")
+
+        debug_log(f"Table {table_label} detached, teardown job {job_id} queued")
+
         return {
             'success': True,
-            'message': f'Table "{table_label}" deleted successfully',
+            'message': f'Table "{table_label}" deleted successfully. Data is being removed in the background.',
+            'job_id': job_id,
             'deletion_log': deletion_log,
-            'summary': f'Deleted table with {record_count} records, {len(reports)} reports, {total_rels} relationships, {len(logic_fields)} logic fields'
+            'summary': f"Deleted table with {detached['reports']} reports, {detached['relationships']} relationships, {detached['logic_fields']} logic fields"
         }
-        
+
     except Exception as e:
         frappe.db.rollback()
-        print(f"❌ Error during table deletion: {str(e)}", flush=True)
         frappe.log_error(f"Clean delete table error: {str(e)}")
         return {'success': False, 'error': str(e)}
 
+def _is_flansa_doctype(doctype_name):
+    """Only Flansa-generated DocTypes are dropped; anything else is preserved"""
+    return doctype_name.startswith('PersonalTracker_') or doctype_name.startswith('Flansa')
+
+def _detach_tables(table_names, deletion_log):
+    """
+    Tombstone phase: remove the Flansa metadata of tables with bulk deletes
+
+    Relationships to tables that are not being deleted still go through
+    delete_doc, because their on_trash removes the link fields from the
+    surviving table. Flansa Table rows are removed without on_trash, which
+    would otherwise delete all records in one statement.
+
+    Returns:
+        Dict with per-resource counts and the DocTypes left for the teardown job
+    """
+    counts = {'reports': 0, 'form_configs': 0, 'relationships': 0, 'logic_fields': 0, 'doctypes': []}
+    if not table_names:
+        return counts
+
+    tables = frappe.get_all('Flansa Table', filters={'name': ['in', table_names]}, fields=['name', 'doctype_name', 'workspace_id'])
+    deleting = set(table_names)
+
+    # Relationships where any of the tables is parent or child
+    relationships = frappe.get_all(
+        'Flansa Relationship',
+        or_filters=[
+            ['parent_table', 'in', table_names],
+            ['child_table', 'in', table_names],
+            ['from_table', 'in', table_names],
+            ['to_table', 'in', table_names]
+        ],
+        fields=['name', 'parent_table', 'child_table', 'from_table', 'to_table']
+    )
+    internal_rels = []
+    for rel in relationships:
+        sides = {t for t in (rel.parent_table, rel.child_table, rel.from_table, rel.to_table) if t}
+        if sides <= deleting:
+            internal_rels.append(rel.name)
+        else:
+            frappe.delete_doc('Flansa Relationship', rel.name, force=True)
+    if internal_rels:
+        frappe.db.delete('Flansa Relationship', {'name': ['in', internal_rels]})
+    counts['relationships'] = len(relationships)
+    deletion_log.append(f"✅ Deleted {counts['relationships']} relationships")
+
+    reports = frappe.get_all('Flansa Saved Report', filters={'base_table': ['in', table_names]}, pluck='name')
+    counts['reports'] = len(reports)
+    if reports:
+        # Bulk delete skips on_trash, which drops the summary rows of a report
+        frappe.db.delete(SUMMARY_ROW_DOCTYPE, {'saved_report': ['in', reports]})
+        frappe.db.delete('Flansa Saved Report', {'name': ['in', reports]})
+        clear_summary_index()
+    deletion_log.append(f"✅ Deleted {counts['reports']} saved reports")
+
+    counts['form_configs'] = frappe.db.count('Flansa Form Config', {'table_name': ['in', table_names]})
+    frappe.db.delete('Flansa Form Config', {'table_name': ['in', table_names]})
+    deletion_log.append(f"✅ Deleted {counts['form_configs']} form configurations")
+
+    counts['logic_fields'] = frappe.db.count('Flansa Logic Field', {'table_name': ['in', table_names]})
+    frappe.db.delete('Flansa Logic Field', {'table_name': ['in', table_names]})
+    deletion_log.append(f"✅ Deleted {counts['logic_fields']} logic fields")
+
+    frappe.db.delete('Flansa Table', {'name': ['in', table_names]})
+    deletion_log.append(f"✅ Deleted {len(tables)} table documents")
+
+    for table in tables:
+        if table.doctype_name and frappe.db.exists('DocType', table.doctype_name):
+            counts['doctypes'].append({
+                'doctype': table.doctype_name,
+                'workspace_id': table.workspace_id,
+                'drop_doctype': _is_flansa_doctype(table.doctype_name)
+            })
+
+    # Bulk deletes skip doc events, so invalidate the metadata caches here
+    from flansa.flansa_core.utils.table_cache import clear_table_cache
+    from flansa.flansa_core.relationship_graph_service import clear_relationship_graph
+    from flansa.flansa_core.metadata_catalog_service import clear_catalog
+    from flansa.flansa_core.usage_service import reconcile_workspace
+    for table_name in table_names:
+        clear_table_cache(table_name)
+    clear_relationship_graph()
+    for workspace_id in {t.workspace_id for t in tables}:
+        clear_catalog(workspace_id)
+        if workspace_id:
+            reconcile_workspace(workspace_id, metadata_only=True)
+
+    return counts
+
+def _start_teardown(label, doctypes):
+    """Record the teardown job with the tombstone, commit both and enqueue the job"""
+    workspace_ids = [d['workspace_id'] for d in doctypes if d.get('workspace_id')]
+    state = {
+        'doctypes': doctypes,
+        'index': 0,
+        'phase': 'records',
+        'counts': {'records': 0, 'files': 0, 's3_objects': 0, 'doctypes': 0}
+    }
+    job_id = enqueue_job(
+        'flansa.flansa_core.api.clean_delete.run_teardown',
+        'bulk',
+        job_key=f"flansa_teardown_{frappe.generate_hash(length=10)}",
+        workspace_id=workspace_ids[0] if workspace_ids else None,
+        timeout=3600,
+        after_commit=True,
+        label=label,
+        checkpoint=state
+    )
+
+    # The tombstone and the record of what is left to tear down commit together
+    frappe.db.commit()
+    return job_id
+
+def _publish_teardown_progress(job_id, state, status, error=None):
+    job = frappe.db.get_value('Flansa Job', job_id, ['label', 'user'], as_dict=True)
+    total = len(state['doctypes'])
+    frappe.publish_realtime(
+        'flansa_teardown_progress',
+        {
+            'job_id': job_id,
+            'label': job.label,
+            'status': status,
+            'phase': state['phase'],
+            'tables_done': min(state['index'], total),
+            'tables_total': total,
+            'counts': state['counts'],
+            'error': error
+        },
+        user=job.user
+    )
+
+def run_teardown():
+    """
+    Background job body: tear down the data of detached tables
+
+    Works through each DocType in phases (records -> files -> doctype). Every
+    chunk commits together with the job's checkpoint, so a restarted job
+    continues from the last completed chunk.
+    """
+    from flansa.flansa_core.usage_service import record_usage
+
+    job_id = frappe.flags.flansa_job_id
+    state = get_checkpoint()
+    if not state:
+        return
+
+    try:
+        while state['index'] < len(state['doctypes']):
+            target = state['doctypes'][state['index']]
+            doctype_name = target['doctype']
+
+            if state['phase'] == 'records':
+                deleted = _delete_records_chunk(doctype_name)
+                if deleted:
+                    state['counts']['records'] += deleted
+                    record_usage(target.get('workspace_id'), {'records': -deleted})
+                else:
+                    state['phase'] = 'files'
+
+            elif state['phase'] == 'files':
+                deleted, s3_deleted, freed_bytes = _delete_files_chunk(doctype_name)
+                if deleted:
+                    state['counts']['files'] += deleted
+                    state['counts']['s3_objects'] += s3_deleted
+                    record_usage(target.get('workspace_id'), {'files': -deleted, 'file_bytes': -freed_bytes})
+                else:
+                    state['phase'] = 'doctype'
+
+            else:
+                if target.get('drop_doctype') and frappe.db.exists('DocType', doctype_name):
+                    frappe.delete_doc('DocType', doctype_name, force=True)
+                    state['counts']['doctypes'] += 1
+                state['index'] += 1
+                state['phase'] = 'records'
+
+            save_checkpoint(state)
+            report_progress(min(state['index'], len(state['doctypes'])), len(state['doctypes']), state['phase'])
+            frappe.db.commit()
+            _publish_teardown_progress(job_id, state, 'Running')
+
+        debug_log(f"Teardown {job_id} finished: {state['counts']}")
+        _publish_teardown_progress(job_id, state, 'Completed')
+
+    except Exception as e:
+        # The job service rolls back, records the failure and logs it
+        _publish_teardown_progress(job_id, state, 'Failed', str(e))
+        raise
+
+def _delete_records_chunk(doctype_name):
+    """Delete up to RECORD_DELETE_CHUNK_SIZE records; returns the number deleted"""
+    if not frappe.db.table_exists(doctype_name):
+        return 0
+
+    quote_char = '"' if frappe.db.db_type == 'postgres' else '`'
+    names = frappe.db.sql_list(
+        f"SELECT {quote_char}name{quote_char} FROM {quote_char}tab{doctype_name}{quote_char} LIMIT %s",
+        (RECORD_DELETE_CHUNK_SIZE,)
+    )
+    if names:
+        frappe.db.delete(doctype_name, {'name': ['in', names]})
+    return len(names)
+
+def _delete_files_chunk(doctype_name):
+    """
+    Delete up to FILE_DELETE_CHUNK_SIZE File rows attached to a DocType
+
+    Storage is removed in one batched S3 call (plus local unlinks) and the
+    File rows in one statement, bypassing the per-file on_trash hooks.
+    Content still referenced by other File rows is kept.
+
+    Returns:
+        (files deleted, S3 objects deleted, bytes of the deleted File rows)
+    """
+    from flansa.flansa_core.s3_integration.s3_upload import delete_files_from_s3
+
+    files = frappe.get_all(
+        'File',
+        filters={'attached_to_doctype': doctype_name},
+        fields=['name', 'file_url', 'file_size'],
+        limit=FILE_DELETE_CHUNK_SIZE
+    )
+    if not files:
+        return 0, 0, 0
+
+    names = [f.name for f in files]
+    urls = {f.file_url for f in files if f.file_url}
+    shared = set()
+    if urls:
+        shared = set(frappe.get_all(
+            'File',
+            filters={'file_url': ['in', list(urls)], 'name': ['not in', names]},
+            pluck='file_url'
+        ))
+    unreferenced = urls - shared
+
+    # Gallery thumbnails live next to their originals
+    from flansa.flansa_core.utils.image_derivatives import derivative_urls
+    storage_urls = set(unreferenced)
+    for file_url in unreferenced:
+        storage_urls.update(derivative_urls(file_url))
+
+    s3_deleted = delete_files_from_s3(storage_urls)
+    for file_url in storage_urls:
+        _delete_local_file(file_url)
+
+    frappe.db.delete('File', {'name': ['in', names]})
+    return len(names), s3_deleted, sum(int(f.file_size or 0) for f in files)
+
+def _delete_local_file(file_url):
+    """Remove a file stored on the site's filesystem, ignoring remote URLs"""
+    if '..' in file_url:
+        return
+    if file_url.startswith('/private/files/'):
+        path = frappe.get_site_path('private', 'files', file_url[len('/private/files/'):])
+    elif file_url.startswith('/files/'):
+        path = frappe.get_site_path('public', 'files', file_url[len('/files/'):])
+    else:
+        return
+
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+    except OSError as e:
+        frappe.logger().error(f"Could not delete local file {file_url}: {str(e)}")
+
+@frappe.whitelist()
+def get_teardown_status(job_id):
+    """Get the progress of a background teardown started by clean_delete_app/table"""
+    job = get_job(job_id)
+    if not job or job.method != 'flansa.flansa_core.api.clean_delete.run_teardown':
+        return {'success': False, 'error': f'Teardown job {job_id} not found'}
+    if not can_view_job(job):
+        return {'success': False, 'error': 'Not permitted'}
+
+    state = job.checkpoint or {'doctypes': [], 'index': 0, 'phase': None, 'counts': {}}
+    return {
+        'success': True,
+        'job_id': job_id,
+        'label': job.label,
+        'status': job.status,
+        'phase': state['phase'],
+        'tables_done': min(state['index'], len(state['doctypes'])),
+        'tables_total': len(state['doctypes']),
+        'counts': state['counts'],
+        'error': job.error,
+        'updated_at': job.modified
+    }
+
+@frappe.whitelist()
+def resume_teardown(job_id):
+    """Re-enqueue a failed or interrupted teardown; it continues from its checkpoint"""
+    frappe.only_for('System Manager')
+
+    job = get_job(job_id)
+    if not job or job.method != 'flansa.flansa_core.api.clean_delete.run_teardown':
+        return {'success': False, 'error': f'Teardown job {job_id} not found'}
+    if job.status == 'Completed':
+        return {'success': True, 'message': 'Teardown already completed'}
+
+    resume_job(job_id)
+    return {'success': True, 'message': 'Teardown resumed'}
+
 @frappe.whitelist()
 def get_deletion_preview(resource_type, resource_name):
     """
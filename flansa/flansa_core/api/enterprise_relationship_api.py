@@ -1079,52 +1079,24 @@ def get_relationships_with_fields(app_name=None):
     """Get relationships with their lookup and computed fields, optionally filtered by app"""
     
     try:
-        # Get relationships - filter by app if provided
-        if app_name:
-            # Get tables for this app
-            app_tables = frappe.get_all("Flansa Table",
-                filters={"application": app_name},
-                fields=["name"]
-            )
-            app_table_names = [t.name for t in app_tables]
-            
-            if not app_table_names:
-                return {"success": True, "relationships": []}
-            
-            # Filter relationships to only include those involving app tables
-            relationships = frappe.get_all("Flansa Relationship", 
-                filters=[
-                    ["from_table", "in", app_table_names],
-                    ["to_table", "in", app_table_names]
-                ],
-                fields=["name", "relationship_name", "relationship_type", "parent_table", "child_table", "from_table", "to_table"],
-                order_by="creation desc"
-            )
-        else:
-            # Get all relationships if no app filter
-            relationships = frappe.get_all("Flansa Relationship", 
-                fields=["name", "relationship_name", "relationship_type", "parent_table", "child_table", "from_table", "to_table"],
-                order_by="creation desc"
-            )
+        # The relationship graph resolves all fields for the app in a few set-based queries
+        from flansa.flansa_core.relationship_graph_service import get_relationship_graph
+        graph = get_relationship_graph(app_name)
         
-        # Use the single source of truth API for each relationship
         enhanced_relationships = []
-        for rel in relationships:
-            # Get detailed field information using the authoritative API
-            detail_result = get_relationship_fields_detail(rel.name)
-            if detail_result.get("success"):
-                rel_detail = detail_result["relationship"]
-                # Merge the basic relationship info with detailed field info
-                rel["computed_fields"] = rel_detail.get("computed_fields", [])
-                rel["lookup_fields"] = rel_detail.get("lookup_fields", [])
-                rel["link_fields"] = rel_detail.get("link_fields", [])
-            else:
-                # Fallback if detailed API fails
-                rel["computed_fields"] = []
-                rel["lookup_fields"] = []
-                rel["link_fields"] = []
-            
-            enhanced_relationships.append(rel)
+        for rel in graph.relationships:
+            enhanced_relationships.append(frappe._dict({
+                "name": rel["name"],
+                "relationship_name": rel["relationship_name"],
+                "relationship_type": rel["relationship_type"],
+                "parent_table": rel["parent_table"],
+                "child_table": rel["child_table"],
+                "from_table": rel["from_table"],
+                "to_table": rel["to_table"],
+                "computed_fields": rel["computed_fields"],
+                "lookup_fields": rel["lookup_fields"],
+                "link_fields": rel["link_fields"]
+            }))
         
         return {
             "success": True,
@@ -5,6 +5,7 @@ Creates custom form layouts with gallery fields and drag-drop functionality
 
 import frappe
 from flansa.flansa_core.workspace_security import apply_workspace_filter, get_current_workspace
+from flansa.flansa_core.utils.conditional_response import conditional, form_config_version
 import json
 from frappe import _
 
@@ -112,9 +113,12 @@ def save_form_layout(table_name, layout_data):
         return {"success": False, "error": str(e)}
 
 @frappe.whitelist()
-def render_gallery_field(docname, fieldname, doctype_name):
+def render_gallery_field(docname, fieldname, doctype_name, image_size=None):
     """Render gallery field with drag-drop functionality"""
     try:
+        from flansa.flansa_core.utils.image_derivatives import DEFAULT_GALLERY_SIZE
+        image_size = image_size or DEFAULT_GALLERY_SIZE
+        
         if not frappe.db.exists(doctype_name, docname):
             return {"success": False, "error": "Document not found"}
         
@@ -148,9 +152,11 @@ def render_gallery_field(docname, fieldname, doctype_name):
         # Add existing items
         for item in gallery_data:
             if isinstance(item, dict) and item.get('file_url'):
+                # Show a derivative when one exists; data-file-url keeps the original
+                image_src = (item.get('thumbnails') or {}).get(image_size) or item['file_url']
                 gallery_html += f"""
                     <div class="gallery-item" data-file-url="{item['file_url']}">
-                        <img src="{item['file_url']}" alt="{item.get('description', '')}" />
+                        <img src="{image_src}" alt="{item.get('description', '')}" loading="lazy" />
                         <div class="gallery-item-overlay">
                             <button class="btn btn-sm btn-danger remove-item">
                                 <i class="fa fa-trash"></i>
@@ -241,6 +247,10 @@ def upload_gallery_image(docname, fieldname, doctype_name):
         # Update document
         doc.db_set(fieldname, json.dumps(gallery_data))
         
+        # Render thumbnails for the new images in the background
+        from flansa.flansa_core.utils.image_derivatives import enqueue_gallery_thumbnails
+        enqueue_gallery_thumbnails(doctype_name, docname, fieldname)
+        
         return {
             "success": True,
             "message": f"Uploaded {len(uploaded_items)} images",
@@ -253,7 +263,37 @@ def upload_gallery_image(docname, fieldname, doctype_name):
         return {"success": False, "error": str(e)}
 
 
+def get_form_config_data(table_name):
+    """Get (form_config, field_overrides) stored in Flansa Form Config for a table"""
+    form_config = {}
+    field_overrides = {}
+    
+    form_doc = frappe.db.get_value(
+        'Flansa Form Config', table_name,
+        ['layout_type', 'sections', 'custom_css', 'custom_js', 'form_title', 'form_description', 'field_overrides'],
+        as_dict=True
+    )
+    if form_doc:
+        form_config = {
+            'layout_type': form_doc.layout_type,
+            'sections': json.loads(form_doc.sections) if form_doc.sections else [],
+            'custom_css': form_doc.custom_css,
+            'custom_js': form_doc.custom_js,
+            'form_title': form_doc.form_title,
+            'form_description': form_doc.form_description
+        }
+        # Parse field overrides
+        if form_doc.field_overrides:
+            try:
+                field_overrides = json.loads(form_doc.field_overrides)
+            except:
+                field_overrides = {}
+    
+    return form_config, field_overrides
+
+
 @frappe.whitelist()
+@conditional(form_config_version)
 def get_table_form_config(table_name, force_refresh=False):
     """Get form configuration for a Flansa table using filtered fields"""
     try:
@@ -280,25 +320,7 @@ def get_table_form_config(table_name, force_refresh=False):
         fields = fields_result.get('fields', [])
         
         # Get form configuration if exists
-        form_config = {}
-        field_overrides = {}
-        
-        if frappe.db.exists('Flansa Form Config', table_name):
-            form_doc = frappe.get_doc('Flansa Form Config', table_name)
-            form_config = {
-                'layout_type': form_doc.layout_type,
-                'sections': json.loads(form_doc.sections) if form_doc.sections else [],
-                'custom_css': form_doc.custom_css,
-                'custom_js': form_doc.custom_js,
-                'form_title': form_doc.form_title,
-                'form_description': form_doc.form_description
-            }
-            # Parse field overrides
-            if form_doc.field_overrides:
-                try:
-                    field_overrides = json.loads(form_doc.field_overrides)
-                except:
-                    field_overrides = {}
+        form_config, field_overrides = get_form_config_data(table_name)
         
         # Apply field overrides if any
         if field_overrides:
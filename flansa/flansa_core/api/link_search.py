@@ -1,16 +1,241 @@
 """
 Enhanced Link Field Search API
 Provides search functionality with display field support
+
+Searches run prefix-first (`LIKE 'term%'`, which can use the index on the
+display field) and only fall back to a contains/full-text match when the
+prefix pass does not fill the page. Results are cached for a few seconds per
+(DocType, fields, term) so repeated keystrokes do not hit the database.
 """
 
+import hashlib
+import re
+
 import frappe
 from frappe import _
 
+from flansa.flansa_core.job_service import enqueue_job
+from flansa.flansa_core.utils.instrumentation import count
+
+# Seconds a search result stays cached
+LINK_SEARCH_CACHE_TTL = 30
+
+# Field types whose columns can carry a plain B-tree index
+INDEXABLE_FIELDTYPES = ['Data', 'Link', 'Select', 'Dynamic Link', 'Int', 'Float', 'Currency', 'Date', 'Datetime']
+
+INDEXED_FIELDS_KEY = "flansa_link_search_indexed"
+
+# Characters with a meaning in MySQL boolean-mode full-text queries
+BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]')
+
+
+def _quote(identifier):
+    """Quote an identifier for the current database"""
+    quote_char = '"' if frappe.db.db_type == 'postgres' else '`'
+    return f"{quote_char}{identifier}{quote_char}"
+
+
+def _escape_like(txt):
+    """Escape LIKE wildcards in user input"""
+    return txt.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _valid_columns(doctype_name, fieldnames):
+    """Keep only fields that exist as columns, so user input never reaches SQL unchecked"""
+    meta = frappe.get_meta(doctype_name)
+    columns = []
+    for fieldname in fieldnames:
+        if fieldname and fieldname not in columns and (fieldname == 'name' or meta.has_field(fieldname)):
+            columns.append(fieldname)
+    return columns
+
+
+def _has_fulltext_index(doctype_name, fieldname):
+    """Check (once per cache lifetime) for a FULLTEXT index on a column"""
+    if frappe.db.db_type == 'postgres':
+        return False
+
+    def _load():
+        return bool(frappe.db.sql("""
+            SELECT 1 FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s
+            AND column_name = %s AND index_type = 'FULLTEXT'
+            LIMIT 1
+        """, (f"tab{doctype_name}", fieldname)))
+
+    return frappe.cache().hget("flansa_link_search_fulltext", f"{doctype_name}:{fieldname}", generator=_load)
+
+
+def _fulltext_query(txt):
+    """Boolean-mode query matching every word of txt as a prefix, with operators stripped"""
+    words = BOOLEAN_OPERATORS.sub(' ', txt).split()
+    return " ".join(f"+{word}*" for word in words)
+
+
+def search_link_values(doctype_name, txt, display_field='name', search_fields=None, start=0, page_len=10):
+    """
+    Search a DocType for link autocomplete
+
+    Results are paged over one ordering: prefix matches first, then the
+    contains/full-text matches that are not prefix matches, each ordered by
+    display field and name.
+
+    Args:
+        doctype_name: The DocType to search
+        txt: Search term
+        display_field: Field shown to the user (and used for ordering)
+        search_fields: Extra fields matched in the contains fallback
+        start: Pagination start
+        page_len: Number of results to return
+
+    Returns:
+        List of dicts with name and display_value
+    """
+    start = max(int(start or 0), 0)
+    page_len = min(max(int(page_len or 10), 1), 100)
+    txt = (txt or '').strip()
+
+    display_field = (_valid_columns(doctype_name, [display_field]) or ['name'])[0]
+    prefix_fields = _valid_columns(doctype_name, ['name', display_field])
+    contains_fields = _valid_columns(doctype_name, prefix_fields + list(search_fields or []))[:4]
+
+    # Case is kept: LIKE is case-sensitive on Postgres
+    cache_key = "flansa_link_search:" + hashlib.md5(
+        f"{doctype_name}|{display_field}|{','.join(contains_fields)}|{txt}|{start}|{page_len}".encode()
+    ).hexdigest()
+    cached = frappe.cache().get_value(cache_key)
+    if cached is not None:
+        count("cache_hits")
+        return cached
+    count("cache_misses")
+
+    table = _quote(f"tab{doctype_name}")
+    select = f"SELECT {_quote('name')} as name, {_quote(display_field)} as display_value FROM {table}"
+    order_by = f"ORDER BY {_quote(display_field)}, {_quote('name')}"
+
+    if not txt:
+        # If no search term, show first records ordered by display field
+        results = frappe.db.sql(f"{select} {order_by} LIMIT %s OFFSET %s", (page_len, start), as_dict=True)
+    else:
+        # Pass 1: prefix match - served by the index on the display field
+        prefix_values = [f"{_escape_like(txt)}%"] * len(prefix_fields)
+        prefix_condition = " OR ".join(f"{_quote(f)} LIKE %s" for f in prefix_fields)
+        results = frappe.db.sql(
+            f"{select} WHERE ({prefix_condition}) {order_by} LIMIT %s OFFSET %s",
+            prefix_values + [page_len, start],
+            as_dict=True
+        )
+
+        # Pass 2: contains / full-text matches, only once the prefix matches are exhausted
+        if len(results) < page_len:
+            if results:
+                prefix_total = start + len(results)
+            else:
+                prefix_total = frappe.db.sql(
+                    f"SELECT COUNT(*) FROM {table} WHERE ({prefix_condition})", prefix_values
+                )[0][0]
+
+            fulltext_query = _fulltext_query(txt) if _has_fulltext_index(doctype_name, display_field) else None
+            if fulltext_query:
+                condition = f"MATCH({_quote(display_field)}) AGAINST (%s IN BOOLEAN MODE)"
+                values = [fulltext_query]
+            else:
+                condition = " OR ".join(f"{_quote(f)} LIKE %s" for f in contains_fields)
+                values = [f"%{_escape_like(txt)}%"] * len(contains_fields)
+
+            # Prefix matches were paged by pass 1; COALESCE keeps rows with an empty display field
+            not_prefix = " OR ".join(f"COALESCE({_quote(f)}, '') LIKE %s" for f in prefix_fields)
+            results += frappe.db.sql(
+                f"{select} WHERE ({condition}) AND NOT ({not_prefix}) {order_by} LIMIT %s OFFSET %s",
+                values + prefix_values + [page_len - len(results), max(start - prefix_total, 0)],
+                as_dict=True
+            )
+
+    results = [{"name": row.name, "display_value": row.display_value} for row in results]
+    frappe.cache().set_value(cache_key, results, expires_in_sec=LINK_SEARCH_CACHE_TTL)
+    return results
+
+
+def ensure_display_field_index(doctype_name, display_field):
+    """Create an index on a link display field so prefix searches can use it"""
+    if not display_field or display_field == 'name':
+        return False
+
+    cache_field = f"{doctype_name}:{display_field}"
+    if frappe.cache().hget(INDEXED_FIELDS_KEY, cache_field):
+        return True
+
+    if not frappe.db.exists("DocType", doctype_name):
+        return False
+
+    df = frappe.get_meta(doctype_name).get_field(display_field)
+    if not df or df.fieldtype not in INDEXABLE_FIELDTYPES:
+        return False
+
+    frappe.db.add_index(doctype_name, [display_field], index_name=f"{display_field}_link_search")
+    frappe.cache().hset(INDEXED_FIELDS_KEY, cache_field, 1)
+    return True
+
+
+def _link_display_target(doc):
+    """(target DocType, display field) of a link logic field, or None"""
+    if doc.get("logic_type") != "link" or not doc.get("link_display_field"):
+        return None
+
+    target = doc.get("link_target_doctype")
+    if not target:
+        table_doctype = frappe.db.get_value("Flansa Table", doc.table_name, "doctype_name")
+        df = frappe.get_meta(table_doctype).get_field(doc.field_name) if table_doctype else None
+        target = df.options if df and df.fieldtype == "Link" else None
+
+    return (target, doc.link_display_field) if target else None
+
+
+def ensure_link_display_index(doc, method=None):
+    """
+    Doc event for Flansa Logic Field: index the display field of link fields
+
+    add_index commits and alters the table, so it runs as a maintenance job
+    after the save commits rather than inside it.
+    """
+    try:
+        link = _link_display_target(doc)
+        if not link or frappe.cache().hget(INDEXED_FIELDS_KEY, f"{link[0]}:{link[1]}"):
+            return
+
+        enqueue_job(
+            'flansa.flansa_core.api.link_search.ensure_display_field_index',
+            'maintenance',
+            job_key=f"flansa_link_index_{link[0]}_{link[1]}",
+            after_commit=True,
+            label=f"Index {link[0]}.{link[1]}",
+            doctype_name=link[0],
+            display_field=link[1]
+        )
+    except Exception as e:
+        frappe.log_error(f"Error creating link display index: {str(e)}", "Link Search")
+
+
+def ensure_all_link_display_indexes():
+    """after_migrate: index display fields of all existing link logic fields"""
+    for doc in frappe.get_all(
+        "Flansa Logic Field",
+        filters={"logic_type": "link", "is_active": 1, "link_display_field": ["is", "set"]},
+        fields=["name", "table_name", "field_name", "logic_type", "link_target_doctype", "link_display_field"]
+    ):
+        try:
+            link = _link_display_target(doc)
+            if link:
+                ensure_display_field_index(*link)
+        except Exception as e:
+            frappe.log_error(f"Error creating link display index: {str(e)}", "Link Search")
+
+
 @frappe.whitelist()
 def search_with_display_field(doctype, txt, searchfield="name", start=0, page_len=10, filters=None, **kwargs):
     """
     Enhanced search for link fields that includes display field values
-    
+
     Args:
         doctype: The target DocType to search
         txt: Search term
@@ -18,91 +243,47 @@ def search_with_display_field(doctype, txt, searchfield="name", start=0, page_le
         start: Pagination start
         page_len: Number of results to return
         filters: Additional filters (includes 'display_field' key)
-    
+
     Returns:
         List of [value, label, description] tuples for autocomplete
     """
     try:
-        
+
         # Handle filters that might be passed as JSON string
         if isinstance(filters, str):
             import json
             filters = json.loads(filters)
-        
+
         if not filters:
             filters = {}
-        
+
         display_field = filters.get('display_field', 'name')
         doctype_name = filters.get('doctype', doctype)
-        
+
         # Verify the DocType exists
         if not frappe.db.exists("DocType", doctype_name):
             return []
-        
-        # Build search conditions - search both name and display field
-        search_conditions = []
-        values = []
-        
-        # Use appropriate quote character based on database type
-        quote_char = '"' if frappe.db.db_type == 'postgres' else '`'
-        
-        if txt and txt.strip():
-            search_conditions.append(f"{quote_char}name{quote_char} LIKE %s")
-            values.append(f"%{txt}%")
-            
-            if display_field != 'name':
-                search_conditions.append(f"{quote_char}{display_field}{quote_char} LIKE %s")
-                values.append(f"%{txt}%")
-        
-        # Build the query
-        search_clause = ""
-        if search_conditions:
-            search_clause = f"WHERE ({' OR '.join(search_conditions)})"
-        else:
-            # If no search term, show first 10 records ordered by display field
-            pass
-        
-        # Execute the search - use database-agnostic query
-        # Build query using Frappe's database abstraction
-        if frappe.db.db_type == 'postgres':
-            # PostgreSQL syntax
-            query = f"""
-                SELECT "name", "{display_field}" as display_value
-                FROM "tab{doctype_name}"
-                {search_clause}
-                ORDER BY "{display_field}", "name"
-                LIMIT {page_len} OFFSET {start}
-            """
-        else:
-            # MySQL/MariaDB syntax
-            query = f"""
-                SELECT `name`, `{display_field}` as display_value
-                FROM `tab{doctype_name}`
-                {search_clause}
-                ORDER BY `{display_field}`, `name`
-                LIMIT {start}, {page_len}
-            """
-        
-        results = frappe.db.sql(query, values, as_dict=True)
-        
+
+        results = search_link_values(doctype_name, txt, display_field, start=start, page_len=page_len)
+
         # Format results for Frappe autocomplete
         # Return format: [value, label, description]
         formatted_results = []
         for row in results:
             name = row.get('name')
             display_value = row.get('display_value') or name
-            
+
             # Only show ID in description if it's different from display value
             description = f"ID: {name}" if name != display_value else ""
-            
+
             formatted_results.append([
-                name,                           # value (what gets stored)  
+                name,                           # value (what gets stored)
                 display_value,                  # label (what user sees)
                 description                     # description (additional info)
             ])
-        
+
         return formatted_results
-        
+
     except Exception as e:
         frappe.log_error(f"Link search error: {str(e)}", "Link Search")
-        return []
\ No newline at end of file
+        return []
@@ -0,0 +1,141 @@
+"""
+Performance API for Flansa
+Serves the request instrumentation collected by flansa_core/utils/instrumentation.py
+and the query findings of flansa_core/utils/query_inspector.py
+"""
+
+import frappe
+
+from flansa.flansa_core.utils.instrumentation import (
+    LATENCY_BUCKETS_MS,
+    get_level,
+    get_sample_rate,
+    get_stats,
+    reset_stats,
+)
+from flansa.flansa_core.utils.query_inspector import QUERY_BUDGETS, get_findings, clear_findings
+
+
+@frappe.whitelist()
+def get_instrumentation_stats():
+    """
+    Aggregated timing, query and cache stats per instrumented endpoint
+
+    Counts cover sampled requests only; divide by sample_rate to estimate totals.
+    """
+    frappe.only_for('System Manager')
+
+    try:
+        endpoints = {}
+        for name, stats in get_stats().items():
+            calls = stats["count"] or 1
+            endpoints[name] = {
+                "count": stats["count"],
+                "errors": stats["errors"],
+                "avg_ms": round(stats["total_ms"] / calls, 2),
+                "max_ms": round(stats["max_ms"], 2),
+                "avg_queries": round(stats["queries"] / calls, 2),
+                "avg_query_ms": round(stats["query_ms"] / calls, 2),
+                "cache_hits": stats["cache_hits"],
+                "cache_misses": stats["cache_misses"],
+                "logic_evaluations": stats["logic_evaluations"],
+            }
+
+        return {
+            "success": True,
+            "level": frappe.conf.get("flansa_instrumentation") or "basic",
+            "sample_rate": get_sample_rate(),
+            "endpoints": dict(sorted(endpoints.items(), key=lambda item: -item[1]["avg_ms"] * item[1]["count"]))
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Error reading instrumentation stats: {str(e)}", "Flansa Instrumentation")
+        return {"success": False, "error": str(e)}
+
+
+@frappe.whitelist(methods=["POST"])
+def reset_instrumentation_stats():
+    """Clear all aggregated instrumentation stats"""
+    frappe.only_for('System Manager')
+    reset_stats()
+    return {"success": True}
+
+
+@frappe.whitelist()
+def get_query_findings():
+    """Latest N+1 and query budget findings per inspected endpoint, with the declared budgets"""
+    frappe.only_for('System Manager')
+
+    return {
+        "success": True,
+        "mode": frappe.conf.get("flansa_query_inspector") or "off",
+        "budgets": QUERY_BUDGETS,
+        "endpoints": get_findings()
+    }
+
+
+@frappe.whitelist(methods=["POST"])
+def clear_query_findings():
+    frappe.only_for('System Manager')
+    clear_findings()
+    return {"success": True}
+
+
+@frappe.whitelist()
+def get_prometheus_metrics():
+    """
+    Instrumentation stats in the Prometheus text exposition format
+
+    Disabled unless flansa_prometheus_exporter is set in site config. Scrape it
+    with the API key of a System Manager user.
+    """
+    from werkzeug.wrappers import Response
+
+    if not frappe.conf.get("flansa_prometheus_exporter"):
+        raise frappe.PermissionError("Prometheus exporter is not enabled")
+    frappe.only_for('System Manager')
+
+    return Response(build_prometheus_text(), mimetype="text/plain; version=0.0.4")
+
+
+def build_prometheus_text():
+    stats_by_name = get_stats()
+    lines = [
+        "# HELP flansa_instrumentation_sample_rate Share of requests that are measured",
+        "# TYPE flansa_instrumentation_sample_rate gauge",
+        f"flansa_instrumentation_sample_rate {get_sample_rate() if get_level() else 0}",
+    ]
+
+    counters = [
+        ("flansa_endpoint_requests_total", "Sampled calls", "count", 1),
+        ("flansa_endpoint_errors_total", "Sampled calls that raised", "errors", 1),
+        ("flansa_endpoint_db_queries_total", "Database queries in sampled calls", "queries", 1),
+        ("flansa_endpoint_db_query_seconds_total", "Database time in sampled calls", "query_ms", 1000),
+        ("flansa_endpoint_cache_hits_total", "Cache hits in sampled calls", "cache_hits", 1),
+        ("flansa_endpoint_cache_misses_total", "Cache misses in sampled calls", "cache_misses", 1),
+        ("flansa_endpoint_logic_evaluations_total", "Logic field evaluations in sampled calls", "logic_evaluations", 1),
+    ]
+    for metric, help_text, key, divisor in counters:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for name, stats in stats_by_name.items():
+            lines.append(f'{metric}{{endpoint="{_label(name)}"}} {stats[key] / divisor}')
+
+    metric = "flansa_endpoint_duration_seconds"
+    lines.append(f"# HELP {metric} Wall time of sampled calls")
+    lines.append(f"# TYPE {metric} histogram")
+    for name, stats in stats_by_name.items():
+        label = _label(name)
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS_MS, stats["buckets"]):
+            cumulative += bucket_count
+            lines.append(f'{metric}_bucket{{endpoint="{label}",le="{bound / 1000}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{endpoint="{label}",le="+Inf"}} {stats["count"]}')
+        lines.append(f'{metric}_sum{{endpoint="{label}"}} {stats["total_ms"] / 1000}')
+        lines.append(f'{metric}_count{{endpoint="{label}"}} {stats["count"]}')
+
+    return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
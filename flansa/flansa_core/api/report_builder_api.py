@@ -9,6 +9,14 @@ filtering, sorting, and multiple view modes including gallery view.
 import frappe
 import json
 
+from flansa.flansa_core.report_cache_service import get_cached_report
+from flansa.flansa_core.utils.conditional_response import conditional, table_metadata_version
+from flansa.flansa_core.report_plan_service import apply_joins, bind_filters, get_report_plan
+from flansa.flansa_core.report_summary_service import get_summary_report
+from flansa.flansa_core.utils.image_derivatives import with_thumbnail_urls, DEFAULT_GALLERY_SIZE
+from flansa.flansa_core.utils.instrumentation import instrument, debug_log
+from flansa.flansa_core.utils.query_inspector import query_budget
+
 def get_period_expression(field, period):
     """
     Generate SQL expression for time period grouping
@@ -58,6 +66,7 @@ from frappe import _
 from frappe.utils import now
 
 @frappe.whitelist()
+@conditional(table_metadata_version)
 def get_report_field_options(table_name):
     """
     Get all available fields for report building including:
@@ -150,18 +159,24 @@ def get_report_field_options(table_name):
         logic_fields = []
         link_fields_in_current = []
         
+        # Tables of this app (and their related tables) come from the cached relationship graph
+        from flansa.flansa_core.relationship_graph_service import get_relationship_graph
+        graph = get_relationship_graph(table_doc.application)
+        
         # First, process regular Link fields from the DocType
         for field in meta.fields:
             if field.fieldtype == "Link" and field.options:
                 # Try to map the DocType back to a Flansa Table
-                target_table = None
+                target_table = graph.table_for_doctype(field.options)
                 try:
-                    # Look for a Flansa Table that uses this DocType
-                    target_tables = frappe.get_all("Flansa Table", 
-                                                   filters={"doctype_name": field.options},
-                                                   fields=["name", "table_label"])
-                    if target_tables:
-                        target_table = target_tables[0].name
+                    if not target_table:
+                        # Look for a Flansa Table outside this app that uses this DocType
+                        target_tables = frappe.get_all("Flansa Table", 
+                                                       filters={"doctype_name": field.options},
+                                                       fields=["name", "table_label"])
+                        if target_tables:
+                            target_table = target_tables[0].name
+                    if target_table:
                         link_fields_in_current.append({
                             "field_name": field.fieldname,
                             "target_table": target_table,
@@ -219,7 +234,11 @@ def get_report_field_options(table_name):
         # Process each link field to get its target table fields
         for link_field in link_fields_in_current:
             try:
-                target_table_doc = frappe.get_doc("Flansa Table", link_field["target_table"])
+                target_table_doc = graph.get_table(link_field["target_table"])
+                if target_table_doc:
+                    target_table_doc = frappe._dict(target_table_doc)
+                else:
+                    target_table_doc = frappe.get_doc("Flansa Table", link_field["target_table"])
                 target_doctype = target_table_doc.doctype_name
                 
                 if target_doctype and frappe.db.exists("DocType", target_doctype):
@@ -496,16 +515,11 @@ def execute_grouped_query(doctype_name, query_fields, filters, grouping_config,
                 values.append(condition)
         
         # Log the query for debugging
-        frappe.logger().info(f"Grouped Query SQL: {sql}")
-        frappe.logger().info(f"Grouped Query Values: {values}")
+        debug_log(f"Grouped Query SQL: {sql} values: {values}")
         
         # Execute the query
         result = frappe.db.sql(sql, values, as_dict=True)
         
-        frappe.logger().info(f"Grouped Query Result: {len(result)} rows")
-        if result:
-            frappe.logger().info(f"First row keys: {list(result[0].keys())}")
-        
         return result
         
     except Exception as e:
@@ -523,6 +537,7 @@ def execute_grouped_query(doctype_name, query_fields, filters, grouping_config,
             order_by=order_by
         )
 
+@instrument()
 def execute_grouped_report(doctype_name, query_fields, filters, grouping_config, order_by, start, page_size, field_map, selected_fields):
     """
     Execute a grouped report and return data structured for modern grouped UI
@@ -556,9 +571,7 @@ def execute_grouped_report(doctype_name, query_fields, filters, grouping_config,
             except Exception:
                 pass
                 
-        print("🔍 FIELD DEBUG: " + group_field + " -> " + str(field_type) + " (period: " + str(period) + ")")
-        print("🔍 SELECTED FIELDS: " + str(selected_fields))
-        print("🔍 FIELD MAP: " + str(field_map))
+        debug_log(f"Grouping field {group_field} -> {field_type} (period: {period})")
         
         # Use period expression if applicable
         if period != 'exact' and field_type in ['Date', 'Datetime']:
@@ -568,8 +581,7 @@ def execute_grouped_report(doctype_name, query_fields, filters, grouping_config,
             group_expression = f"`{group_field}`"
             group_alias = group_field
             
-        frappe.logger().info(f"🔍 Grouping Debug: field={group_field}, type={field_type}, period={period}")
-        frappe.logger().info(f"🔍 Group expression: {group_expression}, alias: {group_alias}")
+        debug_log(f"Group expression: {group_expression}, alias: {group_alias}")
         
         # Query 1: Get group summaries
         if aggregate_type in ['count', 'group']:  # Handle 'group' as 'count'
@@ -620,24 +632,9 @@ def execute_grouped_report(doctype_name, query_fields, filters, grouping_config,
         summary_sql += " GROUP BY {} ORDER BY {}".format(group_expression, group_expression)
         
         # Execute summary query
-        print("🔍 EXECUTING SUMMARY SQL: " + summary_sql)
-        print("🔍 WITH VALUES: " + str(filter_values))
-        
-        try:
-            group_summaries = frappe.db.sql(summary_sql, filter_values, as_dict=True)
-            print("🔍 SQL EXECUTED SUCCESSFULLY")
-        except Exception as sql_error:
-            print("🔍 SQL EXECUTION FAILED: " + str(sql_error))
-            raise sql_error
-        print("🔍 SUMMARY RESULTS: Found " + str(len(group_summaries)) + " groups")
-        if group_summaries:
-            print("🔍 FIRST GROUP: " + str(group_summaries[0]))
-            print("🔍 ALL GROUPS: " + str(group_summaries))
-        else:
-            print("🔍 NO GROUPS RETURNED - checking if table has data...")
-            test_sql = "SELECT COUNT(*) as cnt FROM `tab{}`".format(doctype_name)
-            test_count = frappe.db.sql(test_sql)[0][0]
-            print("🔍 TOTAL RECORDS IN TABLE: " + str(test_count))
+        debug_log(f"Grouped summary SQL: {summary_sql} values: {filter_values}")
+        group_summaries = frappe.db.sql(summary_sql, filter_values, as_dict=True)
+        debug_log(f"Grouped summary returned {len(group_summaries)} groups")
         
         # Query 2: Get detail records for each group (limited for performance)
         groups_data = []
@@ -662,8 +659,7 @@ def execute_grouped_report(doctype_name, query_fields, filters, grouping_config,
                     detail_filter_values.extend(filter_values)
                 
                 detail_sql += " ORDER BY {} LIMIT 10".format(order_by or 'creation desc')
-                print("🔍 EXECUTING DETAIL SQL: " + detail_sql)
-                print("🔍 WITH VALUES: " + str(detail_filter_values))
+                debug_log(f"Group detail SQL: {detail_sql} values: {detail_filter_values}")
                 detail_records = frappe.db.sql(detail_sql, detail_filter_values, as_dict=True)
             else:
                 # Exact value matching
@@ -675,26 +671,10 @@ def execute_grouped_report(doctype_name, query_fields, filters, grouping_config,
                     order_by=order_by or "creation desc"
                 )
             
-            # Format group data with correct label from alias
-            # Make period labels more user-friendly
-            formatted_label = group_value or '(Empty)'
-            if period != 'exact' and group_value:
-                if period == 'week':
-                    # Convert YEARWEEK number to readable format
-                    formatted_label = f"Week {group_value}"
-                elif period == 'month':
-                    formatted_label = f"Month {group_value}"
-                elif period == 'year':
-                    formatted_label = f"Year {group_value}"
-                elif period == 'hour':
-                    formatted_label = f"Hour {group_value}:00"
-                elif period == 'day':
-                    formatted_label = f"Day {group_value}"
-            
             group_data = {
                 'group_field': group_field,
                 'group_value': group_value,
-                'group_label': formatted_label,
+                'group_label': format_group_label(group_value, period),
                 'count': summary.get('group_count', 0),
                 'aggregate': summary.get('group_aggregate') if 'group_aggregate' in summary else None,
                 'aggregate_type': aggregate_type if aggregate_type not in ['count', 'group'] else None,
@@ -720,7 +700,6 @@ def execute_grouped_report(doctype_name, query_fields, filters, grouping_config,
             "fields": selected_fields  # Include field metadata for UI
         }
         
-        print("🔍 RETURNING GROUPED RESULT: is_grouped=" + str(result['is_grouped']) + ", total_groups=" + str(result['total_groups']))
         return result
         
     except Exception as e:
@@ -736,11 +715,26 @@ def execute_grouped_report(doctype_name, query_fields, filters, grouping_config,
             "total": len(records)
         }
 
+def format_group_label(group_value, period):
+    """Group label with user-friendly period names"""
+    formatted_label = group_value or '(Empty)'
+    if period != 'exact' and group_value:
+        if period == 'week':
+            # Convert YEARWEEK number to readable format
+            formatted_label = f"Week {group_value}"
+        elif period == 'month':
+            formatted_label = f"Month {group_value}"
+        elif period == 'year':
+            formatted_label = f"Year {group_value}"
+        elif period == 'hour':
+            formatted_label = f"Hour {group_value}:00"
+        elif period == 'day':
+            formatted_label = f"Day {group_value}"
+    return formatted_label
+
 def process_image_field_value(image_value):
     """Process image field value to ensure it's in the correct format for frontend"""
     try:
-        frappe.logger().info(f"Processing image field value: {image_value} (type: {type(image_value)})")
-        
         if not image_value:
             return None
         
@@ -751,7 +745,6 @@ def process_image_field_value(image_value):
         if isinstance(image_value, str):
             # Check if it looks like a JSON array - keep it as is for frontend processing
             if image_value.startswith('[') and image_value.endswith(']'):
-                frappe.logger().info(f"Preserving JSON array for frontend: {image_value}")
                 return image_value
             
             # Check if it looks like JSON object and try to parse it
@@ -783,7 +776,6 @@ def process_image_field_value(image_value):
         
         # If it's a list, preserve the full list for frontend multi-image handling
         elif isinstance(image_value, list):
-            frappe.logger().info(f"Preserving list structure for frontend: {len(image_value)} items")
             return image_value
             
         # If it's a dict, extract the file path (single image)
@@ -791,9 +783,7 @@ def process_image_field_value(image_value):
             return image_value.get('file_url') or image_value.get('url') or image_value.get('name')
             
         # Convert everything else to string
-        result = str(image_value) if image_value else None
-        frappe.logger().info(f"Final processed image value: {result}")
-        return result
+        return str(image_value) if image_value else None
         
     except Exception as e:
         frappe.logger().error(f"Error processing image field value {image_value}: {str(e)}")
@@ -881,7 +871,9 @@ def test_grouping_debug():
         return {"success": False, "error": str(e), "traceback": traceback.format_exc()}
 
 @frappe.whitelist()
-def execute_report(report_config, view_options=None):
+@instrument()
+@query_budget(50)
+def execute_report(report_config, view_options=None, report_id=None):
     """
     Execute a report and return data for display
     
@@ -895,10 +887,19 @@ def execute_report(report_config, view_options=None):
     view_options: {
         "search": "search term",
         "filters": {"status": "Active"},
+        "params": {"f0": "Closed"}  (values for the report filter slots, by position),
         "page": 1,
         "page_size": 20,
-        "view_type": "table" | "gallery"
+        "view_type": "table" | "gallery",
+        "image_size": "thumb" | "medium" | "large" | "original"  (gallery images, default "medium"),
+        "no_cache": true  (skip the report result cache)
     }
+    
+    report_id: saved report the config was loaded from; its compiled plan is
+    used while the config is unchanged (see report_plan_service).
+    
+    Results are served from the report result cache while none of the tables
+    the report reads have changed (see report_cache_service).
     """
     try:
         if isinstance(report_config, str):
@@ -909,209 +910,95 @@ def execute_report(report_config, view_options=None):
         else:
             view_options = view_options or {}
         
-        base_table = report_config["base_table"]
-        selected_fields = report_config.get("selected_fields", [])
+        plan = get_report_plan(report_config, report_id)
         
-        # Get table and DocType info
-        table_doc = frappe.get_doc("Flansa Table", base_table)
-        doctype_name = table_doc.doctype_name
+        return get_cached_report(
+            report_config,
+            view_options,
+            plan["doctype"],
+            lambda: execute_report_plan(plan, view_options, report_id)
+        )
         
-        if not doctype_name or not frappe.db.exists("DocType", doctype_name):
-            return {"success": False, "error": "DocType not found or not generated"}
+    except Exception as e:
+        frappe.log_error(f"Error executing report: {str(e)}", "Report Builder")
+        return {"success": False, "error": str(e)}
+
+def execute_report_plan(plan, view_options, report_id=None):
+    """Run a compiled report plan with its parameters bound (no caching)"""
+    try:
+        # Saved reports in summary mode answer their grouped view from pre-aggregated rows
+        runtime_filters = view_options.get("search") or view_options.get("filters") or view_options.get("params")
+        if plan["grouping"] and report_id and not runtime_filters:
+            summary_result = get_summary_report(report_id, plan)
+            if summary_result:
+                return summary_result
         
-        # Build query fields - start with essential fields
-        query_fields = ["name", "creation", "modified"]
-        field_map = {}
-        parent_field_configs = []
-        related_field_configs = []
-        
-        for field_config in selected_fields:
-            if field_config["category"] == "current":
-                # Check if this is a computed/virtual field
-                if field_config.get("is_virtual") or field_config.get("fetch_from"):
-                    # Skip virtual/computed fields from direct query
-                    field_map[field_config["fieldname"]] = field_config
-                else:
-                    # Add current table field
-                    query_fields.append(field_config["fieldname"])
-                    field_map[field_config["fieldname"]] = field_config
-            elif field_config["category"] == "parent":
-                # Store parent field config for later processing
-                parent_field_configs.append(field_config)
-            elif field_config["category"] == "related":
-                # Store related field config for later processing
-                related_field_configs.append(field_config)
-                field_map[field_config["fieldname"]] = field_config
-        
-        # Build filters
-        filters = {}
-        
-        # Add report-level filters
-        for filter_config in report_config.get("filters", []):
-            filter_value = filter_config["value"]
-            operator = filter_config["operator"]
-            
-            if operator == "between" and isinstance(filter_value, list):
-                filters[filter_config["field"]] = ["between", filter_value]
-            elif operator == "is":
-                # Handle empty/null checks
-                filters[filter_config["field"]] = ["in", ["", None]]
-            elif operator == "is not":
-                # Handle not empty/null checks
-                filters[filter_config["field"]] = ["not in", ["", None]]
-            else:
-                filters[filter_config["field"]] = [operator, filter_value]
-        
-        # Add view-level filters
-        view_filters = view_options.get("filters", {})
-        for field, value in view_filters.items():
-            filters[field] = value
-        
-        # Add search functionality - search across multiple text fields
-        search_term = view_options.get("search")
-        if search_term:
-            # Get text-searchable fields from selected fields
-            searchable_fields = []
-            for field_config in selected_fields:
-                if field_config["category"] == "current":
-                    field_type = field_config.get("fieldtype", "")
-                    if field_type in ["Data", "Text", "Small Text", "Long Text", "Text Editor"]:
-                        searchable_fields.append(field_config["fieldname"])
-            
-            # If we have searchable fields, create OR condition
-            if searchable_fields:
-                # Build search condition for multiple fields
-                search_filters = []
-                for field in searchable_fields:
-                    search_filters.append([field, "like", f"%{search_term}%"])
-                
-                # Add as OR filter - note: this is a simplified approach
-                # For production, you might want to use raw SQL for complex OR conditions
-                if len(search_filters) == 1:
-                    filters[searchable_fields[0]] = ["like", f"%{search_term}%"]
-                else:
-                    # For multiple fields, we'll use the first field for now
-                    # and log that multi-field search needs enhancement
-                    filters[searchable_fields[0]] = ["like", f"%{search_term}%"]
-                    frappe.log_error(f"Multi-field search across {len(searchable_fields)} fields simplified to first field", "Report Builder Search")
+        doctype_name = plan["doctype"]
+        filters = bind_filters(plan, view_options)
         
         # Pagination
         page_size = view_options.get("page_size", 20)
         page = view_options.get("page", 1)
+        image_size = view_options.get("image_size", DEFAULT_GALLERY_SIZE)
         start = (page - 1) * page_size
         
-        # Build order by
-        order_by = "creation desc"  # Default
-        sort_config = report_config.get("sort", [])
-        if sort_config:
-            order_parts = []
-            for sort_item in sort_config:
-                direction = sort_item.get("direction", "asc")
-                order_parts.append(f"`{sort_item['field']}` {direction}")
-            order_by = ", ".join(order_parts)
-        
-        # Check if grouping is requested
-        grouping_config = report_config.get("grouping", [])
-        
-        # IMPORTANT: Use print statements that will show in console
-        print("🔍 GROUPING DEBUG: Report Config Keys = " + str(list(report_config.keys())))
-        print("🔍 GROUPING DEBUG: Grouping config = " + str(grouping_config))
-        print("🔍 GROUPING DEBUG: Has grouping = " + str(bool(grouping_config)))
-        
-        if grouping_config:
-            frappe.logger().info("Executing grouped query")
+        debug_log(f"Report {plan['base_table']} grouping config: {plan['grouping']}")
+        
+        if plan["grouping"]:
             # Execute grouped query and return grouped structure
             return execute_grouped_report(
-                doctype_name, 
-                query_fields, 
-                filters, 
-                grouping_config,
-                order_by,
+                doctype_name,
+                plan["query_fields"],
+                filters,
+                plan["grouping"],
+                plan["order_by"],
                 start,
                 page_size,
-                field_map,
-                selected_fields
-            )
-        else:
-            # Execute main query
-            records = frappe.get_all(doctype_name,
-                fields=query_fields,
-                filters=filters,
-                limit_start=start,
-                limit_page_length=page_size,
-                order_by=order_by
+                plan["field_map"],
+                plan["selected_fields"]
             )
         
+        records = frappe.get_all(doctype_name,
+            fields=plan["query_fields"] + plan["hidden_fields"],
+            filters=filters,
+            limit_start=start,
+            limit_page_length=page_size,
+            order_by=plan["order_by"]
+        )
+        
         # Get total count for pagination
         total_count = frappe.db.count(doctype_name, filters)
         
-        # Enhance records with parent field data and computed fields
-        enhanced_records = []
-        for record in records:
-            enhanced_record = dict(record)
-            
-            # Add parent field data via relationships
-            for field_config in parent_field_configs:
-                try:
-                    parent_value = get_parent_field_value(
-                        doctype_name,
-                        record["name"], 
-                        field_config
-                    )
-                    enhanced_record[field_config["fieldname"]] = parent_value
-                except Exception as parent_error:
-                    enhanced_record[field_config["fieldname"]] = None
-                    frappe.log_error(f"Error getting parent field value: {str(parent_error)}", "Report Builder")
-            
-            # Add related field data via link field lookups
-            for field_config in related_field_configs:
+        enhanced_records = [dict(record) for record in records]
+        
+        # Parent and related columns, one query per join path
+        apply_joins(plan, enhanced_records)
+        
+        for record in enhanced_records:
+            # Computed/virtual field values come from the document
+            if plan["virtual_fields"]:
                 try:
-                    related_value = get_related_field_value(
-                        doctype_name,
-                        record["name"],
-                        field_config
-                    )
-                    enhanced_record[field_config["fieldname"]] = related_value
-                except Exception as related_error:
-                    enhanced_record[field_config["fieldname"]] = None
-                    frappe.log_error(f"Error getting related field value: {str(related_error)}", "Report Builder")
-            
-            # Add computed/virtual field values and debug image fields
-            for field_name, field_config in field_map.items():
-                if field_config.get("is_virtual") or field_config.get("is_computed"):
-                    try:
-                        # Get the actual value from the document
-                        doc = frappe.get_doc(doctype_name, record["name"])
-                        computed_value = getattr(doc, field_name, None)
-                        enhanced_record[field_name] = computed_value
-                        
-                        # Debug image fields
-                        if field_config.get("is_gallery") and field_config["fieldtype"] in ['Attach Image', 'Attach']:
-                            frappe.logger().info(f"Gallery field {field_name} raw value: {computed_value} (type: {type(computed_value)})")
-                    except Exception as computed_error:
-                        enhanced_record[field_name] = None
-                        frappe.log_error(f"Error getting computed field value for {field_name}: {str(computed_error)}", "Report Builder")
-                        
-                # Also debug regular image fields from the query
-                elif field_config.get("is_gallery") and field_name in enhanced_record:
-                    frappe.logger().info(f"Regular gallery field {field_name} query value: {enhanced_record[field_name]} (type: {type(enhanced_record[field_name])})")
-            
-            # Process image fields to ensure they are in the correct format
-            for field_name, field_config in field_map.items():
-                if field_config.get("is_gallery") and field_name in enhanced_record:
-                    enhanced_record[field_name] = process_image_field_value(enhanced_record[field_name])
+                    doc = frappe.get_doc(doctype_name, record["name"])
+                    for field_name in plan["virtual_fields"]:
+                        record[field_name] = getattr(doc, field_name, None)
+                except Exception as computed_error:
+                    for field_name in plan["virtual_fields"]:
+                        record[field_name] = None
+                    frappe.log_error(f"Error getting computed field values for {record['name']}: {str(computed_error)}", "Report Builder")
             
-            # Also process parent field image values
-            for field_config in parent_field_configs:
-                if field_config.get("is_gallery") and field_config["fieldname"] in enhanced_record:
-                    enhanced_record[field_config["fieldname"]] = process_image_field_value(enhanced_record[field_config["fieldname"]])
+            # Process image fields to ensure they are in the correct format (thumbnails where available)
+            for field_name in plan["gallery_fields"]:
+                if field_name in record:
+                    record[field_name] = process_image_field_value(
+                        with_thumbnail_urls(record[field_name], image_size))
             
-            enhanced_records.append(enhanced_record)
+            for field_name in plan["hidden_fields"]:
+                record.pop(field_name, None)
         
         # Get gallery information if needed
         gallery_info = None
         if view_options.get("view_type") == "gallery":
-            gallery_info = get_gallery_field_info(doctype_name, selected_fields)
+            gallery_info = get_gallery_field_info(doctype_name, plan["selected_fields"])
         
         return {
             "success": True,
@@ -1121,7 +1008,7 @@ def execute_report(report_config, view_options=None):
             "page_size": page_size,
             "total_pages": (total_count + page_size - 1) // page_size,
             "gallery_info": gallery_info,
-            "field_definitions": {**field_map, **{fc["fieldname"]: fc for fc in parent_field_configs}}
+            "field_definitions": plan["field_definitions"]
         }
         
     except Exception as e:
@@ -2,6 +2,10 @@ import frappe
 from flansa.flansa_core.doctype_hooks import calculate_logic_fields
 from frappe import _
 from flansa.flansa_core.workspace_service import apply_tenant_filter, get_workspace_filter
+from flansa.flansa_core.report_cache_service import bump_data_versions
+from flansa.flansa_core.report_summary_service import mark_doctype_summaries_stale
+from flansa.flansa_core.utils.conditional_response import conditional, table_metadata_version
+from flansa.flansa_core.utils.link_resolver import get_link_value, parse_link_expression, prefetch_link_values
 
 @frappe.whitelist()
 def get_tables_list(app_name=None):
@@ -80,6 +84,7 @@ def get_table_info(table_name):
         }
 
 @frappe.whitelist()
+@conditional(table_metadata_version)
 def get_table_fields(table_name):
     """Get fields for a specific table (Flansa Table or system DocType)"""
     
@@ -484,47 +489,7 @@ def get_record(table_name, record_id):
         # Get the record
         record = frappe.get_doc(table_doc.doctype_name, record_id).as_dict()
         
-        # Get fields metadata using native fields API (same as form builder)
-        # This ensures system fields are included and properly handled
-        fields = []
-        try:
-            from flansa.native_fields import get_table_fields_native
-            native_result = get_table_fields_native(table_name)
-            if native_result.get('success'):
-                for field in native_result.get('fields', []):
-                    # Skip layout fields but include system fields
-                    if field.get('fieldtype') not in ['Section Break', 'Column Break', 'Tab Break']:
-                        fields.append({
-                            "fieldname": field.get('fieldname'),
-                            "fieldtype": field.get('fieldtype'),
-                            "label": field.get('label'),
-                            "reqd": field.get('reqd', 0),
-                            "options": field.get('options', ''),
-                            "description": field.get('description', ''),
-                            "read_only": field.get('read_only', 0),
-                            "hidden": field.get('hidden', 0),
-                            "default": field.get('default', ''),
-                            "is_system_field": field.get('is_system_field', False)
-                        })
-        except Exception as native_error:
-            # Fallback to DocType meta if native fields fails
-            frappe.log_error(f"Native fields failed for {table_name}: {str(native_error)}", "Record API Fallback")
-            if frappe.db.exists("DocType", table_doc.doctype_name):
-                doctype_meta = frappe.get_meta(table_doc.doctype_name)
-                
-                for field in doctype_meta.fields:
-                    fields.append({
-                        "fieldname": field.fieldname,
-                        "fieldtype": field.fieldtype,
-                        "label": field.label,
-                        "reqd": field.reqd,
-                        "options": field.options,
-                        "description": field.description,
-                        "read_only": field.read_only,
-                        "hidden": field.hidden,
-                        "default": field.default,
-                        "is_system_field": False
-                    })
+        fields = _get_record_fields(table_name, table_doc.doctype_name)
         
         return {
             "success": True,
@@ -541,7 +506,55 @@ def get_record(table_name, record_id):
             "error": str(e)
         }
 
+def _get_record_fields(table_name, doctype_name):
+    """Get record field metadata using the native fields API (same as form builder)
+
+    This ensures system fields are included and properly handled.
+    """
+    fields = []
+    try:
+        from flansa.native_fields import get_table_fields_native
+        native_result = get_table_fields_native(table_name)
+        if native_result.get('success'):
+            for field in native_result.get('fields', []):
+                # Skip layout fields but include system fields
+                if field.get('fieldtype') not in ['Section Break', 'Column Break', 'Tab Break']:
+                    fields.append({
+                        "fieldname": field.get('fieldname'),
+                        "fieldtype": field.get('fieldtype'),
+                        "label": field.get('label'),
+                        "reqd": field.get('reqd', 0),
+                        "options": field.get('options', ''),
+                        "description": field.get('description', ''),
+                        "read_only": field.get('read_only', 0),
+                        "hidden": field.get('hidden', 0),
+                        "default": field.get('default', ''),
+                        "is_system_field": field.get('is_system_field', False)
+                    })
+    except Exception as native_error:
+        # Fallback to DocType meta if native fields fails
+        frappe.log_error(f"Native fields failed for {table_name}: {str(native_error)}", "Record API Fallback")
+        if frappe.db.exists("DocType", doctype_name):
+            doctype_meta = frappe.get_meta(doctype_name)
+            
+            for field in doctype_meta.fields:
+                fields.append({
+                    "fieldname": field.fieldname,
+                    "fieldtype": field.fieldtype,
+                    "label": field.label,
+                    "reqd": field.reqd,
+                    "options": field.options,
+                    "description": field.description,
+                    "read_only": field.read_only,
+                    "hidden": field.hidden,
+                    "default": field.default,
+                    "is_system_field": False
+                })
+    
+    return fields
+
 @frappe.whitelist()
+@conditional(table_metadata_version)
 def get_table_metadata(table_name):
     """Get comprehensive table metadata"""
     
@@ -617,6 +630,7 @@ def get_table_metadata(table_name):
         }
 
 @frappe.whitelist()
+@conditional(table_metadata_version)
 def get_table_meta(table_name):
     """Get table metadata for new record creation"""
     
@@ -758,68 +772,28 @@ def get_link_options(doctype, search_term="", limit=20):
                 if len(search_fields) >= 3:  # Limit to avoid too many fields
                     break
         
-        # Always include name field
-        if 'name' not in search_fields:
-            search_fields.append('name')
-        
-        # Build query
-        fields = ['name']
-        if title_field and title_field != 'name':
-            fields.append(title_field)
-        
-        # Build filters
-        filters = {}
-        or_filters = []
-        
-        if search_term:
-            # Create OR filters for searching across multiple fields
-            for field in search_fields[:3]:  # Limit to avoid too complex queries
-                or_filters.append([field, 'like', f'%{search_term}%'])
-        
-        # Query the records
-        try:
-            if or_filters:
-                records = frappe.get_all(
-                    doctype,
-                    fields=fields,
-                    or_filters=or_filters,
-                    limit=limit,
-                    order_by='modified desc'
-                )
-            else:
-                records = frappe.get_all(
-                    doctype,
-                    fields=fields,
-                    limit=limit,
-                    order_by='modified desc'
-                )
-        except Exception as e:
-            # Fallback to simpler query if complex query fails
-            records = frappe.get_all(
-                doctype,
-                fields=['name'],
-                limit=limit,
-                order_by='modified desc'
-            )
+        # Prefix-first indexed search with short-lived result cache
+        from flansa.flansa_core.api.link_search import search_link_values
+        records = search_link_values(
+            doctype,
+            search_term,
+            display_field=title_field or 'name',
+            search_fields=search_fields[:3],
+            page_len=limit
+        )
         
         # Format options
         options = []
         for record in records:
             name = record.get('name', '')
-            title = record.get(title_field) if title_field else name
+            title = record.get('display_value') if title_field else name
             
-            option = {
+            options.append({
                 'name': name,
                 'value': name,
                 'title': title or name,
                 'label': title or name
-            }
-            
-            # Add description if available
-            if hasattr(record, 'description'):
-                option['description'] = record.get('description', '')
-            
-            options.append(option)
+            })
         
         return {
             "success": True,
@@ -939,6 +913,91 @@ def get_record_with_logic(table_name, record_name):
             "error": str(e)
         }
 
+@frappe.whitelist()
+def get_record_bundle(table_name, record_id, schema_etag=None):
+    """Get everything the record viewer needs to open a record in one call
+    
+    Returns the record, its resolved link display values and logic values.
+    The schema (fields + form layout) is only included when schema_etag does
+    not match the current schema version, so clients holding a cached copy
+    can skip downloading it.
+    """
+    try:
+        from flansa.flansa_core.utils.table_cache import (
+            get_table_info, get_active_logic_fields, resolve_link_display_values,
+            get_schema_etag, get_cached_schema
+        )
+        
+        table_info = get_table_info(table_name)
+        if not table_info:
+            return {
+                "success": False,
+                "error": "Table not found"
+            }
+        
+        if not table_info.doctype_name:
+            return {
+                "success": False,
+                "error": "No doctype associated with table"
+            }
+        
+        if not frappe.db.exists(table_info.doctype_name, record_id):
+            return {
+                "success": False,
+                "error": "Record not found"
+            }
+        
+        record = frappe.get_doc(table_info.doctype_name, record_id).as_dict()
+        
+        # Schema is shared by every record of the table, so serve it from cache
+        current_etag = get_schema_etag(table_name)
+        schema = None
+        if schema_etag != current_etag:
+            def build_schema():
+                from flansa.flansa_core.api.form_builder import get_form_config_data
+                form_config, field_overrides = get_form_config_data(table_name)
+                return {
+                    "fields": _get_record_fields(table_name, table_info.doctype_name),
+                    "form_config": form_config,
+                    "field_overrides": field_overrides
+                }
+            schema = get_cached_schema(table_name, current_etag, build_schema)
+        
+        # Calculate Logic Fields against the already loaded record
+        logic_values = {}
+        logic_fields = [lf for lf in get_active_logic_fields(table_name) if lf.logic_expression]
+        if logic_fields:
+            from flansa.flansa_core.api.flansa_logic_engine import get_logic_engine
+            engine = get_logic_engine()
+            for field in logic_fields:
+                try:
+                    logic_values[field.field_name] = engine.evaluate(field.logic_expression, record)
+                except Exception as field_error:
+                    frappe.log_error(f"Error calculating {field.field_name}: {str(field_error)}")
+                    logic_values[field.field_name] = 0
+            record.update(logic_values)
+        
+        return {
+            "success": True,
+            "record": record,
+            "doctype_name": table_info.doctype_name,
+            "application": table_info.application or None,
+            "table_label": table_info.table_label,
+            "schema_etag": current_etag,
+            "schema_changed": schema is not None,
+            "schema": schema,
+            "link_display_values": resolve_link_display_values(table_name, record),
+            "logic_fields": logic_values,
+            "has_logic_fields": bool(logic_values)
+        }
+        
+    except Exception as e:
+        frappe.log_error(f"Error getting record bundle {record_id} from table {table_name}: {str(e)}", "Table API Error")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
 @frappe.whitelist()
 def add_logic_field_to_table(table_name, field_config):
     """Add a Logic Field to a table with Phase 1 smart auto-detection"""
@@ -1827,12 +1886,14 @@ def populate_existing_records_for_cached_field(doctype, logic_field):
         populate_cached_field_immediately(doctype, logic_field)
     else:
         # Large dataset: queue background job
-        frappe.enqueue(
+        from flansa.flansa_core.job_service import enqueue_job
+        enqueue_job(
             'flansa.flansa_core.api.table_api.populate_cached_field_background',
+            'bulk',
+            job_key=f"populate_{doctype}_{logic_field.field_name}",
+            timeout=3600,
             doctype=doctype,
-            logic_field_name=logic_field.name,
-            job_name=f"populate_{logic_field.field_name}",
-            timeout=3600
+            logic_field_name=logic_field.name
         )
 
 def populate_cached_field_immediately(doctype, logic_field):
@@ -1840,47 +1901,82 @@ def populate_cached_field_immediately(doctype, logic_field):
     
     records = frappe.get_all(doctype, fields=["name"], limit=1000)
     
-    for record in records:
+    for doc in get_calculation_docs(doctype, logic_field, [r.name for r in records]):
         try:
-            doc = frappe.get_doc(doctype, record.name)
             calculated_value = calculate_field_value_by_type(doc, logic_field)
-            frappe.db.set_value(doctype, record.name, logic_field.field_name, calculated_value)
+            frappe.db.set_value(doctype, doc.name, logic_field.field_name, calculated_value)
         except Exception as e:
-            frappe.log_error(f"Error calculating {logic_field.field_name} for {record.name}: {str(e)}")
+            frappe.log_error(f"Error calculating {logic_field.field_name} for {doc.name}: {str(e)}")
             continue
     
+    # db.set_value skips doc events, so cached reports and summaries over this table are invalidated here
+    bump_data_versions([doctype])
+    mark_doctype_summaries_stale(doctype, f"backfill of {logic_field.field_name}")
     frappe.db.commit()
 
 def populate_cached_field_background(doctype, logic_field_name):
-    """Background population for large datasets"""
+    """Background population for large datasets, resumable from the last committed batch"""
+    from flansa.flansa_core.job_service import get_checkpoint, save_checkpoint, report_progress
     
     logic_field = frappe.get_doc("Flansa Logic Field", logic_field_name)
     total_records = frappe.db.count(doctype)
     batch_size = 100
-    processed = 0
+    checkpoint = get_checkpoint({"last_name": None, "processed": 0})
+    last_name, processed = checkpoint["last_name"], checkpoint["processed"]
     
-    for offset in range(0, total_records, batch_size):
-        records = frappe.get_all(doctype, fields=["name"], start=offset, page_length=batch_size)
+    while True:
+        # Keyset pagination: records inserted meanwhile do not shift the batches
+        filters = {"name": [">", last_name]} if last_name is not None else {}
+        records = frappe.get_all(doctype, filters=filters, fields=["name"], order_by="name asc", page_length=batch_size)
+        if not records:
+            break
         
-        for record in records:
+        for doc in get_calculation_docs(doctype, logic_field, [r.name for r in records]):
             try:
-                doc = frappe.get_doc(doctype, record.name)
                 calculated_value = calculate_field_value_by_type(doc, logic_field)
-                frappe.db.set_value(doctype, record.name, logic_field.field_name, calculated_value)
+                frappe.db.set_value(doctype, doc.name, logic_field.field_name, calculated_value)
                 processed += 1
-                
-                if processed % 50 == 0:
-                    frappe.publish_progress(
-                        percent=(processed / total_records) * 100,
-                        title=f"Calculating {logic_field.field_name}",
-                        description=f"{processed}/{total_records} records processed"
-                    )
                     
             except Exception as e:
-                frappe.log_error(f"Error calculating field for {record.name}: {str(e)}")
+                frappe.log_error(f"Error calculating field for {doc.name}: {str(e)}")
                 continue
         
+        last_name = records[-1].name
+        bump_data_versions([doctype])
+        mark_doctype_summaries_stale(doctype, f"backfill of {logic_field.field_name}")
+        # Checkpoint and batch commit together
+        save_checkpoint({"last_name": last_name, "processed": processed})
+        report_progress(processed, total_records, f"Calculating {logic_field.field_name}")
         frappe.db.commit()
+        frappe.publish_progress(
+            percent=min(processed / max(total_records, 1), 1) * 100,
+            title=f"Calculating {logic_field.field_name}",
+            description=f"{processed}/{total_records} records processed"
+        )
+
+def get_calculation_docs(doctype, logic_field, names):
+    """
+    Records to calculate a logic field for
+    
+    FETCH and LOOKUP fields only need the record's key field, so the records are
+    read in one query and their targets prefetched in one query per target
+    DocType. Other fields get the full document.
+    """
+    spec = parse_link_expression(doctype, logic_field.logic_expression)
+    if spec and frappe.get_meta(doctype).has_field(spec["key_field"]):
+        rows = frappe.get_all(doctype, filters={"name": ["in", names]}, fields=["name", spec["key_field"]])
+        docs = [frappe._dict(row, doctype=doctype) for row in rows]
+        prefetch_link_values(doctype, docs, [logic_field.logic_expression])
+        return docs
+    
+    return _iter_docs(doctype, names)
+
+def _iter_docs(doctype, names):
+    for name in names:
+        try:
+            yield frappe.get_doc(doctype, name)
+        except frappe.DoesNotExistError:
+            continue
 
 def calculate_field_value_by_type(doc, logic_field):
     """Calculate field value based on type"""
@@ -1942,27 +2038,7 @@ def calculate_text_field(doc, expression):
 def calculate_fetch_field(doc, expression):
     """Calculate fetch from linked field"""
     try:
-        args = extract_function_args('FETCH', expression)
-        if len(args) >= 2:
-            link_field, target_field = args[0].strip(), args[1].strip()
-            
-            # Get the value from the link field
-            link_value = getattr(doc, link_field, None)
-            if link_value:
-                # Get the DocType of the link field
-                meta = frappe.get_meta(doc.doctype)
-                link_field_meta = None
-                
-                for field in meta.fields:
-                    if field.fieldname == link_field:
-                        link_field_meta = field
-                        break
-                
-                if link_field_meta and link_field_meta.fieldtype == 'Link':
-                    linked_doctype = link_field_meta.options
-                    result = frappe.db.get_value(linked_doctype, link_value, target_field)
-                    return result
-        return None
+        return get_link_value(doc, expression)
     except Exception as e:
         frappe.log_error(f"Error in calculate_fetch_field: {str(e)}")
         return None
@@ -1970,15 +2046,7 @@ def calculate_fetch_field(doc, expression):
 def calculate_lookup_field(doc, expression):
     """Calculate lookup from parent table"""
     try:
-        args = extract_function_args('LOOKUP', expression)
-        if len(args) >= 3:
-            table_name, field_name, target_field = args[0].strip(), args[1].strip(), args[2].strip()
-            
-            field_value = getattr(doc, field_name, None)
-            if field_value:
-                result = frappe.db.get_value(table_name, field_value, target_field)
-                return result
-        return None
+        return get_link_value(doc, expression)
     except Exception as e:
         frappe.log_error(f"Error in calculate_lookup_field: {str(e)}")
         return None
@@ -2717,30 +2785,23 @@ def get_available_link_targets(table_id, scope='all'):
         targets = []
         
         if scope in ['all', 'flansa']:
-            # Get Flansa tables
-            flansa_tables = frappe.get_all("Flansa Table",
-                filters=apply_tenant_filter({}),
-                fields=["name", "table_label", "table_name"]
-            )
-            for table in flansa_tables:
-                if table.name != table_id:  # Don't include self
+            # Get Flansa tables of the current workspace from the metadata catalog
+            from flansa.flansa_core.metadata_catalog_service import get_catalog
+            for name, table in get_catalog().tables.items():
+                if name != table_id:  # Don't include self
                     targets.append({
-                        "value": table.name,
-                        "label": f"{table.table_label or table.table_name} (Flansa)",
+                        "value": name,
+                        "label": f"{table['table_label'] or table['table_name']} (Flansa)",
                         "type": "flansa"
                     })
         
         if scope in ['all', 'frappe']:
             # Get standard Frappe doctypes
-            standard_doctypes = frappe.get_all("DocType",
-                filters={"custom": 0, "issingle": 0, "istable": 0},
-                fields=["name"],
-                limit=50
-            )
-            for doctype in standard_doctypes:
+            from flansa.flansa_core.metadata_catalog_service import get_system_doctypes
+            for doctype in get_system_doctypes()[:50]:
                 targets.append({
-                    "value": doctype.name,
-                    "label": f"{doctype.name} (Frappe)",
+                    "value": doctype["name"],
+                    "label": f"{doctype['name']} (Frappe)",
                     "type": "frappe"
                 })
         
@@ -2757,21 +2818,18 @@ def get_available_link_targets(table_id, scope='all'):
 def get_link_fields(table_id):
     """Get link fields for a specific table"""
     try:
-        # Get table data
-        table_doc = frappe.get_doc("Flansa Table", table_id)
-        doctype_name = table_doc.doctype_name
+        from flansa.flansa_core.metadata_catalog_service import get_catalog_for_table
+        catalog = get_catalog_for_table(table_id)
         
         # Get all Link type fields
-        link_fields = []
-        meta = frappe.get_meta(doctype_name)
-        
-        for field in meta.fields:
-            if field.fieldtype == 'Link':
-                link_fields.append({
-                    "field_name": field.fieldname,
-                    "label": field.label,
-                    "options": field.options
-                })
+        link_fields = [
+            {
+                "field_name": field["fieldname"],
+                "label": field["label"],
+                "options": field["options"]
+            }
+            for field in catalog.get_fields(catalog.get_table(table_id)["doctype_name"], ['Link'])
+        ]
         
         return {
             "success": True,
@@ -2835,19 +2893,15 @@ def get_child_tables(table_id):
     try:
         # For now, return all other Flansa tables as potential child tables
         # In a real implementation, you might want to check for actual relationships
-        child_tables = frappe.get_all("Flansa Table",
-            filters=apply_tenant_filter({
-                "name": ["!=", table_id]
-            }),
-            fields=["name", "table_label", "table_name"]
-        )
-        
-        formatted_tables = []
-        for table in child_tables:
-            formatted_tables.append({
-                "name": table.name,
-                "label": table.table_label or table.table_name
-            })
+        from flansa.flansa_core.metadata_catalog_service import get_catalog
+        formatted_tables = [
+            {
+                "name": name,
+                "label": table["table_label"] or table["table_name"]
+            }
+            for name, table in get_catalog().tables.items()
+            if name != table_id
+        ]
         
         return {
             "success": True,
@@ -2862,21 +2916,18 @@ def get_child_tables(table_id):
 def get_numeric_fields(table_id):
     """Get numeric fields from a table for rollup calculations"""
     try:
-        # Get table data
-        table_doc = frappe.get_doc("Flansa Table", table_id)
-        doctype_name = table_doc.doctype_name
+        from flansa.flansa_core.metadata_catalog_service import get_catalog_for_table
+        catalog = get_catalog_for_table(table_id)
         
         # Get all numeric fields
-        numeric_fields = []
-        meta = frappe.get_meta(doctype_name)
-        
-        for field in meta.fields:
-            if field.fieldtype in ['Int', 'Float', 'Currency']:
-                numeric_fields.append({
-                    "field_name": field.fieldname,
-                    "label": field.label,
-                    "fieldtype": field.fieldtype
-                })
+        numeric_fields = [
+            {
+                "field_name": field["fieldname"],
+                "label": field["label"],
+                "fieldtype": field["fieldtype"]
+            }
+            for field in catalog.get_fields(catalog.get_table(table_id)["doctype_name"], ['Int', 'Float', 'Currency'])
+        ]
         
         return {
             "success": True,
@@ -8,6 +8,8 @@ import frappe
 from typing import Dict, List, Optional
 from frappe import _
 
+from flansa.flansa_core.utils.query_inspector import query_budget
+
 def get_current_workspace_id():
     """Get the current workspace_id from user settings"""
     # Get from user workspace settings
@@ -21,6 +23,7 @@ def get_current_workspace_id():
     return workspace_id
 
 @frappe.whitelist()
+@query_budget(15)
 def get_user_applications():
     """Get applications accessible by current user with role information"""
     try:
@@ -388,6 +391,7 @@ def get_user_dashboard_stats():
 
 
 @frappe.whitelist()
+@query_budget(15)
 def get_recent_activity():
     """Get recent activity based on user's role and permissions"""
     try:
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Flansa App Provisioning - bulk import and cloning of whole applications
+
+Inserting Flansa Tables one by one generates each DocType in after_insert
+(DDL plus cache clears per table), and every relationship then saves its
+DocTypes again once per added field. Provisioning an application instead:
+
+1. Inserts all metadata inside the request: the application, its tables
+   (with DocType generation deferred), logic fields and relationships (with
+   field creation skipped). Nothing is generated yet.
+2. A background job creates every DocType with its fields in one insert,
+   then plans all relationship and cross-table link fields and saves each
+   DocType that gained fields once.
+3. Clones optionally copy the source records with batched INSERT ... SELECT.
+4. Caches are cleared once at the end.
+
+The plan is the checkpoint of the job's Flansa Job record, written in the same
+transaction as the metadata and saved with every step, so a half-provisioned
+application is always resumed (get_provisioning_status). Progress is
+published as flansa_provisioning_progress to the user who started it.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+from flansa.flansa_core.workspace_service import apply_tenant_filter
+from flansa.flansa_core.usage_service import record_usage
+from flansa.flansa_core.job_service import can_view_job, enqueue_job, get_checkpoint, get_job, report_progress, save_checkpoint
+
+PROVISIONING_METHOD = "flansa.flansa_core.app_provisioning_service.run_provisioning"
+DATA_COPY_BATCH_SIZE = 5000
+
+TABLE_FIELDS = ["name", "table_name", "table_label", "description", "doctype_name", "is_submittable",
+                "naming_rule", "autoname_prefix"]
+LOGIC_FIELD_COLUMNS = ["field_name", "field_label", "field_type", "logic_expression", "logic_type", "result_type",
+                       "link_target_doctype", "link_display_field", "link_filters", "calculation_type", "is_active"]
+# Schema keys of a field and the DocField properties they map to
+SCHEMA_FIELD_MAP = {
+    "name": "fieldname", "label": "label", "type": "fieldtype", "required": "reqd", "unique": "unique",
+    "readonly": "read_only", "hidden": "hidden", "options": "options", "default": "default",
+    "in_list_view": "in_list_view", "in_standard_filter": "in_standard_filter", "depends_on": "depends_on",
+    "description": "description", "virtual": "is_virtual", "fetch_from": "fetch_from"
+}
+
+
+def build_application_schema(app_name):
+    """Schema of an application (tables with their fields, logic fields, relationships) as a dict"""
+    app_doc = frappe.get_doc("Flansa Application", app_name)
+    schema = {
+        "application": {
+            "name": app_doc.app_name,
+            "title": app_doc.app_title,
+            "description": app_doc.description,
+            "type": app_doc.app_type,
+            "theme_color": app_doc.theme_color,
+            "icon": app_doc.icon,
+            "version": "1.0.0",
+            "created": str(app_doc.creation)
+        },
+        "workspaces": [],
+        "tables": [],
+        "logic_fields": [],
+        "relationships": []
+    }
+
+    tables = frappe.get_all("Flansa Table", filters=apply_tenant_filter({"application": app_name}), fields=TABLE_FIELDS)
+    table_names = {table.name: table.table_name for table in tables}
+
+    for table in tables:
+        fields = []
+        if table.doctype_name and frappe.db.exists("DocType", table.doctype_name):
+            for df in frappe.get_meta(table.doctype_name).fields:
+                field = {key: df.get(prop) for key, prop in SCHEMA_FIELD_MAP.items()}
+                fields.append({key: value for key, value in field.items() if value not in (None, "", 0)})
+
+        schema["tables"].append({
+            "name": table.table_name,
+            "label": table.table_label,
+            "description": table.description,
+            "doctype": table.doctype_name,
+            "is_submittable": table.is_submittable,
+            "naming_rule": table.naming_rule,
+            "autoname_prefix": table.autoname_prefix,
+            "fields": fields
+        })
+
+    if table_names:
+        for logic_field in frappe.get_all(
+            "Flansa Logic Field",
+            filters={"table_name": ["in", list(table_names)]},
+            fields=["table_name"] + LOGIC_FIELD_COLUMNS
+        ):
+            entry = {column: logic_field.get(column) for column in LOGIC_FIELD_COLUMNS}
+            entry["table"] = table_names.get(logic_field.table_name)
+            schema["logic_fields"].append(entry)
+
+    for rel in frappe.get_all(
+        "Flansa Relationship",
+        filters=[["parent_table", "in", list(table_names) or [""]]],
+        fields=["relationship_name", "relationship_type", "parent_table", "child_table", "from_field",
+                "to_field", "cascade_delete", "required_reference"]
+    ):
+        schema["relationships"].append({
+            "name": rel.relationship_name,
+            "type": rel.relationship_type,
+            "from_table": table_names.get(rel.parent_table),
+            "to_table": table_names.get(rel.child_table),
+            "from_field": rel.from_field,
+            "to_field": rel.to_field,
+            "cascade_delete": rel.cascade_delete,
+            "required_reference": rel.required_reference
+        })
+
+    return schema
+
+
+def provision_application(schema, app_title=None, copy_data=False):
+    """
+    Insert the metadata of a schema and start the job that generates it
+
+    Returns (application name, job id). With copy_data, records are copied
+    from the DocTypes named in the schema's tables[].doctype.
+    """
+    from flansa.flansa_core.api.application import normalize_app_name
+
+    app_data = schema.get("application", {})
+    title = app_title or app_data.get("title") or app_data.get("name")
+    app_doc = frappe.get_doc({
+        "doctype": "Flansa Application",
+        "app_name": _unique_app_name(normalize_app_name(app_title or app_data.get("name") or title)),
+        "app_title": title,
+        "description": app_data.get("description"),
+        "app_type": app_data.get("type", "Business"),
+        "theme_color": app_data.get("theme_color", "#2196F3"),
+        "icon": app_data.get("icon"),
+        "status": "Active"
+    })
+    app_doc.insert(ignore_permissions=True)
+
+    tables = []
+    table_map = {}
+    for table_data in schema.get("tables", []):
+        table_doc = frappe.get_doc({
+            "doctype": "Flansa Table",
+            "application": app_doc.name,
+            "table_name": table_data.get("name"),
+            "table_label": table_data.get("label") or table_data.get("name"),
+            "description": table_data.get("description"),
+            "is_submittable": table_data.get("is_submittable", 0),
+            "naming_rule": table_data.get("naming_rule") or "Autoincrement",
+            "autoname_prefix": table_data.get("autoname_prefix")
+        })
+        table_doc._defer_doctype_generation = True
+        table_doc.insert(ignore_permissions=True)
+        table_map[table_data.get("name")] = table_doc.name
+        tables.append({
+            "table": table_doc.name,
+            "doctype": table_doc.doctype_name,
+            "source_doctype": table_data.get("doctype"),
+            "fields": [_to_docfield(field) for field in table_data.get("fields", []) if field.get("name")]
+        })
+
+    # DocType names of the source are rewritten in field options and expressions
+    doctype_map = {t["source_doctype"]: t["doctype"] for t in tables if t["source_doctype"]}
+    for table in tables:
+        table["fields"] = [_remap_doctypes(field, doctype_map) for field in table["fields"]]
+
+    for logic_data in schema.get("logic_fields", []):
+        table_name = table_map.get(logic_data.get("table"))
+        if not table_name:
+            continue
+        logic_doc = frappe.get_doc(dict(
+            _remap_doctypes({column: logic_data.get(column) for column in LOGIC_FIELD_COLUMNS}, doctype_map),
+            doctype="Flansa Logic Field",
+            table_name=table_name
+        ))
+        logic_doc.insert(ignore_permissions=True)
+
+    for rel_data in schema.get("relationships", []):
+        parent_table = table_map.get(rel_data.get("from_table"))
+        child_table = table_map.get(rel_data.get("to_table"))
+        if not (parent_table and child_table):
+            continue
+        rel_doc = frappe.get_doc({
+            "doctype": "Flansa Relationship",
+            "relationship_name": rel_data.get("name"),
+            "relationship_type": rel_data.get("type"),
+            "parent_table": parent_table,
+            "child_table": child_table,
+            "from_field": rel_data.get("from_field"),
+            "to_field": rel_data.get("to_field"),
+            "cascade_delete": rel_data.get("cascade_delete", 0),
+            "required_reference": rel_data.get("required_reference", 0),
+            "status": "Active"
+        })
+        rel_doc._skip_auto_field_creation = True
+        rel_doc.insert(ignore_permissions=True)
+
+    job_id = _start_provisioning(app_doc, tables, copy_data)
+    return app_doc.name, job_id
+
+
+@frappe.whitelist()
+def clone_application(app_name, app_title=None, copy_data=0):
+    """
+    Clone an application: metadata now, DocTypes (and optionally records) in the background
+
+    Returns the new application and the provisioning job id (see get_provisioning_status).
+    """
+    try:
+        if not frappe.has_permission("Flansa Application", "create"):
+            frappe.throw(_("Not permitted"))
+        if not frappe.has_permission("Flansa Application", "read", doc=app_name):
+            frappe.throw(_("Not permitted"))
+
+        schema = build_application_schema(app_name)
+        title = app_title or _("{0} (Copy)").format(schema["application"]["title"])
+        new_app, job_id = provision_application(schema, app_title=title, copy_data=cint(copy_data))
+        return {"success": True, "application": new_app, "job_id": job_id}
+
+    except frappe.PermissionError:
+        raise
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Error cloning application {app_name}: {str(e)}", "App Provisioning")
+        return {"success": False, "error": str(e)}
+
+
+@frappe.whitelist()
+def get_provisioning_status(job_id):
+    """Get the progress of a background provisioning started by clone_application or a bulk import"""
+    job = get_job(job_id)
+    if not job or job.method != PROVISIONING_METHOD or not job.checkpoint:
+        return {"success": False, "error": f"Provisioning job {job_id} not found"}
+    if not can_view_job(job):
+        return {"success": False, "error": "Not permitted"}
+    return dict(_progress(job_id, job.checkpoint, job.status, job.error), success=True, updated_at=job.modified)
+
+
+def run_provisioning():
+    """
+    Background job body: generate the DocTypes of a provisioned application
+
+    Phases: doctypes (one insert per table) -> fields (relationship and link
+    fields planned together, one save per DocType) -> data (batched copy of
+    source records) -> one cache clear. Every step commits together with the
+    job's checkpoint, so a restarted job continues where it stopped.
+    """
+    job_id = frappe.flags.flansa_job_id
+    state = get_checkpoint()
+    if not state:
+        return
+
+    try:
+        while state["phase"] != "done":
+            if state["phase"] == "doctypes":
+                if state["index"] < len(state["tables"]):
+                    _create_doctype(state["tables"][state["index"]], state["doctypes"])
+                    state["counts"]["doctypes"] += 1
+                    state["index"] += 1
+                else:
+                    state["phase"], state["index"] = "fields", 0
+
+            elif state["phase"] == "fields":
+                state["counts"]["fields"] += _create_planned_fields(state)
+                state["phase"] = "data" if state["copy_data"] else "done"
+
+            elif state["phase"] == "data":
+                if state["index"] < len(state["tables"]):
+                    copied = _copy_records_batch(state)
+                    if copied:
+                        state["counts"]["records"] += copied
+                    else:
+                        state["index"] += 1
+                        state["cursor"] = None
+                else:
+                    state["phase"] = "done"
+
+            save_checkpoint(state)
+            report_progress(min(state["index"], len(state["tables"])), len(state["tables"]), state["phase"])
+            frappe.db.commit()
+            _publish_progress(job_id, state, "Running")
+
+        _clear_caches(state)
+        _publish_progress(job_id, state, "Completed")
+
+    except Exception as e:
+        # The job service rolls back, records the failure and logs it
+        _publish_progress(job_id, state, "Failed", str(e))
+        raise
+
+
+def _create_doctype(table, doctypes):
+    """Insert a table's DocType with all its fields except links to the other new DocTypes"""
+    if frappe.db.exists("DocType", table["doctype"]):
+        return
+    table_doc = frappe.get_doc("Flansa Table", table["table"])
+    own_fields = [field for field in table["fields"] if not _links_to(field, doctypes)]
+    frappe.get_doc(table_doc.get_doctype_definition(own_fields)).insert(ignore_permissions=True)
+
+
+def _create_planned_fields(state):
+    """Plan link and relationship fields of every new DocType, then save each DocType once"""
+    planned = {}
+    frappe.flags.flansa_planned_fields = planned
+    try:
+        for table in state["tables"]:
+            for field in table["fields"]:
+                if _links_to(field, state["doctypes"]):
+                    planned.setdefault(table["doctype"], []).append(field)
+
+        table_ids = [table["table"] for table in state["tables"]]
+        for rel_name in frappe.get_all("Flansa Relationship", filters={"parent_table": ["in", table_ids]}, pluck="name"):
+            frappe.get_doc("Flansa Relationship", rel_name).create_relationship()
+    finally:
+        frappe.flags.flansa_planned_fields = None
+
+    added = 0
+    for doctype, fields in planned.items():
+        doctype_doc = frappe.get_doc("DocType", doctype)
+        existing = {df.fieldname for df in doctype_doc.fields}
+        new_fields = [field for field in fields if field["fieldname"] not in existing]
+        if not new_fields:
+            continue
+        for field in new_fields:
+            existing.add(field["fieldname"])
+            doctype_doc.append("fields", field)
+        doctype_doc.save(ignore_permissions=True)
+        added += len(new_fields)
+    return added
+
+
+def _copy_records_batch(state):
+    """Copy the next batch of source records of the current table; returns the number copied"""
+    table = state["tables"][state["index"]]
+    source, target = table.get("source_doctype"), table["doctype"]
+    if not source or not frappe.db.exists("DocType", source):
+        return 0
+
+    target_columns = frappe.db.get_table_columns(target)
+    source_columns = set(frappe.db.get_table_columns(source))
+    columns = ", ".join(f"`{column}`" for column in target_columns if column in source_columns)
+
+    condition, values = "", {"limit": DATA_COPY_BATCH_SIZE}
+    if state.get("cursor") is not None:
+        condition, values["cursor"] = "WHERE `name` > %(cursor)s", state["cursor"]
+    names = frappe.db.sql_list(
+        f"SELECT `name` FROM `tab{source}` {condition} ORDER BY `name` LIMIT %(limit)s", values
+    )
+    if not names:
+        return 0
+
+    # A keyset range rather than IN (list), which only some drivers expand
+    values["last"] = names[-1]
+    range_condition = "`name` <= %(last)s" + (" AND `name` > %(cursor)s" if "cursor" in values else "")
+    frappe.db.sql(
+        f"INSERT INTO `tab{target}` ({columns}) SELECT {columns} FROM `tab{source}` WHERE {range_condition}",
+        values
+    )
+    # Copied rows skip doc events, so count them here
+    record_usage(state.get("workspace_id"), {"records": len(names)})
+    state["cursor"] = names[-1]
+    return len(names)
+
+
+def _clear_caches(state):
+    from flansa.flansa_core.metadata_catalog_service import clear_catalog
+    from flansa.flansa_core.relationship_graph_service import clear_relationship_graph
+    from flansa.flansa_core.summary_recalc_service import clear_summary_dependents
+    from flansa.flansa_core.utils.table_cache import clear_table_cache
+
+    frappe.clear_cache()
+    clear_table_cache()
+    clear_relationship_graph()
+    clear_summary_dependents()
+    clear_catalog(state.get("workspace_id"))
+
+
+def _start_provisioning(app_doc, tables, copy_data):
+    """Record the provisioning job with the metadata, commit both and enqueue the job"""
+    state = {
+        "application": app_doc.name,
+        "workspace_id": app_doc.get("workspace_id"),
+        "tables": tables,
+        "doctypes": [table["doctype"] for table in tables],
+        "copy_data": bool(copy_data),
+        "phase": "doctypes",
+        "index": 0,
+        "cursor": None,
+        "counts": {"doctypes": 0, "fields": 0, "records": 0}
+    }
+    job_id = enqueue_job(
+        PROVISIONING_METHOD,
+        "bulk",
+        job_key=f"flansa_provisioning_{frappe.generate_hash(length=10)}",
+        workspace_id=state["workspace_id"],
+        timeout=3600,
+        after_commit=True,
+        label=app_doc.app_title or app_doc.app_name,
+        checkpoint=state
+    )
+
+    # The metadata and the plan of what is left to generate commit together
+    frappe.db.commit()
+    return job_id
+
+
+def _progress(job_id, state, status, error=None):
+    return {
+        "job_id": job_id,
+        "application": state["application"],
+        "label": frappe.db.get_value("Flansa Job", job_id, "label"),
+        "status": status,
+        "phase": state["phase"],
+        "tables_done": min(state["index"], len(state["tables"])),
+        "tables_total": len(state["tables"]),
+        "counts": state["counts"],
+        "error": error
+    }
+
+
+def _publish_progress(job_id, state, status, error=None):
+    user = frappe.db.get_value("Flansa Job", job_id, "user")
+    frappe.publish_realtime("flansa_provisioning_progress", _progress(job_id, state, status, error), user=user)
+
+
+def _to_docfield(field):
+    docfield = {prop: field.get(key) for key, prop in SCHEMA_FIELD_MAP.items() if field.get(key) not in (None, "")}
+    docfield.setdefault("fieldtype", "Data")
+    docfield.setdefault("label", field.get("name"))
+    return docfield
+
+
+def _remap_doctypes(values, doctype_map):
+    """Replace source DocType names in string values (link options, expressions, summary configs)"""
+    if not doctype_map:
+        return values
+    remapped = {}
+    for key, value in values.items():
+        if isinstance(value, str):
+            for source, target in doctype_map.items():
+                value = value.replace(source, target)
+        remapped[key] = value
+    return remapped
+
+
+def _links_to(field, doctypes):
+    return field.get("fieldtype") == "Link" and field.get("options") in doctypes
+
+
+def _unique_app_name(app_name):
+    candidate, suffix = app_name, 1
+    while frappe.db.exists("Flansa Application", {"app_name": candidate}):
+        suffix += 1
+        candidate = f"{app_name}_{suffix}"
+    return candidate
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Flansa Change Feed - delta sync for client-side record caches
+
+get_changes_since returns the records of a table inserted or modified after a
+cursor, in (modified, name) order, plus tombstones for records deleted since.
+Deletions of generated records are logged to Flansa Deleted Record by the
+generic on_trash doc event. A client that keeps the returned cursor pays per
+changed record instead of reloading whole pages.
+
+With flansa_realtime_changes set in site config, every committed change also
+publishes a flansa_record_change event to the DocType's realtime room. The
+event only names the record; clients fetch the change itself through
+get_changes_since, which checks permissions.
+
+`modified` is stamped before a transaction commits, so a slow transaction can
+commit a change older than one a client has already seen. The cursor of a last
+page is therefore wound back by OVERLAP_SECONDS: the next call re-reads that
+window (clients drop records they already have) and picks up late commits.
+Pages within one call still follow the cursor exactly, so a call always ends.
+
+Tombstones are kept for TOMBSTONE_RETENTION_DAYS. A cursor from before the
+last prune gets reset=True and must reload.
+"""
+
+import json
+
+import frappe
+from frappe.utils import add_days, add_to_date, get_datetime, now_datetime
+
+from flansa.flansa_core.utils.table_cache import get_table_info
+
+DELETION_LOG_DOCTYPE = "Flansa Deleted Record"
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 2000
+TOMBSTONE_RETENTION_DAYS = 30
+# Longest expected gap between stamping `modified` and committing
+OVERLAP_SECONDS = 10
+PRUNED_BEFORE_KEY = "flansa_deletion_log_pruned_before"
+REALTIME_EVENT = "flansa_record_change"
+
+
+def on_record_change(doc, method=None):
+    """Doc event (on_update, on_trash): log deletions and announce changes of generated records"""
+    try:
+        if doc.meta.module != "Flansa Generated":
+            return
+
+        if method == "on_trash":
+            frappe.get_doc({
+                "doctype": DELETION_LOG_DOCTYPE,
+                "reference_doctype": doc.doctype,
+                "reference_name": str(doc.name),
+                "workspace_id": doc.get("workspace_id") or ""
+            }).insert(ignore_permissions=True)
+
+        announce_changes(doc.doctype, [doc.name], "delete" if method == "on_trash" else "update")
+    except Exception as e:
+        frappe.log_error(f"Error recording change of {doc.doctype} {doc.name}: {str(e)}", "Change Feed")
+
+
+def announce_changes(doctype, names, action="update"):
+    """Publish committed changes of records, also for writes made without doc events"""
+    if not frappe.conf.get("flansa_realtime_changes"):
+        return
+    for name in names:
+        frappe.publish_realtime(
+            REALTIME_EVENT,
+            {"doctype": doctype, "name": name, "action": action},
+            doctype=doctype,
+            after_commit=True
+        )
+
+
+@frappe.whitelist()
+def get_changes_since(table_name, cursor=None, fields=None, limit=DEFAULT_LIMIT):
+    """
+    Records of a table changed since cursor, and tombstones of deleted ones
+
+    Call without a cursor after loading the table to get the current one. Keep
+    calling with the returned cursor while has_more is set.
+    """
+    try:
+        table = get_table_info(table_name)
+        if not table or not table.doctype_name:
+            return {"success": False, "error": "Table not found"}
+        doctype = table.doctype_name
+
+        if not frappe.has_permission(doctype, "read"):
+            return {"success": False, "error": "Not permitted"}
+
+        limit = min(max(int(limit or DEFAULT_LIMIT), 1), MAX_LIMIT)
+        if isinstance(fields, str):
+            fields = json.loads(fields)
+
+        if not cursor:
+            return {
+                "success": True,
+                "changes": [],
+                "deleted": [],
+                "cursor": _encode_cursor(_with_overlap(_current_watermarks(doctype))),
+                "has_more": False
+            }
+
+        position = _decode_cursor(cursor)
+        pruned_before = frappe.db.get_global(PRUNED_BEFORE_KEY)
+        if pruned_before and get_datetime(position["deleted"]) < get_datetime(pruned_before):
+            # Tombstones this client has not seen may be gone
+            return {"success": True, "reset": True, "cursor": _encode_cursor(_with_overlap(_current_watermarks(doctype)))}
+
+        changes = frappe.get_list(
+            doctype,
+            fields=_with_cursor_fields(fields),
+            filters=[["modified", ">=", position["modified"]]],
+            or_filters=[["modified", ">", position["modified"]], ["name", ">", position["name"]]],
+            order_by="modified asc, name asc",
+            page_length=limit + 1
+        )
+
+        deletion_filters = [
+            ["reference_doctype", "=", doctype],
+            ["creation", ">=", position["deleted"]]
+        ]
+        workspace_id = getattr(frappe.local, "workspace_id", None)
+        if workspace_id:
+            deletion_filters.append(["workspace_id", "in", [workspace_id, ""]])
+        deleted = frappe.get_all(
+            DELETION_LOG_DOCTYPE,
+            fields=["name", "reference_name", "creation"],
+            filters=deletion_filters,
+            or_filters=[["creation", ">", position["deleted"]], ["name", ">", position["deleted_name"]]],
+            order_by="creation asc, name asc",
+            page_length=limit + 1
+        )
+
+        has_more = len(changes) > limit or len(deleted) > limit
+        changes, deleted = changes[:limit], deleted[:limit]
+
+        if changes:
+            position["modified"], position["name"] = str(changes[-1].modified), str(changes[-1].name)
+        if deleted:
+            position["deleted"], position["deleted_name"] = str(deleted[-1].creation), deleted[-1].name
+        if not has_more:
+            position = _with_overlap(position)
+
+        return {
+            "success": True,
+            "changes": changes,
+            "deleted": [row.reference_name for row in deleted],
+            "cursor": _encode_cursor(position),
+            "has_more": has_more
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Error getting changes for table {table_name}: {str(e)}", "Change Feed")
+        return {"success": False, "error": str(e)}
+
+
+def prune_deletion_log():
+    """Scheduled job: drop old tombstones; cursors from before them are told to reload"""
+    boundary = add_days(now_datetime(), -TOMBSTONE_RETENTION_DAYS)
+    frappe.db.delete(DELETION_LOG_DOCTYPE, {"creation": ["<", boundary]})
+    frappe.db.set_global(PRUNED_BEFORE_KEY, str(boundary))
+    frappe.db.commit()
+
+
+def _current_watermarks(doctype):
+    latest = frappe.get_all(doctype, fields=["name", "modified"], order_by="modified desc, name desc", limit=1)
+    latest_deletion = frappe.get_all(
+        DELETION_LOG_DOCTYPE,
+        filters={"reference_doctype": doctype},
+        fields=["name", "creation"],
+        order_by="creation desc, name desc",
+        limit=1
+    )
+    now = str(now_datetime())
+    return {
+        "modified": str(latest[0].modified) if latest else now,
+        "name": str(latest[0].name) if latest else "",
+        "deleted": str(latest_deletion[0].creation) if latest_deletion else now,
+        "deleted_name": latest_deletion[0].name if latest_deletion else "",
+    }
+
+
+def _with_overlap(position):
+    """Wind a cursor back so the next call re-reads changes that may still commit late"""
+    horizon = add_to_date(now_datetime(), seconds=-OVERLAP_SECONDS)
+    position = dict(position)
+    if get_datetime(position["modified"]) > horizon:
+        position["modified"], position["name"] = str(horizon), ""
+    if get_datetime(position["deleted"]) > horizon:
+        position["deleted"], position["deleted_name"] = str(horizon), ""
+    return position
+
+
+def _with_cursor_fields(fields):
+    if not fields or "*" in fields:
+        return ["*"]
+    return list(dict.fromkeys(["name", "modified", *fields]))
+
+
+def _encode_cursor(position):
+    return json.dumps(position, separators=(",", ":"))
+
+
+def _decode_cursor(cursor):
+    try:
+        position = json.loads(cursor) if isinstance(cursor, str) else dict(cursor)
+        return {key: str(position[key]) for key in ("modified", "name", "deleted", "deleted_name")}
+    except (ValueError, KeyError, TypeError):
+        frappe.throw("Invalid change cursor")
@@ -45,9 +45,7 @@ class FlansaApplication(Document):
 			# Workspace count disabled
 			self.workspace_count = 0
 			
-			# Count tables
-			self.table_count = frappe.db.count("Flansa Table", 
-				filters={"application": self.name})
+			# table_count is kept by usage_service as tables are added and removed
 			
 			# Count active users
 			self.user_count = len(self.allowed_users or [])
@@ -0,0 +1,14 @@
+# Copyright (c) 2025, Flansa Team and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class FlansaDeletedRecord(Document):
+	pass
+
+
+def on_doctype_update():
+	# get_changes_since reads tombstones per DocType in (creation, name) order
+	frappe.db.add_index("Flansa Deleted Record", ["reference_doctype", "creation"])
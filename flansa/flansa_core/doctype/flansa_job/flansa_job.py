@@ -0,0 +1,15 @@
+# Copyright (c) 2025, Flansa Team and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class FlansaJob(Document):
+	pass
+
+
+def on_doctype_update():
+	# Slot counts and waiting queues per workspace; stale-job sweeps by status
+	frappe.db.add_index("Flansa Job", ["workspace_id", "status"])
+	frappe.db.add_index("Flansa Job", ["status", "modified"])
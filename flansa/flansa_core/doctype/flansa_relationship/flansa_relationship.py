@@ -136,6 +136,8 @@ class FlansaRelationship(Document):
         # Users can manually create computed fields as needed
     
     def on_update(self):
+        if getattr(self, '_skip_auto_field_creation', False):
+            return
         if self.has_value_changed("status"):
             if self.status == "Active":
                 self.create_relationship()
@@ -895,11 +897,20 @@ class FlansaRelationship(Document):
             return ""
 
 def field_exists(doctype, fieldname):
-    """Check if field exists in a DocType"""
+    """Check if field exists in a DocType (or is planned for it during bulk provisioning)"""
+    planned = frappe.flags.get("flansa_planned_fields")
+    if planned and any(f["fieldname"] == fieldname for f in planned.get(doctype, [])):
+        return True
     return frappe.db.exists("DocField", {"parent": doctype, "fieldname": fieldname})
 
 def safe_add_field_to_doctype(doctype, field_dict):
     """Safely add a field to an existing DocType with proper validation"""
+    planned = frappe.flags.get("flansa_planned_fields")
+    if planned is not None:
+        # Bulk provisioning saves every planned field of a DocType at once
+        planned.setdefault(doctype, []).append(field_dict)
+        return
+
     try:
         doc = frappe.get_doc("DocType", doctype)
         
@@ -8,7 +8,10 @@ Stores user-created reports with their configurations for reuse and sharing.
 import frappe
 import json
 from frappe.model.document import Document
-from frappe.utils import now
+from frappe.share import get_shared
+from frappe.utils import cint, now
+
+from flansa.flansa_core.utils.query_inspector import query_budget
 
 class FlansaSavedReport(Document):
     def before_save(self):
@@ -19,6 +22,74 @@ class FlansaSavedReport(Document):
         
         self.modified_by_user = frappe.session.user
         self.last_modified = now()
+
+        # Reports follow the workspace of their base table, so listings can filter on the indexed column
+        if not self.workspace_id and self.base_table:
+            self.workspace_id = frappe.db.get_value("Flansa Table", self.base_table, "workspace_id")
+
+        self.compile_plan()
+        self.prepare_summary()
+    
+    def on_update(self):
+        from flansa.flansa_core.report_summary_service import (
+            clear_summary_index, delete_summary, enqueue_summary_rebuild
+        )
+        
+        if self.flags.rebuild_summary:
+            enqueue_summary_rebuild(self.name)
+        elif self.flags.drop_summary:
+            delete_summary(self.name)
+        # The summary mode may have changed between Incremental and Scheduled
+        clear_summary_index()
+    
+    def on_trash(self):
+        from flansa.flansa_core.report_summary_service import delete_summary
+        delete_summary(self.name)
+    
+    def prepare_summary(self):
+        """Validate summary mode and flag a rebuild when the aggregated grouping changed"""
+        from flansa.flansa_core.report_summary_service import get_summary_definition
+        
+        if not self.summary_mode:
+            if self.summary_key or self.summary_status:
+                self.summary_status = ""
+                self.summary_key = None
+                self.flags.drop_summary = True
+            return
+        
+        definition = get_summary_definition(json.loads(self.compiled_plan)) if self.compiled_plan else None
+        if not definition:
+            frappe.throw(
+                "Summary mode needs a grouped report that counts, sums or averages "
+                "by a field or by a day, week, month or year period"
+            )
+        
+        if definition["key"] != self.summary_key or self.summary_status != "Ready":
+            self.summary_status = "Building"
+            self.flags.rebuild_summary = True
+    
+    def compile_plan(self):
+        """Store the compiled query plan and its EXPLAIN warnings"""
+        from flansa.flansa_core.report_plan_service import compile_report_plan
+        
+        if not self.report_config or not self.base_table:
+            return
+        
+        try:
+            config = json.loads(self.report_config)
+            config["base_table"] = self.base_table
+            plan = compile_report_plan(config, explain=True)
+        except Exception as e:
+            # A report that cannot be compiled is compiled again when it is run
+            self.compiled_plan = None
+            self.plan_warnings = f"Plan could not be compiled: {str(e)}"
+            return
+        
+        self.compiled_plan = json.dumps(plan)
+        warnings = plan["warnings"] + [
+            f"No index on {index['fieldname']}" for index in plan["required_indexes"]
+        ]
+        self.plan_warnings = "\n".join(warnings)
     
     def validate(self):
         """Validate the report configuration"""
@@ -64,78 +135,102 @@ class FlansaSavedReport(Document):
         if self.created_by_user == user:
             return True
         
-        return False
+        # Shared with the user (or everyone) through the standard share dialog
+        return bool(get_shared(
+            self.doctype, user, rights=["read"], filters=[["share_name", "=", self.name]], limit=1
+        ))
+
+REPORT_LIST_FIELDS = [
+    "name", "report_title", "description", "base_table",
+    "report_type", "is_public", "created_by_user", "created_on", "workspace_id"
+]
 
 @frappe.whitelist()
-def get_user_reports(base_table=None):
-    """Get reports accessible to current user with workspace-aware filtering"""
-    filters = {}
+@query_budget(10)
+def get_user_reports(base_table=None, search=None, start=0, page_length=None):
+    """Get reports accessible to current user with workspace-aware filtering
 
-    # Add base table filter if specified
-    if base_table:
-        filters['base_table'] = base_table
+    Access (owner, public, shared with the user) and the workspace match are
+    resolved in one query; pass page_length for a single page of the list.
+    """
+    where, values = _user_reports_conditions(base_table, search)
+    limit = ""
+    if page_length:
+        limit = " LIMIT %(page_length)s OFFSET %(start)s"
+        values.update({"page_length": cint(page_length), "start": cint(start)})
 
-    # Get current workspace for filtering with robust resolution
-    current_workspace = None
+    columns = ", ".join(f"r.`{field}`" for field in REPORT_LIST_FIELDS if field != "workspace_id")
+    return frappe.db.sql(f"""
+        SELECT {columns},
+            COALESCE(NULLIF(r.workspace_id, ''), t.workspace_id) AS workspace_id
+        FROM `tabFlansa Saved Report` r
+        LEFT JOIN `tabFlansa Table` t ON t.name = r.base_table
+        WHERE {where}
+        ORDER BY r.created_on DESC{limit}
+    """, values, as_dict=True)
 
-    # Try multiple sources for workspace_id
-    # 1. First try frappe.local (set by before_request hook)
-    if hasattr(frappe.local, 'workspace_id') and frappe.local.workspace_id:
-        current_workspace = frappe.local.workspace_id
+@frappe.whitelist()
+def count_user_reports(base_table=None, search=None):
+    """Number of reports get_user_reports would return, for pagination"""
+    where, values = _user_reports_conditions(base_table, search)
+    return frappe.db.sql(f"""
+        SELECT COUNT(*)
+        FROM `tabFlansa Saved Report` r
+        LEFT JOIN `tabFlansa Table` t ON t.name = r.base_table
+        WHERE {where}
+    """, values)[0][0]
 
-    # 2. If not available, use WorkspaceContext directly
-    if not current_workspace:
-        try:
-            from flansa.flansa_core.workspace_service import WorkspaceContext
-            current_workspace = WorkspaceContext.get_current_workspace_id()
-            # Also set it in frappe.local for subsequent calls
-            frappe.local.workspace_id = current_workspace
-        except:
-            pass
+def _user_reports_conditions(base_table=None, search=None):
+    """WHERE clause (over r = report, t = base table) of the reports visible to the session user"""
+    user = frappe.session.user
+    conditions = []
+    values = {"user": user}
 
-    # Get all reports that could match
-    all_reports = frappe.get_all(
-        "Flansa Saved Report",
-        fields=[
-            "name", "report_title", "description", "base_table",
-            "report_type", "is_public", "created_by_user", "created_on", "workspace_id"
-        ],
-        filters=filters,
-        order_by="created_on desc"
-    )
+    if base_table:
+        conditions.append("r.base_table = %(base_table)s")
+        values["base_table"] = base_table
 
-    # Filter by access permissions and workspace
-    accessible_reports = []
-    for report in all_reports:
-        # Check user access first
-        report_doc = frappe.get_doc("Flansa Saved Report", report.name)
-        if not report_doc.can_user_access():
-            continue
+    if search:
+        conditions.append("(r.report_title LIKE %(search)s OR r.description LIKE %(search)s)")
+        values["search"] = f"%{search}%"
 
-        # Workspace filtering with fallback to base_table workspace
-        report_workspace = report.workspace_id
+    # System managers can access all reports
+    if "System Manager" not in frappe.get_roles(user):
+        conditions.append("""(
+            r.is_public = 1
+            OR r.created_by_user = %(user)s
+            OR EXISTS (
+                SELECT 1 FROM `tabDocShare` s
+                WHERE s.share_doctype = 'Flansa Saved Report'
+                    AND s.share_name = r.name
+                    AND s.`read` = 1
+                    AND (s.user = %(user)s OR s.everyone = 1)
+            )
+        )""")
 
-        # If report has no workspace_id, get it from base_table
-        if not report_workspace and report.base_table:
-            try:
-                table_workspace = frappe.db.get_value('Flansa Table', report.base_table, 'workspace_id')
-                if table_workspace:
-                    report_workspace = table_workspace
-            except:
-                pass
+    # Reports without a workspace inherit the one of their base table; the
+    # "default" workspace sees everything for backward compatibility
+    current_workspace = _get_current_workspace()
+    if current_workspace and current_workspace != "default":
+        conditions.append("(r.is_public = 1 OR COALESCE(NULLIF(r.workspace_id, ''), t.workspace_id) = %(workspace)s)")
+        values["workspace"] = current_workspace
+
+    return " AND ".join(conditions) or "1 = 1", values
 
-        # Include report if:
-        # 1. No workspace filtering needed (current_workspace is None or "default")
-        # 2. Report workspace matches current workspace
-        # 3. Report is public
-        # 4. Current workspace is "default" (for backward compatibility)
-        if (not current_workspace or
-            current_workspace == "default" or
-            report_workspace == current_workspace or
-            report.is_public):
-            accessible_reports.append(report)
+def _get_current_workspace():
+    # 1. First try frappe.local (set by before_request hook)
+    if getattr(frappe.local, 'workspace_id', None):
+        return frappe.local.workspace_id
 
-    return accessible_reports
+    # 2. If not available, use WorkspaceContext directly
+    try:
+        from flansa.flansa_core.workspace_service import WorkspaceContext
+        current_workspace = WorkspaceContext.get_current_workspace_id()
+        # Also set it in frappe.local for subsequent calls
+        frappe.local.workspace_id = current_workspace
+        return current_workspace
+    except Exception:
+        return None
 
 @frappe.whitelist()
 def save_report(report_title, description, base_table, report_type, report_config, view_options=None, is_public=0):
@@ -162,7 +257,8 @@ def save_report(report_title, description, base_table, report_type, report_confi
         return {
             "success": True,
             "message": f"Report '{report_title}' saved successfully",
-            "report_id": report.name
+            "report_id": report.name,
+            "plan_warnings": [w for w in (report.plan_warnings or "").split("\n") if w]
         }
         
     except Exception as e:
@@ -207,7 +303,8 @@ def update_report(report_id, report_title, description, base_table, report_type,
         return {
             "success": True,
             "message": f"Report '{report_title}' updated successfully",
-            "report_id": report.name
+            "report_id": report.name,
+            "plan_warnings": [w for w in (report.plan_warnings or "").split("\n") if w]
         }
         
     except Exception as e:
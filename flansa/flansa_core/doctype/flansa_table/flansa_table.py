@@ -30,6 +30,10 @@ class FlansaTable(Document):
     def after_insert(self):
         """Auto-trigger DocType creation after table creation"""
         try:
+            # Bulk provisioning generates all DocTypes of an application in one pass later
+            if getattr(self, '_defer_doctype_generation', False):
+                return
+
             # For new tables created from dashboard, auto-generate DocType immediately
             if self.application and self.table_name and self.doctype_name and not frappe.db.exists("DocType", self.doctype_name):
                 # Generate DocType immediately for dashboard-created tables
@@ -158,22 +162,7 @@ class FlansaTable(Document):
                             }))
             
             # Create DocType structure
-            doctype_doc = {
-                "doctype": "DocType",
-                "name": doctype_name,
-                "module": "Flansa Generated",
-                "custom": 1,
-                "naming_rule": "Autoincrement",
-                "autoname": self.get_unique_naming_series(),
-                "description": f"Generated from Flansa Table: {self.table_label or self.table_name}",
-                "sort_field": "creation",
-                "sort_order": "DESC",
-                "track_changes": 1,
-                "fields": []
-            }
-            
-            # Add standard Flansa metadata fields
-            self.add_flansa_metadata_fields(doctype_doc)
+            doctype_doc = self.get_doctype_definition()
             
             # Add user-defined fields (if any exist)
             if fields:
@@ -182,9 +171,6 @@ class FlansaTable(Document):
                 doctype_doc["search_fields"] = self.get_search_fields(fields)
             # Note: No default fields are added for empty tables - keep it clean and simple
             
-            # Add permissions
-            self.add_permissions(doctype_doc)
-            
             # Create the DocType
             dt = frappe.get_doc(doctype_doc)
             dt.insert(ignore_permissions=True)
@@ -203,6 +189,27 @@ class FlansaTable(Document):
             frappe.log_error(f"Error force generating DocType: {str(e)}")
             return {"success": False, "message": f"Error creating DocType: {str(e)}"}
 
+    def get_doctype_definition(self, docfields=None):
+        """DocType dict for this table; docfields (DocField dicts) are added as they are"""
+        doctype_doc = {
+            "doctype": "DocType",
+            "name": self.doctype_name,
+            "module": "Flansa Generated",
+            "custom": 1,
+            "naming_rule": "Autoincrement",
+            "autoname": self.get_unique_naming_series(),
+            "description": f"Generated from Flansa Table: {self.table_label or self.table_name}",
+            "sort_field": "creation",
+            "sort_order": "DESC",
+            "track_changes": 1,
+            "fields": list(docfields or [])
+        }
+
+        # Add standard Flansa metadata fields
+        self.add_flansa_metadata_fields(doctype_doc)
+        self.add_permissions(doctype_doc)
+        return doctype_doc
+
     def add_flansa_metadata_fields(self, doctype_doc):
         """Add minimal essential metadata fields following low-code best practices"""
         # Only add essential fields - use Frappe's default 'name' field as ID
@@ -0,0 +1,14 @@
+# Copyright (c) 2025, Flansa Team and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class FlansaUsageCounter(Document):
+	pass
+
+
+def on_doctype_update():
+	# Usage is read as SUM(value) per workspace and metric
+	frappe.db.add_index("Flansa Usage Counter", ["workspace_id", "metric"])
@@ -48,31 +48,15 @@ class FlansaWorkspace(Document):
         """Update tenant usage statistics - works with both databases"""
         
         try:
-            # Database-agnostic approach using frappe methods
-            # These work with both MariaDB and PostgreSQL
-            
-            # Check if tables exist before counting
-            doctypes_to_count = [
-                ("total_applications", "Flansa Application"),
-                ("total_tables", "Flansa Table"),
-                ("total_relationships", "Flansa Relationship"),
-                ("total_reports", "Flansa Saved Report"),
-                ("total_form_configs", "Flansa Form Config")
-            ]
-            
-            for field_name, doctype in doctypes_to_count:
-                try:
-                    # Check if DocType exists
-                    if frappe.db.exists("DocType", doctype):
-                        # Use frappe.db.count which works with both databases
-                        count = frappe.db.count(doctype, {"workspace_id": self.workspace_id})
-                        setattr(self, field_name, count or 0)
-                    else:
-                        # DocType doesn't exist yet
-                        setattr(self, field_name, 0)
-                except Exception:
-                    # If table doesn't exist or any error, set to 0
-                    setattr(self, field_name, 0)
+            # Read from the usage counters instead of counting each DocType
+            from flansa.flansa_core.usage_service import get_workspace_usage
+
+            usage = get_workspace_usage(self.workspace_id)
+            self.total_applications = usage["applications"]
+            self.total_tables = usage["tables"]
+            self.total_relationships = usage["relationships"]
+            self.total_reports = usage["reports"]
+            self.total_form_configs = usage["form_configs"]
             
             # Update last activity
             self.last_activity = frappe.utils.now()
@@ -3,7 +3,10 @@ DocType hooks for Logic Field calculations and tenant inheritance
 """
 import frappe
 from flansa.flansa_core.api.flansa_logic_engine import get_logic_engine
+from flansa.flansa_core.utils.instrumentation import instrument
+from flansa.flansa_core.utils.link_resolver import prefetch_link_values
 
+@instrument()
 def calculate_logic_fields(doc, method=None):
     """Calculate Logic Fields for any DocType on save/load"""
     
@@ -33,6 +36,9 @@ def calculate_logic_fields(doc, method=None):
         if not doctype_logic_fields:
             return
         
+        # Load the targets of all FETCH/LOOKUP fields at once, one query per target DocType
+        prefetch_link_values(doc.doctype, [doc], [f.logic_expression for f in doctype_logic_fields])
+        
         # Calculate each Logic Field using the proper calculation functions
         for logic_field in doctype_logic_fields:
             try:
@@ -41,7 +47,6 @@ def calculate_logic_fields(doc, method=None):
                 
                 # Skip Link fields - they should preserve user-entered values, not be calculated
                 if hasattr(logic_field_doc, 'logic_type') and logic_field_doc.logic_type == 'link':
-                    print(f"⏭️  Skipping Link field calculation for {logic_field.field_name}", flush=True)
                     continue
                 
                 # Use the proper calculation function based on expression type
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Flansa Field Calculator - one compiled calculator per generated DocType
+
+Formula and summary fields added through native_fields keep their configuration
+in the DocField description (flansa_config). Instead of a Server Script per
+field, all of them are compiled into a single function per DocType that runs
+once per save:
+
+- summaries first: one aggregate query per related DocType, grouped on its
+  link field (the same queries serve a single save and a batch of parents,
+  see summary_recalc_service)
+- then the formulas in dependency order, so a formula may use summaries and
+  other formulas
+
+Every formula is parsed and checked against a whitelist of operators,
+functions and the DocType's own fields before it is compiled, so the generated
+code runs without the safe_exec sandbox. Calculators are cached per process
+and keyed by the DocType's meta.modified: adding, editing or deleting a field
+saves the DocType and compiles a new calculator on the next save.
+"""
+
+import ast
+import json
+
+import frappe
+
+from flansa.flansa_core.utils.instrumentation import count
+
+SUMMARY_AGGREGATES = {"Sum": "SUM", "Average": "AVG", "Count": "COUNT", "Max": "MAX", "Min": "MIN"}
+
+# Functions the converted formulas may call (see native_fields.convert_formula_to_safe_python)
+FORMULA_FUNCTIONS = {"sum": sum, "max": max, "min": min, "round": round, "abs": abs, "len": len}
+
+ALLOWED_NODES = (
+    ast.Expression, ast.Load, ast.Name, ast.Constant, ast.List, ast.Tuple,
+    ast.BoolOp, ast.And, ast.Or,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.UnaryOp, ast.UAdd, ast.USub, ast.Not,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.IfExp, ast.Call,
+)
+
+# Fields every document has besides the ones in meta.fields
+STANDARD_FIELDS = {"name", "owner", "creation", "modified", "modified_by", "docstatus", "idx"}
+
+_calculators = {}
+
+
+class FieldCalculator:
+    """Compiled formula and summary fields of one DocType"""
+
+    def __init__(self, doctype, version, summaries, formulas, errors):
+        self.doctype = doctype
+        self.version = version
+        self.summaries = summaries
+        self.formulas = formulas
+        self.errors = errors
+        self.source = generate_source(summaries, formulas)
+        self._calculate = _compile(self.source, doctype)
+
+    @property
+    def is_empty(self):
+        return not (self.summaries or self.formulas)
+
+    @property
+    def fields(self):
+        """Every field the calculator reads or writes"""
+        names = {s["field_name"] for s in self.summaries} | {s["source_field"] for s in self.summaries}
+        for formula in self.formulas:
+            names.add(formula["field_name"])
+            names.update(formula["dependencies"])
+        return names
+
+    def calculate(self, doc, found=None):
+        """
+        Set every summary and formula field of doc
+
+        found: aggregates from fetch_summaries for a batch of documents; fetched
+        for doc alone when omitted.
+        """
+        if found is None:
+            found = self.fetch_summaries({
+                s["source_field"]: [doc.get(s["source_field"])] for s in self.summaries
+            })
+        self._calculate(doc, self.summary_values(doc, found))
+        count("logic_evaluations", len(self.summaries) + len(self.formulas))
+
+    def fetch_summaries(self, keys_by_source):
+        """
+        Aggregates of every summary for any number of parent keys, one query per related DocType
+
+        keys_by_source maps a summary's source_field to the parent values to
+        aggregate for. Returns {(group, key): row}.
+        """
+        keys = {
+            s["group"]: tuple({str(k) for k in keys_by_source.get(s["source_field"]) or [] if k})
+            for s in self.summaries
+        }
+        keys = {group: values for group, values in keys.items() if values}
+        if not keys:
+            return {}
+
+        found = {}
+        for group, values in keys.items():
+            for row in fetch_summary_group([s for s in self.summaries if s["group"] == group], values):
+                found[(group, str(row.k))] = row
+        return found
+
+    def summary_values(self, doc, found):
+        return {
+            s["field_name"]: (found.get((s["group"], str(doc.get(s["source_field"])))) or {}).get(s["column"]) or 0
+            for s in self.summaries
+        }
+
+
+def get_calculator(doctype):
+    """Compiled calculator of a DocType, rebuilt whenever its schema changes"""
+    meta = frappe.get_meta(doctype)
+    version = str(meta.modified)
+    key = (frappe.local.site, doctype)
+
+    cached = _calculators.get(key)
+    if cached and cached.version == version:
+        count("cache_hits")
+        return cached
+
+    count("cache_misses")
+    calculator = compile_calculator(meta, version)
+    _calculators[key] = calculator
+    return calculator
+
+
+def run_calculator(doc, method=None):
+    """Doc event (before_save): calculate the formula and summary fields of generated DocTypes"""
+    if doc.meta.module != "Flansa Generated":
+        return
+
+    try:
+        calculator = get_calculator(doc.doctype)
+    except Exception as e:
+        frappe.log_error(f"Error compiling field calculator for {doc.doctype}: {str(e)}", "Field Calculator")
+        return
+
+    if not calculator.is_empty:
+        calculator.calculate(doc)
+
+
+def clear_calculators(doctype=None):
+    for key in [k for k in _calculators if doctype is None or k[1] == doctype]:
+        _calculators.pop(key, None)
+
+
+def compile_calculator(meta, version=None):
+    """Build the calculator of a DocType from the flansa_config of its fields"""
+    field_names = STANDARD_FIELDS | {df.fieldname for df in meta.fields}
+    summaries, formulas, errors = [], [], []
+    groups = {}
+
+    for df in meta.fields:
+        config = get_calculated_field_config(df)
+        if not config:
+            continue
+        field_type, settings = config
+        settings = dict(settings, field_name=df.fieldname)
+        try:
+            if field_type == "summary":
+                summaries.append(_prepare_summary(settings, groups))
+            else:
+                formulas.append(_prepare_formula(settings, field_names))
+        except Exception as e:
+            errors.append({"field_name": df.fieldname, "error": str(e)})
+
+    formulas, cycle_errors = _order_formulas(formulas)
+    return FieldCalculator(meta.name, version or str(meta.modified), summaries, formulas, errors + cycle_errors)
+
+
+def get_calculated_field_config(df):
+    """(field_type, config) of a formula or summary field, None for any other field"""
+    description = df.get("description") or ""
+    if "flansa_config" not in description:
+        return None
+    try:
+        flansa_config = json.loads(description).get("flansa_config") or {}
+    except (json.JSONDecodeError, TypeError, AttributeError):
+        return None
+
+    if flansa_config.get("field_type") not in ("formula", "summary"):
+        return None
+    return flansa_config["field_type"], flansa_config.get("config") or {}
+
+
+def check_formula(doctype, formula):
+    """Error message for a formula that cannot be compiled against the DocType, None if it is valid"""
+    meta = frappe.get_meta(doctype)
+    try:
+        _prepare_formula({"field_name": "", "formula": formula}, STANDARD_FIELDS | {df.fieldname for df in meta.fields})
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def check_summary(config):
+    """Error message for a summary config that cannot be compiled, None if it is valid"""
+    try:
+        _prepare_summary(config, {})
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def fetch_summary_group(summaries, keys):
+    """Aggregates of the summaries over one related DocType, a row per parent key (k, a0, a1, ...)"""
+    first = summaries[0]
+    # get_all builds the IN list and quoting for MariaDB and Postgres alike
+    return frappe.get_all(
+        first["target_doctype"],
+        filters={first["filter_field"]: ["in", list(keys)]},
+        fields=[f"`{first['filter_field']}` as k"] + [f"{_aggregate_sql(s)} as {s['column']}" for s in summaries],
+        group_by=f"`{first['filter_field']}`",
+        order_by=None
+    )
+
+
+def generate_source(summaries, formulas):
+    """Python source of the calculator function"""
+    lines = ["def calculate(doc, summary_values):"]
+    assigned = set()
+
+    for summary in summaries:
+        name = summary["field_name"]
+        lines.append(f"    f_{name} = summary_values[{name!r}]")
+        lines.append(f"    doc.set({name!r}, f_{name})")
+        assigned.add(name)
+
+    inputs = sorted({dep for formula in formulas for dep in formula["dependencies"]} - assigned - {f["field_name"] for f in formulas})
+    for name in inputs:
+        lines.append(f"    f_{name} = _field(doc, {name!r})")
+
+    for formula in formulas:
+        name = formula["field_name"]
+        lines.extend([
+            "    try:",
+            f"        f_{name} = {formula['expression']}",
+            "    except Exception as e:",
+            f"        f_{name} = _failed(doc, {name!r}, e)",
+            f"    doc.set({name!r}, 0 if f_{name} is None else f_{name})",
+        ])
+
+    if len(lines) == 1:
+        lines.append("    pass")
+    return "\n".join(lines) + "\n"
+
+
+def _prepare_summary(config, groups):
+    summary_type = config.get("summary_type")
+    if summary_type not in SUMMARY_AGGREGATES:
+        raise ValueError(f"Unknown summary type: {summary_type}")
+
+    target = config.get("target_doctype")
+    if not target or not frappe.db.exists("DocType", target):
+        raise ValueError(f"Summary target DocType {target} does not exist")
+
+    target_meta = frappe.get_meta(target)
+    target_fields = STANDARD_FIELDS | {df.fieldname for df in target_meta.fields}
+    filter_field = config.get("filter_field")
+    summary_field = config.get("summary_field")
+    if filter_field not in target_fields:
+        raise ValueError(f"Field {filter_field} does not exist in {target}")
+    if summary_type != "Count" and summary_field not in target_fields:
+        raise ValueError(f"Field {summary_field} does not exist in {target}")
+
+    source_field = config.get("source_field") or "name"
+    group_key = (target, filter_field, source_field)
+    group = groups.setdefault(group_key, {"index": len(groups), "columns": 0})
+    column = f"a{group['columns']}"
+    group["columns"] += 1
+
+    return {
+        "field_name": config.get("field_name"),
+        "summary_type": summary_type,
+        "summary_field": summary_field,
+        "target_doctype": target,
+        "filter_field": filter_field,
+        "source_field": source_field,
+        "group": group["index"],
+        "column": column,
+    }
+
+
+def _aggregate_sql(summary):
+    if summary["summary_type"] == "Count":
+        return "COUNT(*)"
+    return f"{SUMMARY_AGGREGATES[summary['summary_type']]}(`{summary['summary_field']}`)"
+
+
+def _prepare_formula(config, field_names):
+    """Convert, parse and validate a formula; returns it with its dependencies and generated expression"""
+    from flansa.native_fields import convert_formula_to_safe_python
+
+    formula = config.get("formula") or ""
+    python_expr = convert_formula_to_safe_python(formula, [])
+    try:
+        tree = ast.parse(python_expr.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid formula {formula}: {e.msg}")
+
+    dependencies = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise ValueError(f"Formula {formula} uses an unsupported expression ({type(node).__name__})")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FORMULA_FUNCTIONS or node.keywords:
+                raise ValueError(f"Formula {formula} calls an unsupported function")
+        elif isinstance(node, ast.Name) and node.id not in FORMULA_FUNCTIONS:
+            if node.id not in field_names:
+                raise ValueError(f"Formula {formula} uses unknown field {node.id}")
+            if node.id not in dependencies:
+                dependencies.append(node.id)
+
+    tree = _FieldRenamer().visit(tree)
+    return {
+        "field_name": config.get("field_name"),
+        "formula": formula,
+        "dependencies": dependencies,
+        "expression": ast.unparse(tree),
+    }
+
+
+class _FieldRenamer(ast.NodeTransformer):
+    """Field names become f_<field> locals, so they cannot shadow the formula functions"""
+
+    def visit_Call(self, node):
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+    def visit_Name(self, node):
+        return ast.copy_location(ast.Name(id=f"f_{node.id}", ctx=node.ctx), node)
+
+
+def _order_formulas(formulas):
+    """Formulas sorted so that each comes after the formulas it uses; cycles are reported as errors"""
+    by_name = {f["field_name"]: f for f in formulas}
+    ordered, done, errors = [], set(), []
+
+    pending = list(formulas)
+    while pending:
+        ready = [f for f in pending if all(d in done or d not in by_name or d == f["field_name"] for d in f["dependencies"])]
+        if not ready:
+            for formula in pending:
+                errors.append({"field_name": formula["field_name"], "error": "Circular formula dependency"})
+            break
+        for formula in ready:
+            if formula["field_name"] in formula["dependencies"]:
+                errors.append({"field_name": formula["field_name"], "error": "Formula refers to itself"})
+            else:
+                ordered.append(formula)
+            done.add(formula["field_name"])
+        pending = [f for f in pending if f["field_name"] not in done]
+
+    return ordered, errors
+
+
+def _field(doc, fieldname):
+    value = doc.get(fieldname)
+    return 0 if value is None else value
+
+
+def _failed(doc, fieldname, error):
+    frappe.log_error(f"Formula calculation error in {doc.doctype}.{fieldname}: {str(error)}", "Field Calculator")
+    return 0
+
+
+def _compile(source, doctype):
+    namespace = {"__builtins__": {}, "_field": _field, "_failed": _failed, **FORMULA_FUNCTIONS}
+    exec(compile(source, f"<flansa calculator {doctype}>", "exec"), namespace)
+    return namespace["calculate"]
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Flansa Job Service - prioritized background jobs for Flansa operations
+
+Every Flansa background job goes through enqueue_job with a job class:
+
+- interactive: a user is waiting (report refresh, buffered public form
+  submissions); short queue
+- bulk: long data work (teardown, provisioning, backfills, summary rebuilds);
+  long queue, capped per workspace
+- maintenance: housekeeping (summary recalculation, orphan scans, gallery
+  thumbnails); default queue
+
+The RQ queue of a class can be overridden with flansa_job_queues in site
+config (e.g. {"bulk": "flansa_bulk"}) to give it dedicated workers.
+
+A job key deduplicates: while a job with the same key is queued, waiting or
+running, enqueueing it again is a no-op. A workspace runs at most
+flansa_workspace_job_limit bulk jobs at a time (default 2); further jobs wait
+and are started in order as slots free up, so one tenant's import cannot hold
+every long worker.
+
+Jobs are recorded in Flansa Job, in the database rather than the evictable
+cache: status, progress and the checkpoint a job saves with save_checkpoint.
+A job given an initial checkpoint is recorded in the caller's transaction, so
+work handed over to it (e.g. detached tables still to be torn down) commits
+together with its record. maintain_jobs restarts recorded jobs whose worker or
+queue entry was lost; resumable jobs continue from their last checkpoint.
+"""
+
+import hashlib
+import json
+
+import frappe
+from frappe.utils import add_to_date, cint, now_datetime
+from frappe.utils.background_jobs import is_job_enqueued
+
+JOB_DOCTYPE = "Flansa Job"
+PROGRESS_EVENT = "flansa_job_progress"
+
+JOB_CLASSES = {
+    "interactive": {"queue": "short", "timeout": 600, "workspace_limit": False},
+    "bulk": {"queue": "long", "timeout": 3600, "workspace_limit": True},
+    "maintenance": {"queue": "default", "timeout": 1800, "workspace_limit": False},
+}
+DEFAULT_WORKSPACE_JOB_LIMIT = 2
+ACTIVE_STATUSES = ("Queued", "Waiting", "Running")
+# A recorded job missing from the queue for this long lost its worker or queue entry
+LOST_AFTER_SECONDS = 120
+# Finished job records are kept this long for get_job_status
+KEEP_FINISHED_SECONDS = 86400
+MAX_NAME_LENGTH = 140
+
+
+def enqueue_job(method, job_class, job_key=None, workspace_id=None, timeout=None,
+                after_commit=False, label=None, checkpoint=None, **kwargs):
+    """
+    Enqueue method(**kwargs) as a Flansa job of job_class
+
+    Args:
+        job_key: deduplication key; also the job id used by the status API
+        workspace_id: workspace charged for the job (bulk jobs default to the current one)
+        after_commit: enqueue only once the current transaction commits
+        label: title shown in job listings
+        checkpoint: initial state of a resumable job; records the job in the
+            current transaction
+
+    Returns:
+        The job id
+    """
+    settings = JOB_CLASSES[job_class]
+    job_id = _job_name(job_key) if job_key else f"{job_class}_{frappe.generate_hash(length=10)}"
+
+    if job_key and _is_active(job_id):
+        return job_id
+
+    if settings["workspace_limit"] and not workspace_id:
+        from flansa.flansa_core.workspace_service import WorkspaceContext
+        workspace_id = WorkspaceContext.get_current_workspace_id()
+
+    spec = {
+        "method": method,
+        "job_class": job_class,
+        "workspace_id": workspace_id,
+        "user": frappe.session.user,
+        "label": label or method.rsplit(".", 1)[-1],
+        "timeout": timeout or settings["timeout"],
+        "kwargs": kwargs,
+    }
+    if checkpoint is not None:
+        _write_job(job_id, spec, status="Queued", checkpoint=checkpoint)
+
+    _submit(job_id, spec, after_commit=after_commit)
+    return job_id
+
+
+def run_job(flansa_job_id, spec):
+    """Background job body: run a Flansa job inside its workspace slot"""
+    # Not named job_id: frappe.enqueue takes that keyword for the RQ job id
+    job_id = flansa_job_id
+    limited = _is_limited(spec)
+
+    if limited and not _acquire_slot(job_id, spec):
+        frappe.db.commit()
+        _publish(job_id)
+        return
+
+    if not limited:
+        _write_job(job_id, spec, status="Running")
+    frappe.db.commit()
+    _publish(job_id)
+
+    frappe.flags.flansa_job_id = job_id
+    # A job resubmitted by maintain_jobs runs as the user who requested it, not the scheduler
+    previous_user = frappe.session.user
+    if spec.get("user") and spec["user"] != previous_user:
+        frappe.set_user(spec["user"])
+    try:
+        frappe.get_attr(spec["method"])(**spec["kwargs"])
+        frappe.db.set_value(JOB_DOCTYPE, job_id, {"status": "Completed", "error": None})
+        frappe.db.commit()
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.db.set_value(JOB_DOCTYPE, job_id, {"status": "Failed", "error": str(e)})
+        frappe.db.commit()
+        frappe.log_error(f"Job {job_id} ({spec['method']}) failed: {str(e)}", "Flansa Job")
+    finally:
+        frappe.flags.flansa_job_id = None
+        if frappe.session.user != previous_user:
+            frappe.set_user(previous_user)
+
+    _publish(job_id)
+    if limited:
+        _start_waiting(spec["workspace_id"])
+
+
+def report_progress(done, total=None, message=None):
+    """Record and publish progress of the running job; committed with the job's next commit"""
+    job_id = frappe.flags.get("flansa_job_id")
+    if not job_id:
+        return
+    frappe.db.set_value(
+        JOB_DOCTYPE, job_id, {"progress_done": cint(done), "progress_total": cint(total), "message": message}
+    )
+    _publish(job_id)
+
+
+def get_checkpoint(default=None):
+    """Checkpoint of the current job: its initial state or what an earlier run saved"""
+    job_id = frappe.flags.get("flansa_job_id")
+    checkpoint = frappe.db.get_value(JOB_DOCTYPE, job_id, "checkpoint") if job_id else None
+    return json.loads(checkpoint) if checkpoint else default
+
+
+def save_checkpoint(checkpoint):
+    """Save where the current job got to; call before committing the work it covers"""
+    job_id = frappe.flags.get("flansa_job_id")
+    if job_id:
+        frappe.db.set_value(JOB_DOCTYPE, job_id, "checkpoint", frappe.as_json(checkpoint, indent=None))
+
+
+def get_job(job_id):
+    """Job record with its checkpoint decoded, or None"""
+    job = frappe.db.get_value(JOB_DOCTYPE, job_id, "*", as_dict=True)
+    if job:
+        job.checkpoint = json.loads(job.checkpoint) if job.checkpoint else None
+    return job
+
+
+def resume_job(job_id):
+    """Submit a recorded job again; a resumable job continues from its checkpoint"""
+    job = frappe.db.get_value(JOB_DOCTYPE, job_id, "*", as_dict=True)
+    if not job:
+        return False
+    if job.status in ACTIVE_STATUSES and is_job_enqueued(job_id):
+        return True
+    frappe.db.set_value(JOB_DOCTYPE, job_id, {"status": "Queued", "error": None})
+    _submit(job_id, _spec_of(job), after_commit=True)
+    return True
+
+
+def can_view_job(job):
+    """Whether the session user may see a job record: its own jobs, or any as System Manager"""
+    return job.user == frappe.session.user or "System Manager" in frappe.get_roles()
+
+
+@frappe.whitelist()
+def get_job_status(job_id):
+    """Status, progress and error of a Flansa job"""
+    job = frappe.db.get_value(JOB_DOCTYPE, job_id, list(_SUMMARY_FIELDS) + ["user"], as_dict=True)
+    if not job:
+        if is_job_enqueued(job_id):
+            return {"success": True, "job": {"job_id": job_id, "status": "Queued"}}
+        return {"success": False, "error": "Job not found"}
+    if not can_view_job(job):
+        return {"success": False, "error": "Not permitted"}
+    return {"success": True, "job": _summary(job)}
+
+
+@frappe.whitelist()
+def get_workspace_jobs(workspace_id=None):
+    """Queued, waiting and running jobs of a workspace (default: the current one)"""
+    from flansa.flansa_core.workspace_service import WorkspaceContext
+
+    current = WorkspaceContext.get_current_workspace_id()
+    workspace_id = workspace_id or current
+    if workspace_id != current and "System Manager" not in frappe.get_roles():
+        return {"success": False, "error": "Not permitted"}
+
+    jobs = frappe.get_all(
+        JOB_DOCTYPE,
+        filters={"workspace_id": workspace_id, "status": ["in", ACTIVE_STATUSES]},
+        fields=list(_SUMMARY_FIELDS),
+        order_by="creation asc"
+    )
+    return {"success": True, "jobs": [_summary(job) for job in jobs]}
+
+
+def maintain_jobs():
+    """
+    Scheduled job: restart lost jobs, start waiting jobs, drop old records
+
+    A job is lost when its record says queued or running but neither the queue
+    nor a worker has it (worker killed, queue flushed, enqueue rolled back).
+    Jobs with a checkpoint and queued jobs are submitted again; running jobs
+    without a checkpoint cannot resume and are marked failed.
+    """
+    lost_before = add_to_date(now_datetime(), seconds=-LOST_AFTER_SECONDS)
+    for job in frappe.get_all(
+        JOB_DOCTYPE,
+        filters={"status": ["in", ("Queued", "Running")], "modified": ["<", lost_before]},
+        fields=["*"]
+    ):
+        if is_job_enqueued(job.name):
+            continue
+        if job.status == "Queued" or job.checkpoint:
+            frappe.db.set_value(JOB_DOCTYPE, job.name, "status", "Queued")
+            _submit(job.name, _spec_of(job))
+        else:
+            frappe.db.set_value(JOB_DOCTYPE, job.name, {"status": "Failed", "error": "Worker lost"})
+    frappe.db.commit()
+
+    for workspace_id in frappe.get_all(
+        JOB_DOCTYPE, filters={"status": "Waiting"}, pluck="workspace_id", distinct=True
+    ):
+        _start_waiting(workspace_id)
+
+    frappe.db.delete(JOB_DOCTYPE, {
+        "status": ["in", ("Completed", "Failed")],
+        "modified": ["<", add_to_date(now_datetime(), seconds=-KEEP_FINISHED_SECONDS)]
+    })
+    frappe.db.commit()
+
+
+_SUMMARY_FIELDS = (
+    "name", "job_class", "label", "workspace_id", "status", "progress_done", "progress_total",
+    "message", "error", "creation", "modified"
+)
+
+
+def _summary(job):
+    summary = {field: job.get(field) for field in _SUMMARY_FIELDS if field != "name"}
+    summary["job_id"] = job.get("name")
+    return summary
+
+
+def _submit(job_id, spec, after_commit=False):
+    queues = frappe.conf.get("flansa_job_queues") or {}
+    frappe.enqueue(
+        "flansa.flansa_core.job_service.run_job",
+        queue=queues.get(spec["job_class"]) or JOB_CLASSES[spec["job_class"]]["queue"],
+        timeout=spec["timeout"],
+        job_name=job_id,
+        job_id=job_id,
+        deduplicate=True,
+        enqueue_after_commit=after_commit,
+        flansa_job_id=job_id,
+        spec=spec
+    )
+
+
+def _is_active(job_id):
+    if is_job_enqueued(job_id):
+        return True
+    # Waiting jobs have no queue entry until a slot frees up
+    return frappe.db.get_value(JOB_DOCTYPE, job_id, "status") == "Waiting"
+
+
+def _is_limited(spec):
+    return JOB_CLASSES[spec["job_class"]]["workspace_limit"] and bool(spec.get("workspace_id"))
+
+
+def _workspace_job_limit():
+    return cint(frappe.conf.get("flansa_workspace_job_limit") or DEFAULT_WORKSPACE_JOB_LIMIT)
+
+
+def _acquire_slot(job_id, spec):
+    """Mark the job Running if its workspace has a free bulk slot, Waiting otherwise"""
+    workspace_id = spec["workspace_id"]
+    # Serializes slot counting per workspace until the caller commits
+    frappe.db.sql("SELECT `name` FROM `tabFlansa Workspace` WHERE `name` = %s FOR UPDATE", (workspace_id,))
+    running = frappe.db.count(JOB_DOCTYPE, {
+        "workspace_id": workspace_id,
+        "job_class": spec["job_class"],
+        "status": "Running",
+        "name": ["!=", job_id]
+    })
+    acquired = running < _workspace_job_limit()
+    _write_job(job_id, spec, status="Running" if acquired else "Waiting")
+    return acquired
+
+
+def _start_waiting(workspace_id):
+    """Submit the oldest waiting bulk jobs of a workspace for its free slots"""
+    running = frappe.db.count(JOB_DOCTYPE, {"workspace_id": workspace_id, "job_class": "bulk", "status": "Running"})
+    free = _workspace_job_limit() - running
+    if free <= 0:
+        return
+
+    for job in frappe.get_all(
+        JOB_DOCTYPE,
+        filters={"workspace_id": workspace_id, "status": "Waiting"},
+        fields=["*"],
+        order_by="creation asc",
+        limit=free
+    ):
+        frappe.db.set_value(JOB_DOCTYPE, job.name, "status", "Queued")
+        _submit(job.name, _spec_of(job))
+    frappe.db.commit()
+
+
+def _write_job(job_id, spec, status, checkpoint=None):
+    """Insert or update a job record; a finished job run again starts without its old checkpoint"""
+    values = {
+        "status": status,
+        "job_class": spec["job_class"],
+        "method": spec["method"],
+        "label": spec.get("label"),
+        "workspace_id": spec.get("workspace_id"),
+        "user": spec.get("user"),
+        "timeout": spec["timeout"],
+        "kwargs": frappe.as_json(spec["kwargs"], indent=None),
+        "error": None,
+    }
+    if checkpoint is not None:
+        values["checkpoint"] = frappe.as_json(checkpoint, indent=None)
+
+    previous = frappe.db.get_value(JOB_DOCTYPE, job_id, "status")
+    if previous is None:
+        job = frappe.get_doc({"doctype": JOB_DOCTYPE, "name": job_id, **values})
+        # Bookkeeping row: no doc events
+        job.db_insert()
+        return
+
+    if previous in ("Completed", "Failed") and checkpoint is None:
+        values.update({"checkpoint": None, "progress_done": 0, "progress_total": 0, "message": None})
+    frappe.db.set_value(JOB_DOCTYPE, job_id, values)
+
+
+def _spec_of(job):
+    return {
+        "method": job.method,
+        "job_class": job.job_class,
+        "workspace_id": job.workspace_id,
+        "user": job.user,
+        "label": job.label,
+        "timeout": job.timeout or JOB_CLASSES[job.job_class]["timeout"],
+        "kwargs": json.loads(job.kwargs or "{}"),
+    }
+
+
+def _job_name(job_key):
+    if len(job_key) <= MAX_NAME_LENGTH:
+        return job_key
+    return f"{job_key[:MAX_NAME_LENGTH - 33]}_{hashlib.md5(job_key.encode()).hexdigest()}"
+
+
+def _publish(job_id):
+    job = frappe.db.get_value(JOB_DOCTYPE, job_id, list(_SUMMARY_FIELDS) + ["user"], as_dict=True)
+    if job and job.user:
+        frappe.publish_realtime(PROGRESS_EVENT, _summary(job), user=job.user)
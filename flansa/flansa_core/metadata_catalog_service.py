@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Flansa Metadata Catalog Service - workspace-scoped catalog for wizards and builder pickers
+
+Holds the applications, tables, generated DocType fields and relationships of
+one workspace, built from a handful of set-based queries and cached per
+workspace. Doc events drop the workspace's cached catalog and the next read
+rebuilds it with a newer version, so pickers never have to load Flansa Table /
+Flansa Application documents one by one.
+"""
+
+import time
+
+import frappe
+from typing import Optional, Dict, List, Any
+
+from flansa.flansa_core.utils.instrumentation import cached_hget
+
+CATALOG_CACHE_KEY = "flansa_metadata_catalog"
+DOCTYPE_LISTS_KEY = "flansa_catalog_doctype_lists"
+
+TABLE_FIELDS = ["name", "table_name", "table_label", "doctype_name", "application"]
+APPLICATION_FIELDS = ["name", "app_name", "app_title"]
+RELATIONSHIP_FIELDS = ["name", "relationship_name", "relationship_type", "status", "parent_table", "child_table"]
+FIELD_COLUMNS = ["fieldname", "label", "fieldtype", "options", "reqd"]
+
+# Layout-only field types never offered in pickers
+LAYOUT_FIELDTYPES = ["Section Break", "Column Break", "Tab Break", "HTML", "Button", "Fold", "Heading", "Image"]
+
+
+class MetadataCatalog:
+    """Read-only view over a cached workspace catalog"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.workspace_id = data.get("workspace_id")
+        self.version = data.get("version")
+        self.applications = data.get("applications", {})
+        self.tables = data.get("tables", {})
+        self.fields = data.get("fields", {})
+        self.relationships = data.get("relationships", [])
+        self._table_by_doctype = {
+            table["doctype_name"]: table_id
+            for table_id, table in self.tables.items()
+            if table.get("doctype_name")
+        }
+
+    def get_table(self, table_id: str) -> Optional[Dict[str, Any]]:
+        return self.tables.get(table_id)
+
+    def table_for_doctype(self, doctype_name: str) -> Optional[str]:
+        return self._table_by_doctype.get(doctype_name)
+
+    def get_application(self, app_id: str) -> Optional[Dict[str, Any]]:
+        return self.applications.get(app_id)
+
+    def table_doctype(self, table_id: str) -> Optional[str]:
+        """DocType of a table, falling back to the table name like the wizards always have"""
+        table = self.tables.get(table_id) or {}
+        return table.get("doctype_name") or table.get("table_name")
+
+    def app_name_for_table(self, table_id: str) -> Optional[str]:
+        """Name used to group a table by application (table label when it has none)"""
+        table = self.tables.get(table_id)
+        if not table:
+            return None
+        app_id = table.get("application")
+        if not app_id:
+            return table.get("table_label") or table_id
+        app = self.applications.get(app_id) or {}
+        return app.get("app_name") or app_id
+
+    def get_fields(self, doctype_name: str, fieldtypes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Fields of a catalogued DocType, optionally limited to some field types"""
+        fields = self.fields.get(doctype_name)
+        if fields is None:
+            fields = _fields_from_meta(doctype_name)
+        if fieldtypes:
+            return [f for f in fields if f["fieldtype"] in fieldtypes]
+        return list(fields)
+
+    def relationships_for_table(self, table_id: str) -> List[Dict[str, Any]]:
+        return [
+            rel for rel in self.relationships
+            if table_id in (rel["parent_table"], rel["child_table"])
+        ]
+
+
+def get_catalog(workspace_id: Optional[str] = None) -> MetadataCatalog:
+    """Get the cached metadata catalog of a workspace (the current one by default)"""
+    if not workspace_id:
+        from flansa.flansa_core.workspace_service import WorkspaceContext
+        workspace_id = WorkspaceContext.get_current_workspace_id()
+
+    data = cached_hget(CATALOG_CACHE_KEY, workspace_id, lambda: build_catalog(workspace_id))
+    return MetadataCatalog(data or {})
+
+
+def get_catalog_for_table(table_id: str) -> MetadataCatalog:
+    """Get the catalog that contains a table (the current workspace's, if it is there)"""
+    catalog = get_catalog()
+    if catalog.get_table(table_id):
+        return catalog
+
+    workspace_id = frappe.db.get_value("Flansa Table", table_id, "workspace_id")
+    if workspace_id and workspace_id != catalog.workspace_id:
+        catalog = get_catalog(workspace_id)
+    if not catalog.get_table(table_id):
+        frappe.throw(f"Flansa Table {table_id} not found", frappe.DoesNotExistError)
+    return catalog
+
+
+def build_catalog(workspace_id: str) -> Dict[str, Any]:
+    """Build a workspace catalog with set-based queries"""
+    applications = {
+        app.name: {"app_name": app.app_name, "app_title": app.app_title}
+        for app in frappe.get_all(
+            "Flansa Application",
+            filters={"workspace_id": workspace_id},
+            fields=APPLICATION_FIELDS
+        )
+    }
+
+    tables = {
+        t.name: _table_entry(t)
+        for t in frappe.get_all(
+            "Flansa Table",
+            filters={"workspace_id": workspace_id},
+            fields=TABLE_FIELDS,
+            order_by="table_label asc"
+        )
+    }
+
+    # Tables may belong to applications created before workspaces were introduced
+    missing_apps = {t["application"] for t in tables.values() if t["application"] and t["application"] not in applications}
+    if missing_apps:
+        for app in frappe.get_all("Flansa Application", filters={"name": ["in", list(missing_apps)]}, fields=APPLICATION_FIELDS):
+            applications[app.name] = {"app_name": app.app_name, "app_title": app.app_title}
+
+    return {
+        "workspace_id": workspace_id,
+        "version": _next_version(),
+        "applications": applications,
+        "tables": tables,
+        "fields": _load_fields({t["doctype_name"] for t in tables.values() if t["doctype_name"]}),
+        "relationships": _load_relationships(workspace_id),
+    }
+
+
+def get_system_doctypes() -> List[Dict[str, Any]]:
+    """Standard, non-child, non-single DocTypes (site-wide, cached)"""
+
+    def _load():
+        return [
+            dict(row) for row in frappe.db.sql("""
+                SELECT name, module
+                FROM `tabDocType`
+                WHERE custom = 0
+                AND istable = 0
+                AND issingle = 0
+                ORDER BY name
+            """, as_dict=True)
+        ]
+
+    return frappe.cache().hget(DOCTYPE_LISTS_KEY, "system", generator=_load) or []
+
+
+def get_custom_doctypes() -> List[str]:
+    """Names of custom DocTypes (site-wide, cached)"""
+
+    def _load():
+        return frappe.get_all("DocType", filters={"custom": 1}, pluck="name")
+
+    return frappe.cache().hget(DOCTYPE_LISTS_KEY, "custom", generator=_load) or []
+
+
+def clear_catalog(workspace_id: Optional[str] = None):
+    """Drop the cached catalog of one workspace, or of all workspaces"""
+    if workspace_id:
+        frappe.cache().hdel(CATALOG_CACHE_KEY, workspace_id)
+    else:
+        frappe.cache().delete_value(CATALOG_CACHE_KEY)
+
+
+def on_table_change(doc, method=None):
+    """Doc event for Flansa Table: drop the catalog of the table's workspace"""
+    previous = doc.get_doc_before_save() if method != "on_trash" else None
+    if previous and previous.get("workspace_id") != doc.get("workspace_id"):
+        # Moved between workspaces: both catalogs are stale
+        _invalidate_catalog(previous.get("workspace_id"))
+    _invalidate_catalog(doc.get("workspace_id"))
+
+
+def on_application_change(doc, method=None):
+    """Doc event for Flansa Application: drop the catalog of its workspace"""
+    _invalidate_catalog(doc.get("workspace_id"))
+
+
+def on_relationship_change(doc, method=None):
+    """Doc event for Flansa Relationship: drop the catalog of its workspace"""
+    _invalidate_catalog(doc.get("workspace_id"))
+
+
+def on_doctype_change(doc, method=None):
+    """Doc event for DocType / Custom Field: drop the catalog holding a generated DocType"""
+    doctype_name = doc.dt if doc.doctype == "Custom Field" else doc.name
+
+    if doc.doctype == "DocType" and method in ("after_insert", "on_trash"):
+        frappe.cache().delete_value(DOCTYPE_LISTS_KEY)
+
+    workspace_id = frappe.db.get_value("Flansa Table", {"doctype_name": doctype_name}, "workspace_id")
+    _invalidate_catalog(workspace_id)
+
+
+def _invalidate_catalog(workspace_id):
+    """Drop a workspace catalog now and again once the change is committed
+
+    Patching the cached catalog in place was a read-modify-write that lost
+    updates under concurrent saves; a plain delete cannot. The second delete
+    covers readers that rebuilt the catalog from uncommitted state meanwhile.
+    """
+    if not workspace_id:
+        return
+    clear_catalog(workspace_id)
+    frappe.db.after_commit.add(lambda: clear_catalog(workspace_id))
+
+
+def _next_version():
+    # Millisecond clock keeps versions increasing across rebuilds
+    return int(time.time() * 1000)
+
+
+def _table_entry(table):
+    return {
+        "table_name": table.get("table_name"),
+        "table_label": table.get("table_label"),
+        "doctype_name": table.get("doctype_name"),
+        "application": table.get("application"),
+    }
+
+
+def _load_relationships(workspace_id):
+    return [
+        dict(rel) for rel in frappe.get_all(
+            "Flansa Relationship",
+            filters={"workspace_id": workspace_id},
+            fields=RELATIONSHIP_FIELDS
+        )
+    ]
+
+
+def _load_fields(doctypes):
+    """Load DocField and Custom Field rows for many DocTypes in two queries"""
+    fields = {doctype: [] for doctype in doctypes}
+    if not doctypes:
+        return fields
+
+    for field in frappe.get_all(
+        "DocField",
+        filters={"parent": ["in", list(doctypes)], "parenttype": "DocType", "fieldtype": ["not in", LAYOUT_FIELDTYPES]},
+        fields=["parent"] + FIELD_COLUMNS,
+        order_by="idx asc"
+    ):
+        fields[field.parent].append(_field_entry(field))
+
+    for field in frappe.get_all(
+        "Custom Field",
+        filters={"dt": ["in", list(doctypes)], "fieldtype": ["not in", LAYOUT_FIELDTYPES]},
+        fields=["dt as parent"] + FIELD_COLUMNS,
+        order_by="idx asc"
+    ):
+        fields[field.parent].append(_field_entry(field))
+
+    return fields
+
+
+def _field_entry(field):
+    return {
+        "fieldname": field.fieldname,
+        "label": field.label,
+        "fieldtype": field.fieldtype,
+        "options": field.options or "",
+        "reqd": field.reqd,
+    }
+
+
+def _fields_from_meta(doctype_name):
+    """Fields of a DocType outside the catalog (e.g. standard DocTypes)"""
+    return [
+        _field_entry(field)
+        for field in frappe.get_meta(doctype_name).get("fields")
+        if field.fieldtype not in LAYOUT_FIELDTYPES
+    ]
@@ -487,17 +487,51 @@ class FlansaDatabaseViewer {
         
         $(this.wrapper).find('#scanOrphanedFields').prop('disabled', true).html('<i class="fa fa-spinner fa-spin"></i> Scanning...');
         
+        this.run_background_scan('fields', 'orphaned_fields', (result) => {
+            $(this.wrapper).find('#scanOrphanedFields').prop('disabled', false).html('<i class="fa fa-search"></i> Scan for Orphaned Fields');
+            
+            if (result.success) {
+                this.render_orphaned_fields(result);
+                this.update_status(result.scan_summary);
+            } else {
+                this.show_error('Orphaned fields scan failed: ' + (result.error || 'Unknown error'));
+            }
+        }, (partial) => this.render_orphaned_fields(partial));
+    }
+    
+    run_background_scan(scanType, resultKey, onDone, onProgress) {
+        // Scans run as background jobs; results stream in over realtime
         frappe.call({
-            method: 'flansa.flansa_core.page.flansa_database_viewer.flansa_database_viewer.scan_orphaned_fields',
+            method: 'flansa.flansa_core.page.flansa_database_viewer.flansa_database_viewer.start_orphan_scan',
+            args: { scan_type: scanType },
             callback: (r) => {
-                $(this.wrapper).find('#scanOrphanedFields').prop('disabled', false).html('<i class="fa fa-search"></i> Scan for Orphaned Fields');
-                
-                if (r.message && r.message.success) {
-                    this.render_orphaned_fields(r.message);
-                    this.update_status(r.message.scan_summary);
-                } else {
-                    this.show_error('Orphaned fields scan failed: ' + (r.message?.error || 'Unknown error'));
+                if (!r.message || !r.message.success) {
+                    onDone({ success: false, error: r.message?.error });
+                    return;
                 }
+                
+                const scanId = r.message.scan_id;
+                const items = [];
+                const handler = (data) => {
+                    if (!data || data.scan_id !== scanId) return;
+                    
+                    if (!data.done) {
+                        items.push(...(data.items || []));
+                        this.update_status(`Scanning... ${items.length} found so far`);
+                        onProgress({ [resultKey]: items, total_count: items.length });
+                        return;
+                    }
+                    
+                    frappe.realtime.off('flansa_orphan_scan', handler);
+                    onDone({
+                        success: data.success,
+                        error: data.error,
+                        [resultKey]: items,
+                        total_count: data.total_count,
+                        scan_summary: data.scan_summary
+                    });
+                };
+                frappe.realtime.on('flansa_orphan_scan', handler);
             }
         });
     }
@@ -572,19 +606,16 @@ class FlansaDatabaseViewer {
         
         $(this.wrapper).find('#scanOrphanedTables').prop('disabled', true).html('<i class="fa fa-spinner fa-spin"></i> Scanning...');
         
-        frappe.call({
-            method: 'flansa.flansa_core.page.flansa_database_viewer.flansa_database_viewer.scan_orphaned_tables',
-            callback: (r) => {
-                $(this.wrapper).find('#scanOrphanedTables').prop('disabled', false).html('<i class="fa fa-search"></i> Scan for Orphaned Tables');
-                
-                if (r.message && r.message.success) {
-                    this.render_orphaned_tables(r.message);
-                    this.update_status(r.message.scan_summary);
-                } else {
-                    this.show_error('Orphaned tables scan failed: ' + (r.message?.error || 'Unknown error'));
-                }
+        this.run_background_scan('tables', 'orphaned_tables', (result) => {
+            $(this.wrapper).find('#scanOrphanedTables').prop('disabled', false).html('<i class="fa fa-search"></i> Scan for Orphaned Tables');
+            
+            if (result.success) {
+                this.render_orphaned_tables(result);
+                this.update_status(result.scan_summary);
+            } else {
+                this.show_error('Orphaned tables scan failed: ' + (result.error || 'Unknown error'));
             }
-        });
+        }, (partial) => this.render_orphaned_tables(partial));
     }
     
     render_orphaned_tables(data) {
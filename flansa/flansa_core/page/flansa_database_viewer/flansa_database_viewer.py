@@ -312,87 +312,203 @@ def execute_sql_query(query):
 # Keep the other functions (scan_orphaned_tables, etc.) with minimal changes
 # They use information_schema which works on both databases
 
-@frappe.whitelist()
-def scan_orphaned_tables():
-    """Scan for tables that exist in database but have no DocType definition"""
-    try:
-        db_type = get_db_type()
-        orphaned_tables = []
-        
-        # Get all tables that start with 'tab' (DocType tables) - database agnostic
-        if db_type == 'postgres':
-            all_tables = frappe.db.sql("""
-                SELECT table_name 
-                FROM information_schema.tables 
-                WHERE table_schema = current_schema()
-                AND table_name LIKE 'tab%'
-                ORDER BY table_name
-            """, as_dict=True)
-        else:
-            all_tables = frappe.db.sql("""
-                SELECT table_name 
-                FROM information_schema.tables 
-                WHERE table_schema = DATABASE()
-                AND table_name LIKE 'tab%'
-                ORDER BY table_name
-            """, as_dict=True)
-        
-        # Get all registered DocTypes
-        registered_doctypes = frappe.db.sql("""
-            SELECT name FROM "tabDocType" 
-        """ if db_type == 'postgres' else """
-            SELECT name FROM `tabDocType`
+# Columns Frappe adds to every DocType table without a DocField row
+STANDARD_TABLE_COLUMNS = {
+    # Core DocType fields
+    'name', 'owner', 'creation', 'modified', 'modified_by', 
+    'docstatus', 'parent', 'parentfield', 'parenttype', 'idx',
+    
+    # System fields added by Frappe
+    '_user_tags', '_comments', '_assign', '_liked_by',
+    
+    # Communication and tracking fields
+    '_seen', 'reference_doctype', 'reference_name',
+    
+    # Workflow and automation fields
+    'workflow_state', '_action',
+    
+    # Version control
+    '_version',
+    
+    # Additional system fields that may appear
+    'is_cancelled', 'amended_from', 'autoname'
+}
+
+# System tables that are expected to exist without a DocType
+SYSTEM_TABLES = ['Singles', 'Deleted Documents', 'Version', 'Activity Log']
+
+ORPHAN_SCAN_CHUNK_SIZE = 200
+# Tables whose columns are read per information_schema query while scanning
+ORPHAN_SCAN_TABLE_BATCH = 100
+
+def _get_all_table_columns(db_type, table_names=None):
+    """Read the columns of DocType tables (all, or table_names) in one information_schema query"""
+    values = []
+    table_condition = "AND table_name LIKE 'tab%%'"
+    if table_names is not None:
+        if not table_names:
+            return {}
+        table_condition = f"AND table_name IN ({', '.join(['%s'] * len(table_names))})"
+        values = list(table_names)
+    
+    if db_type == 'postgres':
+        rows = frappe.db.sql(f"""
+            SELECT table_name, column_name, data_type, is_nullable, column_default
+            FROM information_schema.columns 
+            WHERE table_schema = current_schema() 
+            {table_condition}
+        """, values, as_dict=True)
+    else:
+        rows = frappe.db.sql(f"""
+            SELECT TABLE_NAME as table_name, COLUMN_NAME as column_name, COLUMN_TYPE as data_type,
+                IS_NULLABLE as is_nullable, COLUMN_DEFAULT as column_default
+            FROM information_schema.columns 
+            WHERE table_schema = DATABASE() 
+            {table_condition}
+        """, values, as_dict=True)
+    
+    columns_by_table = {}
+    for row in rows:
+        columns_by_table.setdefault(row['table_name'], []).append(row)
+    return columns_by_table
+
+def _get_table_row_estimates(db_type):
+    """Estimated row counts from catalog statistics instead of COUNT(*) per table"""
+    if db_type == 'postgres':
+        rows = frappe.db.sql("""
+            SELECT c.relname as table_name, c.reltuples::bigint as table_rows
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = current_schema()
+            AND c.relkind = 'r'
+            AND c.relname LIKE 'tab%'
         """, as_dict=True)
+    else:
+        rows = frappe.db.sql("""
+            SELECT TABLE_NAME as table_name, TABLE_ROWS as table_rows
+            FROM information_schema.tables 
+            WHERE table_schema = DATABASE()
+            AND table_name LIKE 'tab%'
+        """, as_dict=True)
+    
+    return {row['table_name']: max(int(row['table_rows'] or 0), 0) for row in rows}
+
+def _get_defined_fields_by_doctype():
+    """Fieldnames defined per DocType from bulk DocField and Custom Field reads"""
+    defined_fields = {}
+    
+    for row in frappe.get_all("DocField", filters={"parenttype": "DocType"}, fields=["parent", "fieldname"]):
+        defined_fields.setdefault(row.parent, set()).add(row.fieldname)
+    
+    for row in frappe.get_all("Custom Field", fields=["dt", "fieldname"]):
+        defined_fields.setdefault(row.dt, set()).add(row.fieldname)
+    
+    return defined_fields
+
+def iter_orphaned_fields(doctypes):
+    """Orphaned fields of doctypes, yielded as one list per batch of tables scanned"""
+    db_type = get_db_type()
+    defined_by_doctype = _get_defined_fields_by_doctype()
+    
+    for start in range(0, len(doctypes), ORPHAN_SCAN_TABLE_BATCH):
+        batch = doctypes[start:start + ORPHAN_SCAN_TABLE_BATCH]
+        columns_by_table = _get_all_table_columns(db_type, [f"tab{d['name']}" for d in batch])
         
-        # Create a set of registered DocType names for faster lookup
-        registered_names = {dt['name'] for dt in registered_doctypes}
-        
-        # Check each table to see if it has a corresponding DocType
-        for table in all_tables:
-            table_name = table['table_name']
+        orphaned_fields = []
+        for doctype_info in batch:
+            doctype_name = doctype_info['name']
+            table_name = f"tab{doctype_name}"
             
-            # Extract DocType name from table name (remove 'tab' prefix)
-            if table_name.startswith('tab'):
-                doctype_name = table_name[3:]  # Remove 'tab' prefix
-                
-                # Skip system tables
-                if doctype_name in ['Singles', 'Deleted Documents', 'Version', 'Activity Log']:
+            columns = columns_by_table.get(table_name)
+            if not columns:
+                continue
+            
+            defined_fields = STANDARD_TABLE_COLUMNS | defined_by_doctype.get(doctype_name, set())
+            for col in columns:
+                if col['column_name'] in defined_fields:
                     continue
                 
-                # Check if DocType exists
-                if doctype_name not in registered_names:
-                    # Get table row count
-                    try:
-                        if db_type == 'postgres':
-                            count_result = frappe.db.sql('SELECT COUNT(*) as count FROM "{}"'.format(table_name), as_dict=True)
-                        else:
-                            escaped_table = table_name.replace('`', '``')
-                            count_result = frappe.db.sql("SELECT COUNT(*) as count FROM `{}`".format(escaped_table), as_dict=True)
-                        
-                        row_count = count_result[0]['count'] if count_result else 0
-                        
-                        orphaned_tables.append({
-                            'table_name': table_name,
-                            'doctype_name': doctype_name,
-                            'row_count': row_count,
-                            'reason': 'No corresponding DocType found'
-                        })
-                    except Exception as e:
-                        # If we can't count rows, still mark as orphaned
-                        orphaned_tables.append({
-                            'table_name': table_name,
-                            'doctype_name': doctype_name,
-                            'row_count': 'Unknown',
-                            'reason': f'No DocType found, count error: {str(e)[:50]}'
-                        })
+                orphaned_fields.append({
+                    'doctype': doctype_name,
+                    'table_name': table_name,
+                    'field_name': col['column_name'],
+                    'field_type': col.get('data_type') or 'Unknown',
+                    'nullable': col.get('is_nullable') or 'Unknown',
+                    'is_nullable': col.get('is_nullable') == 'YES',
+                    'default_value': col.get('column_default'),
+                    'is_custom_doctype': doctype_info.get('custom', 0)
+                })
+        yield orphaned_fields
+
+def get_scanned_doctypes():
+    """DocTypes with their own table, as scanned for orphaned fields"""
+    return frappe.get_all("DocType", fields=["name", "custom"], filters={"istable": 0, "issingle": 0})
+
+def find_orphaned_fields():
+    """Columns that exist in DocType tables but in no DocField/Custom Field definition"""
+    doctypes = get_scanned_doctypes()
+    orphaned_fields = [field for batch in iter_orphaned_fields(doctypes) for field in batch]
+    return orphaned_fields, len(doctypes)
+
+def iter_orphaned_tables():
+    """DocType-prefixed tables that have no registered DocType, yielded in batches"""
+    db_type = get_db_type()
+    row_estimates = _get_table_row_estimates(db_type)
+    registered_names = set(frappe.get_all("DocType", pluck="name"))
+    
+    # Skip system tables
+    candidates = [
+        table_name for table_name in sorted(row_estimates)
+        if table_name[3:] not in SYSTEM_TABLES and table_name[3:] not in registered_names
+    ]
+    
+    for start in range(0, len(candidates), ORPHAN_SCAN_TABLE_BATCH):
+        batch = candidates[start:start + ORPHAN_SCAN_TABLE_BATCH]
+        columns_by_table = _get_all_table_columns(db_type, batch)
         
+        orphaned_tables = []
+        for table_name in batch:
+            # Extract DocType name from table name (remove 'tab' prefix)
+            doctype_name = table_name[3:]
+            orphaned_tables.append({
+                'table_name': table_name,
+                'doctype_name': doctype_name,
+                'probable_doctype': doctype_name,
+                'row_count': row_estimates[table_name],
+                'row_count_estimated': True,
+                'column_count': len(columns_by_table.get(table_name, [])),
+                'reason': 'No corresponding DocType found'
+            })
+        yield orphaned_tables
+
+def find_orphaned_tables():
+    """DocType-prefixed tables that have no registered DocType"""
+    return [table for batch in iter_orphaned_tables() for table in batch]
+
+def _orphan_scan_result(scan_type, items, doctype_count=0):
+    """Response of a finished orphaned fields/tables scan"""
+    db_type = get_db_type()
+    if scan_type == 'fields':
         return {
             'success': True,
-            'orphaned_tables': orphaned_tables,
-            'total_count': len(orphaned_tables),
-            'scan_summary': f"Found {len(orphaned_tables)} orphaned tables in {db_type} database",
+            'orphaned_fields': items,
+            'total_count': len(items),
+            'scan_summary': f"Found {len(items)} orphaned fields across {doctype_count} DocTypes in {db_type} database",
             'database_type': db_type
         }
+    return {
+        'success': True,
+        'orphaned_tables': items,
+        'total_count': len(items),
+        'scan_summary': f"Found {len(items)} orphaned tables in {db_type} database (row counts are estimates)",
+        'database_type': db_type
+    }
+
+@frappe.whitelist()
+def scan_orphaned_tables():
+    """Scan for tables that exist in database but have no DocType definition"""
+    try:
+        return _orphan_scan_result('tables', find_orphaned_tables())
         
     except Exception as e:
         return {
@@ -404,131 +520,8 @@ def scan_orphaned_tables():
 def scan_orphaned_fields():
     """Scan for fields that exist in database tables but not in DocType definitions"""
     try:
-        db_type = get_db_type()
-        orphaned_fields = []
-        
-        # Get all DocTypes
-        doctypes = frappe.get_all("DocType", fields=["name", "custom"], filters={"istable": 0})
-        
-        for doctype_info in doctypes:
-            doctype_name = doctype_info['name']
-            table_name = f"tab{doctype_name}"
-            
-            # Check if table exists - database agnostic
-            if db_type == 'postgres':
-                table_exists = frappe.db.sql("""
-                    SELECT 1 FROM information_schema.tables 
-                    WHERE table_schema = current_schema() 
-                    AND table_name = %s
-                """, (table_name,))
-            else:
-                table_exists = frappe.db.sql("SHOW TABLES LIKE %s", (table_name,))
-            
-            if not table_exists:
-                continue
-            
-            try:
-                # Get actual columns from database table
-                if db_type == 'postgres':
-                    actual_columns = frappe.db.sql("""
-                        SELECT column_name 
-                        FROM information_schema.columns 
-                        WHERE table_schema = current_schema() 
-                        AND table_name = %s
-                    """, (table_name,), as_dict=True)
-                else:
-                    desc_result = frappe.db.sql(f"DESCRIBE `{table_name}`", as_dict=True)
-                    actual_columns = [{"column_name": col["Field"]} for col in desc_result]
-                
-                # Get defined fields using Frappe's own method to get table columns
-                # This should be the most accurate way to determine what fields SHOULD exist
-                try:
-                    from frappe.model.meta import get_table_columns
-                    defined_fields = set(get_table_columns(doctype_name))
-                except:
-                    # Fallback to manual method if get_table_columns doesn't work
-                    defined_fields = set()
-                    
-                    # Standard DocType fields
-                    meta = frappe.get_meta(doctype_name)
-                    for field in meta.fields:
-                        defined_fields.add(field.fieldname)
-                    
-                    # Add standard fields that all DocTypes have
-                    # This is the comprehensive list of standard fields that Frappe adds automatically
-                    standard_fields = {
-                        # Core DocType fields
-                        'name', 'owner', 'creation', 'modified', 'modified_by', 
-                        'docstatus', 'parent', 'parentfield', 'parenttype', 'idx',
-                        
-                        # System fields added by Frappe
-                        '_user_tags', '_comments', '_assign', '_liked_by',
-                        
-                        # Communication and tracking fields
-                        '_seen', 'reference_doctype', 'reference_name',
-                        
-                        # Workflow and automation fields
-                        'workflow_state', '_action',
-                        
-                        # Version control
-                        '_version',
-                        
-                        # Additional system fields that may appear
-                        'is_cancelled', 'amended_from'
-                    }
-                    defined_fields.update(standard_fields)
-                    
-                    # Custom fields
-                    custom_fields = frappe.get_all("Custom Field", 
-                        filters={"dt": doctype_name}, 
-                        fields=["fieldname"])
-                    for cf in custom_fields:
-                        defined_fields.add(cf.fieldname)
-                
-                # Find orphaned fields
-                for col in actual_columns:
-                    column_name = col["column_name"]
-                    if column_name not in defined_fields:
-                        # Get column details
-                        if db_type == 'postgres':
-                            col_details = frappe.db.sql("""
-                                SELECT data_type, is_nullable, column_default
-                                FROM information_schema.columns 
-                                WHERE table_schema = current_schema() 
-                                AND table_name = %s AND column_name = %s
-                            """, (table_name, column_name), as_dict=True)
-                        else:
-                            col_details = frappe.db.sql(f"""
-                                SELECT COLUMN_TYPE as data_type, IS_NULLABLE as is_nullable, COLUMN_DEFAULT as column_default
-                                FROM information_schema.columns 
-                                WHERE table_schema = DATABASE() 
-                                AND table_name = %s AND column_name = %s
-                            """, (table_name, column_name), as_dict=True)
-                        
-                        detail = col_details[0] if col_details else {}
-                        
-                        orphaned_fields.append({
-                            'doctype': doctype_name,
-                            'table_name': table_name,
-                            'field_name': column_name,
-                            'field_type': detail.get('data_type', 'Unknown'),
-                            'nullable': detail.get('is_nullable', 'Unknown'),
-                            'default_value': detail.get('column_default', None),
-                            'is_custom_doctype': doctype_info.get('custom', 0)
-                        })
-                        
-            except Exception as field_error:
-                # If we can't analyze a specific DocType, continue with others
-                print(f"Error analyzing {doctype_name}: {str(field_error)}", flush=True)
-                continue
-        
-        return {
-            'success': True,
-            'orphaned_fields': orphaned_fields,
-            'total_count': len(orphaned_fields),
-            'scan_summary': f"Found {len(orphaned_fields)} orphaned fields across {len(doctypes)} DocTypes in {db_type} database",
-            'database_type': db_type
-        }
+        orphaned_fields, doctype_count = find_orphaned_fields()
+        return _orphan_scan_result('fields', orphaned_fields, doctype_count)
         
     except Exception as e:
         return {
@@ -536,6 +529,86 @@ def scan_orphaned_fields():
             'error': f"Orphaned fields scan error: {str(e)[:100]}"
         }
 
+@frappe.whitelist()
+def start_orphan_scan(scan_type):
+    """Run an orphaned fields/tables scan as a background job
+    
+    Results are streamed to the requesting user in chunks over the
+    'flansa_orphan_scan' realtime event and kept in cache for
+    get_orphan_scan_result.
+    """
+    if scan_type not in ('fields', 'tables'):
+        return {'success': False, 'error': f"Unknown scan type: {scan_type}"}
+    
+    scan_id = frappe.generate_hash(length=10)
+    from flansa.flansa_core.job_service import enqueue_job
+
+    enqueue_job(
+        'flansa.flansa_core.page.flansa_database_viewer.flansa_database_viewer.run_orphan_scan',
+        'maintenance',
+        job_key=f"orphan_scan_{scan_type}_{scan_id}",
+        timeout=1800,
+        scan_type=scan_type,
+        scan_id=scan_id,
+        user=frappe.session.user
+    )
+    
+    return {'success': True, 'scan_id': scan_id}
+
+def run_orphan_scan(scan_type, scan_id, user):
+    """Background job body for start_orphan_scan"""
+    cache_key = f"flansa_orphan_scan:{scan_id}"
+    
+    try:
+        # Each batch of tables is published as soon as it is scanned
+        if scan_type == 'fields':
+            doctypes = get_scanned_doctypes()
+            batches = iter_orphaned_fields(doctypes)
+        else:
+            doctypes = []
+            batches = iter_orphaned_tables()
+        
+        items = []
+        for batch in batches:
+            items.extend(batch)
+            for start in range(0, len(batch), ORPHAN_SCAN_CHUNK_SIZE):
+                frappe.publish_realtime(
+                    'flansa_orphan_scan',
+                    {
+                        'scan_id': scan_id,
+                        'scan_type': scan_type,
+                        'items': batch[start:start + ORPHAN_SCAN_CHUNK_SIZE],
+                        'done': False
+                    },
+                    user=user
+                )
+        result = _orphan_scan_result(scan_type, items, len(doctypes))
+    except Exception as e:
+        result = {'success': False, 'error': f"Scan error: {str(e)[:100]}"}
+    
+    frappe.cache().set_value(cache_key, result, expires_in_sec=3600)
+    frappe.publish_realtime(
+        'flansa_orphan_scan',
+        {
+            'scan_id': scan_id,
+            'scan_type': scan_type,
+            'done': True,
+            'success': result.get('success'),
+            'error': result.get('error'),
+            'total_count': result.get('total_count', 0),
+            'scan_summary': result.get('scan_summary')
+        },
+        user=user
+    )
+
+@frappe.whitelist()
+def get_orphan_scan_result(scan_id):
+    """Get the full result of a finished background orphan scan"""
+    result = frappe.cache().get_value(f"flansa_orphan_scan:{scan_id}")
+    if not result:
+        return {'success': False, 'pending': True}
+    return result
+
 @frappe.whitelist()
 def delete_orphaned_field(doctype_name, field_name, confirm_delete=False):
     """Delete an orphaned field from database table"""
@@ -858,73 +858,70 @@ if (typeof FlansaFormBuilder === 'undefined') {
     }
     
     load_table_data() {
-        frappe.call({
-            method: 'flansa.flansa_core.api.form_builder.get_table_form_config',
-            args: { table_name: this.table_name },
-            callback: (r) => {
-                if (r.message && r.message.success) {
-                    this.form_config = r.message.form_config || {};
+        window.FlansaDataService.callConditional('flansa.flansa_core.api.form_builder.get_table_form_config', { table_name: this.table_name }).then((message) => {
+            const r = { message: message };
+            if (r.message && r.message.success) {
+                this.form_config = r.message.form_config || {};
+                
+                // Check if we have saved form sections, otherwise use raw table fields
+                if (this.form_config.sections && this.form_config.sections.length > 0) {
+                    console.log('📋 Loading saved form sections:', this.form_config.sections);
                     
-                    // Check if we have saved form sections, otherwise use raw table fields
-                    if (this.form_config.sections && this.form_config.sections.length > 0) {
-                        console.log('📋 Loading saved form sections:', this.form_config.sections);
-                        
-                        // Validate saved fields - remove any that no longer exist in table
-                        const validFieldNames = (r.message.fields || []).map(f => f.fieldname || f.field_name);
-                        const validatedSections = this.form_config.sections.filter(field => {
-                            // Keep layout elements
-                            if (field.is_layout_element) {
-                                return true;
-                            }
-                            // Keep only fields that still exist in the table
-                            return validFieldNames.includes(field.field_name);
-                        });
-                        
-                        // Check if any fields were removed during validation
-                        const removedFields = this.form_config.sections.filter(field => 
-                            !field.is_layout_element && !validFieldNames.includes(field.field_name)
-                        );
-                        
-                        if (removedFields.length > 0) {
-                            console.log('🚨 Removed invalid fields from saved form:', removedFields.map(f => f.field_name));
-                            frappe.show_alert({
-                                message: `Auto-removed ${removedFields.length} deleted field(s): ${removedFields.map(f => f.field_name).join(', ')}`,
-                                indicator: 'orange'
-                            });
+                    // Validate saved fields - remove any that no longer exist in table
+                    const validFieldNames = (r.message.fields || []).map(f => f.fieldname || f.field_name);
+                    const validatedSections = this.form_config.sections.filter(field => {
+                        // Keep layout elements
+                        if (field.is_layout_element) {
+                            return true;
                         }
-                        
-                        this.current_fields = validatedSections;
-                    } else {
-                        console.log('📋 Loading raw table fields (no saved sections):', r.message.fields);
-                        this.current_fields = r.message.fields || [];
-                    }
+                        // Keep only fields that still exist in the table
+                        return validFieldNames.includes(field.field_name);
+                    });
                     
-                    // Store raw fields for reference
-                    this.table_fields = r.message.fields || [];
+                    // Check if any fields were removed during validation
+                    const removedFields = this.form_config.sections.filter(field => 
+                        !field.is_layout_element && !validFieldNames.includes(field.field_name)
+                    );
                     
-                    // Update header with table name using the new header manager
-                    this.table_display_name = r.message.table_label || r.message.table_name || this.table_name;
-                    if (window.FlansaHeaderManager) {
-                        window.FlansaHeaderManager.updateTitle(`📝 ${this.table_display_name} Forms`);
+                    if (removedFields.length > 0) {
+                        console.log('🚨 Removed invalid fields from saved form:', removedFields.map(f => f.field_name));
+                        frappe.show_alert({
+                            message: `Auto-removed ${removedFields.length} deleted field(s): ${removedFields.map(f => f.field_name).join(', ')}`,
+                            indicator: 'orange'
+                        });
                     }
                     
-                    this.render_form_canvas();
-                    
-                    // Load saved form settings into UI controls
-                    this.load_form_settings();
-                    
-                    // Update available fields list
-                    this.load_available_fields();
-                    
-                    // Update banner info and load workspace logo
-                    setTimeout(() => {
-                        this.update_banner_info();
-                    }, 100);
+                    this.current_fields = validatedSections;
                 } else {
-                    const error_msg = r.message?.error || 'Error loading table data';
-                    frappe.msgprint(error_msg);
-                    console.error('Form Builder Error:', error_msg);
+                    console.log('📋 Loading raw table fields (no saved sections):', r.message.fields);
+                    this.current_fields = r.message.fields || [];
+                }
+                
+                // Store raw fields for reference
+                this.table_fields = r.message.fields || [];
+                
+                // Update header with table name using the new header manager
+                this.table_display_name = r.message.table_label || r.message.table_name || this.table_name;
+                if (window.FlansaHeaderManager) {
+                    window.FlansaHeaderManager.updateTitle(`📝 ${this.table_display_name} Forms`);
                 }
+                
+                this.render_form_canvas();
+                
+                // Load saved form settings into UI controls
+                this.load_form_settings();
+                
+                // Update available fields list
+                this.load_available_fields();
+                
+                // Update banner info and load workspace logo
+                setTimeout(() => {
+                    this.update_banner_info();
+                }, 100);
+            } else {
+                const error_msg = r.message?.error || 'Error loading table data';
+                frappe.msgprint(error_msg);
+                console.error('Form Builder Error:', error_msg);
             }
         });
     }
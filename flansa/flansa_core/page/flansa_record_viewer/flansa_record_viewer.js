@@ -126,7 +126,7 @@ class FlansaRecordViewer {
     // Load form builder configuration
     async load_form_configuration() {
         try {
-            const formConfigResponse = await this.call_api(
+            const formConfigResponse = await window.FlansaDataService.callConditional(
                 'flansa.flansa_core.api.form_builder.get_table_form_config',
                 { table_name: this.table_name }
             );
@@ -1154,13 +1154,64 @@ class FlansaRecordViewer {
             this.clear_cached_data();
         }
         
+        // Existing records load schema, layout and data in a single bundle call
+        if (this.mode !== 'new') {
+            this.load_record_bundle();
+            return;
+        }
+        
         // First load form configuration, then load data
         this.load_form_configuration().then((hasFormConfig) => {
-            if (this.mode === 'new') {
-                this.load_table_structure();
-            } else {
-                this.load_record_data();
+            this.load_table_structure();
+        });
+    }
+    
+    load_record_bundle() {
+        const schemaKey = `flansa_record_schema_${this.table_name}`;
+        let cachedSchema = null;
+        try {
+            cachedSchema = JSON.parse(sessionStorage.getItem(schemaKey) || 'null');
+        } catch (e) {
+            cachedSchema = null;
+        }
+        
+        this.call_api('flansa.flansa_core.api.table_api.get_record_bundle', {
+            table_name: this.table_name,
+            record_id: this.record_id,
+            schema_etag: cachedSchema ? cachedSchema.etag : null
+        })
+        .then(async (bundle) => {
+            if (!bundle.success) {
+                this.show_error('Record not found: ' + (bundle.error || 'Unknown error'));
+                return;
+            }
+            
+            // Reuse the cached schema unless the server sent a newer version
+            let schema = cachedSchema ? cachedSchema.schema : null;
+            if (bundle.schema_changed || !schema) {
+                schema = bundle.schema || {};
+                try {
+                    sessionStorage.setItem(schemaKey, JSON.stringify({ etag: bundle.schema_etag, schema: schema }));
+                } catch (e) {
+                    // Storage full or unavailable - the schema is still used for this view
+                }
             }
+            
+            this.form_config = schema.form_config || {};
+            this.form_sections = this.form_config.sections || [];
+            this.table_fields = schema.fields || [];
+            this.record_data = bundle.record || {};
+            this.link_display_values = bundle.link_display_values || {};
+            this.doctype_name = bundle.doctype_name;
+            this.application = bundle.application;
+            
+            this.update_banner_title();
+            this.update_mode_display();
+            await this.render_record();
+        }).catch(error => {
+            console.error('Error loading record bundle:', error);
+            // Fall back to the individual endpoints
+            this.load_form_configuration().then(() => this.load_record_data());
         });
     }
 
@@ -1185,7 +1236,7 @@ class FlansaRecordViewer {
                 }
                 
                 // User has access, load table structure
-                this.call_api('flansa.flansa_core.api.table_api.get_table_meta', { table_name: this.table_name })
+                window.FlansaDataService.callConditional('flansa.flansa_core.api.table_api.get_table_meta', { table_name: this.table_name })
                 .then(async (metaResponse) => {
                     if (metaResponse.success) {
                         this.table_fields = metaResponse.fields || [];
@@ -1440,6 +1491,7 @@ class FlansaRecordViewer {
         this.table_fields = [];
         this.doctype_name = null;
         this.form_config = {};
+        this.link_display_values = {};
         
         // Clear any form input values that might be cached
         this.clear_form_inputs();
@@ -1819,6 +1871,12 @@ class FlansaRecordViewer {
             return '';
         }
         
+        // Display values resolved server-side by get_record_bundle
+        if (this.link_display_values && this.link_display_values[field.fieldname]
+            && this.record_data && this.record_data[field.fieldname] === fieldValue) {
+            return this.link_display_values[field.fieldname];
+        }
+        
         // Try to get display field configuration from Flansa Logic Field
         try {
             const logicFields = await frappe.call({
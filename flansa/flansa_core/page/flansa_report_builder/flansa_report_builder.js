@@ -838,41 +838,35 @@ class UnifiedReportBuilder {
     
     load_app_name_for_table(table_name) {
         // Load app label and table label from enhanced API
-        frappe.call({
-            method: 'flansa.flansa_core.api.table_api.get_table_meta',
-            args: { table_name: table_name },
-            callback: (r) => {
-                if (r.message && r.message.success) {
-                    // Set app label
-                    if (r.message.app_label) {
-                        this.current_app_name = r.message.app_label;
-                        $('#app-name-display').text(r.message.app_label);
-                    }
-                    
-                    // Store table label for context and breadcrumbs
-                    if (r.message.table_label) {
-                        this.table_lookup[table_name] = r.message.table_label;
-                        // Update context with table label
-                        $('#context-table-label').text(`(${r.message.table_label})`);
-                        // Update breadcrumbs
-                        this.update_breadcrumbs();
-                    }
+        window.FlansaDataService.callConditional('flansa.flansa_core.api.table_api.get_table_meta', { table_name: table_name }).then((message) => {
+            const r = { message: message };
+            if (r.message && r.message.success) {
+                // Set app label
+                if (r.message.app_label) {
+                    this.current_app_name = r.message.app_label;
+                    $('#app-name-display').text(r.message.app_label);
+                }
+                
+                // Store table label for context and breadcrumbs
+                if (r.message.table_label) {
+                    this.table_lookup[table_name] = r.message.table_label;
+                    // Update context with table label
+                    $('#context-table-label').text(`(${r.message.table_label})`);
+                    // Update breadcrumbs
+                    this.update_breadcrumbs();
                 }
             }
         });
     }
 
     load_table_fields(table_name) {
-        frappe.call({
-            method: 'flansa.flansa_core.api.report_builder_api.get_report_field_options',
-            args: { table_name: table_name },
-            callback: (r) => {
-                if (r.message && r.message.success) {
-                    this.available_fields = r.message.fields;
-                    this.render_available_fields();
-                } else {
-                    frappe.msgprint('Failed to load table fields');
-                }
+        window.FlansaDataService.callConditional('flansa.flansa_core.api.report_builder_api.get_report_field_options', { table_name: table_name }).then((message) => {
+            const r = { message: message };
+            if (r.message && r.message.success) {
+                this.available_fields = r.message.fields;
+                this.render_available_fields();
+            } else {
+                frappe.msgprint('Failed to load table fields');
             }
         });
     }
@@ -429,10 +429,12 @@ class FlansaReportViewer {
     async create_default_table_view() {
         try {
             // Get table metadata using the new enhanced API
-            const response = await frappe.call({
-                method: 'flansa.flansa_core.api.table_api.get_table_metadata',
-                args: { table_name: this.table_name }
-            });
+            const response = {
+                message: await window.FlansaDataService.callConditional(
+                    'flansa.flansa_core.api.table_api.get_table_metadata',
+                    { table_name: this.table_name }
+                )
+            };
             
             if (response.message && response.message.success) {
                 const metadata = response.message;
@@ -744,6 +746,8 @@ class FlansaReportViewer {
                             grouping: report.config.grouping || [], // Include grouping configuration
                             sort: report.config.sort || []
                         },
+                        // Lets the server reuse the saved report's compiled plan
+                        report_id: report.id,
                         view_options: {
                             page: this.current_page,
                             page_size: this.page_size,
@@ -781,10 +785,12 @@ class FlansaReportViewer {
     async transform_legacy_field_names(field_names, table_name) {
         try {
             // Get field metadata from the report builder API
-            const response = await frappe.call({
-                method: 'flansa.flansa_core.api.report_builder_api.get_report_field_options',
-                args: { table_name: table_name }
-            });
+            const response = {
+                message: await window.FlansaDataService.callConditional(
+                    'flansa.flansa_core.api.report_builder_api.get_report_field_options',
+                    { table_name: table_name }
+                )
+            };
             
             if (!response.message || !response.message.success) {
                 // Fallback to simple transformation
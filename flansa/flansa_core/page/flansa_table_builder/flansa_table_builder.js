@@ -5038,12 +5038,12 @@ class EnhancedFlansaTableBuilder {
                 table_name = table_info.name || table_info.value;  // This is the Flansa Table ID
             }
 
-            const result = await frappe.call({
-                method: 'flansa.flansa_core.api.table_api.get_table_fields',
-                args: {
-                    table_name: table_name
-                }
-            });
+            const result = {
+                message: await window.FlansaDataService.callConditional(
+                    'flansa.flansa_core.api.table_api.get_table_fields',
+                    { table_name: table_name }
+                )
+            };
             
             if (result.message && result.message.success) {
 
@@ -272,15 +272,15 @@ def get_workspace_statistics(workspace_id):
         
         workspace_doc = frappe.get_doc("Flansa Workspace", workspace_list[0].name)
         
-        # Get statistics
-        stats = {
-            "applications": frappe.db.count("Flansa Application", {"workspace_id": workspace_id}) if frappe.db.exists("DocType", "Flansa Application") else 0,
-            "tables": frappe.db.count("Flansa Table", {"workspace_id": workspace_id}) if frappe.db.exists("DocType", "Flansa Table") else 0,
-            "relationships": frappe.db.count("Flansa Relationship", {"workspace_id": workspace_id}) if frappe.db.exists("DocType", "Flansa Relationship") else 0,
-            "reports": frappe.db.count("Flansa Saved Report", {"workspace_id": workspace_id}) if frappe.db.exists("DocType", "Flansa Saved Report") else 0,
-            "form_configs": frappe.db.count("Flansa Form Config", {"workspace_id": workspace_id}) if frappe.db.exists("DocType", "Flansa Form Config") else 0,
+        # Get statistics from the usage counters
+        from flansa.flansa_core.usage_service import get_workspace_usage, get_workspace_limits
+
+        stats = get_workspace_usage(workspace_id)
+        stats.update({
+            "storage_mb": round(stats["file_bytes"] / (1024 * 1024), 2),
+            "limits": get_workspace_limits(workspace_id),
             "last_activity": workspace_doc.last_activity
-        }
+        })
         
         return {
             "status": "success",
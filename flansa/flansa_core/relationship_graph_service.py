@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Flansa Relationship Graph Service - in-memory graph of an application's relationships
+
+Builds every relationship of an application together with its link, lookup and
+computed fields from a few set-based queries, instead of loading relationship,
+table and DocType meta documents per relationship. Graphs are cached per
+application and invalidated by Flansa Relationship, Flansa Table and DocType
+doc events.
+"""
+
+import json
+
+import frappe
+from typing import Optional, Dict, List, Any
+
+from flansa.flansa_core.utils.instrumentation import cached_hget
+
+GRAPH_CACHE_KEY = "flansa_relationship_graph"
+ALL_APPS = "__all__"
+
+RELATIONSHIP_FIELDS = [
+    "name", "relationship_name", "relationship_type", "status", "description",
+    "parent_table", "child_table", "from_table", "to_table", "creation"
+]
+DOCFIELD_FIELDS = [
+    "parent", "fieldname", "label", "fieldtype", "options", "fetch_from",
+    "description", "is_virtual", "reqd", "in_list_view"
+]
+
+
+class RelationshipGraph:
+    """Read-only view over a cached relationship graph"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.app_name = data.get("app_name")
+        self.tables = data.get("tables", {})
+        self.relationships = data.get("relationships", [])
+        self._by_name = {rel["name"]: rel for rel in self.relationships}
+        self._table_by_doctype = {
+            table["doctype_name"]: table_id
+            for table_id, table in self.tables.items()
+            if table.get("doctype_name")
+        }
+
+    def get_relationship(self, relationship_name: str) -> Optional[Dict[str, Any]]:
+        return self._by_name.get(relationship_name)
+
+    def get_table(self, table_id: str) -> Optional[Dict[str, Any]]:
+        return self.tables.get(table_id)
+
+    def table_for_doctype(self, doctype_name: str) -> Optional[str]:
+        return self._table_by_doctype.get(doctype_name)
+
+    def relationships_for_table(self, table_id: str) -> List[Dict[str, Any]]:
+        """Relationships where the table is either the parent or the child"""
+        return [
+            rel for rel in self.relationships
+            if table_id in (rel["parent_table"], rel["child_table"])
+        ]
+
+    def child_relationships(self, table_id: str) -> List[Dict[str, Any]]:
+        """Relationships where the table is the parent (one record -> many children)"""
+        return [rel for rel in self.relationships if rel["parent_table"] == table_id]
+
+    def parent_relationships(self, table_id: str) -> List[Dict[str, Any]]:
+        """Relationships where the table is the child (each record links to one parent)"""
+        return [rel for rel in self.relationships if rel["child_table"] == table_id]
+
+
+def get_relationship_graph(app_name: Optional[str] = None) -> RelationshipGraph:
+    """Get the cached relationship graph for an application (or for all applications)"""
+    key = app_name or ALL_APPS
+    data = cached_hget(GRAPH_CACHE_KEY, key, lambda: build_relationship_graph(app_name))
+    return RelationshipGraph(data or {})
+
+
+def get_relationship_graph_for_doctype(doctype_name: str) -> Optional[RelationshipGraph]:
+    """Get the relationship graph of the application that owns a generated DocType"""
+    table = frappe.db.get_value("Flansa Table", {"doctype_name": doctype_name}, ["name", "application"], as_dict=True)
+    if not table:
+        return None
+    return get_relationship_graph(table.application)
+
+
+def build_relationship_graph(app_name: Optional[str] = None) -> Dict[str, Any]:
+    """Build the graph data with set-based queries (tables, relationships, fields)"""
+    table_filters = {"application": app_name} if app_name else {}
+    tables = {
+        t.name: {
+            "table_name": t.table_name,
+            "table_label": t.table_label,
+            "doctype_name": t.doctype_name,
+            "application": t.application,
+        }
+        for t in frappe.get_all(
+            "Flansa Table",
+            filters=table_filters,
+            fields=["name", "table_name", "table_label", "doctype_name", "application"]
+        )
+    }
+
+    if app_name and not tables:
+        return {"app_name": app_name, "tables": {}, "relationships": []}
+
+    rel_filters = []
+    if app_name:
+        # Only relationships between tables of this app
+        rel_filters = [
+            ["from_table", "in", list(tables)],
+            ["to_table", "in", list(tables)]
+        ]
+    relationships = frappe.get_all(
+        "Flansa Relationship",
+        filters=rel_filters,
+        fields=RELATIONSHIP_FIELDS,
+        order_by="creation desc"
+    )
+
+    # Related tables outside the app still need their DocType for field matching
+    missing = {
+        table_id
+        for rel in relationships
+        for table_id in (rel.parent_table, rel.child_table, rel.from_table, rel.to_table)
+        if table_id and table_id not in tables
+    }
+    if missing:
+        for t in frappe.get_all(
+            "Flansa Table",
+            filters={"name": ["in", list(missing)]},
+            fields=["name", "table_name", "table_label", "doctype_name", "application"]
+        ):
+            tables[t.name] = {
+                "table_name": t.table_name,
+                "table_label": t.table_label,
+                "doctype_name": t.doctype_name,
+                "application": t.application,
+            }
+
+    fields_by_doctype = _get_fields_by_doctype(
+        {t["doctype_name"] for t in tables.values() if t.get("doctype_name")}
+    )
+
+    graph_relationships = []
+    for rel in relationships:
+        parent_table = rel.parent_table or rel.from_table
+        child_table = rel.child_table or rel.to_table
+        parent_doctype = (tables.get(parent_table) or {}).get("doctype_name")
+        child_doctype = (tables.get(child_table) or {}).get("doctype_name")
+        parent_fields = fields_by_doctype.get(parent_doctype, [])
+        child_fields = fields_by_doctype.get(child_doctype, [])
+
+        graph_relationships.append({
+            "name": rel.name,
+            "relationship_name": rel.relationship_name,
+            "relationship_type": rel.relationship_type,
+            "status": rel.status,
+            "description": rel.description or "",
+            "parent_table": parent_table,
+            "child_table": child_table,
+            "from_table": rel.from_table,
+            "to_table": rel.to_table,
+            "parent_doctype": parent_doctype,
+            "child_doctype": child_doctype,
+            "computed_fields": _match_computed_fields(rel.name, parent_fields),
+            "lookup_fields": _match_lookup_fields(rel, tables, parent_table, parent_doctype, child_doctype, child_fields),
+            "link_fields": _match_link_fields(tables, parent_table, parent_doctype, child_doctype, child_fields),
+        })
+
+    return {"app_name": app_name, "tables": tables, "relationships": graph_relationships}
+
+
+def clear_relationship_graph(doc=None, method=None):
+    """Doc event: drop all cached relationship graphs"""
+    try:
+        frappe.cache().delete_value(GRAPH_CACHE_KEY)
+    except Exception as e:
+        frappe.log_error(f"Error clearing relationship graph cache: {str(e)}", "Relationship Graph")
+
+
+def on_doctype_change(doc, method=None):
+    """Doc event for DocType / Custom Field: only generated DocTypes affect the graph"""
+    module = doc.get("module")
+    if doc.doctype == "Custom Field":
+        module = frappe.db.get_value("DocType", doc.dt, "module")
+    if module == "Flansa Generated":
+        clear_relationship_graph()
+
+
+def _get_fields_by_doctype(doctypes):
+    """Load DocField and Custom Field rows for all DocTypes in two queries"""
+    fields_by_doctype = {doctype: [] for doctype in doctypes}
+    if not doctypes:
+        return fields_by_doctype
+
+    for field in frappe.get_all(
+        "DocField",
+        filters={"parent": ["in", list(doctypes)], "parenttype": "DocType"},
+        fields=DOCFIELD_FIELDS,
+        order_by="idx asc"
+    ):
+        fields_by_doctype[field.parent].append(field)
+
+    custom_fields = [f if f != "parent" else "dt as parent" for f in DOCFIELD_FIELDS]
+    for field in frappe.get_all(
+        "Custom Field",
+        filters={"dt": ["in", list(doctypes)]},
+        fields=custom_fields,
+        order_by="idx asc"
+    ):
+        fields_by_doctype[field.parent].append(field)
+
+    return fields_by_doctype
+
+
+def _flansa_config(description):
+    """Parse the flansa_config block stored in a field description"""
+    if not description:
+        return {}
+    try:
+        data = json.loads(description)
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return {}
+    return data.get("flansa_config", {}) if isinstance(data, dict) else {}
+
+
+def _meaningful_label(field_label, table, doctype_name):
+    """Same rules as enterprise_relationship_api.get_meaningful_field_label, without a get_doc"""
+    if not field_label or not field_label.startswith('FT-'):
+        return field_label or 'Field'
+
+    table = table or {}
+    if table.get("table_label") and not table["table_label"].startswith('FT-'):
+        return table["table_label"]
+    if table.get("table_name") and not table["table_name"].startswith('FT-'):
+        return table["table_name"].replace('_', ' ').title()
+    if doctype_name:
+        clean_name = doctype_name.replace('FLS', '').replace('Flansa', '')
+        return clean_name if clean_name else 'Related Table'
+    return 'Related Table'
+
+
+def _match_computed_fields(relationship_name, parent_fields):
+    computed_fields = []
+    for field in parent_fields:
+        config = _flansa_config(field.description)
+        if config.get("field_type") == "computed" and config.get("relationship") == relationship_name:
+            computed_fields.append({
+                "field_name": field.fieldname,
+                "field_label": field.label,
+                "computation_type": config.get("computation_type"),
+                "target_field": config.get("target_field")
+            })
+    return computed_fields
+
+
+def _match_lookup_fields(rel, tables, parent_table, parent_doctype, child_doctype, child_fields):
+    """Lookup fields live in the child and fetch from the parent through a link field"""
+    if not child_doctype:
+        return []
+
+    self_referential = rel.relationship_type == "Self Referential"
+    links_to_parent = {
+        f.fieldname for f in child_fields
+        if f.fieldtype == "Link" and parent_doctype and f.options == parent_doctype
+    }
+    links_to_self = {
+        f.fieldname for f in child_fields
+        if f.fieldtype == "Link" and f.options == child_doctype
+    }
+
+    lookup_fields = []
+    for field in child_fields:
+        fetch_from = field.fetch_from or ""
+        if not fetch_from:
+            continue
+
+        link_field_name = fetch_from.split('.')[0] if '.' in fetch_from else ''
+        config = _flansa_config(field.description)
+
+        # Flansa-created lookup field for this relationship
+        include_field = config.get("field_type") == "lookup" and config.get("relationship") == rel.name
+
+        if not include_field and link_field_name and link_field_name in links_to_parent:
+            # Fetches through a link field that points at the parent DocType
+            include_field = True
+
+        if not include_field and self_referential and link_field_name.startswith("parent_"):
+            include_field = link_field_name in links_to_self
+
+        if include_field:
+            lookup_fields.append({
+                "fieldname": field.fieldname,
+                "label": _meaningful_label(field.label or field.fieldname, tables.get(parent_table), parent_doctype),
+                "fieldtype": field.fieldtype,
+                "fetch_from": fetch_from,
+                "description": f"Lookup from {fetch_from}",
+                "is_virtual": field.is_virtual
+            })
+    return lookup_fields
+
+
+def _match_link_fields(tables, parent_table, parent_doctype, child_doctype, child_fields):
+    """Link fields in the child that point to the parent"""
+    if not (child_doctype and parent_doctype):
+        return []
+
+    link_fields = []
+    for field in child_fields:
+        if field.fieldtype == "Link" and field.options == parent_doctype:
+            link_fields.append({
+                "fieldname": field.fieldname,
+                "label": _meaningful_label(field.label or field.fieldname, tables.get(parent_table), parent_doctype),
+                "fieldtype": field.fieldtype,
+                "options": field.options,
+                "description": f"Links {child_doctype} to {parent_doctype}",
+                "required": field.reqd,
+                "in_list_view": field.in_list_view,
+                "is_link_field": True
+            })
+    return link_fields
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Flansa Report Cache Service - cached report results invalidated by data versions
+
+Each Flansa Generated DocType (and the Flansa metadata DocTypes reports are
+built from) has a data version that the generic doc events replace after every
+committed insert, update or delete. A cached report result remembers the
+versions of the DocTypes it read: the base table and every table joined to it
+through a relationship. A result is served only while all of those versions are
+unchanged, so no report ever needs an explicit purge.
+
+Results are keyed by the normalized report_config, the view options and a
+fingerprint of what the user is allowed to see. The cache keeps at most
+flansa_report_cache_max_entries results and flansa_report_cache_max_mb of
+payload, evicting the least recently used entries first.
+
+Site config:
+    flansa_report_cache                           set to 0 to disable result caching
+    flansa_report_cache_max_entries               default 500
+    flansa_report_cache_max_mb                    default 64
+    flansa_report_cache_stale_while_revalidate    serve stale grouped results while a job refreshes them
+"""
+
+import hashlib
+import json
+import time
+
+import frappe
+from frappe.permissions import get_user_permissions
+
+from flansa.flansa_core.utils.instrumentation import count
+from flansa.flansa_core.job_service import enqueue_job
+
+DATA_VERSION_KEY = "flansa_doctype_data_version"
+RESULT_KEY_PREFIX = "flansa_report_result"
+RESULT_INDEX_KEY = "flansa_report_result_index"
+
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_MB = 64
+# Results larger than this share of the total budget are never cached
+MAX_ENTRY_SHARE = 0.1
+RESULT_TTL_SECONDS = 24 * 3600
+# Stale grouped results older than this are recomputed inline
+MAX_STALE_SECONDS = 3600
+
+# Metadata that changes how every report over a table is computed
+METADATA_DOCTYPES = ("Flansa Table", "Flansa Relationship", "Flansa Logic Field")
+
+
+def is_enabled():
+    return bool(frappe.conf.get("flansa_report_cache", 1))
+
+
+def get_data_version(doctype):
+    return frappe.cache().hget(DATA_VERSION_KEY, doctype) or "0"
+
+
+def bump_data_version(doc, method=None):
+    """Doc event: give the document's DocType a new data version once the transaction commits"""
+    try:
+        if doc.doctype not in METADATA_DOCTYPES and doc.meta.module != "Flansa Generated":
+            return
+        bump_data_versions([doc.doctype])
+    except Exception as e:
+        frappe.log_error(f"Error bumping data version of {doc.doctype}: {str(e)}", "Report Cache")
+
+
+def bump_data_versions(doctypes):
+    """
+    New data versions for DocTypes changed outside of doc events (bulk SQL, backfills)
+
+    The bump waits for the commit: a report computed from the old rows before
+    the commit is then stored under the old version and never served again.
+    """
+    pending = frappe.flags.setdefault("flansa_pending_data_versions", set())
+    new = set(doctypes) - pending
+    if not new:
+        return
+    pending.update(new)
+
+    if getattr(frappe.db, "after_commit", None) is None:
+        _apply_pending_versions()
+    else:
+        frappe.db.after_commit.add(_apply_pending_versions)
+        frappe.db.after_rollback.add(_discard_pending_versions)
+
+
+def _apply_pending_versions():
+    pending = frappe.flags.pop("flansa_pending_data_versions", None) or set()
+    cache = frappe.cache()
+    for doctype in pending:
+        cache.hset(DATA_VERSION_KEY, doctype, frappe.generate_hash(length=12))
+
+
+def _discard_pending_versions():
+    frappe.flags.pop("flansa_pending_data_versions", None)
+
+
+def get_report_dependencies(base_table, doctype_name):
+    """DocTypes a report over base_table reads: its own, every related table's and the metadata"""
+    from flansa.flansa_core.relationship_graph_service import get_relationship_graph
+    from flansa.flansa_core.utils.table_cache import get_table_info
+
+    dependencies = {doctype_name, *METADATA_DOCTYPES}
+    info = get_table_info(base_table)
+    if info and info.application:
+        graph = get_relationship_graph(info.application)
+        for rel in graph.relationships_for_table(base_table):
+            dependencies.update(d for d in (rel["parent_doctype"], rel["child_doctype"]) if d)
+    return sorted(dependencies)
+
+
+def permission_fingerprint(doctypes, user=None):
+    """Hash of everything that changes which rows the user may see in these DocTypes"""
+    user = user or frappe.session.user
+    parts = {
+        "roles": sorted(frappe.get_roles(user)),
+        "user_permissions": get_user_permissions(user),
+        "workspace": getattr(frappe.local, "workspace_id", None),
+    }
+    # "Only if creator" rules make the rows depend on the user, not just the roles
+    if any(p.if_owner for doctype in doctypes for p in _permissions(doctype)):
+        parts["user"] = user
+    return _hash(parts)
+
+
+def get_cached_report(report_config, view_options, doctype_name, compute):
+    """
+    Serve a report result from cache, computing and storing it on a miss
+
+    compute() must return the same dict execute_report returns; only
+    successful results are stored. The returned dict carries cache_status
+    ("hit", "miss", "stale" or "bypass").
+    """
+    if not is_enabled() or view_options.get("no_cache"):
+        result = compute()
+        result["cache_status"] = "bypass"
+        return result
+
+    dependencies = get_report_dependencies(report_config["base_table"], doctype_name)
+    key = _result_key(report_config, view_options, permission_fingerprint(dependencies))
+    # Versions are read before computing, so changes made meanwhile invalidate this result
+    versions = {doctype: get_data_version(doctype) for doctype in dependencies}
+
+    # refresh=True recomputes and replaces the entry (stale-while-revalidate jobs)
+    entry = None if view_options.get("refresh") else frappe.cache().get_value(key)
+    if entry and entry.get("versions") == versions:
+        count("cache_hits")
+        _touch(key, entry["size"])
+        return dict(entry["result"], cache_status="hit")
+    count("cache_misses")
+
+    if entry and _can_serve_stale(report_config, entry):
+        _enqueue_refresh(key, report_config, view_options)
+        return dict(entry["result"], cache_status="stale")
+
+    result = compute()
+    if result.get("success"):
+        _store(key, versions, result)
+    result["cache_status"] = "miss"
+    return result
+
+
+def refresh_report_result(report_config, view_options, user):
+    """Background job: recompute a stale report result as the user who requested it"""
+    from flansa.flansa_core.api.report_builder_api import execute_report
+
+    frappe.set_user(user)
+    execute_report(report_config, dict(view_options, refresh=True))
+
+
+def config_hash(report_config):
+    """Hash of a normalized report_config, shared with the compiled report plans"""
+    return _hash(_normalize(report_config))
+
+
+def clear_report_cache():
+    cache = frappe.cache()
+    for key in (cache.hgetall(RESULT_INDEX_KEY) or {}):
+        cache.delete_value(frappe.safe_decode(key))
+    cache.delete_value(RESULT_INDEX_KEY)
+
+
+def _result_key(report_config, view_options, fingerprint):
+    # refresh and no_cache only steer the cache itself
+    options = {k: v for k, v in view_options.items() if k not in ("refresh", "no_cache")}
+    return f"{RESULT_KEY_PREFIX}|{_hash([_normalize(report_config), _normalize(options), fingerprint])}"
+
+
+def _normalize(value):
+    """Drop empty values so equivalent configs saved by different builders share a key"""
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def _hash(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _permissions(doctype):
+    try:
+        return frappe.get_meta(doctype).permissions
+    except Exception:
+        return []
+
+
+def _can_serve_stale(report_config, entry):
+    return (
+        report_config.get("grouping")
+        and frappe.conf.get("flansa_report_cache_stale_while_revalidate")
+        and time.time() - entry["stored_at"] < MAX_STALE_SECONDS
+    )
+
+
+def _enqueue_refresh(key, report_config, view_options):
+    enqueue_job(
+        'flansa.flansa_core.report_cache_service.refresh_report_result',
+        'interactive',
+        job_key=f"refresh_{key}",
+        timeout=600,
+        report_config=report_config,
+        view_options=view_options,
+        user=frappe.session.user
+    )
+
+
+def _store(key, versions, result):
+    try:
+        size = len(json.dumps(result, default=str))
+        max_bytes = float(frappe.conf.get("flansa_report_cache_max_mb") or DEFAULT_MAX_MB) * 1024 * 1024
+        if size > max_bytes * MAX_ENTRY_SHARE:
+            return
+
+        frappe.cache().set_value(
+            key,
+            {"versions": versions, "result": result, "size": size, "stored_at": time.time()},
+            expires_in_sec=RESULT_TTL_SECONDS
+        )
+        _touch(key, size)
+        _evict(max_bytes)
+    except Exception as e:
+        # A result that cannot be cached is still a valid result
+        frappe.logger("flansa").warning(f"Could not cache report result: {str(e)}")
+
+
+def _touch(key, size):
+    frappe.cache().hset(RESULT_INDEX_KEY, key, [time.time(), size])
+
+
+def _evict(max_bytes):
+    """Drop least recently used results until both limits hold"""
+    cache = frappe.cache()
+    max_entries = int(frappe.conf.get("flansa_report_cache_max_entries") or DEFAULT_MAX_ENTRIES)
+    index = sorted(
+        ((frappe.safe_decode(key), used_at, size) for key, (used_at, size) in (cache.hgetall(RESULT_INDEX_KEY) or {}).items()),
+        key=lambda item: item[1]
+    )
+
+    total = sum(size for _, _, size in index)
+    entries = len(index)
+    for key, _, size in index:
+        if entries <= max_entries and total <= max_bytes:
+            break
+        cache.delete_value(key)
+        cache.hdel(RESULT_INDEX_KEY, key)
+        entries -= 1
+        total -= size
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Flansa Report Plan Service - compiled, validated query plans for reports
+
+compile_report_plan() turns a report_config into a plan holding everything
+execute_report used to re-derive on every call: the resolved DocTypes, the
+join path (link field + target DocType) of each parent and related column,
+the selected and hidden query columns, the validated sort, filters as
+parameter slots with their saved values, and the filter/sort columns that
+have no index. Saved reports keep their plan in compiled_plan together with
+EXPLAIN warnings gathered at save time; plans of unsaved configs are cached
+in Redis. A plan is recompiled only when the report config or the schema
+version of the DocTypes it reads changes.
+"""
+
+import json
+import time
+
+import frappe
+
+from flansa.flansa_core.report_cache_service import METADATA_DOCTYPES, config_hash, get_data_version
+from flansa.flansa_core.utils.instrumentation import cached_hget, count
+from flansa.flansa_core.utils.table_cache import get_table_info
+
+PLAN_VERSION = 1
+PLAN_CACHE_KEY = "flansa_report_plans"
+
+STANDARD_FIELDS = {"name", "owner", "creation", "modified", "modified_by", "docstatus", "idx"}
+INDEXED_STANDARD_FIELDS = {"name", "modified"}
+FILTER_OPERATORS = {
+    "=", "!=", "<", ">", "<=", ">=", "like", "not like",
+    "in", "not in", "between", "is", "is not"
+}
+SEARCHABLE_FIELDTYPES = ["Data", "Text", "Small Text", "Long Text", "Text Editor"]
+
+# The parts of a report_config a plan is compiled from
+PLAN_CONFIG_KEYS = ("base_table", "selected_fields", "filters", "sort", "grouping")
+
+# EXPLAIN flags a full scan only when it reads more rows than this
+FULL_SCAN_WARN_ROWS = 1000
+
+
+def get_report_plan(report_config, report_id=None):
+    """
+    Current plan for a report_config
+
+    With a report_id the plan stored on the saved report is used when it was
+    compiled from the same config (the viewer may send a modified one) and the
+    schema has not changed since; it is recompiled and stored otherwise.
+    """
+    key = plan_key(report_config)
+
+    if report_id:
+        saved = frappe.db.get_value(
+            "Flansa Saved Report", report_id, ["base_table", "report_config", "compiled_plan"], as_dict=True
+        )
+        if saved and saved.report_config and plan_key(dict(json.loads(saved.report_config), base_table=saved.base_table)) == key:
+            plan = _parse_plan(saved.compiled_plan)
+            if _is_current(plan, key):
+                count("cache_hits")
+                return plan
+            count("cache_misses")
+            plan = compile_report_plan(report_config)
+            frappe.db.set_value("Flansa Saved Report", report_id, "compiled_plan", json.dumps(plan), update_modified=False)
+            return plan
+
+    plan = cached_hget(PLAN_CACHE_KEY, key, lambda: compile_report_plan(report_config))
+    if not _is_current(plan, key):
+        plan = compile_report_plan(report_config)
+        frappe.cache().hset(PLAN_CACHE_KEY, key, plan)
+    return plan
+
+
+def compile_report_plan(report_config, explain=False):
+    """Resolve and validate a report_config into a plan; explain=True adds EXPLAIN warnings"""
+    base_table = report_config["base_table"]
+    info = get_table_info(base_table)
+    doctype_name = info.doctype_name if info else None
+    if not doctype_name or not frappe.db.exists("DocType", doctype_name):
+        frappe.throw("DocType not found or not generated")
+
+    meta = frappe.get_meta(doctype_name)
+    selected_fields = report_config.get("selected_fields", [])
+    warnings = []
+
+    query_fields = ["name", "creation", "modified"]
+    field_map = {}
+    parent_field_configs = []
+    joins = {}
+    unresolved_columns = []
+
+    for field_config in selected_fields:
+        category = field_config["category"]
+        if category == "current":
+            field_map[field_config["fieldname"]] = field_config
+            # Virtual/computed fields are read from the document, not queried
+            if not (field_config.get("is_virtual") or field_config.get("fetch_from")):
+                query_fields.append(field_config["fieldname"])
+        elif category == "parent":
+            parent_field_configs.append(field_config)
+            _add_join(joins, unresolved_columns, _parent_join_path(meta, field_config), field_config)
+        elif category == "related":
+            field_map[field_config["fieldname"]] = field_config
+            _add_join(joins, unresolved_columns, _related_join_path(field_config), field_config)
+
+    for column in unresolved_columns:
+        warnings.append(f"Column {column} has no resolvable join path and stays empty")
+
+    # Link columns the joins need but the report does not show
+    hidden_fields = sorted({join["link_field"] for join in joins.values()} - set(query_fields))
+
+    filters = []
+    params = {}
+    for index, filter_config in enumerate(report_config.get("filters", [])):
+        operator = filter_config["operator"]
+        if operator not in FILTER_OPERATORS:
+            frappe.throw(f"Unsupported filter operator: {operator}")
+        if not _is_valid_field(meta, filter_config["field"]):
+            warnings.append(f"Filter on unknown field {filter_config['field']}")
+        slot = f"f{index}"
+        filters.append({"field": filter_config["field"], "operator": operator, "slot": slot})
+        params[slot] = filter_config.get("value")
+
+    order_parts = []
+    for sort_item in report_config.get("sort", []):
+        direction = (sort_item.get("direction") or "asc").lower()
+        if direction not in ("asc", "desc") or not _is_valid_field(meta, sort_item.get("field")):
+            warnings.append(f"Ignored invalid sort on {sort_item.get('field')} {direction}")
+            continue
+        order_parts.append(f"`{sort_item['field']}` {direction}")
+    order_by = ", ".join(order_parts) or "creation desc"
+
+    searchable_fields = [
+        fc["fieldname"] for fc in selected_fields
+        if fc["category"] == "current" and fc.get("fieldtype", "") in SEARCHABLE_FIELDTYPES
+    ]
+    if len(searchable_fields) > 1:
+        warnings.append(f"Search only covers {searchable_fields[0]} of {len(searchable_fields)} text fields")
+
+    grouping = report_config.get("grouping", [])
+    indexed_columns = [f["field"] for f in filters] + [
+        sort_item["field"] for sort_item in report_config.get("sort", []) if sort_item.get("field")
+    ] + [group["field"] for group in grouping]
+
+    doctypes = sorted({doctype_name, *(join["doctype"] for join in joins.values())})
+    plan = {
+        "version": PLAN_VERSION,
+        "config_hash": plan_key(report_config),
+        "schema_version": schema_version(doctypes),
+        "compiled_at": time.time(),
+        "base_table": base_table,
+        "doctype": doctype_name,
+        "doctypes": doctypes,
+        "selected_fields": selected_fields,
+        "query_fields": query_fields,
+        "hidden_fields": hidden_fields,
+        "field_map": field_map,
+        "field_definitions": {**field_map, **{fc["fieldname"]: fc for fc in parent_field_configs}},
+        "virtual_fields": [
+            name for name, fc in field_map.items() if fc.get("is_virtual") or fc.get("is_computed")
+        ],
+        "gallery_fields": [
+            name for name, fc in field_map.items() if fc.get("is_gallery")
+        ] + [fc["fieldname"] for fc in parent_field_configs if fc.get("is_gallery")],
+        "joins": list(joins.values()),
+        "unresolved_columns": unresolved_columns,
+        "filters": filters,
+        "params": params,
+        "searchable_fields": searchable_fields,
+        "order_by": order_by,
+        "grouping": grouping,
+        "required_indexes": _missing_indexes(meta, indexed_columns),
+        "warnings": warnings,
+    }
+
+    if explain:
+        plan["warnings"] += explain_plan(plan)
+    return plan
+
+
+def plan_key(report_config):
+    return config_hash({key: report_config.get(key) for key in PLAN_CONFIG_KEYS})
+
+
+def bind_filters(plan, view_options):
+    """Frappe filters of a plan with its parameter slots bound (view_options["params"] overrides saved values)"""
+    params = dict(plan["params"])
+    params.update(view_options.get("params") or {})
+
+    filters = {}
+    for slot in plan["filters"]:
+        value = params.get(slot["slot"])
+        operator = slot["operator"]
+        if operator == "is":
+            # Handle empty/null checks
+            filters[slot["field"]] = ["in", ["", None]]
+        elif operator == "is not":
+            filters[slot["field"]] = ["not in", ["", None]]
+        else:
+            filters[slot["field"]] = [operator, value]
+
+    # Add view-level filters
+    for field, value in (view_options.get("filters") or {}).items():
+        filters[field] = value
+
+    search_term = view_options.get("search")
+    if search_term and plan["searchable_fields"]:
+        filters[plan["searchable_fields"][0]] = ["like", f"%{search_term}%"]
+
+    return filters
+
+
+def apply_joins(plan, records):
+    """Fill parent/related columns with one query per join path instead of two per record"""
+    for join in plan["joins"]:
+        names = {record.get(join["link_field"]) for record in records} - {None, ""}
+        rows = {}
+        if names:
+            try:
+                rows = {
+                    row.name: row
+                    for row in frappe.get_all(
+                        join["doctype"],
+                        filters={"name": ["in", list(names)]},
+                        fields=["name"] + sorted(set(join["columns"].values()))
+                    )
+                }
+            except Exception as e:
+                frappe.log_error(f"Error loading {join['doctype']} columns for report: {str(e)}", "Report Builder")
+
+        for record in records:
+            row = rows.get(record.get(join["link_field"]))
+            for column, source_field in join["columns"].items():
+                record[column] = row.get(source_field) if row else None
+
+    for column in plan["unresolved_columns"]:
+        for record in records:
+            record[column] = None
+
+
+def explain_plan(plan):
+    """EXPLAIN the first page of a plan and describe full scans and filesorts"""
+    warnings = []
+    try:
+        query = frappe.get_all(
+            plan["doctype"],
+            fields=plan["query_fields"] + plan["hidden_fields"],
+            filters=bind_filters(plan, {}),
+            order_by=plan["order_by"],
+            limit_page_length=20,
+            run=0
+        )
+        rows = frappe.db.sql(f"EXPLAIN {query}", as_dict=True)
+    except Exception as e:
+        return [f"EXPLAIN failed: {str(e)}"]
+
+    if frappe.db.db_type == "postgres":
+        for row in rows:
+            line = next(iter(row.values()), "") or ""
+            if "Seq Scan" in line:
+                warnings.append(f"Full table scan: {line.strip()}")
+        return warnings
+
+    for row in rows:
+        table = row.get("table")
+        if row.get("type") == "ALL" and (row.get("rows") or 0) > FULL_SCAN_WARN_ROWS:
+            warnings.append(f"Full table scan of {table} (~{row.get('rows')} rows)")
+        if "filesort" in (row.get("Extra") or ""):
+            warnings.append(f"Sort on {table} needs a filesort; index the sort column")
+    return warnings
+
+
+def schema_version(doctypes):
+    """Version token of the DocTypes a plan reads and of the Flansa metadata"""
+    try:
+        parts = [str(frappe.get_meta(doctype).modified) for doctype in doctypes]
+    except frappe.DoesNotExistError:
+        return None
+    parts += [get_data_version(doctype) for doctype in METADATA_DOCTYPES]
+    return "|".join(parts)
+
+
+def _is_current(plan, key):
+    return bool(
+        plan
+        and plan.get("version") == PLAN_VERSION
+        and plan.get("config_hash") == key
+        and plan.get("schema_version") is not None
+        and plan.get("schema_version") == schema_version(plan["doctypes"])
+    )
+
+
+def _parse_plan(value):
+    try:
+        return json.loads(value) if value else None
+    except ValueError:
+        return None
+
+
+def _parent_join_path(meta, field_config):
+    """(link field on the base DocType, parent DocType) of a parent column"""
+    relationship_id = field_config.get("relationship")
+    if not relationship_id or not field_config.get("source_field"):
+        return None
+
+    parent_table = frappe.db.get_value("Flansa Relationship", relationship_id, "parent_table")
+    parent_info = get_table_info(parent_table) if parent_table else None
+    parent_doctype = parent_info.doctype_name if parent_info else None
+    if not parent_doctype or not frappe.db.exists("DocType", parent_doctype):
+        return None
+
+    # The first link field pointing at the parent connects the two tables
+    link_field = next(
+        (f.fieldname for f in meta.fields if f.fieldtype == "Link" and f.options == parent_doctype),
+        None
+    )
+    return (link_field, parent_doctype) if link_field else None
+
+
+def _related_join_path(field_config):
+    """(link field on the base DocType, related DocType) of a related column"""
+    if not (field_config.get("link_field") and field_config.get("source_field") and field_config.get("table")):
+        return None
+
+    related_info = get_table_info(field_config["table"])
+    related_doctype = related_info.doctype_name if related_info else None
+    if not related_doctype or not frappe.db.exists("DocType", related_doctype):
+        return None
+    return field_config["link_field"], related_doctype
+
+
+def _add_join(joins, unresolved_columns, path, field_config):
+    if not path:
+        unresolved_columns.append(field_config["fieldname"])
+        return
+    link_field, doctype = path
+    join = joins.setdefault(path, {"link_field": link_field, "doctype": doctype, "columns": {}})
+    join["columns"][field_config["fieldname"]] = field_config.get("source_field")
+
+
+def _is_valid_field(meta, fieldname):
+    return bool(fieldname) and (fieldname in STANDARD_FIELDS or meta.has_field(fieldname))
+
+
+def _missing_indexes(meta, fieldnames):
+    """Filter, sort and group columns of the base DocType without an index"""
+    missing = []
+    for fieldname in dict.fromkeys(fieldnames):
+        if fieldname in INDEXED_STANDARD_FIELDS:
+            continue
+        df = meta.get_field(fieldname)
+        if df is None and fieldname not in STANDARD_FIELDS:
+            # Unknown fields are reported as warnings already
+            continue
+        if df and (df.search_index or df.unique):
+            continue
+        missing.append({"doctype": meta.name, "fieldname": fieldname})
+    return missing
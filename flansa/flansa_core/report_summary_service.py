@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Flansa Report Summary Service - pre-aggregated rows for grouped saved reports
+
+A saved report in summary mode keeps one Flansa Report Summary Row per group
+value (or day/week/month/year bucket) of its first grouping, holding the row
+count and the sum of its measure field. Grouped views of the report are then
+answered from those rows instead of scanning the base table.
+
+Summary modes:
+    Incremental   document hooks apply each insert, update and delete as a delta
+    Scheduled     the hourly job rebuilds the rows (for high-churn tables)
+
+A full rebuild runs in the background whenever the report's grouping, filters
+or measure change. Summaries that cannot be kept exact incrementally (bulk SQL
+updates, filters the hooks cannot evaluate) are marked Stale, served live
+until then, and rebuilt by the hourly job.
+"""
+
+import hashlib
+import json
+
+import frappe
+from frappe.utils import cstr, flt, get_datetime, now
+from frappe.utils.data import evaluate_filters
+
+from flansa.flansa_core.utils.instrumentation import cached_hget
+from flansa.flansa_core.job_service import enqueue_job
+
+SUMMARY_ROW_DOCTYPE = "Flansa Report Summary Row"
+SUMMARY_INDEX_KEY = "flansa_report_summary_index"
+
+SUMMARY_AGGREGATES = ("count", "group", "sum", "avg")
+SUMMARY_PERIODS = ("exact", "day", "week", "month", "year")
+NUMERIC_FIELDTYPES = ["Int", "Float", "Currency"]
+MAX_SUMMARY_GROUPS = 500
+
+
+def get_summary_definition(plan):
+    """What a summary of this plan aggregates, or None when its grouping cannot be summarized"""
+    if not plan.get("grouping"):
+        return None
+
+    group = plan["grouping"][0]
+    aggregate = group.get("aggregate", "count")
+    if aggregate not in SUMMARY_AGGREGATES:
+        return None
+
+    group_field = group["field"]
+    meta = frappe.get_meta(plan["doctype"])
+    df = meta.get_field(group_field)
+    if not df and group_field not in ("name", "owner", "creation", "modified"):
+        return None
+
+    # Same rule as execute_grouped_report: periods only apply to date fields
+    field_type = plan["field_map"].get(group_field, {}).get("fieldtype") or (df.fieldtype if df else "")
+    period = group.get("period", "exact") if field_type in ["Date", "Datetime"] else "exact"
+    if period not in SUMMARY_PERIODS:
+        return None
+
+    measure_field = None
+    if aggregate in ("sum", "avg"):
+        measure_field = next(
+            (f for f in plan["query_fields"] if plan["field_map"].get(f, {}).get("fieldtype") in NUMERIC_FIELDTYPES),
+            None
+        )
+
+    from flansa.flansa_core.report_plan_service import bind_filters
+
+    definition = {
+        "doctype": plan["doctype"],
+        "group_field": group_field,
+        "period": period,
+        "aggregate": aggregate,
+        "measure_field": measure_field,
+        "filters": bind_filters(plan, {}),
+    }
+    definition["key"] = hashlib.md5(json.dumps(definition, sort_keys=True, default=str).encode()).hexdigest()
+    # Outside the key: it only decides how exact buckets are spelled
+    definition["field_type"] = field_type
+    return definition
+
+
+def bucket_value(value, period, field_type=None):
+    """Python twin of get_period_expression, so hook deltas land in the rows a rebuild creates"""
+    if value in (None, ""):
+        return ""
+    if period == "exact":
+        # The database returns 5.000000000 where the document holds 5.0
+        if field_type in NUMERIC_FIELDTYPES:
+            number = flt(value)
+            return str(int(number)) if number.is_integer() else repr(number)
+        if field_type == "Datetime":
+            return str(get_datetime(value))
+        return cstr(value)
+
+    value = get_datetime(value)
+    if period == "day":
+        return value.date().isoformat()
+    if period == "week":
+        # YEARWEEK(date, 1) is the ISO year and week
+        iso_year, iso_week, _ = value.isocalendar()
+        return str(iso_year * 100 + iso_week)
+    if period == "month":
+        return f"{value.year}-{value.month:02d}"
+    return str(value.year)
+
+
+def rebuild_summary(report_id):
+    """Recompute every summary row of a saved report from the base table"""
+    from flansa.flansa_core.report_plan_service import get_report_plan
+
+    # Before any read: deltas committed while the rows are recomputed would be overwritten
+    _lock_report(report_id)
+    report = frappe.get_doc("Flansa Saved Report", report_id)
+    config = dict(report.get_config_dict(), base_table=report.base_table)
+    definition = get_summary_definition(get_report_plan(config, report_id))
+    if not definition:
+        _set_status(report_id, "", None)
+        frappe.db.commit()
+        return
+
+    buckets = compute_summary_buckets(definition)
+
+    timestamp = now()
+    frappe.db.delete(SUMMARY_ROW_DOCTYPE, {"saved_report": report_id})
+    frappe.db.bulk_insert(
+        SUMMARY_ROW_DOCTYPE,
+        ["name", "creation", "modified", "owner", "modified_by", "saved_report", "bucket", "row_count", "sum_value"],
+        [
+            [_row_name(report_id, bucket), timestamp, timestamp, "Administrator", "Administrator",
+             report_id, bucket, row_count, sum_value]
+            for bucket, (row_count, sum_value) in buckets.items()
+        ]
+    )
+    _set_status(report_id, "Ready", definition["key"])
+    frappe.db.commit()
+    clear_summary_index()
+
+
+def compute_summary_buckets(definition):
+    """{bucket: (row_count, sum_value)} of a summary, aggregated from the base table"""
+    from flansa.flansa_core.api.report_builder_api import get_period_expression
+
+    group_field = definition["group_field"]
+    expression = get_period_expression(group_field, definition["period"]) if definition["period"] != "exact" else f"`{group_field}`"
+    measure = f"SUM(`{definition['measure_field']}`)" if definition["measure_field"] else "0"
+    where, values = _where_clause(definition["filters"])
+
+    buckets = {}
+    for row in frappe.db.sql(f"""
+        SELECT {expression} AS bucket, COUNT(*) AS row_count, {measure} AS sum_value
+        FROM `tab{definition['doctype']}`
+        {where}
+        GROUP BY {expression}
+    """, values, as_dict=True):
+        if definition["period"] == "exact":
+            bucket = bucket_value(row.bucket, "exact", definition.get("field_type"))
+        else:
+            bucket = cstr(row.bucket)
+        row_count, sum_value = buckets.get(bucket, (0, 0))
+        buckets[bucket] = (row_count + row.row_count, sum_value + flt(row.sum_value))
+
+    return buckets
+
+
+def enqueue_summary_rebuild(report_id):
+    enqueue_job(
+        'flansa.flansa_core.report_summary_service.rebuild_summary',
+        'bulk',
+        job_key=f"report_summary_{report_id}",
+        workspace_id=frappe.db.get_value("Flansa Saved Report", report_id, "workspace_id"),
+        timeout=3600,
+        after_commit=True,
+        report_id=report_id
+    )
+
+
+def delete_summary(report_id):
+    frappe.db.delete(SUMMARY_ROW_DOCTYPE, {"saved_report": report_id})
+    clear_summary_index()
+
+
+def get_summary_report(report_id, plan):
+    """Grouped report result from the summary rows, or None when the summary does not apply"""
+    saved = frappe.db.get_value(
+        "Flansa Saved Report", report_id,
+        ["summary_mode", "summary_status", "summary_key", "summary_refreshed_on"], as_dict=True
+    )
+    if not saved or not saved.summary_mode or saved.summary_status != "Ready":
+        return None
+
+    definition = get_summary_definition(plan)
+    if not definition or definition["key"] != saved.summary_key:
+        # The viewer sent a config that differs from the one the summary was built for
+        return None
+
+    from flansa.flansa_core.api.report_builder_api import format_group_label
+
+    # Buckets are stored as text: numeric groups are ordered by value here instead
+    numeric = definition["period"] == "exact" and definition.get("field_type") in NUMERIC_FIELDTYPES
+    rows = frappe.get_all(
+        SUMMARY_ROW_DOCTYPE,
+        filters={"saved_report": report_id, "row_count": [">", 0]},
+        fields=["bucket", "row_count", "sum_value"],
+        order_by="bucket asc",
+        limit_page_length=0 if numeric else MAX_SUMMARY_GROUPS
+    )
+    if numeric:
+        rows = sorted(rows, key=lambda row: (row.bucket != "", flt(row.bucket)))[:MAX_SUMMARY_GROUPS]
+
+    aggregate_type = definition["aggregate"]
+    period = definition["period"]
+    groups_data = []
+    for row in rows:
+        group_value = row.bucket or None
+        aggregate = None
+        if definition["measure_field"]:
+            aggregate = row.sum_value / row.row_count if aggregate_type == "avg" else row.sum_value
+        groups_data.append({
+            'group_field': definition["group_field"],
+            'group_value': group_value,
+            'group_label': format_group_label(group_value, period),
+            'count': row.row_count,
+            'aggregate': aggregate,
+            'aggregate_type': aggregate_type if aggregate_type not in ['count', 'group'] else None,
+            # Summary rows carry no records; the group is opened as a filtered view instead
+            'records': [],
+            'has_more': True,
+            'from_summary': True
+        })
+
+    selected_fields = plan["selected_fields"]
+    group_field = definition["group_field"]
+    return {
+        "success": True,
+        "is_grouped": True,
+        "from_summary": True,
+        "summary_refreshed_on": saved.summary_refreshed_on,
+        "grouping": {
+            'field': group_field,
+            'field_label': next((f.get('custom_label', f.get('field_label', f['fieldname'])) for f in selected_fields if f['fieldname'] == group_field), group_field),
+            'aggregate': aggregate_type
+        },
+        "groups": groups_data,
+        "total": sum(g['count'] for g in groups_data),
+        "total_groups": len(groups_data),
+        "fields": selected_fields
+    }
+
+
+def on_document_change(doc, method=None):
+    """Doc event: apply a document change to the Incremental summaries of its DocType"""
+    try:
+        if doc.meta.module != "Flansa Generated":
+            return
+        summaries = get_summaries_for_doctype(doc.doctype)
+        if not summaries:
+            return
+
+        if method == "on_trash":
+            before, after = doc, None
+        else:
+            before, after = doc.get_doc_before_save(), doc
+
+        for summary in summaries:
+            try:
+                old = _contribution(summary, before)
+                new = _contribution(summary, after)
+                if old == new:
+                    continue
+                # Waits for a running rebuild, which then already counts this change
+                _lock_report(summary["report"], shared=True)
+                if old:
+                    _apply_delta(summary["report"], old[0], -1, -old[1])
+                if new:
+                    _apply_delta(summary["report"], new[0], 1, new[1])
+            except Exception as e:
+                mark_summary_stale(summary["report"], f"{doc.doctype} {doc.name}: {str(e)}")
+    except Exception as e:
+        frappe.log_error(f"Error updating report summaries for {doc.doctype}: {str(e)}", "Report Summary")
+
+
+def get_summaries_for_doctype(doctype):
+    """Incremental summaries that are Ready, by DocType (cached)"""
+    return cached_hget(SUMMARY_INDEX_KEY, "by_doctype", _build_summary_index).get(doctype, [])
+
+
+def mark_doctype_summaries_stale(doctype, reason):
+    """For changes made without doc events (bulk SQL, backfills)"""
+    for summary in get_summaries_for_doctype(doctype):
+        mark_summary_stale(summary["report"], reason)
+
+
+def mark_summary_stale(report_id, reason):
+    frappe.db.set_value("Flansa Saved Report", report_id, "summary_status", "Stale", update_modified=False)
+    frappe.logger("flansa").info(f"Report summary {report_id} is stale: {reason}")
+    clear_summary_index()
+
+
+def clear_summary_index(doc=None, method=None):
+    frappe.cache().delete_value(SUMMARY_INDEX_KEY)
+
+
+def refresh_scheduled_summaries():
+    """Scheduled job: rebuild Scheduled summaries and any summary marked Stale"""
+    reports = frappe.get_all(
+        "Flansa Saved Report",
+        filters={"summary_mode": ["in", ["Incremental", "Scheduled"]]},
+        fields=["name", "summary_mode", "summary_status"]
+    )
+    for report in reports:
+        if report.summary_mode != "Scheduled" and report.summary_status == "Ready":
+            continue
+        report_id = report.name
+        try:
+            rebuild_summary(report_id)
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Error rebuilding report summary {report_id}: {str(e)}", "Report Summary")
+
+
+def _build_summary_index():
+    from flansa.flansa_core.report_plan_service import get_report_plan
+
+    index = {}
+    for report in frappe.get_all(
+        "Flansa Saved Report",
+        filters={"summary_mode": "Incremental", "summary_status": "Ready"},
+        fields=["name", "base_table", "report_config", "summary_key"]
+    ):
+        try:
+            config = dict(json.loads(report.report_config), base_table=report.base_table)
+            definition = get_summary_definition(get_report_plan(config, report.name))
+        except Exception:
+            continue
+        if definition and definition["key"] == report.summary_key:
+            index.setdefault(definition["doctype"], []).append(dict(definition, report=report.name))
+    return index
+
+
+def _contribution(summary, doc):
+    """(bucket, measure) a document adds to a summary, or None when the report filters exclude it"""
+    if doc is None:
+        return None
+    if summary["filters"] and not evaluate_filters(doc, summary["filters"]):
+        return None
+    measure = flt(doc.get(summary["measure_field"])) if summary["measure_field"] else 0
+    return bucket_value(doc.get(summary["group_field"]), summary["period"], summary.get("field_type")), measure
+
+
+def _apply_delta(report_id, bucket, row_count, sum_value):
+    # One upsert: two first changes of a bucket must not both insert its row
+    if frappe.db.db_type == "postgres":
+        upsert = f"""ON CONFLICT (`name`) DO UPDATE SET
+            `row_count` = `tab{SUMMARY_ROW_DOCTYPE}`.`row_count` + EXCLUDED.`row_count`,
+            `sum_value` = `tab{SUMMARY_ROW_DOCTYPE}`.`sum_value` + EXCLUDED.`sum_value`,
+            `modified` = EXCLUDED.`modified`"""
+    else:
+        upsert = """ON DUPLICATE KEY UPDATE `row_count` = `row_count` + VALUES(`row_count`),
+            `sum_value` = `sum_value` + VALUES(`sum_value`), `modified` = VALUES(`modified`)"""
+
+    timestamp = now()
+    frappe.db.sql(f"""
+        INSERT INTO `tab{SUMMARY_ROW_DOCTYPE}`
+            (`name`, `creation`, `modified`, `owner`, `modified_by`, `saved_report`, `bucket`, `row_count`, `sum_value`)
+        VALUES (%s, %s, %s, 'Administrator', 'Administrator', %s, %s, %s, %s)
+        {upsert}
+    """, (_row_name(report_id, bucket), timestamp, timestamp, report_id, bucket, row_count, sum_value))
+
+
+def _lock_report(report_id, shared=False):
+    """Row lock on a saved report until commit: exclusive for rebuilds, shared for deltas"""
+    if not shared:
+        mode = "FOR UPDATE"
+    else:
+        mode = "FOR SHARE" if frappe.db.db_type == "postgres" else "LOCK IN SHARE MODE"
+    frappe.db.sql(f"SELECT `name` FROM `tabFlansa Saved Report` WHERE `name` = %s {mode}", (report_id,))
+
+
+def _row_name(report_id, bucket):
+    return hashlib.md5(f"{report_id}|{bucket}".encode()).hexdigest()
+
+
+def _set_status(report_id, status, key):
+    frappe.db.set_value("Flansa Saved Report", report_id, {
+        "summary_status": status,
+        "summary_key": key,
+        "summary_refreshed_on": now() if status == "Ready" else None
+    }, update_modified=False)
+
+
+def _where_clause(filters):
+    """WHERE clause for bound report filters (the operators the grouped query supports)"""
+    conditions = []
+    values = []
+    for field, condition in filters.items():
+        if isinstance(condition, list) and len(condition) == 2:
+            operator, value = condition
+            if operator in ("in", "not in") and not value:
+                if operator == "in":
+                    conditions.append("1 = 0")
+            elif operator in ("in", "not in"):
+                placeholders = ", ".join(["%s"] * len(value))
+                conditions.append(f"`{field}` {operator.upper()} ({placeholders})")
+                values.extend(value)
+            elif operator == "between" and isinstance(value, list) and len(value) == 2:
+                conditions.append(f"`{field}` BETWEEN %s AND %s")
+                values.extend(value)
+            elif operator in ("like", "not like", "=", "!=", ">", "<", ">=", "<="):
+                conditions.append(f"`{field}` {operator.upper()} %s")
+                values.append(value)
+            else:
+                frappe.throw(f"Filter operator {operator} is not supported in summary mode")
+        else:
+            conditions.append(f"`{field}` = %s")
+            values.append(condition)
+    return ("WHERE " + " AND ".join(conditions)) if conditions else "", values
@@ -6,7 +6,7 @@ Hooks to integrate S3 upload with Frappe's file system
 
 import frappe
 from frappe.utils.file_manager import save_file_on_filesystem
-from flansa.flansa_core.s3_integration.s3_upload import upload_file_to_s3, delete_file_from_s3
+from flansa.flansa_core.s3_integration.s3_upload import upload_file_to_s3, delete_file_from_s3, delete_files_from_s3
 
 def override_file_save():
     """Override Frappe's file save to include S3 upload"""
@@ -73,6 +73,12 @@ def on_file_delete(doc, method):
                 frappe.logger().info(f"Deleting S3 file: {doc.file_name}")
                 delete_file_from_s3(doc.file_url)
                 frappe.logger().info(f"Successfully deleted S3 file: {doc.file_name}")
+
+                # Remove gallery thumbnails stored next to the original
+                from flansa.flansa_core.utils.image_derivatives import derivative_urls
+                thumbnails = derivative_urls(doc.file_url)
+                if thumbnails:
+                    delete_files_from_s3(thumbnails)
     except Exception as e:
         error_msg = f"Error deleting S3 file {doc.file_name}: {str(e)}"
         frappe.log_error(error_msg, "Flansa S3 Delete Hook")
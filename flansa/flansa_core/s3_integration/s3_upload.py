@@ -151,6 +151,45 @@ def get_content_type(filename):
     return content_type or 'application/octet-stream'
 
 
+def is_s3_url(file_url):
+    return bool(file_url) and ('s3.amazonaws.com' in file_url or 's3.' in file_url)
+
+
+def parse_s3_url(file_url):
+    """Split a presigned or direct S3 URL into (bucket, key)"""
+    # Parse presigned URL to extract bucket and key
+    base_url = file_url.split('?')[0]
+
+    # Parse S3 URL to get bucket and key
+    parts = base_url.replace('https://', '').split('/')
+    bucket_name = parts[0].split('.')[0]  # Extract bucket from subdomain
+    s3_key = '/'.join(parts[1:])  # Rest is the key
+
+    # URL decode the S3 key to handle special characters and spaces
+    import urllib.parse
+    s3_key = urllib.parse.unquote(s3_key)
+
+    # Remove any empty parts
+    return bucket_name, s3_key.strip('/')
+
+
+def get_configured_s3_client(site_config):
+    """S3 client from site config, or None when credentials are incomplete"""
+    aws_access_key_id = site_config.get('s3_access_key_id') or site_config.get('aws_access_key_id')
+    aws_secret_access_key = site_config.get('s3_secret_access_key') or site_config.get('aws_secret_access_key')
+    region = site_config.get('s3_region') or site_config.get('aws_s3_region_name')
+
+    if not all([aws_access_key_id, aws_secret_access_key, region]):
+        return None
+
+    return boto3.client(
+        's3',
+        region_name=region,
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key
+    )
+
+
 def delete_file_from_s3(file_url):
     """
     Delete file from S3
@@ -165,43 +204,15 @@ def delete_file_from_s3(file_url):
             return
 
         # Handle both presigned URLs and direct S3 URLs
-        if 's3.amazonaws.com' not in file_url and 's3.' not in file_url:
+        if not is_s3_url(file_url):
             return
 
-        # Parse presigned URL to extract bucket and key
-        if '?' in file_url:  # Presigned URL with query parameters
-            base_url = file_url.split('?')[0]
-        else:
-            base_url = file_url
-
-        # Parse S3 URL to get bucket and key
-        parts = base_url.replace('https://', '').split('/')
-        bucket_name = parts[0].split('.')[0]  # Extract bucket from subdomain
-        s3_key = '/'.join(parts[1:])  # Rest is the key
-
-        # URL decode the S3 key to handle special characters and spaces
-        import urllib.parse
-        s3_key = urllib.parse.unquote(s3_key)
-
-        # Remove any empty parts
-        s3_key = s3_key.strip('/')
-
-        # Get S3 credentials
-        aws_access_key_id = site_config.get('s3_access_key_id') or site_config.get('aws_access_key_id')
-        aws_secret_access_key = site_config.get('s3_secret_access_key') or site_config.get('aws_secret_access_key')
-        region = site_config.get('s3_region') or site_config.get('aws_s3_region_name')
+        bucket_name, s3_key = parse_s3_url(file_url)
 
-        if not all([aws_access_key_id, aws_secret_access_key, region]):
+        s3_client = get_configured_s3_client(site_config)
+        if not s3_client:
             return
 
-        # Create S3 client
-        s3_client = boto3.client(
-            's3',
-            region_name=region,
-            aws_access_key_id=aws_access_key_id,
-            aws_secret_access_key=aws_secret_access_key
-        )
-
         # Delete from S3
         s3_client.delete_object(Bucket=bucket_name, Key=s3_key)
         frappe.logger().info(f"File deleted from S3: {file_url}")
@@ -212,6 +223,61 @@ def delete_file_from_s3(file_url):
         frappe.logger().error(error_msg)
 
 
+# S3 DeleteObjects accepts at most 1000 keys per request
+S3_DELETE_BATCH_SIZE = 1000
+
+
+def delete_files_from_s3(file_urls):
+    """
+    Delete many files from S3 with batched delete_objects calls
+
+    Keys are grouped per bucket and sent up to 1000 at a time through one
+    client, instead of one delete_object call (and client) per file.
+
+    Args:
+        file_urls: Iterable of S3 URLs (presigned or direct)
+
+    Returns:
+        Number of objects S3 reported as deleted
+    """
+    site_config = frappe.get_site_config()
+    if not site_config.get('use_s3'):
+        return 0
+
+    keys_by_bucket = {}
+    for file_url in file_urls:
+        if is_s3_url(file_url):
+            bucket_name, s3_key = parse_s3_url(file_url)
+            if s3_key:
+                keys_by_bucket.setdefault(bucket_name, set()).add(s3_key)
+
+    if not keys_by_bucket:
+        return 0
+
+    s3_client = get_configured_s3_client(site_config)
+    if not s3_client:
+        return 0
+
+    deleted = 0
+    for bucket_name, keys in keys_by_bucket.items():
+        keys = sorted(keys)
+        for start in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+            batch = keys[start:start + S3_DELETE_BATCH_SIZE]
+            try:
+                response = s3_client.delete_objects(
+                    Bucket=bucket_name,
+                    Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+                )
+                errors = response.get('Errors', [])
+                deleted += len(batch) - len(errors)
+                for error in errors[:10]:
+                    frappe.logger().error(f"S3 batch delete failed for {error.get('Key')}: {error.get('Message')}")
+            except Exception as e:
+                frappe.log_error(f"Error batch deleting {len(batch)} files from S3 bucket {bucket_name}: {str(e)}", "Flansa S3 Delete")
+
+    return deleted
+
+
 def get_s3_file_content(file_url):
     """
     Get file content from S3
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Flansa Summary Recalculation - coalesced refresh of parent summary fields
+
+Summary fields (see field_calculator_service) aggregate child records onto a
+parent, but the calculator only runs when the parent itself is saved. Instead
+of recalculating parents on every child save, child doc events add the parents
+they affect to a deduplicating Redis set once the transaction commits. A
+background job waits until the set has been quiet for a moment, then drains it
+in batches: every dirty parent is recalculated once, with one aggregate query
+and one read per parent DocType per batch, however many of its children changed.
+
+Parents that are themselves children of another summary queue their own
+parents in turn, so multi-level rollups settle within the same run.
+
+Site config:
+    flansa_summary_recalc_debounce    seconds without child changes before draining (default 5)
+"""
+
+import json
+import time
+
+import frappe
+
+from flansa.flansa_core.utils.instrumentation import cached_hget
+from flansa.flansa_core.job_service import enqueue_job
+
+DIRTY_SET_KEY = "flansa_dirty_summary_parents"
+LAST_CHANGE_KEY = "flansa_dirty_summary_last_change"
+DEPENDENTS_KEY = "flansa_summary_dependents"
+JOB_ID = "flansa_summary_recalc"
+
+DEFAULT_DEBOUNCE_SECONDS = 5
+# Continuous child churn must not postpone recalculation forever
+MAX_WAIT_SECONDS = 60
+BATCH_SIZE = 500
+
+
+class _ParentRow(frappe._dict):
+    """Parent row read for recalculation; the compiled calculator assigns fields through set()"""
+
+    def set(self, key, value):
+        self[key] = value
+
+
+def get_summary_dependents(doctype):
+    """
+    Summary fields that aggregate records of doctype, grouped by parent
+
+    Returns [{"parent_doctype", "filter_field", "source_field", "fields"}].
+    """
+    return cached_hget(DEPENDENTS_KEY, "by_child", _build_dependents_index).get(doctype, [])
+
+
+def clear_summary_dependents(doc=None, method=None):
+    """Doc event for DocType: summary fields may have been added or removed"""
+    frappe.cache().delete_value(DEPENDENTS_KEY)
+
+
+def on_child_change(doc, method=None):
+    """Doc event: mark the parents whose summaries include this record as dirty"""
+    try:
+        if doc.meta.module != "Flansa Generated":
+            return
+        dependents = get_summary_dependents(doc.doctype)
+        if not dependents:
+            return
+
+        before = None if method == "on_trash" else doc.get_doc_before_save()
+        members = set()
+        for dependent in dependents:
+            # A child moved to another parent changes both
+            for record in (doc, before):
+                value = record.get(dependent["filter_field"]) if record else None
+                if value:
+                    members.add(_member(dependent["parent_doctype"], dependent["source_field"], value))
+
+        if members:
+            mark_dirty(members)
+    except Exception as e:
+        frappe.log_error(f"Error queueing summary recalculation for {doc.doctype}: {str(e)}", "Summary Recalculation")
+
+
+def mark_dirty(members):
+    """Queue parents for recalculation once the current transaction commits"""
+    pending = frappe.flags.setdefault("flansa_dirty_summary_parents", set())
+    first = not pending
+    pending.update(members)
+    if not first:
+        return
+
+    if getattr(frappe.db, "after_commit", None) is None:
+        _flush_pending()
+    else:
+        frappe.db.after_commit.add(_flush_pending)
+        frappe.db.after_rollback.add(_discard_pending)
+
+
+def _flush_pending():
+    pending = frappe.flags.pop("flansa_dirty_summary_parents", None)
+    if not pending:
+        return
+
+    cache = frappe.cache()
+    cache.sadd(DIRTY_SET_KEY, *pending)
+    cache.set_value(LAST_CHANGE_KEY, time.time())
+    enqueue_job(
+        'flansa.flansa_core.summary_recalc_service.process_dirty_parents',
+        'maintenance',
+        job_key=JOB_ID,
+        timeout=1800
+    )
+
+
+def _discard_pending():
+    frappe.flags.pop("flansa_dirty_summary_parents", None)
+
+
+def process_dirty_parents():
+    """Background job (and scheduler safety net): drain the dirty set in debounced batches"""
+    cache = frappe.cache()
+    # scard, unlike sadd/smembers/srem, does not add the site prefix itself
+    if not cache.scard(cache.make_key(DIRTY_SET_KEY)):
+        return
+
+    _wait_until_quiet()
+    while True:
+        # SPOP takes a batch out of the set atomically: concurrent drains never share members,
+        # and a change committed meanwhile queues the parent again
+        pipe = cache.pipeline(transaction=False)
+        pipe.spop(cache.make_key(DIRTY_SET_KEY), BATCH_SIZE)
+        members = [frappe.safe_decode(m) for m in pipe.execute()[0] or []]
+        if not members:
+            break
+        try:
+            recalculate_parents(members)
+            frappe.db.commit()
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Error recalculating summary parents: {str(e)}", "Summary Recalculation")
+
+
+def recalculate_parents(members):
+    """Recalculate the summary and formula fields of dirty parents, one pass per parent DocType"""
+    grouped = {}
+    for member in members:
+        parent_doctype, source_field, value = json.loads(member)
+        grouped.setdefault(parent_doctype, {}).setdefault(source_field, set()).add(value)
+
+    for parent_doctype, keys_by_source in grouped.items():
+        _recalculate_doctype(parent_doctype, keys_by_source)
+
+
+def _recalculate_doctype(parent_doctype, keys_by_source):
+    from flansa.flansa_core.change_feed_service import announce_changes
+    from flansa.flansa_core.field_calculator_service import get_calculator
+    from flansa.flansa_core.report_cache_service import bump_data_versions
+    from flansa.flansa_core.report_summary_service import mark_doctype_summaries_stale
+
+    calculator = get_calculator(parent_doctype)
+    if not calculator.summaries:
+        return
+
+    grandparents = get_summary_dependents(parent_doctype)
+    fields = calculator.fields | {d["filter_field"] for d in grandparents} | {"name"}
+
+    rows = []
+    for source_field, values in keys_by_source.items():
+        rows.extend(
+            _ParentRow(row) for row in frappe.get_all(
+                parent_doctype,
+                filters={source_field: ["in", list(values)]},
+                fields=sorted(fields)
+            )
+        )
+    if not rows:
+        return
+
+    found = calculator.fetch_summaries({
+        source_field: [row.get(source_field) for row in rows] for source_field in keys_by_source
+    })
+
+    changed = []
+    for row in rows:
+        before = dict(row)
+        calculator.calculate(row, found)
+        updates = {k: v for k, v in row.items() if before.get(k) != v}
+        if updates:
+            # modified advances so change feed cursors pick the new values up
+            frappe.db.set_value(parent_doctype, row.name, updates)
+            changed.append(row)
+
+    if not changed:
+        return
+
+    # db.set_value skips doc events
+    bump_data_versions([parent_doctype])
+    mark_doctype_summaries_stale(parent_doctype, "summary recalculation")
+    announce_changes(parent_doctype, [row.name for row in changed])
+
+    members = {
+        _member(d["parent_doctype"], d["source_field"], row.get(d["filter_field"]))
+        for d in grandparents for row in changed if row.get(d["filter_field"])
+    }
+    if members:
+        # Rollups of rollups: recalculated in a later batch of the same run
+        frappe.cache().sadd(DIRTY_SET_KEY, *members)
+
+
+def _wait_until_quiet():
+    debounce = float(frappe.conf.get("flansa_summary_recalc_debounce") or DEFAULT_DEBOUNCE_SECONDS)
+    started = time.time()
+    while time.time() - started < MAX_WAIT_SECONDS:
+        # expires=True skips the request-local copy, which would hide changes made meanwhile
+        last_change = float(frappe.cache().get_value(LAST_CHANGE_KEY, expires=True) or 0)
+        remaining = last_change + debounce - time.time()
+        if remaining <= 0:
+            return
+        time.sleep(min(remaining, 1))
+
+
+def _member(parent_doctype, source_field, value):
+    return json.dumps([parent_doctype, source_field, str(value)])
+
+
+def _build_dependents_index():
+    """{child doctype: [dependent]} from every summary field of the generated DocTypes"""
+    from flansa.flansa_core.field_calculator_service import get_calculated_field_config
+
+    index = {}
+    groups = {}
+    for df in frappe.get_all(
+        "DocField",
+        filters={"parenttype": "DocType", "description": ["like", "%flansa_config%summary%"]},
+        fields=["parent", "fieldname", "description"]
+    ):
+        config = get_calculated_field_config(df)
+        if not config or config[0] != "summary":
+            continue
+        settings = config[1]
+        child_doctype, filter_field = settings.get("target_doctype"), settings.get("filter_field")
+        if not (child_doctype and filter_field):
+            continue
+
+        key = (child_doctype, df.parent, filter_field, settings.get("source_field") or "name")
+        if key not in groups:
+            groups[key] = {
+                "parent_doctype": df.parent,
+                "filter_field": filter_field,
+                "source_field": key[3],
+                "fields": [],
+            }
+            index.setdefault(child_doctype, []).append(groups[key])
+        groups[key]["fields"].append(df.fieldname)
+
+    return index
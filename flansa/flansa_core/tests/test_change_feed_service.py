@@ -0,0 +1,57 @@
+# Copyright (c) 2025, Flansa Team and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, now_datetime
+
+from flansa.flansa_core import change_feed_service
+from flansa.flansa_core.change_feed_service import _encode_cursor, get_changes_since
+
+
+class TestChangeFeedService(FrappeTestCase):
+	def setUp(self):
+		patcher = patch.object(
+			change_feed_service, "get_table_info", return_value=frappe._dict(doctype_name="ToDo")
+		)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def todo(self, description):
+		return frappe.get_doc({"doctype": "ToDo", "description": description}).insert().name
+
+	def sync(self, cursor, limit):
+		"""Every page of one sync call: (names, cursor, pages)"""
+		names, pages = [], 0
+		while True:
+			result = get_changes_since("_test_table", cursor, fields=["name"], limit=limit)
+			self.assertTrue(result["success"], result.get("error"))
+			names += [row.name for row in result["changes"]]
+			cursor, pages = result["cursor"], pages + 1
+			if not result["has_more"]:
+				return names, cursor, pages
+
+	def test_pages_follow_the_cursor(self):
+		start = str(add_to_date(now_datetime(), minutes=-1))
+		cursor = _encode_cursor({"modified": start, "name": "", "deleted": start, "deleted_name": ""})
+		todos = [self.todo(f"_Test change feed {i}") for i in range(5)]
+
+		names, _cursor, pages = self.sync(cursor, limit=2)
+
+		self.assertGreaterEqual(pages, 3)
+		self.assertEqual(len(names), len(set(names)))
+		self.assertTrue(set(todos) <= set(names))
+
+	def test_late_commits_are_read_again(self):
+		_names, cursor, _pages = self.sync(None, limit=500)
+		self.todo("_Test change feed seen")
+		_names, cursor, _pages = self.sync(cursor, limit=500)
+
+		# Stamped before the change the client has seen, committed after it
+		late = self.todo("_Test change feed late")
+		frappe.db.set_value("ToDo", late, "modified", add_to_date(now_datetime(), seconds=-3), update_modified=False)
+
+		names, _cursor, _pages = self.sync(cursor, limit=500)
+		self.assertIn(late, names)
@@ -0,0 +1,43 @@
+# Copyright (c) 2025, Flansa Team and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from flansa.flansa_core.utils.instrumentation import COUNTERS, _record, get_stats, reset_stats
+
+NAME = "_test_instrumented_endpoint"
+
+
+def _deltas(**kwargs):
+	return dict(dict.fromkeys(COUNTERS, 0), **kwargs)
+
+
+class TestInstrumentation(FrappeTestCase):
+	def setUp(self):
+		reset_stats()
+
+	def tearDown(self):
+		reset_stats()
+
+	def test_samples_accumulate(self):
+		_record(NAME, 5.0, _deltas(queries=2, query_ms=1.5), False)
+		_record(NAME, 40.0, _deltas(queries=3, query_ms=2.5, cache_hits=1), True)
+		_record(NAME, 20000.0, _deltas(), False)
+
+		stats = get_stats()[NAME]
+		self.assertEqual(stats["count"], 3)
+		self.assertEqual(stats["errors"], 1)
+		self.assertEqual(stats["queries"], 5)
+		self.assertAlmostEqual(stats["query_ms"], 4.0)
+		self.assertEqual(stats["cache_hits"], 1)
+		self.assertAlmostEqual(stats["total_ms"], 20045.0)
+		self.assertAlmostEqual(stats["max_ms"], 20000.0)
+		# 5ms -> <=10, 40ms -> <=50, 20s -> +Inf
+		self.assertEqual(stats["buckets"][0], 1)
+		self.assertEqual(stats["buckets"][2], 1)
+		self.assertEqual(stats["buckets"][-1], 1)
+
+	def test_reset_clears_every_name(self):
+		_record(NAME, 5.0, _deltas(), False)
+		reset_stats()
+		self.assertEqual(get_stats(), {})
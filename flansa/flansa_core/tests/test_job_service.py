@@ -0,0 +1,118 @@
+# Copyright (c) 2025, Flansa Team and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from flansa.flansa_core import job_service
+from flansa.flansa_core.job_service import JOB_DOCTYPE
+
+WORKSPACE = "_test_jobs_workspace"
+SESSION_USERS = []
+
+
+def record_session_user():
+	SESSION_USERS.append(frappe.session.user)
+
+
+def _spec(job_class="bulk", method="frappe.ping", **kwargs):
+	return {
+		"method": method,
+		"job_class": job_class,
+		"workspace_id": WORKSPACE,
+		"user": "Administrator",
+		"label": "Test job",
+		"timeout": 60,
+		"kwargs": kwargs,
+	}
+
+
+class TestJobService(FrappeTestCase):
+	def setUp(self):
+		frappe.db.delete(JOB_DOCTYPE, {"workspace_id": WORKSPACE})
+
+	def tearDown(self):
+		frappe.db.delete(JOB_DOCTYPE, {"workspace_id": WORKSPACE})
+		frappe.db.commit()
+
+	def status(self, job_id):
+		return frappe.db.get_value(JOB_DOCTYPE, job_id, "status")
+
+	@patch.object(job_service, "_workspace_job_limit", return_value=1)
+	def test_bulk_jobs_over_the_workspace_limit_wait(self, _limit):
+		self.assertTrue(job_service._acquire_slot("_test_job_a", _spec()))
+		self.assertFalse(job_service._acquire_slot("_test_job_b", _spec()))
+		self.assertEqual(self.status("_test_job_a"), "Running")
+		self.assertEqual(self.status("_test_job_b"), "Waiting")
+
+		# Other job classes do not count against the bulk slots
+		self.assertFalse(job_service._is_limited(_spec("interactive")))
+
+	@patch.object(job_service, "_workspace_job_limit", return_value=1)
+	def test_waiting_job_starts_when_a_slot_frees(self, _limit):
+		job_service._acquire_slot("_test_job_a", _spec())
+		job_service._acquire_slot("_test_job_b", _spec())
+
+		with patch.object(job_service, "_submit") as submit:
+			job_service._start_waiting(WORKSPACE)
+			submit.assert_not_called()
+
+			frappe.db.set_value(JOB_DOCTYPE, "_test_job_a", "status", "Completed")
+			job_service._start_waiting(WORKSPACE)
+
+		submit.assert_called_once()
+		self.assertEqual(submit.call_args.args[0], "_test_job_b")
+		self.assertEqual(self.status("_test_job_b"), "Queued")
+
+	@patch.object(job_service, "_workspace_job_limit", return_value=1)
+	def test_waiting_job_is_deduplicated(self, _limit):
+		job_service._acquire_slot("_test_job_a", _spec())
+		job_service._acquire_slot("_test_job_b", _spec())
+
+		with patch.object(job_service, "_submit") as submit:
+			job_id = job_service.enqueue_job("frappe.ping", "bulk", job_key="_test_job_b", workspace_id=WORKSPACE)
+
+		self.assertEqual(job_id, "_test_job_b")
+		submit.assert_not_called()
+
+	def test_run_job_records_completion(self):
+		job_service.run_job("_test_job_ok", _spec("interactive"))
+		self.assertEqual(self.status("_test_job_ok"), "Completed")
+
+	def test_run_job_records_failure(self):
+		job_service.run_job("_test_job_fail", _spec("interactive", method="frappe.throw", msg="boom"))
+		job = job_service.get_job("_test_job_fail")
+		self.assertEqual(job.status, "Failed")
+		self.assertIn("boom", job.error)
+
+	def test_run_job_runs_as_the_requesting_user(self):
+		SESSION_USERS.clear()
+		spec = dict(_spec("interactive", method="flansa.flansa_core.tests.test_job_service.record_session_user"), user="Guest")
+		job_service.run_job("_test_job_user", spec)
+
+		self.assertEqual(SESSION_USERS, ["Guest"])
+		self.assertEqual(frappe.session.user, "Administrator")
+
+	def test_checkpoint_survives_a_rerun(self):
+		with patch.object(job_service, "_submit"):
+			job_id = job_service.enqueue_job(
+				"frappe.ping", "interactive", job_key="_test_job_resume", workspace_id=WORKSPACE,
+				checkpoint={"index": 0}
+			)
+		self.assertEqual(job_service.get_job(job_id).checkpoint, {"index": 0})
+
+		frappe.flags.flansa_job_id = job_id
+		try:
+			job_service.save_checkpoint({"index": 3})
+			self.assertEqual(job_service.get_checkpoint(), {"index": 3})
+		finally:
+			frappe.flags.flansa_job_id = None
+
+		self.assertEqual(job_service.get_job(job_id).checkpoint, {"index": 3})
+
+	def test_long_job_keys_fit_the_name_column(self):
+		name = job_service._job_name("gallery_thumbnails_" + "x" * 300)
+		self.assertLessEqual(len(name), job_service.MAX_NAME_LENGTH)
+		self.assertNotEqual(name, job_service._job_name("gallery_thumbnails_" + "x" * 301))
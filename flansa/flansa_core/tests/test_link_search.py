@@ -0,0 +1,31 @@
+# Copyright (c) 2025, Flansa Team and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from flansa.flansa_core.api.link_search import _fulltext_query, search_link_values
+
+
+class TestLinkSearch(FrappeTestCase):
+	def names(self, txt, start, page_len):
+		return [row["name"] for row in search_link_values("DocType", txt, start=start, page_len=page_len)]
+
+	def test_pages_follow_one_ordering(self):
+		# "log" matches both as a prefix (Log Settings) and inside names (Error Log)
+		everything = self.names("Log", 0, 100)
+		self.assertGreater(len(everything), 6)
+
+		paged = []
+		for start in range(0, len(everything), 3):
+			paged += self.names("Log", start, 3)
+
+		self.assertEqual(paged, everything)
+
+	def test_prefix_matches_come_first(self):
+		results = self.names("Log", 0, 100)
+		is_prefix = [name.lower().startswith("log") for name in results]
+		self.assertEqual(is_prefix, sorted(is_prefix, reverse=True))
+
+	def test_fulltext_operators_are_stripped(self):
+		self.assertEqual(_fulltext_query('"error" -log* (x)'), "+error* +log* +x*")
+		self.assertEqual(_fulltext_query("+-*"), "")
@@ -0,0 +1,55 @@
+# Copyright (c) 2025, Flansa Team and Contributors
+# See license.txt
+
+from decimal import Decimal
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from flansa.flansa_core.report_summary_service import _contribution, bucket_value, compute_summary_buckets
+
+
+def _definition(**kwargs):
+	return dict({
+		"doctype": "Print Format",
+		"group_field": "margin_top",
+		"period": "exact",
+		"aggregate": "sum",
+		"measure_field": "margin_bottom",
+		"filters": {},
+		"field_type": "Float",
+	}, **kwargs)
+
+
+class TestReportSummaryService(FrappeTestCase):
+	def test_numeric_buckets_match_database_values(self):
+		self.assertEqual(bucket_value(5.0, "exact", "Float"), bucket_value(Decimal("5.000000000"), "exact", "Float"))
+		self.assertEqual(bucket_value(7.25, "exact", "Currency"), bucket_value(Decimal("7.250000000"), "exact", "Currency"))
+		self.assertEqual(bucket_value(3, "exact", "Int"), "3")
+
+	def test_deltas_add_up_to_a_rebuild(self):
+		for i, margin in enumerate((5, 7.25, 7.25)):
+			frappe.get_doc({
+				"doctype": "Print Format",
+				"name": f"_Test Summary Format {i}",
+				"doc_type": "ToDo",
+				"module": "Core",
+				"standard": "No",
+				"margin_top": margin,
+				"margin_bottom": i + 1,
+			}).insert()
+
+		for definition in (_definition(), _definition(filters={"margin_top": 7.25})):
+			self.assertEqual(self.apply_deltas(definition), compute_summary_buckets(definition))
+
+	def apply_deltas(self, definition):
+		"""Buckets the document hooks would build by inserting every Print Format"""
+		buckets = {}
+		for name in frappe.get_all("Print Format", pluck="name"):
+			contribution = _contribution(definition, frappe.get_doc("Print Format", name))
+			if not contribution:
+				continue
+			bucket, measure = contribution
+			row_count, sum_value = buckets.get(bucket, (0, 0))
+			buckets[bucket] = (row_count + 1, sum_value + measure)
+		return buckets
@@ -0,0 +1,64 @@
+# Copyright (c) 2025, Flansa Team and Contributors
+# See license.txt
+
+import pickle
+import time
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from flansa.flansa_core import summary_recalc_service
+from flansa.flansa_core.summary_recalc_service import (
+	DIRTY_SET_KEY,
+	LAST_CHANGE_KEY,
+	_member,
+	process_dirty_parents,
+)
+
+
+class TestSummaryRecalcService(FrappeTestCase):
+	def setUp(self):
+		self.cache = frappe.cache()
+		self.cache.delete_value(DIRTY_SET_KEY)
+		self.cache.set_value(LAST_CHANGE_KEY, 0)
+
+	def tearDown(self):
+		self.cache.delete_value([DIRTY_SET_KEY, LAST_CHANGE_KEY])
+
+	def test_dirty_parents_are_drained(self):
+		members = {_member("Test Parent", "name", "P-1"), _member("Test Parent", "name", "P-2")}
+		self.cache.sadd(DIRTY_SET_KEY, *members)
+
+		with patch.object(summary_recalc_service, "recalculate_parents") as recalculate:
+			process_dirty_parents()
+
+		recalculated = {member for call in recalculate.call_args_list for member in call.args[0]}
+		self.assertEqual(recalculated, members)
+		self.assertFalse(self.cache.smembers(DIRTY_SET_KEY))
+
+	def test_drain_batches_large_sets(self):
+		members = {_member("Test Parent", "name", f"P-{i}") for i in range(summary_recalc_service.BATCH_SIZE + 5)}
+		self.cache.sadd(DIRTY_SET_KEY, *members)
+
+		with patch.object(summary_recalc_service, "recalculate_parents") as recalculate:
+			process_dirty_parents()
+
+		self.assertEqual(recalculate.call_count, 2)
+		self.assertEqual(sum(len(call.args[0]) for call in recalculate.call_args_list), len(members))
+
+	def test_wait_sees_changes_of_other_workers(self):
+		key = self.cache.make_key(LAST_CHANGE_KEY)
+		# Another worker records a child change after this process read the key
+		self.cache.set(key, pickle.dumps(time.time()))
+
+		sleeps = []
+
+		def sleep(seconds):
+			sleeps.append(seconds)
+			self.cache.set(key, pickle.dumps(0))
+
+		with patch.object(summary_recalc_service.time, "sleep", side_effect=sleep):
+			summary_recalc_service._wait_until_quiet()
+
+		self.assertEqual(len(sleeps), 1)
@@ -0,0 +1,66 @@
+# Copyright (c) 2025, Flansa Team and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from flansa.flansa_core import usage_service
+from flansa.flansa_core.usage_service import (
+	COUNTER_DOCTYPE,
+	QuotaExceededError,
+	check_quota,
+	get_workspace_usage,
+	reconcile_workspace,
+	record_usage,
+)
+
+WORKSPACE = "_test_usage_workspace"
+
+
+class TestUsageService(FrappeTestCase):
+	def setUp(self):
+		frappe.db.delete(COUNTER_DOCTYPE, {"workspace_id": WORKSPACE})
+
+	def tearDown(self):
+		frappe.db.delete(COUNTER_DOCTYPE, {"workspace_id": WORKSPACE})
+		frappe.db.commit()
+
+	def test_striped_counters_add_up(self):
+		for _ in range(20):
+			record_usage(WORKSPACE, {"records": 2, "tables": 1})
+		record_usage(WORKSPACE, {"records": -5})
+
+		usage = get_workspace_usage(WORKSPACE)
+		self.assertEqual(usage["records"], 35)
+		self.assertEqual(usage["tables"], 20)
+
+	def test_reconcile_stores_the_difference(self):
+		# Drift: counters say 7 tables, the workspace has none
+		record_usage(WORKSPACE, {"tables": 7, "records": 3})
+		reconcile_workspace(WORKSPACE)
+
+		usage = get_workspace_usage(WORKSPACE)
+		self.assertEqual(usage["tables"], 0)
+		self.assertEqual(usage["records"], 0)
+
+	def test_reconcile_metadata_only_keeps_records(self):
+		record_usage(WORKSPACE, {"tables": 7, "records": 3})
+		reconcile_workspace(WORKSPACE, metadata_only=True)
+
+		usage = get_workspace_usage(WORKSPACE)
+		self.assertEqual(usage["tables"], 0)
+		self.assertEqual(usage["records"], 3)
+
+	def test_quota_refuses_inserts_over_the_limit(self):
+		limits = dict.fromkeys(usage_service.LIMITS, 0)
+		limits["max_tables"] = 2
+		table = frappe._dict(doctype="Flansa Table", workspace_id=WORKSPACE)
+
+		with patch.object(usage_service, "get_workspace_limits", return_value=limits):
+			record_usage(WORKSPACE, {"tables": 1})
+			check_quota(table)
+
+			record_usage(WORKSPACE, {"tables": 1})
+			self.assertRaises(QuotaExceededError, check_quota, table)
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Flansa Usage Service - per-workspace usage counters and quota checks
+
+Usage (applications, tables, relationships, reports, form configs, records,
+attached files and their bytes) is kept in Flansa Usage Counter rows instead of
+being counted on demand. Doc events add +1 / -1 with an upsert inside the
+transaction of the change itself, so a rolled back insert never counts.
+Every counter is striped over SHARD_COUNT rows picked at random, so concurrent
+inserts into one workspace do not queue on a single hot row; reading a
+workspace's usage is one indexed SUM ... GROUP BY metric.
+
+Quotas come from the Limits section of Flansa Workspace (0 = unlimited) and
+are checked in before_insert against the counters. Inserts into a workspace
+with a limit on what they count are serialized by a lock on the workspace row,
+so concurrent inserts cannot pass the same check together. max_users is not
+covered: users are not counted per workspace.
+
+Bulk paths that skip doc events (teardown, provisioning) report their deltas
+with record_usage; reconcile_usage recounts everything daily and stores the
+difference, so drift never outlives a day.
+"""
+
+import random
+
+import frappe
+from frappe import _
+
+from flansa.flansa_core.utils.instrumentation import cached_hget
+
+COUNTER_DOCTYPE = "Flansa Usage Counter"
+LIMITS_KEY = "flansa_workspace_limits"
+DOCTYPE_WORKSPACE_KEY = "flansa_usage_doctype_workspace"
+MULTI_TENANT_KEY = "flansa_multi_tenant_enabled"
+SHARD_COUNT = 8
+
+# Metadata DocTypes counted per workspace, by their workspace_id
+METADATA_METRICS = {
+    "Flansa Application": "applications",
+    "Flansa Table": "tables",
+    "Flansa Relationship": "relationships",
+    "Flansa Saved Report": "reports",
+    "Flansa Form Config": "form_configs",
+}
+METRICS = tuple(METADATA_METRICS.values()) + ("records", "files", "file_bytes")
+
+# Workspace limit field -> (metric, unit multiplier)
+LIMITS = {
+    "max_applications": ("applications", 1),
+    "max_tables": ("tables", 1),
+    "max_records": ("records", 1),
+    "max_storage_mb": ("file_bytes", 1024 * 1024),
+}
+
+
+class QuotaExceededError(frappe.ValidationError):
+    pass
+
+
+def get_workspace_usage(workspace_id):
+    """{metric: value} for every metric of a workspace, in one query"""
+    usage = dict.fromkeys(METRICS, 0)
+    for metric, value in frappe.db.sql(
+        f"""
+        SELECT `metric`, SUM(`value`) FROM `tab{COUNTER_DOCTYPE}`
+        WHERE `workspace_id` = %s GROUP BY `metric`
+        """,
+        (workspace_id,)
+    ):
+        usage[metric] = int(value or 0)
+    return usage
+
+
+def get_workspace_limits(workspace_id):
+    """{limit field: value} of a workspace from cache; 0 means unlimited"""
+
+    def _load():
+        limits = frappe.db.get_value("Flansa Workspace", workspace_id, list(LIMITS), as_dict=True)
+        return {field: int((limits or {}).get(field) or 0) for field in LIMITS}
+
+    return cached_hget(LIMITS_KEY, workspace_id, _load) or dict.fromkeys(LIMITS, 0)
+
+
+def clear_workspace_limits(doc=None, method=None):
+    """Doc event for Flansa Workspace: limits or the number of workspaces may have changed"""
+    cache = frappe.cache()
+    if doc:
+        cache.hdel(LIMITS_KEY, doc.name)
+    else:
+        cache.delete_value(LIMITS_KEY)
+    cache.delete_value(MULTI_TENANT_KEY)
+
+
+def clear_doctype_workspace(doc, method=None):
+    """Doc event for Flansa Table: its DocType may have been generated, moved or dropped"""
+    if doc.get("doctype_name"):
+        frappe.cache().hdel(DOCTYPE_WORKSPACE_KEY, doc.doctype_name)
+
+
+def is_multi_tenant(loader):
+    """Cached answer of loader() (more than one workspace); cleared by Flansa Workspace events"""
+    return bool(cached_hget(MULTI_TENANT_KEY, "enabled", loader))
+
+
+def record_usage(workspace_id, deltas):
+    """Add {metric: delta} to a workspace's counters within the current transaction"""
+    deltas = {metric: int(delta) for metric, delta in deltas.items() if delta}
+    if not workspace_id or not deltas:
+        return
+
+    shard = random.randrange(SHARD_COUNT)
+    now = frappe.utils.now()
+    rows, values = [], {"workspace_id": workspace_id, "shard": shard, "now": now, "user": frappe.session.user}
+    for i, (metric, delta) in enumerate(deltas.items()):
+        values[f"name{i}"] = f"{workspace_id}|{metric}|{shard}"
+        values[f"metric{i}"] = metric
+        values[f"delta{i}"] = delta
+        rows.append(
+            f"(%(name{i})s, %(workspace_id)s, %(metric{i})s, %(shard)s, %(delta{i})s, %(now)s, %(now)s, %(user)s, %(user)s)"
+        )
+
+    if frappe.db.db_type == "postgres":
+        upsert = f"""ON CONFLICT (`name`) DO UPDATE
+            SET `value` = `tab{COUNTER_DOCTYPE}`.`value` + EXCLUDED.`value`, `modified` = EXCLUDED.`modified`"""
+    else:
+        upsert = "ON DUPLICATE KEY UPDATE `value` = `value` + VALUES(`value`), `modified` = VALUES(`modified`)"
+
+    frappe.db.sql(
+        f"""
+        INSERT INTO `tab{COUNTER_DOCTYPE}`
+            (`name`, `workspace_id`, `metric`, `shard`, `value`, `creation`, `modified`, `owner`, `modified_by`)
+        VALUES {", ".join(rows)}
+        {upsert}
+        """,
+        values
+    )
+
+
+def check_quota(doc, method=None):
+    """Doc event (before_insert): refuse an insert that would exceed its workspace's limits"""
+    counted = _usage_of(doc, 1)
+    if not counted:
+        return
+    workspace_id, deltas = counted
+
+    limits = get_workspace_limits(workspace_id)
+    checked = {field: LIMITS[field] for field, limit in limits.items() if limit and LIMITS[field][0] in deltas}
+    if not checked:
+        return
+
+    usage = _locked_usage(workspace_id, [metric for metric, unit in checked.values()])
+    for field, (metric, unit) in checked.items():
+        if usage.get(metric, 0) + deltas[metric] > limits[field] * unit:
+            frappe.throw(
+                _("Workspace {0} has reached its limit for {1} ({2})").format(
+                    workspace_id, _(metric.replace("_", " ")), limits[field]
+                ),
+                QuotaExceededError
+            )
+
+
+@frappe.whitelist()
+def get_usage(workspace_id=None):
+    """Usage counters and limits of a workspace (default: the current one)"""
+    try:
+        from flansa.flansa_core.workspace_service import WorkspaceContext
+
+        current = WorkspaceContext.get_current_workspace_id()
+        workspace_id = workspace_id or current
+        if workspace_id != current and "System Manager" not in frappe.get_roles():
+            return {"success": False, "error": "Not permitted"}
+
+        return {
+            "success": True,
+            "workspace_id": workspace_id,
+            "usage": get_workspace_usage(workspace_id),
+            "limits": get_workspace_limits(workspace_id)
+        }
+    except Exception as e:
+        frappe.log_error(f"Error getting usage of workspace {workspace_id}: {str(e)}", "Usage Accounting")
+        return {"success": False, "error": str(e)}
+
+
+@frappe.whitelist()
+def reconcile_workspace_usage(workspace_id):
+    """Recount one workspace's usage now instead of waiting for the daily job"""
+    frappe.only_for("System Manager")
+    reconcile_workspace(workspace_id)
+    frappe.db.commit()
+    return {"success": True, "usage": get_workspace_usage(workspace_id)}
+
+
+def on_insert(doc, method=None):
+    """Doc event (after_insert): count the new document"""
+    _apply(doc, 1)
+
+
+def on_trash(doc, method=None):
+    """Doc event (on_trash): uncount the deleted document"""
+    _apply(doc, -1)
+
+
+def reconcile_usage():
+    """Scheduled job (daily): recount the usage of every workspace"""
+    for workspace_id in frappe.get_all("Flansa Workspace", pluck="name"):
+        try:
+            reconcile_workspace(workspace_id)
+            frappe.db.commit()
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Error reconciling usage of workspace {workspace_id}: {str(e)}", "Usage Accounting")
+
+
+def reconcile_workspace(workspace_id, metadata_only=False):
+    """
+    Recount a workspace's usage and store the difference to its counters
+
+    Storing the difference instead of overwriting keeps increments committed
+    while the recount ran. metadata_only skips records and files, for callers
+    that bulk-deleted metadata rows.
+    """
+    exact = dict.fromkeys(METRICS, 0)
+    for doctype, metric in METADATA_METRICS.items():
+        exact[metric] = frappe.db.count(doctype, {"workspace_id": workspace_id})
+
+    if not metadata_only:
+        doctypes = [
+            d for d in frappe.get_all(
+                "Flansa Table", filters={"workspace_id": workspace_id}, pluck="doctype_name"
+            ) if d
+        ]
+        for doctype in doctypes:
+            if frappe.db.table_exists(doctype):
+                exact["records"] += frappe.db.count(doctype)
+        if doctypes:
+            files = frappe.get_all(
+                "File",
+                filters={"attached_to_doctype": ["in", doctypes], "is_folder": 0},
+                fields=["count(*) as total", "sum(file_size) as bytes"]
+            )
+            exact["files"] = files[0].total if files else 0
+            exact["file_bytes"] = int(files[0].bytes or 0) if files else 0
+
+    current = get_workspace_usage(workspace_id)
+    metrics = METADATA_METRICS.values() if metadata_only else METRICS
+    record_usage(workspace_id, {metric: exact[metric] - current[metric] for metric in metrics})
+    _update_table_counts(workspace_id)
+
+
+def _locked_usage(workspace_id, metrics):
+    """
+    Current {metric: value} of a workspace for a quota check, serialized per workspace
+
+    The workspace row lock is held until the inserting transaction commits, so
+    a concurrent insert checks only after this one is counted; the locking read
+    of the counters sees their latest committed values. Only workspaces with a
+    limit on the metric pay for the lock.
+    """
+    frappe.db.sql("SELECT `name` FROM `tabFlansa Workspace` WHERE `name` = %s FOR UPDATE", (workspace_id,))
+    usage = dict.fromkeys(metrics, 0)
+    for metric, value in frappe.db.sql(
+        f"""
+        SELECT `metric`, `value` FROM `tab{COUNTER_DOCTYPE}`
+        WHERE `workspace_id` = %s AND `metric` IN ({", ".join(["%s"] * len(metrics))})
+        FOR UPDATE
+        """,
+        [workspace_id] + list(metrics)
+    ):
+        usage[metric] += int(value or 0)
+    return usage
+
+
+def _apply(doc, sign):
+    try:
+        counted = _usage_of(doc, sign)
+        if not counted:
+            return
+        workspace_id, deltas = counted
+        record_usage(workspace_id, deltas)
+        if doc.doctype == "Flansa Table" and doc.application:
+            # Kept next to the counter instead of counting tables on every application save
+            frappe.db.sql(
+                "UPDATE `tabFlansa Application` SET `table_count` = GREATEST(COALESCE(`table_count`, 0) + %s, 0) WHERE `name` = %s",
+                (sign, doc.application)
+            )
+    except Exception as e:
+        frappe.log_error(f"Error counting usage of {doc.doctype} {doc.name}: {str(e)}", "Usage Accounting")
+
+
+def _usage_of(doc, sign):
+    """(workspace_id, {metric: delta}) a document contributes, None if it is not counted"""
+    metric = METADATA_METRICS.get(doc.doctype)
+    if metric:
+        # Assigned by workspace_service.before_insert, which runs before the "*" events
+        workspace_id = doc.get("workspace_id")
+        return (workspace_id, {metric: sign}) if workspace_id else None
+
+    if doc.doctype == "File":
+        workspace_id = _workspace_of_doctype(doc.attached_to_doctype) if doc.attached_to_doctype else None
+        if not workspace_id or doc.is_folder:
+            return None
+        return workspace_id, {"files": sign, "file_bytes": sign * int(doc.file_size or 0)}
+
+    if doc.meta.module == "Flansa Generated":
+        workspace_id = _workspace_of_doctype(doc.doctype)
+        return (workspace_id, {"records": sign}) if workspace_id else None
+
+    return None
+
+
+def _workspace_of_doctype(doctype):
+    """Workspace of the table a generated DocType belongs to"""
+    if not doctype or doctype.startswith("Flansa ") or doctype in ("File", "DocType"):
+        return None
+    return cached_hget(
+        DOCTYPE_WORKSPACE_KEY,
+        doctype,
+        lambda: frappe.db.get_value("Flansa Table", {"doctype_name": doctype}, "workspace_id") or ""
+    ) or None
+
+
+def _update_table_counts(workspace_id):
+    frappe.db.sql(
+        """
+        UPDATE `tabFlansa Application`
+        SET `table_count` = (
+            SELECT COUNT(*) FROM `tabFlansa Table` t WHERE t.`application` = `tabFlansa Application`.`name`
+        )
+        WHERE `workspace_id` = %s
+        """,
+        (workspace_id,)
+    )
@@ -0,0 +1,102 @@
+"""
+Conditional Response - ETag / If-None-Match for metadata endpoints
+
+Table, form and report pages ask for the same schema payloads on nearly every
+navigation. Decorate such an endpoint with @conditional(version_fn): when it is
+requested over HTTP GET, version_fn(*args, **kwargs) yields a cheap version
+token (DocType and Flansa config modified stamps, metadata data versions, the
+user's roles). A request whose If-None-Match still matches is answered with an
+empty 304 before the payload is built; any other GET gets the payload with an
+ETag header. POSTs and direct Python calls are passed through unchanged.
+
+FlansaDataService.callConditional() on the client keeps the payloads and sends
+If-None-Match.
+"""
+
+import functools
+import hashlib
+
+import frappe
+
+from flansa.flansa_core.utils.instrumentation import count
+from flansa.flansa_core.utils.table_cache import get_schema_etag, get_table_info
+
+
+def conditional(version_fn):
+    """Decorator (below @frappe.whitelist()): answer unchanged GETs with 304 Not Modified"""
+
+    def decorator(fn):
+        cmd = f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            request = getattr(frappe.local, "request", None)
+            if not request or request.method != "GET" or frappe.form_dict.get("cmd") != cmd:
+                return fn(*args, **kwargs)
+
+            try:
+                parts = version_fn(*args, **kwargs)
+            except Exception as e:
+                frappe.log_error(f"Error computing version of {cmd}: {str(e)}", "Conditional Response")
+                parts = None
+            if parts is None:
+                return fn(*args, **kwargs)
+
+            etag = _make_etag(cmd, parts, args, kwargs)
+            if request.if_none_match.contains(etag):
+                count("cache_hits")
+                return _response(None, etag, status=304)
+
+            count("cache_misses")
+            payload = fn(*args, **kwargs)
+            if isinstance(payload, dict) and payload.get("success") is False:
+                return payload
+            return _response(payload, etag)
+
+        return wrapper
+
+    return decorator
+
+
+def table_metadata_version(table_name, *args, **kwargs):
+    """Version parts of a table's schema, its configs and relationships; None if it does not exist"""
+    from flansa.flansa_core.report_cache_service import METADATA_DOCTYPES, get_data_version
+
+    info = get_table_info(table_name)
+    if info:
+        parts = [get_schema_etag(table_name)]
+        if info.application:
+            # Application titles appear in the table headers
+            parts.append(frappe.db.get_value("Flansa Application", info.application, "modified"))
+    else:
+        # System DocTypes are served by some of the table endpoints as well
+        modified = frappe.db.get_value("DocType", table_name, "modified")
+        if not modified:
+            return None
+        parts = [modified]
+    return [str(part or "") for part in parts] + [get_data_version(doctype) for doctype in METADATA_DOCTYPES]
+
+
+def form_config_version(table_name, force_refresh=False):
+    """Version parts of a table's form config; force_refresh always rebuilds"""
+    return None if force_refresh else table_metadata_version(table_name)
+
+
+def _make_etag(cmd, parts, args, kwargs):
+    # Permissions and labels in the payloads depend on who asks
+    user = frappe.session.user
+    roles = ",".join(sorted(frappe.get_roles(user)))
+    arguments = [str(a) for a in args] + [f"{k}={v}" for k, v in sorted(kwargs.items())]
+    token = "|".join([cmd, user, roles, frappe.local.lang or "", *arguments, *map(str, parts)])
+    return hashlib.md5(token.encode()).hexdigest()
+
+
+def _response(payload, etag, status=200):
+    from werkzeug.wrappers import Response
+
+    body = frappe.as_json({"message": payload}) if status == 200 else None
+    response = Response(body, status=status, mimetype="application/json")
+    response.set_etag(etag)
+    # The browser must revalidate, but may keep the payload
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
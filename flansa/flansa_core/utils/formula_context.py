@@ -0,0 +1,61 @@
+"""
+Formula Context - lazy, read-only views over a document for formula evaluation
+
+Both formula engines evaluate expressions with eval(code, FUNCTIONS, context).
+FUNCTIONS is a module-level table built once at import; context is a
+DocumentContext that reads a field only when the expression names it. Nothing
+is copied per document: evaluating formulas over many records costs one small
+view object per record instead of a merged dict of fields and closures.
+
+Names that are not fields of the document raise KeyError, so eval falls back
+to the function table.
+"""
+
+from collections.abc import Mapping
+from functools import lru_cache
+
+COMPILE_CACHE_SIZE = 2048
+
+
+class DocumentContext(Mapping):
+    """Mapping view over the fields of a Document or a plain dict"""
+
+    __slots__ = ("_doc",)
+
+    def __init__(self, doc):
+        self._doc = doc
+
+    def __getitem__(self, key):
+        doc = self._doc
+        if isinstance(doc, dict):
+            value = doc[key]
+        elif key.startswith("_"):
+            raise KeyError(key)
+        else:
+            # Documents keep every field, set or not, as an instance attribute
+            value = vars(doc)[key]
+        if callable(value):
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        doc = self._doc
+        keys = doc if isinstance(doc, dict) else (k for k in vars(doc) if not k.startswith("_"))
+        return (k for k in keys if not callable(self._raw(k)))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def _raw(self, key):
+        doc = self._doc
+        return doc[key] if isinstance(doc, dict) else vars(doc)[key]
+
+    @property
+    def doc(self):
+        return self._doc
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile_expression(expression):
+    """Compiled code of an expression; the same formula is only compiled once per process"""
+    return compile(expression, "<formula>", "eval")
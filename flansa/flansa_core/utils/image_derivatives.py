@@ -0,0 +1,285 @@
+"""
+Image Derivatives - thumbnails for gallery fields
+
+Gallery fields store a JSON list of uploaded images. After a record is saved,
+a background job renders a few fixed-size derivatives of every new image with
+Pillow, stores them next to the original (same S3 key prefix or same files
+folder, named ``<name>__<size>.<ext>``) and records their URLs on the gallery
+item under ``thumbnails``. Gallery and report endpoints then serve a
+derivative instead of the full-resolution original.
+
+Derivative names are derived from the original URL, so cleanup code can find
+them without reading the gallery JSON (see derivative_urls).
+"""
+
+import io
+import json
+import os
+
+import frappe
+
+from flansa.flansa_core.job_service import enqueue_job
+
+# Longest edge in pixels for each derivative
+DERIVATIVE_SIZES = {
+    "thumb": 160,
+    "medium": 480,
+    "large": 1280,
+}
+DEFAULT_GALLERY_SIZE = "medium"
+DERIVATIVE_QUALITY = 80
+
+IMAGE_EXTENSIONS = ("jpg", "jpeg", "png", "gif", "webp", "bmp", "tif", "tiff")
+
+# Derivatives are immutable per name, browsers and CDNs may keep them
+DERIVATIVE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _derivative_format():
+    """WebP where Pillow supports it, JPEG otherwise"""
+    from PIL import features
+    return ("WEBP", "webp", "image/webp") if features.check("webp") else ("JPEG", "jpg", "image/jpeg")
+
+
+def _split_url(file_url):
+    """Original URL without query string, split into (root, extension)"""
+    base_url = file_url.split('?')[0]
+    root, ext = os.path.splitext(base_url)
+    return root, ext.lstrip('.').lower()
+
+
+def is_derivable_image(file_url):
+    if not file_url or not isinstance(file_url, str):
+        return False
+    root, ext = _split_url(file_url)
+    # Private local files are served through File permissions; derivatives would have no File row
+    if file_url.startswith('/private/') or root.endswith(tuple(f"__{size}" for size in DERIVATIVE_SIZES)):
+        return False
+    return ext in IMAGE_EXTENSIONS
+
+
+def derivative_urls(file_url):
+    """Unsigned URLs of every possible derivative of an original (for cleanup)"""
+    if not is_derivable_image(file_url):
+        return []
+    root, _ext = _split_url(file_url)
+    _fmt, ext, _mime = _derivative_format()
+    return [f"{root}__{size}.{ext}" for size in DERIVATIVE_SIZES]
+
+
+def generate_derivatives(file_url):
+    """
+    Render all derivative sizes of an image and store them next to the original
+
+    Returns:
+        {size_name: url} - empty when the file is not an image or cannot be read
+    """
+    if not is_derivable_image(file_url):
+        return {}
+
+    from PIL import Image, ImageOps
+    from flansa.flansa_core.s3_integration.s3_upload import is_s3_url
+
+    content = _read_original(file_url)
+    if not content:
+        return {}
+
+    fmt, ext, mime = _derivative_format()
+    image = Image.open(io.BytesIO(content))
+    # Let the JPEG decoder downscale while decoding - far cheaper for phone photos
+    largest = max(DERIVATIVE_SIZES.values())
+    image.draft("RGB", (largest, largest))
+    image = ImageOps.exif_transpose(image)
+    if fmt == "JPEG":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if image.mode in ("P", "LA", "PA") else "RGB")
+
+    root, _ext = _split_url(file_url)
+    urls = {}
+    # Largest first, each smaller size is resized from the previous one
+    for size_name, edge in sorted(DERIVATIVE_SIZES.items(), key=lambda item: -item[1]):
+        image.thumbnail((edge, edge), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if fmt == "WEBP":
+            image.save(buffer, fmt, quality=DERIVATIVE_QUALITY, method=4)
+        else:
+            image.save(buffer, fmt, quality=DERIVATIVE_QUALITY, optimize=True)
+
+        target = f"{root}__{size_name}.{ext}"
+        if is_s3_url(file_url):
+            urls[size_name] = _store_s3_derivative(target, buffer.getvalue(), mime)
+        else:
+            urls[size_name] = _store_local_derivative(target, buffer.getvalue())
+
+    return {size: url for size, url in urls.items() if url}
+
+
+def _read_original(file_url):
+    from flansa.flansa_core.s3_integration.s3_upload import is_s3_url, parse_s3_url, get_configured_s3_client
+
+    if is_s3_url(file_url):
+        s3_client = get_configured_s3_client(frappe.get_site_config())
+        if not s3_client:
+            return None
+        bucket_name, s3_key = parse_s3_url(file_url)
+        return s3_client.get_object(Bucket=bucket_name, Key=s3_key)['Body'].read()
+
+    path = _local_path(file_url)
+    if path and os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    return None
+
+
+def _local_path(file_url):
+    if '..' in file_url or not file_url.startswith('/files/'):
+        return None
+    return frappe.get_site_path('public', 'files', file_url[len('/files/'):])
+
+
+def _store_local_derivative(target_url, content):
+    path = _local_path(target_url)
+    if not path:
+        return None
+    with open(path, 'wb') as f:
+        f.write(content)
+    return target_url
+
+
+def _store_s3_derivative(target_url, content, content_type):
+    """Upload next to the original and return a presigned URL like the original's"""
+    from flansa.flansa_core.s3_integration.s3_upload import parse_s3_url, get_configured_s3_client
+
+    s3_client = get_configured_s3_client(frappe.get_site_config())
+    if not s3_client:
+        return None
+
+    bucket_name, s3_key = parse_s3_url(target_url)
+    s3_client.put_object(
+        Bucket=bucket_name,
+        Key=s3_key,
+        Body=content,
+        ContentType=content_type,
+        CacheControl=DERIVATIVE_CACHE_CONTROL
+    )
+    return s3_client.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': bucket_name, 'Key': s3_key},
+        ExpiresIn=604800  # Same 7 day expiry as uploaded originals
+    )
+
+
+def _parse_gallery(value):
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    try:
+        parsed = json.loads(value)
+    except (TypeError, ValueError):
+        return []
+    if isinstance(parsed, dict):
+        return [parsed]
+    return parsed if isinstance(parsed, list) else []
+
+
+def _needs_derivatives(item):
+    return isinstance(item, dict) and not item.get("thumbnails") and is_derivable_image(item.get("file_url"))
+
+
+def gallery_needs_thumbnails(value):
+    """True when a gallery value has images without derivatives"""
+    return any(_needs_derivatives(item) for item in _parse_gallery(value))
+
+
+def get_gallery_fields(doctype_name):
+    """Fieldnames of Flansa gallery fields in a DocType"""
+    gallery_fields = []
+    for field in frappe.get_meta(doctype_name).get("fields"):
+        description = field.description or ""
+        if field.fieldtype in ("Long Text", "JSON") and '"gallery"' in description:
+            try:
+                if json.loads(description).get("flansa_config", {}).get("field_type") == "gallery":
+                    gallery_fields.append(field.fieldname)
+            except (TypeError, ValueError, AttributeError):
+                continue
+    return gallery_fields
+
+
+def queue_gallery_thumbnails(doc, method=None):
+    """Doc event: enqueue derivative generation for new gallery images"""
+    try:
+        if doc.meta.module != "Flansa Generated":
+            return
+
+        for fieldname in get_gallery_fields(doc.doctype):
+            if gallery_needs_thumbnails(doc.get(fieldname)):
+                enqueue_gallery_thumbnails(doc.doctype, doc.name, fieldname)
+    except Exception as e:
+        frappe.log_error(f"Error queueing gallery thumbnails for {doc.doctype} {doc.name}: {str(e)}", "Image Derivatives")
+
+
+def enqueue_gallery_thumbnails(doctype_name, docname, fieldname):
+    enqueue_job(
+        'flansa.flansa_core.utils.image_derivatives.generate_gallery_thumbnails',
+        'maintenance',
+        job_key=f"gallery_thumbnails_{doctype_name}_{docname}_{fieldname}",
+        timeout=600,
+        after_commit=True,
+        doctype_name=doctype_name,
+        docname=docname,
+        fieldname=fieldname
+    )
+
+
+def generate_gallery_thumbnails(doctype_name, docname, fieldname):
+    """Background job: render derivatives for a gallery field and record them in its JSON"""
+    value = frappe.db.get_value(doctype_name, docname, fieldname)
+    generated = {}
+    for item in _parse_gallery(value):
+        if _needs_derivatives(item) and item["file_url"] not in generated:
+            try:
+                generated[item["file_url"]] = generate_derivatives(item["file_url"])
+            except Exception as e:
+                frappe.log_error(f"Error generating thumbnails for {item['file_url']}: {str(e)}", "Image Derivatives")
+
+    generated = {url: thumbs for url, thumbs in generated.items() if thumbs}
+    if not generated:
+        return
+
+    # Re-read right before writing so edits made while rendering are kept
+    items = _parse_gallery(frappe.db.get_value(doctype_name, docname, fieldname, for_update=True))
+    for item in items:
+        if isinstance(item, dict) and item.get("file_url") in generated:
+            item["thumbnails"] = generated[item["file_url"]]
+
+    frappe.db.set_value(doctype_name, docname, fieldname, json.dumps(items), update_modified=False)
+    frappe.db.commit()
+    frappe.clear_document_cache(doctype_name, docname)
+
+
+def with_thumbnail_urls(value, size=DEFAULT_GALLERY_SIZE):
+    """
+    Point gallery items at a derivative for display
+
+    Items with a derivative of the requested size get it as file_url and keep
+    the original under original_url. size="original" returns the value as is.
+    Strings stay strings, so callers that pass raw JSON through keep working.
+    """
+    if not value or size == "original" or size not in DERIVATIVE_SIZES:
+        return value
+    if isinstance(value, str) and not value.lstrip().startswith(('[', '{')):
+        return value
+
+    items = _parse_gallery(value)
+    if not any(isinstance(item, dict) and item.get("thumbnails") for item in items):
+        return value
+
+    display_items = []
+    for item in items:
+        if isinstance(item, dict) and (item.get("thumbnails") or {}).get(size):
+            item = dict(item, original_url=item.get("file_url"), file_url=item["thumbnails"][size])
+        display_items.append(item)
+
+    return json.dumps(display_items) if isinstance(value, str) else display_items
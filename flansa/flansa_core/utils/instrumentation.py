@@ -0,0 +1,272 @@
+"""
+Flansa Instrumentation - request-scoped timing, query and cache counters
+
+Wrap an endpoint or hook with @instrument() (or a block with measure(name)) to
+record its wall time, database query count/time, cache hits/misses and logic
+evaluations. Only a sample of requests is measured; the measured ones are
+aggregated per name in frappe.cache() and served by the stats endpoints in
+flansa_core/api/performance_api.py.
+
+Site config:
+    flansa_instrumentation              "off", "basic" (default) or "debug"
+    flansa_instrumentation_sample_rate  share of requests measured at "basic" (default 0.1)
+
+At "debug" every request is measured and debug_log() messages are written to
+the flansa logger; at any other level debug_log() is a no-op.
+"""
+
+import functools
+import random
+import time
+from contextlib import contextmanager
+
+import frappe
+
+# One hash of counters per measured name, plus the set of names and a sorted set of max latencies
+STATS_CACHE_KEY = "flansa_instrumentation_stats"
+STATS_NAMES_KEY = "flansa_instrumentation_names"
+STATS_MAX_KEY = "flansa_instrumentation_max_ms"
+
+LEVELS = {"off": 0, "basic": 1, "debug": 2}
+DEFAULT_LEVEL = "basic"
+DEFAULT_SAMPLE_RATE = 0.1
+
+# Upper bounds (ms) of the latency histogram exported to Prometheus
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+COUNTERS = ("queries", "query_ms", "cache_hits", "cache_misses", "logic_evaluations")
+FLOAT_COUNTERS = ("query_ms",)
+
+
+class _RequestMetrics:
+    """Counters of the sampled request running on this thread"""
+
+    __slots__ = ("queries", "query_ms", "cache_hits", "cache_misses", "logic_evaluations", "depth", "original_sql")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.logic_evaluations = 0
+        self.depth = 0
+        self.original_sql = None
+
+    def snapshot(self):
+        return tuple(getattr(self, counter) for counter in COUNTERS)
+
+
+def get_level():
+    return LEVELS.get(frappe.conf.get("flansa_instrumentation") or DEFAULT_LEVEL, LEVELS[DEFAULT_LEVEL])
+
+
+def get_sample_rate():
+    if get_level() >= LEVELS["debug"]:
+        return 1.0
+    try:
+        return min(max(float(frappe.conf.get("flansa_instrumentation_sample_rate", DEFAULT_SAMPLE_RATE)), 0.0), 1.0)
+    except (TypeError, ValueError):
+        return DEFAULT_SAMPLE_RATE
+
+
+def debug_log(message):
+    """Replacement for unconditional debug prints on hot paths"""
+    if get_level() >= LEVELS["debug"]:
+        frappe.logger("flansa").info(message)
+
+
+def count(counter, amount=1):
+    """Add to a counter of the sampled request (no-op when the request is not sampled)"""
+    metrics = getattr(frappe.local, "flansa_metrics", None)
+    if metrics is not None:
+        setattr(metrics, counter, getattr(metrics, counter) + amount)
+
+
+def cached_hget(key, field, generator):
+    """frappe.cache().hget with a generator, counting the lookup as a hit or a miss"""
+    missed = []
+
+    def _load():
+        missed.append(True)
+        return generator()
+
+    value = frappe.cache().hget(key, field, generator=_load)
+    count("cache_misses" if missed else "cache_hits")
+    return value
+
+
+@contextmanager
+def measure(name):
+    """Measure a block; nested blocks are recorded under their own name as well"""
+    metrics = getattr(frappe.local, "flansa_metrics", None)
+    if metrics is None:
+        if get_level() == LEVELS["off"] or random.random() >= get_sample_rate():
+            yield
+            return
+        metrics = frappe.local.flansa_metrics = _RequestMetrics()
+        _install_query_counter(metrics)
+
+    metrics.depth += 1
+    before = metrics.snapshot()
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        metrics.depth -= 1
+        if metrics.depth == 0:
+            _remove_query_counter(metrics)
+            frappe.local.flansa_metrics = None
+        deltas = {counter: after - start for counter, start, after in zip(COUNTERS, before, metrics.snapshot())}
+        _record(name, elapsed_ms, deltas, failed)
+
+
+@contextmanager
+def capture():
+    """
+    Measure a block regardless of level and sampling and yield its counters
+
+    Used by the benchmark suite; instrumented calls inside the block are still
+    recorded under their own names.
+    """
+    if getattr(frappe.local, "flansa_metrics", None) is not None:
+        raise RuntimeError("capture() cannot be nested inside a measured request")
+
+    metrics = frappe.local.flansa_metrics = _RequestMetrics()
+    _install_query_counter(metrics)
+    metrics.depth += 1
+    try:
+        yield metrics
+    finally:
+        metrics.depth -= 1
+        _remove_query_counter(metrics)
+        frappe.local.flansa_metrics = None
+
+
+def instrument(name=None):
+    """Decorator form of measure(); the name defaults to module.function"""
+
+    def decorator(fn):
+        metric_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with measure(metric_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _install_query_counter(metrics):
+    # Same approach as frappe.recorder: shadow frappe.db.sql on the connection object
+    metrics.original_sql = frappe.db.sql
+
+    def sql(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return metrics.original_sql(*args, **kwargs)
+        finally:
+            metrics.queries += 1
+            metrics.query_ms += (time.perf_counter() - started) * 1000
+
+    frappe.db.sql = sql
+
+
+def _remove_query_counter(metrics):
+    if metrics.original_sql is None:
+        return
+    if "sql" in vars(frappe.db):
+        del frappe.db.sql
+    if frappe.db.sql != metrics.original_sql:
+        frappe.db.sql = metrics.original_sql
+    metrics.original_sql = None
+
+
+def _record(name, elapsed_ms, deltas, failed):
+    """Fold one measurement into the aggregated stats of a name"""
+    try:
+        cache = frappe.cache()
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                break
+        else:
+            index = len(LATENCY_BUCKETS_MS)
+
+        # Atomic increments, so concurrent workers never overwrite each other's samples
+        pipe = cache.pipeline(transaction=False)
+        key = cache.make_key(_stats_key(name))
+        pipe.sadd(cache.make_key(STATS_NAMES_KEY), name)
+        pipe.hincrby(key, "count", 1)
+        if failed:
+            pipe.hincrby(key, "errors", 1)
+        pipe.hincrbyfloat(key, "total_ms", elapsed_ms)
+        for counter, delta in deltas.items():
+            if counter in FLOAT_COUNTERS:
+                pipe.hincrbyfloat(key, counter, delta)
+            elif delta:
+                pipe.hincrby(key, counter, delta)
+        pipe.hincrby(key, f"bucket_{index}", 1)
+        # ZADD GT keeps the larger score: an atomic max
+        pipe.zadd(cache.make_key(STATS_MAX_KEY), {name: elapsed_ms}, gt=True)
+        pipe.execute()
+    except Exception as e:
+        # Instrumentation must never break the request it measures
+        frappe.logger("flansa").warning(f"Could not record instrumentation for {name}: {str(e)}")
+
+
+def _stats_key(name):
+    return f"{STATS_CACHE_KEY}:{name}"
+
+
+def _empty_stats():
+    stats = {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+    stats.update({counter: 0 for counter in COUNTERS})
+    # One slot per bucket plus +Inf
+    stats["buckets"] = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    return stats
+
+
+def _parse_stats(fields, max_ms):
+    stats = _empty_stats()
+    for field, value in fields.items():
+        field = frappe.safe_decode(field)
+        if field.startswith("bucket_"):
+            stats["buckets"][int(field[len("bucket_"):])] = int(value)
+        elif field in stats:
+            stats[field] = float(value) if field in ("total_ms", *FLOAT_COUNTERS) else int(value)
+    stats["max_ms"] = float(max_ms or 0)
+    return stats
+
+
+def get_stats():
+    """Aggregated stats of every measured name"""
+    cache = frappe.cache()
+    # smembers adds the site prefix itself; the pipeline below does not
+    names = sorted(frappe.safe_decode(name) for name in cache.smembers(STATS_NAMES_KEY) or [])
+    if not names:
+        return {}
+
+    pipe = cache.pipeline(transaction=False)
+    for name in names:
+        pipe.hgetall(cache.make_key(_stats_key(name)))
+        pipe.zscore(cache.make_key(STATS_MAX_KEY), name)
+    results = pipe.execute()
+
+    return {
+        name: _parse_stats(results[2 * i], results[2 * i + 1])
+        for i, name in enumerate(names)
+        if results[2 * i]
+    }
+
+
+def reset_stats():
+    cache = frappe.cache()
+    names = [frappe.safe_decode(name) for name in cache.smembers(STATS_NAMES_KEY) or []]
+    keys = [cache.make_key(_stats_key(name)) for name in names]
+    cache.delete(*keys, cache.make_key(STATS_NAMES_KEY), cache.make_key(STATS_MAX_KEY))
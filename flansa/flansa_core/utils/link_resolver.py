@@ -0,0 +1,145 @@
+"""
+Link Resolver - set-based resolution of FETCH() and LOOKUP() logic fields
+
+FETCH(link_field, target_field) and LOOKUP(doctype, key_field, target_field)
+both read a field of the record a value points to. Instead of a get_value per
+record and field, callers hand the resolver every record they are about to
+calculate: it collects the link values, groups them by target DocType and
+loads all needed target fields with one IN (...) query per target.
+
+Loaded rows are kept in a per-request identity map (frappe.local), so a save
+that evaluates several FETCH fields over the same link, or a backfill batch
+whose records share parents, reads each target row once. The map forgets a
+row when that document is updated or deleted.
+"""
+
+import frappe
+
+IDENTITY_MAP_ATTR = "flansa_link_rows"
+STANDARD_FIELDS = {"name", "owner", "creation", "modified", "modified_by", "docstatus", "idx"}
+
+
+def parse_link_expression(doctype, expression):
+    """
+    Target of a FETCH or LOOKUP expression as {"doctype", "key_field", "target_field"}
+
+    Returns None for other expressions and for links that cannot be resolved.
+    """
+    from flansa.flansa_core.api.table_api import extract_function_args
+
+    expression_upper = (expression or "").upper()
+    if "FETCH(" in expression_upper:
+        args = extract_function_args('FETCH', expression)
+        if len(args) < 2:
+            return None
+        link_field = frappe.get_meta(doctype).get_field(args[0])
+        if not link_field or link_field.fieldtype != 'Link' or not link_field.options:
+            return None
+        return {"doctype": link_field.options, "key_field": args[0], "target_field": args[1]}
+
+    if "LOOKUP(" in expression_upper:
+        args = extract_function_args('LOOKUP', expression)
+        if len(args) < 3:
+            return None
+        return {"doctype": args[0], "key_field": args[1], "target_field": args[2]}
+
+    return None
+
+
+def prefetch_link_values(doctype, records, expressions):
+    """Load every target row the expressions need for these records, one query per target DocType"""
+    needed = {}
+    for expression in expressions:
+        spec = parse_link_expression(doctype, expression)
+        if not spec:
+            continue
+        keys = {str(value) for value in (_get(record, spec["key_field"]) for record in records) if value}
+        if keys:
+            target = needed.setdefault(spec["doctype"], {"names": set(), "fields": set()})
+            target["names"].update(keys)
+            target["fields"].add(spec["target_field"])
+
+    for target_doctype, target in needed.items():
+        load_rows(target_doctype, target["names"], target["fields"])
+
+
+def get_link_value(doc, expression, doctype=None):
+    """Value a FETCH or LOOKUP expression yields for doc, loading its target row if it is not prefetched"""
+    spec = parse_link_expression(doctype or _get(doc, "doctype"), expression)
+    if not spec:
+        return None
+
+    key = _get(doc, spec["key_field"])
+    if not key:
+        return None
+
+    key = str(key)
+    row = _identity_map().get((spec["doctype"], key))
+    if row is None or spec["target_field"] not in row:
+        load_rows(spec["doctype"], {key}, {spec["target_field"]})
+        row = _identity_map().get((spec["doctype"], key)) or {}
+    return row.get(spec["target_field"])
+
+
+def get_row(doctype, name):
+    """Row loaded earlier by load_rows or prefetch_link_values, None if it is not in the identity map"""
+    return _identity_map().get((doctype, str(name)))
+
+
+def forget_document(doc, method=None):
+    """Doc event: drop a changed or deleted document from the identity map"""
+    rows = getattr(frappe.local, IDENTITY_MAP_ATTR, None)
+    if rows:
+        rows.pop((doc.doctype, str(doc.name)), None)
+
+
+def clear_identity_map():
+    if hasattr(frappe.local, IDENTITY_MAP_ATTR):
+        delattr(frappe.local, IDENTITY_MAP_ATTR)
+
+
+def load_rows(doctype, names, fields):
+    """Fetch the missing (name, field) pairs of a target DocType with a single IN query"""
+    rows = _identity_map()
+    names = {str(name) for name in names if name}
+    fields = _valid_fields(doctype, fields)
+    missing = {
+        name for name in names
+        if (doctype, name) not in rows or not fields.issubset(rows[(doctype, name)])
+    }
+    if not missing or not fields:
+        return
+
+    # Fields already known for some rows are loaded again, keeping it to one query
+    wanted = set(fields)
+    for name in missing:
+        wanted.update(rows.get((doctype, name), {}))
+    wanted.discard("name")
+
+    loaded = frappe.get_all(doctype, filters={"name": ["in", list(missing)]}, fields=["name", *sorted(wanted)])
+    # Keys are compared as strings: link values are text, autoincrement names are not
+    for row in loaded:
+        rows[(doctype, str(row.name))] = dict(row)
+    # Names that do not exist resolve to None without another query
+    for name in missing - {str(row.name) for row in loaded}:
+        rows[(doctype, name)] = dict.fromkeys(wanted, None)
+
+
+def _valid_fields(doctype, fields):
+    try:
+        meta = frappe.get_meta(doctype)
+    except frappe.DoesNotExistError:
+        return set()
+    return {f for f in fields if f in STANDARD_FIELDS or meta.has_field(f)}
+
+
+def _identity_map():
+    rows = getattr(frappe.local, IDENTITY_MAP_ATTR, None)
+    if rows is None:
+        rows = {}
+        setattr(frappe.local, IDENTITY_MAP_ATTR, rows)
+    return rows
+
+
+def _get(record, fieldname):
+    return record.get(fieldname) if isinstance(record, dict) else getattr(record, fieldname, None)
@@ -0,0 +1,252 @@
+"""
+Query Inspector - query budgets and N+1 detection for Flansa endpoints
+
+While a Flansa whitelisted method runs with the inspector enabled, every
+frappe.db.sql call is counted and fingerprinted (literals stripped, IN lists
+collapsed). A fingerprint repeated N_PLUS_ONE_THRESHOLD times in one request
+is reported as a likely N+1 pattern together with the Flansa stack frames
+that issued it. Endpoints may declare a budget with @query_budget(n); going
+over it is reported (and logged), and raises in strict mode.
+
+Site config:
+    flansa_query_inspector        "off" (default), "on" (every Flansa request) or
+                                  "header" (only requests sending X-Flansa-Inspect-Queries: 1)
+    flansa_query_budget_strict    raise QueryBudgetExceeded when a budget is exceeded
+
+The benchmark suite enables the inspector through inspect_queries().
+"""
+
+import functools
+import re
+import traceback
+from contextlib import contextmanager
+
+import frappe
+
+FINDINGS_CACHE_KEY = "flansa_query_inspector_findings"
+INSPECT_HEADER = "X-Flansa-Inspect-Queries"
+
+N_PLUS_ONE_THRESHOLD = 10
+STACK_SAMPLE_DEPTH = 6
+MAX_FINDINGS_PER_ENDPOINT = 20
+
+# Registered budgets, "module.function" -> max queries
+QUERY_BUDGETS = {}
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(frappe.ValidationError):
+    pass
+
+
+class _Inspection:
+    """Query log of one inspected request or block"""
+
+    __slots__ = ("endpoint", "queries", "fingerprints", "findings", "budgets", "original_sql")
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.queries = 0
+        self.fingerprints = {}
+        self.findings = []
+        # Stack of (name, budget, queries at entry) for the budgeted calls in progress
+        self.budgets = []
+        self.original_sql = None
+
+    def summary(self):
+        repeated = sorted(
+            ((fp, n) for fp, n in self.fingerprints.items() if n > 1),
+            key=lambda item: -item[1]
+        )
+        return {
+            "endpoint": self.endpoint,
+            "queries": self.queries,
+            "distinct_queries": len(self.fingerprints),
+            "top_repeated": [{"fingerprint": fp, "count": n} for fp, n in repeated[:5]],
+            "findings": self.findings,
+        }
+
+
+def fingerprint(query):
+    """Shape of a statement with literals and IN lists collapsed"""
+    query = _STRING_LITERAL.sub("?", str(query))
+    query = _NUMBER_LITERAL.sub("?", query)
+    query = _IN_LIST.sub("IN (?)", query)
+    return _WHITESPACE.sub(" ", query).strip()[:500]
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of queries a call may issue"""
+
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+        QUERY_BUDGETS[name] = max_queries
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            inspection = getattr(frappe.local, "flansa_query_inspection", None)
+            if inspection is None:
+                return fn(*args, **kwargs)
+
+            inspection.budgets.append((name, max_queries, inspection.queries))
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _, _, entry_queries = inspection.budgets.pop()
+                used = inspection.queries - entry_queries
+                if used > max_queries:
+                    _add_finding(inspection, {
+                        "type": "budget",
+                        "function": name,
+                        "budget": max_queries,
+                        "queries": used,
+                    })
+
+        return wrapper
+
+    return decorator
+
+
+def is_enabled_for_request():
+    mode = frappe.conf.get("flansa_query_inspector") or "off"
+    if mode == "on":
+        return True
+    if mode == "header" and frappe.session.user != "Guest":
+        request = getattr(frappe.local, "request", None)
+        return bool(request and request.headers.get(INSPECT_HEADER) == "1")
+    return False
+
+
+def start_request_inspection():
+    """before_request hook: inspect Flansa whitelisted methods when enabled"""
+    try:
+        cmd = (frappe.form_dict or {}).get("cmd") or _method_from_path()
+        if not cmd or not cmd.startswith("flansa.") or not is_enabled_for_request():
+            return
+        _start(cmd)
+    except Exception as e:
+        frappe.logger("flansa").warning(f"Query inspector could not start: {str(e)}")
+
+
+def finish_request_inspection(response=None, request=None):
+    """after_request hook: record findings and expose the query count"""
+    inspection = getattr(frappe.local, "flansa_query_inspection", None)
+    if inspection is None:
+        return
+
+    _stop(inspection)
+    if response is not None:
+        response.headers["X-Flansa-Query-Count"] = str(inspection.queries)
+        response.headers["X-Flansa-Query-Findings"] = str(len(inspection.findings))
+    if inspection.findings:
+        _store_findings(inspection)
+
+
+@contextmanager
+def inspect_queries(name):
+    """Inspect a block outside of a web request (benchmarks, tests) and yield its inspection"""
+    if getattr(frappe.local, "flansa_query_inspection", None) is not None:
+        raise RuntimeError("inspect_queries() cannot be nested")
+
+    inspection = _start(name)
+    try:
+        yield inspection
+    finally:
+        _stop(inspection)
+
+
+def get_findings():
+    return {
+        frappe.safe_decode(endpoint): findings
+        for endpoint, findings in (frappe.cache().hgetall(FINDINGS_CACHE_KEY) or {}).items()
+    }
+
+
+def clear_findings():
+    frappe.cache().delete_value(FINDINGS_CACHE_KEY)
+
+
+def _method_from_path():
+    request = getattr(frappe.local, "request", None)
+    path = getattr(request, "path", "") or ""
+    for prefix in ("/api/method/", "/api/v1/method/", "/api/v2/method/"):
+        if path.startswith(prefix):
+            return path[len(prefix):]
+    return None
+
+
+def _start(endpoint):
+    inspection = frappe.local.flansa_query_inspection = _Inspection(endpoint)
+    # Same approach as frappe.recorder: shadow frappe.db.sql on the connection object
+    inspection.original_sql = frappe.db.sql
+
+    def sql(query, *args, **kwargs):
+        _on_query(inspection, query)
+        return inspection.original_sql(query, *args, **kwargs)
+
+    frappe.db.sql = sql
+    return inspection
+
+
+def _stop(inspection):
+    frappe.local.flansa_query_inspection = None
+    if inspection.original_sql is None:
+        return
+    if "sql" in vars(frappe.db):
+        del frappe.db.sql
+    if frappe.db.sql != inspection.original_sql:
+        frappe.db.sql = inspection.original_sql
+    inspection.original_sql = None
+
+
+def _on_query(inspection, query):
+    inspection.queries += 1
+    shape = fingerprint(query)
+    seen = inspection.fingerprints.get(shape, 0) + 1
+    inspection.fingerprints[shape] = seen
+
+    if seen == N_PLUS_ONE_THRESHOLD:
+        _add_finding(inspection, {
+            "type": "n_plus_one",
+            "fingerprint": shape,
+            "count": seen,
+            "stack": _stack_sample(),
+        })
+
+    for name, budget, entry_queries in inspection.budgets:
+        if inspection.queries - entry_queries == budget + 1 and frappe.conf.get("flansa_query_budget_strict"):
+            raise QueryBudgetExceeded(f"{name} exceeded its query budget of {budget}")
+
+
+def _add_finding(inspection, finding):
+    if len(inspection.findings) < MAX_FINDINGS_PER_ENDPOINT:
+        inspection.findings.append(finding)
+
+
+def _stack_sample():
+    """The innermost Flansa frames that issued the query"""
+    frames = [
+        f"{frame.filename.split('/flansa/', 1)[-1]}:{frame.lineno} {frame.name}"
+        for frame in traceback.extract_stack()
+        if "/flansa/" in frame.filename and "query_inspector" not in frame.filename
+    ]
+    return frames[-STACK_SAMPLE_DEPTH:]
+
+
+def _store_findings(inspection):
+    """Keep the latest findings per endpoint and log budget overruns"""
+    try:
+        frappe.cache().hset(FINDINGS_CACHE_KEY, inspection.endpoint, inspection.summary())
+        # Logger rather than Error Log: the request transaction is already closed here
+        for finding in inspection.findings:
+            if finding["type"] == "budget":
+                frappe.logger("flansa").warning(
+                    f"Query budget exceeded in {inspection.endpoint}: {finding['function']} "
+                    f"used {finding['queries']} queries (budget {finding['budget']})"
+                )
+    except Exception as e:
+        frappe.logger("flansa").warning(f"Could not store query findings for {inspection.endpoint}: {str(e)}")
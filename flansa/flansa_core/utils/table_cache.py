@@ -0,0 +1,179 @@
+"""
+Table Cache - shared, Redis-backed lookups for per-table metadata
+
+Record, form and report endpoints all need the same handful of facts about a
+Flansa Table (its DocType, application, logic fields, link display config).
+These helpers serve them from frappe.cache() and are invalidated by doc events
+registered in hooks.py.
+"""
+
+import hashlib
+
+import frappe
+
+from flansa.flansa_core.utils.instrumentation import cached_hget, count
+
+TABLE_INFO_KEY = "flansa_table_info"
+LOGIC_FIELDS_KEY = "flansa_table_logic_fields"
+LINK_DISPLAY_KEY = "flansa_table_link_display"
+RECORD_SCHEMA_KEY = "flansa_record_schema"
+
+_TABLE_CACHE_KEYS = (TABLE_INFO_KEY, LOGIC_FIELDS_KEY, LINK_DISPLAY_KEY, RECORD_SCHEMA_KEY)
+
+
+def get_table_info(table_name):
+    """Get the basic Flansa Table row (doctype, application, labels) from cache"""
+
+    def _load():
+        info = frappe.db.get_value(
+            "Flansa Table",
+            table_name,
+            ["name", "table_name", "table_label", "doctype_name", "application", "workspace_id"],
+            as_dict=True,
+        )
+        return dict(info) if info else None
+
+    info = cached_hget(TABLE_INFO_KEY, table_name, _load)
+    return frappe._dict(info) if info else None
+
+
+def get_active_logic_fields(table_name):
+    """Get active Flansa Logic Field rows for a table from cache"""
+
+    def _load():
+        return [
+            dict(row)
+            for row in frappe.get_all(
+                "Flansa Logic Field",
+                filters={"table_name": table_name, "is_active": 1},
+                fields=[
+                    "name", "field_name", "logic_expression", "logic_type",
+                    "result_type", "link_target_doctype", "link_display_field",
+                ],
+            )
+        ]
+
+    return [frappe._dict(row) for row in cached_hget(LOGIC_FIELDS_KEY, table_name, _load) or []]
+
+
+def get_link_display_config(table_name):
+    """Get {fieldname: {"doctype": target, "display_field": field}} for link fields with a display field"""
+
+    def _load():
+        info = get_table_info(table_name)
+        if not info or not info.doctype_name or not frappe.db.exists("DocType", info.doctype_name):
+            return {}
+
+        meta = frappe.get_meta(info.doctype_name)
+        config = {}
+        for logic_field in get_active_logic_fields(table_name):
+            if logic_field.logic_type != "link" or not logic_field.link_display_field:
+                continue
+
+            df = meta.get_field(logic_field.field_name)
+            target = (df.options if df and df.fieldtype == "Link" else None) or logic_field.link_target_doctype
+            if target:
+                config[logic_field.field_name] = {
+                    "doctype": target,
+                    "display_field": logic_field.link_display_field,
+                }
+        return config
+
+    return cached_hget(LINK_DISPLAY_KEY, table_name, _load) or {}
+
+
+def resolve_link_display_values(table_name, record):
+    """Resolve display values for all configured link fields of a record
+
+    Values are grouped by target DocType so each target costs one query.
+    """
+    config = get_link_display_config(table_name)
+    if not config:
+        return {}
+
+    wanted = {}
+    for fieldname, link in config.items():
+        value = record.get(fieldname)
+        if value:
+            target = wanted.setdefault(link["doctype"], {"names": set(), "fields": set()})
+            target["names"].add(value)
+            target["fields"].add(link["display_field"])
+
+    fetched = {}
+    for doctype, target in wanted.items():
+        try:
+            rows = frappe.get_all(
+                doctype,
+                filters={"name": ["in", list(target["names"])]},
+                fields=["name"] + sorted(target["fields"]),
+            )
+            fetched[doctype] = {row.name: row for row in rows}
+        except Exception as e:
+            frappe.log_error(f"Error resolving link display values from {doctype}: {str(e)}", "Table Cache")
+
+    display_values = {}
+    for fieldname, link in config.items():
+        value = record.get(fieldname)
+        row = fetched.get(link["doctype"], {}).get(value) if value else None
+        if row and row.get(link["display_field"]):
+            display_values[fieldname] = row.get(link["display_field"])
+    return display_values
+
+
+def get_schema_etag(table_name):
+    """Get a version token for a table's schema
+
+    Built from the modified timestamps of the DocType, the Flansa Table, its Form
+    Config and its Logic Fields in a single query.
+    """
+    info = get_table_info(table_name)
+    if not info:
+        return None
+
+    row = frappe.db.sql(
+        """
+        SELECT
+            (SELECT `modified` FROM `tabDocType` WHERE `name` = %(doctype)s),
+            (SELECT `modified` FROM `tabFlansa Table` WHERE `name` = %(table)s),
+            (SELECT `modified` FROM `tabFlansa Form Config` WHERE `name` = %(table)s),
+            (SELECT MAX(`modified`) FROM `tabFlansa Logic Field` WHERE `table_name` = %(table)s)
+        """,
+        {"doctype": info.doctype_name or "", "table": table_name},
+    )
+    parts = [table_name] + [str(value or "") for value in (row[0] if row else ())]
+    return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+
+def get_cached_schema(table_name, etag, builder):
+    """Return the schema payload cached for etag, rebuilding it with builder() on a miss"""
+    cached = frappe.cache().hget(RECORD_SCHEMA_KEY, table_name)
+    if cached and cached.get("etag") == etag:
+        count("cache_hits")
+        return cached.get("schema")
+
+    count("cache_misses")
+    schema = builder()
+    if schema is not None:
+        frappe.cache().hset(RECORD_SCHEMA_KEY, table_name, {"etag": etag, "schema": schema})
+    return schema
+
+
+def clear_table_cache(table_name=None):
+    """Clear cached metadata for one table, or for all tables"""
+    cache = frappe.cache()
+    for key in _TABLE_CACHE_KEYS:
+        if table_name:
+            cache.hdel(key, table_name)
+        else:
+            cache.delete_value(key)
+
+
+def on_table_metadata_change(doc, method=None):
+    """Doc event: invalidate table caches when a table or its config changes"""
+    try:
+        if doc.doctype == "Flansa Table":
+            clear_table_cache(doc.name)
+        else:
+            clear_table_cache(doc.get("table_name"))
+    except Exception as e:
+        frappe.log_error(f"Error clearing table cache: {str(e)}", "Table Cache")
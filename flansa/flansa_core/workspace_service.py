@@ -335,8 +335,9 @@ def get_workspace_tables(app_id: str, workspace_id: Optional[str] = None) -> lis
 def is_multi_tenant_enabled() -> bool:
     """Check if multi-tenant mode is enabled"""
     
-    tenant_count = frappe.db.count("Flansa Workspace")
-    return tenant_count > 1
+    from flansa.flansa_core.usage_service import is_multi_tenant
+
+    return is_multi_tenant(lambda: frappe.db.count("Flansa Workspace") > 1)
 
 
 def get_workspace_stats(workspace_id: Optional[str] = None) -> Dict[str, int]:
@@ -345,11 +346,14 @@ def get_workspace_stats(workspace_id: Optional[str] = None) -> Dict[str, int]:
     if not workspace_id:
         workspace_id = WorkspaceContext.get_current_workspace_id()
     
+    from flansa.flansa_core.usage_service import get_workspace_usage
+
+    usage = get_workspace_usage(workspace_id)
     return {
-        "apps": frappe.db.count("Flansa Application", {"workspace_id": workspace_id}),
-        "tables": frappe.db.count("Flansa Table", {"workspace_id": workspace_id}), 
-        "relationships": frappe.db.count("Flansa Relationship", {"workspace_id": workspace_id}),
-        "reports": frappe.db.count("Flansa Saved Report", {"workspace_id": workspace_id})
+        "apps": usage["applications"],
+        "tables": usage["tables"],
+        "relationships": usage["relationships"],
+        "reports": usage["reports"]
     }
 
 @frappe.whitelist()
@@ -3,28 +3,66 @@ from frappe import _
 from frappe.utils import cint
 import json
 
-@frappe.whitelist(allow_guest=True)
-def show_form(token):
-    """Display the public form based on token"""
-    # Find the form by token in the URL
-    forms = frappe.get_all("Flansa Public Form", 
-                          filters={"public_url": ["like", f"%{token}%"], "is_active": 1},
-                          fields=["*"])
+from flansa.flansa_core.job_service import enqueue_job, get_job
+
+TOKEN_CACHE_KEY = "flansa_public_form_token"
+RENDERED_FORM_CACHE_KEY = "flansa_public_form_html"
+SUBMISSION_JOB = "flansa.flansa_public.api.public_form.insert_public_submission_job"
+SUBMISSION_ERROR = "Error submitting form. Please try again."
+
+# Submissions per form per minute above which inserts are queued instead of run inline
+DEFAULT_BUFFER_THRESHOLD = 60
+
+def get_form_name_by_token(token):
+    """Resolve a public form token to the active form name (cached)"""
+    if not token:
+        return None
     
-    if not forms:
-        frappe.throw(_("Form not found or inactive"))
-        
-    form = forms[0]
-    form_doc = frappe.get_doc("Flansa Public Form", form.name)
+    def _load():
+        # Indexed (unique) token column - no LIKE scan over public_url
+        return frappe.db.get_value("Flansa Public Form", {"form_token": token, "is_active": 1}, "name")
+    
+    return frappe.cache().hget(TOKEN_CACHE_KEY, token, generator=_load)
+
+def clear_public_form_cache(form_name=None, token=None):
+    """Invalidate cached token lookups and rendered shells"""
+    cache = frappe.cache()
+    if token:
+        cache.hdel(TOKEN_CACHE_KEY, token)
+    else:
+        cache.delete_value(TOKEN_CACHE_KEY)
+    
+    if form_name:
+        cache.hdel(RENDERED_FORM_CACHE_KEY, form_name)
+    else:
+        cache.delete_value(RENDERED_FORM_CACHE_KEY)
+
+def on_form_table_change(doc, method=None):
+    """Doc event for Flansa Table, DocType and Custom Field: re-render the forms built on the table"""
+    if doc.doctype == "Flansa Table":
+        table = doc.name
+    else:
+        doctype_name = doc.dt if doc.doctype == "Custom Field" else doc.name
+        table = frappe.db.get_value("Flansa Table", {"doctype_name": doctype_name}, "name")
+    if not table:
+        return
+    
+    forms = frappe.get_all("Flansa Public Form", filters={"table": table}, pluck="name")
+    if forms:
+        frappe.cache().hdel(RENDERED_FORM_CACHE_KEY, *forms)
+
+def render_public_form(form_name):
+    """Render the public form template (uncached)"""
+    form_doc = frappe.get_doc("Flansa Public Form", form_name)
     
     # Get fields to display
     fields = form_doc.get_form_fields()
     
     # Get the table structure
-    table = frappe.get_doc("Flansa Table", form.table)
+    table = frappe.get_doc("Flansa Table", form_doc.table)
     
     context = {
-        "form": form,
+        "form": form_doc.as_dict(),
         "fields": fields,
         "table": table,
         "no_cache": 1
@@ -33,6 +71,75 @@ def show_form(token):
     # Render the public form template
     return frappe.render_template("flansa/templates/public_form.html", context)
 
+@frappe.whitelist(allow_guest=True)
+def show_form(token):
+    """Display the public form based on token"""
+    # Find the form by token in the URL
+    form_name = get_form_name_by_token(token)
+    
+    if not form_name:
+        frappe.throw(_("Form not found or inactive"))
+    
+    # The rendered shell is shared by every visitor until the form or its table is edited
+    return frappe.cache().hget(RENDERED_FORM_CACHE_KEY, form_name, generator=lambda: render_public_form(form_name))
+
+def _submissions_this_minute(form_name):
+    """Count submissions for a form in the current minute window"""
+    cache = frappe.cache()
+    key = cache.make_key(f"flansa_public_form_rate:{form_name}:{frappe.utils.now_datetime().strftime('%Y%m%d%H%M')}")
+    count = cache.incr(key)
+    if count == 1:
+        cache.expire(key, 120)
+    return count
+
+def build_public_submission(form_name, fields):
+    """New (unsaved) record of the form's table holding a submission"""
+    table_name = frappe.db.get_value("Flansa Public Form", form_name, "table")
+    
+    # Get the actual DocType name
+    doctype_name = frappe.db.get_value("Flansa Table", table_name, "doctype_name")
+    
+    # Create new document
+    new_doc = frappe.new_doc(doctype_name)
+    
+    # Set field values
+    for field_name, value in (fields or {}).items():
+        if hasattr(new_doc, field_name):
+            new_doc.set(field_name, value)
+    
+    return new_doc
+
+def validate_public_submission(doc):
+    """Run the field checks insert() would fail on, so a queued submission is known to be valid"""
+    doc._set_defaults()
+    doc._validate_mandatory()
+    doc._validate_links()
+    doc._validate_selects()
+    doc._validate_length()
+    doc._validate_data_fields()
+
+def insert_public_submission(form_name, fields):
+    """Insert a public form submission into the form's table"""
+    from flansa.flansa_public.doctype.flansa_public_form.flansa_public_form import increment_submission_count
+    
+    new_doc = build_public_submission(form_name, fields)
+    
+    # Insert the document
+    new_doc.insert(ignore_permissions=True)
+    
+    # Increment submission count
+    increment_submission_count(form_name)
+    
+    return new_doc
+
+def insert_public_submission_job(form_name, fields):
+    """Background job for buffered public form submissions"""
+    try:
+        insert_public_submission(form_name, fields)
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Public Form Submission Error")
+        raise
+
 @frappe.whitelist(allow_guest=True)
 def submit_form():
     """Handle public form submission"""
@@ -41,54 +148,90 @@ def submit_form():
         token = data.get("token")
         
         # Find the form configuration
-        forms = frappe.get_all("Flansa Public Form", 
-                              filters={"public_url": ["like", f"%{token}%"], "is_active": 1},
-                              fields=["*"])
+        form_name = get_form_name_by_token(token)
         
-        if not forms:
+        if not form_name:
             return {"success": False, "message": _("Form not found or inactive")}
-            
-        form = forms[0]
-        form_doc = frappe.get_doc("Flansa Public Form", form.name)
-        
-        # Get the table to submit to
-        table = frappe.get_doc("Flansa Table", form.table)
-        
-        # Get the actual DocType name
-        doctype_name = table.doctype_name
         
-        # Create new document
-        new_doc = frappe.new_doc(doctype_name)
+        form = frappe.db.get_value(
+            "Flansa Public Form", form_name, ["allow_file_uploads", "success_message"], as_dict=True
+        )
+        success_message = form.success_message or _("Thank you for your submission!")
         
-        # Set field values
-        for field_name, value in data.get("fields", {}).items():
-            if hasattr(new_doc, field_name):
-                new_doc.set(field_name, value)
-                
         # Handle file uploads if enabled
-        if form_doc.allow_file_uploads and "files" in data:
+        if form.allow_file_uploads and "files" in data:
             # Process file uploads
             pass
+        
+        # Under a traffic spike, queue the insert so guest traffic does not hold web workers
+        threshold = cint(frappe.conf.get("flansa_public_form_buffer_threshold") or DEFAULT_BUFFER_THRESHOLD)
+        if threshold and _submissions_this_minute(form_name) > threshold:
+            validate_public_submission(build_public_submission(form_name, data.get("fields", {})))
             
-        # Insert the document
-        new_doc.insert(ignore_permissions=True)
+            # Recorded with the request (empty checkpoint) so a lost queue entry is resubmitted
+            job_id = enqueue_job(
+                SUBMISSION_JOB,
+                "interactive",
+                after_commit=True,
+                label=f"Public submission: {form_name}",
+                checkpoint={},
+                form_name=form_name,
+                fields=data.get("fields", {})
+            )
+            # Not saved yet: the client polls get_submission_status
+            return {
+                "success": False,
+                "queued": True,
+                "job_id": job_id,
+                "message": _("Your submission is being processed...")
+            }
         
-        # Increment submission count
-        form_doc.increment_submission_count()
+        new_doc = insert_public_submission(form_name, data.get("fields", {}))
         
         return {
             "success": True,
-            "message": form_doc.success_message or _("Thank you for your submission!"),
+            "message": success_message,
             "doc_name": new_doc.name
         }
         
+    except frappe.MandatoryError:
+        frappe.clear_messages()
+        return {
+            "success": False,
+            "message": _("Please fill in all required fields.")
+        }
+    except frappe.ValidationError as e:
+        frappe.clear_messages()
+        return {
+            "success": False,
+            "message": frappe.utils.strip_html(str(e)) or _(SUBMISSION_ERROR)
+        }
     except Exception as e:
         frappe.log_error(frappe.get_traceback(), "Public Form Submission Error")
         return {
             "success": False,
-            "message": _("Error submitting form. Please try again.")
+            "message": _(SUBMISSION_ERROR)
         }
 
+@frappe.whitelist(allow_guest=True)
+def get_submission_status(token, job_id):
+    """Outcome of a queued public form submission"""
+    form_name = get_form_name_by_token(token)
+    job = get_job(job_id) if form_name and job_id else None
+    
+    # Only submissions to the form behind the token are visible
+    if not job or job.method != SUBMISSION_JOB or json.loads(job.kwargs or "{}").get("form_name") != form_name:
+        return {"success": False, "message": _("Submission not found")}
+    
+    if job.status == "Completed":
+        success_message = frappe.db.get_value("Flansa Public Form", form_name, "success_message")
+        return {"success": True, "message": success_message or _("Thank you for your submission!")}
+    
+    if job.status == "Failed":
+        return {"success": False, "message": _(SUBMISSION_ERROR)}
+    
+    return {"success": False, "queued": True, "job_id": job_id, "message": _("Your submission is being processed...")}
+
 @frappe.whitelist()
 def get_form_preview(form_name):
     """Get a preview of the public form"""
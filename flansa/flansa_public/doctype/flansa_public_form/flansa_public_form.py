@@ -21,10 +21,23 @@ class FlansaPublicForm(Document):
             # Generate a random token
             token = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(20))
             self.public_url = f"{get_url()}/api/method/flansa.core.api.public_form.show_form?token={token}"
+        
+        # Keep the indexed token column in sync with the URL
+        if not self.form_token:
+            self.form_token = get_token_from_url(self.public_url)
             
     def on_update(self):
         """Clear cache when form is updated"""
         frappe.clear_cache(doctype="Flansa Public Form")
+        self.clear_public_form_cache()
+        
+    def on_trash(self):
+        self.clear_public_form_cache()
+        
+    def clear_public_form_cache(self):
+        """Drop the cached token lookup and rendered shell for this form"""
+        from flansa.flansa_public.api.public_form import clear_public_form_cache
+        clear_public_form_cache(self.name, self.form_token)
         
     def get_form_fields(self):
         """Get the fields to display in the public form"""
@@ -47,6 +60,21 @@ class FlansaPublicForm(Document):
             
     def increment_submission_count(self):
         """Increment the submission count"""
-        self.submissions_count = (self.submissions_count or 0) + 1
-        self.last_submission = frappe.utils.now()
-        self.save(ignore_permissions=True)
\ No newline at end of file
+        # Atomic update - saving the document would invalidate the cached form on every submission
+        increment_submission_count(self.name)
+
+
+def increment_submission_count(form_name):
+    """Atomically bump submissions_count and last_submission for a form"""
+    frappe.db.sql("""
+        UPDATE `tabFlansa Public Form`
+        SET `submissions_count` = COALESCE(`submissions_count`, 0) + 1, `last_submission` = %s
+        WHERE `name` = %s
+    """, (frappe.utils.now(), form_name))
+
+
+def get_token_from_url(public_url):
+    """Extract the token query parameter from a public form URL"""
+    if public_url and "token=" in public_url:
+        return public_url.split("token=", 1)[1].split("&", 1)[0]
+    return None
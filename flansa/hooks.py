@@ -108,7 +108,8 @@ default_workspace = "Flansa"
 # App startup
 after_migrate = [
     "flansa.doctype_overrides.setup_doctype_overrides",
-    "flansa.flansa_core.s3_integration.hooks.init_s3_integration"
+    "flansa.flansa_core.s3_integration.hooks.init_s3_integration",
+    "flansa.flansa_core.api.link_search.ensure_all_link_display_indexes"
 ]
 
 # Uninstallation
@@ -198,10 +199,33 @@ user_data_fields = [
 # Document Events for Logic Field calculations, validation, and tenant context
 doc_events = {
     "*": {
-        "before_insert": "flansa.flansa_core.doctype_hooks.apply_tenant_inheritance",
+        "before_insert": [
+            "flansa.flansa_core.doctype_hooks.apply_tenant_inheritance",
+            "flansa.flansa_core.usage_service.check_quota"
+        ],
+        "after_insert": "flansa.flansa_core.usage_service.on_insert",
         "validate": "flansa.flansa_core.doctype_hooks.validate_logic_fields",
-        "before_save": "flansa.flansa_core.doctype_hooks.calculate_logic_fields",
-        "on_update": "flansa.flansa_core.doctype_hooks.calculate_logic_fields"
+        "before_save": [
+            "flansa.flansa_core.doctype_hooks.calculate_logic_fields",
+            "flansa.flansa_core.field_calculator_service.run_calculator"
+        ],
+        "on_update": [
+            "flansa.flansa_core.doctype_hooks.calculate_logic_fields",
+            "flansa.flansa_core.utils.image_derivatives.queue_gallery_thumbnails",
+            "flansa.flansa_core.report_cache_service.bump_data_version",
+            "flansa.flansa_core.report_summary_service.on_document_change",
+            "flansa.flansa_core.utils.link_resolver.forget_document",
+            "flansa.flansa_core.summary_recalc_service.on_child_change",
+            "flansa.flansa_core.change_feed_service.on_record_change"
+        ],
+        "on_trash": [
+            "flansa.flansa_core.report_cache_service.bump_data_version",
+            "flansa.flansa_core.report_summary_service.on_document_change",
+            "flansa.flansa_core.utils.link_resolver.forget_document",
+            "flansa.flansa_core.summary_recalc_service.on_child_change",
+            "flansa.flansa_core.change_feed_service.on_record_change",
+            "flansa.flansa_core.usage_service.on_trash"
+        ]
     },
     "File": {
         "after_insert": "flansa.flansa_core.s3_integration.doc_events.upload_to_s3_after_insert",
@@ -209,23 +233,87 @@ doc_events = {
     },
     "Flansa Application": {
         "before_insert": "flansa.flansa_core.workspace_service.before_insert",
-        "validate": "flansa.flansa_core.workspace_service.validate_tenant_access"
+        "validate": "flansa.flansa_core.workspace_service.validate_tenant_access",
+        "on_update": "flansa.flansa_core.metadata_catalog_service.on_application_change",
+        "on_trash": "flansa.flansa_core.metadata_catalog_service.on_application_change"
     },
     "Flansa Table": {
         "before_insert": "flansa.flansa_core.workspace_service.before_insert",
-        "validate": "flansa.flansa_core.workspace_service.validate_tenant_access"
+        "validate": "flansa.flansa_core.workspace_service.validate_tenant_access",
+        "on_update": [
+            "flansa.flansa_core.utils.table_cache.on_table_metadata_change",
+            "flansa.flansa_core.relationship_graph_service.clear_relationship_graph",
+            "flansa.flansa_core.metadata_catalog_service.on_table_change",
+            "flansa.flansa_core.usage_service.clear_doctype_workspace",
+            "flansa.flansa_public.api.public_form.on_form_table_change"
+        ],
+        "on_trash": [
+            "flansa.flansa_core.utils.table_cache.on_table_metadata_change",
+            "flansa.flansa_core.relationship_graph_service.clear_relationship_graph",
+            "flansa.flansa_core.metadata_catalog_service.on_table_change",
+            "flansa.flansa_core.usage_service.clear_doctype_workspace",
+            "flansa.flansa_public.api.public_form.on_form_table_change"
+        ]
     },
     "Flansa Relationship": {
         "before_insert": "flansa.flansa_core.workspace_service.before_insert",
-        "validate": "flansa.flansa_core.workspace_service.validate_tenant_access"
+        "validate": "flansa.flansa_core.workspace_service.validate_tenant_access",
+        "on_update": [
+            "flansa.flansa_core.relationship_graph_service.clear_relationship_graph",
+            "flansa.flansa_core.metadata_catalog_service.on_relationship_change"
+        ],
+        "on_trash": [
+            "flansa.flansa_core.relationship_graph_service.clear_relationship_graph",
+            "flansa.flansa_core.metadata_catalog_service.on_relationship_change"
+        ]
+    },
+    "DocType": {
+        "after_insert": "flansa.flansa_core.metadata_catalog_service.on_doctype_change",
+        "on_update": [
+            "flansa.flansa_core.relationship_graph_service.on_doctype_change",
+            "flansa.flansa_core.metadata_catalog_service.on_doctype_change",
+            "flansa.flansa_core.summary_recalc_service.clear_summary_dependents",
+            "flansa.flansa_public.api.public_form.on_form_table_change"
+        ],
+        "on_trash": [
+            "flansa.flansa_core.relationship_graph_service.on_doctype_change",
+            "flansa.flansa_core.metadata_catalog_service.on_doctype_change",
+            "flansa.flansa_core.summary_recalc_service.clear_summary_dependents"
+        ]
+    },
+    "Custom Field": {
+        "on_update": [
+            "flansa.flansa_core.relationship_graph_service.on_doctype_change",
+            "flansa.flansa_core.metadata_catalog_service.on_doctype_change",
+            "flansa.flansa_public.api.public_form.on_form_table_change"
+        ],
+        "on_trash": [
+            "flansa.flansa_core.relationship_graph_service.on_doctype_change",
+            "flansa.flansa_core.metadata_catalog_service.on_doctype_change",
+            "flansa.flansa_public.api.public_form.on_form_table_change"
+        ]
     },
     "Flansa Saved Report": {
         "before_insert": "flansa.flansa_core.workspace_service.before_insert",
         "validate": "flansa.flansa_core.workspace_service.validate_tenant_access"
     },
+    "Flansa Workspace": {
+        "after_insert": "flansa.flansa_core.usage_service.clear_workspace_limits",
+        "on_update": "flansa.flansa_core.usage_service.clear_workspace_limits",
+        "on_trash": "flansa.flansa_core.usage_service.clear_workspace_limits"
+    },
     "Flansa Form Config": {
         "before_insert": "flansa.flansa_core.workspace_service.before_insert",
-        "validate": "flansa.flansa_core.workspace_service.validate_tenant_access"
+        "validate": "flansa.flansa_core.workspace_service.validate_tenant_access",
+        "on_update": "flansa.flansa_core.utils.table_cache.on_table_metadata_change",
+        "on_trash": "flansa.flansa_core.utils.table_cache.on_table_metadata_change"
+    },
+    "Flansa Logic Field": {
+        "on_update": [
+            "flansa.flansa_core.utils.table_cache.on_table_metadata_change",
+            "flansa.flansa_core.api.link_search.ensure_link_display_index"
+        ],
+        "on_trash": "flansa.flansa_core.utils.table_cache.on_table_metadata_change"
     },
     "Flansa Computed Field": {
         "before_insert": "flansa.flansa_core.workspace_service.before_insert",
@@ -254,6 +342,20 @@ doc_events = {
 #     ],
 # }
 
+scheduler_events = {
+    "all": [
+        "flansa.flansa_core.summary_recalc_service.process_dirty_parents",
+        "flansa.flansa_core.job_service.maintain_jobs"
+    ],
+    "hourly": [
+        "flansa.flansa_core.report_summary_service.refresh_scheduled_summaries"
+    ],
+    "daily": [
+        "flansa.flansa_core.change_feed_service.prune_deletion_log",
+        "flansa.flansa_core.usage_service.reconcile_usage"
+    ]
+}
+
 # Testing
 # -------
 
@@ -284,8 +386,11 @@ override_whitelisted_methods = {
 
 # Request Events
 # ----------------
-before_request = ["flansa.flansa_core.workspace_service.resolve_tenant_from_request"]
-# after_request = ["flansa.utils.after_request"]
+before_request = [
+    "flansa.flansa_core.workspace_service.resolve_tenant_from_request",
+    "flansa.flansa_core.utils.query_inspector.start_request_inspection"
+]
+after_request = ["flansa.flansa_core.utils.query_inspector.finish_request_inspection"]
 
 # Boot Session
 # ------------
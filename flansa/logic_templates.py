@@ -112,51 +112,42 @@ def get_logic_templates():
 def get_lookup_wizard_data(table_name):
     """Get data for lookup field wizard"""
     try:
-        # Get current table info
-        flansa_table = frappe.get_doc("Flansa Table", table_name)
-        target_doctype = flansa_table.doctype_name if hasattr(flansa_table, 'doctype_name') and flansa_table.doctype_name else flansa_table.table_name
+        from flansa.flansa_core.metadata_catalog_service import get_catalog_for_table, get_custom_doctypes
+
+        # Current table and workspace tables come from the metadata catalog
+        catalog = get_catalog_for_table(table_name)
+        target_doctype = catalog.table_doctype(table_name)
         
         # Get fields from current table (potential source fields)
-        meta = frappe.get_meta(target_doctype)
-        source_fields = []
-        
-        for field in meta.get("fields"):
-            if field.fieldtype in ["Link", "Data", "Select"]:
-                source_fields.append({
-                    "fieldname": field.fieldname,
-                    "label": field.label,
-                    "fieldtype": field.fieldtype,
-                    "options": getattr(field, "options", "")
-                })
-        
-        # Get available DocTypes for lookup targets
-        all_doctypes = frappe.get_all("DocType", 
-                                     filters={"custom": 1},
-                                     fields=["name"])
-        
-        # Also get Flansa Tables
-        flansa_tables = frappe.get_all("Flansa Table",
-                                      fields=["name", "table_label", "doctype_name"])
+        source_fields = [
+            {
+                "fieldname": field["fieldname"],
+                "label": field["label"],
+                "fieldtype": field["fieldtype"],
+                "options": field["options"]
+            }
+            for field in catalog.get_fields(target_doctype, ["Link", "Data", "Select"])
+        ]
         
         target_tables = []
         
         # Add Flansa Tables first
         flansa_doctype_names = set()
-        for ft in flansa_tables:
-            if ft.doctype_name:
+        for ft_name, ft in catalog.tables.items():
+            if ft["doctype_name"]:
                 target_tables.append({
-                    "value": ft.doctype_name,
-                    "label": ft.table_label or ft.name,
+                    "value": ft["doctype_name"],
+                    "label": ft["table_label"] or ft_name,
                     "type": "flansa_table"
                 })
-                flansa_doctype_names.add(ft.doctype_name)
+                flansa_doctype_names.add(ft["doctype_name"])
         
-        # Add other DocTypes (excluding those already added as Flansa Tables)
-        for dt in all_doctypes:
-            if dt.name not in flansa_doctype_names:
+        # Add other custom DocTypes (excluding those already added as Flansa Tables)
+        for dt_name in get_custom_doctypes():
+            if dt_name not in flansa_doctype_names:
                 target_tables.append({
-                    "value": dt.name,
-                    "label": dt.name,
+                    "value": dt_name,
+                    "label": dt_name,
                     "type": "doctype"
                 })
         
@@ -164,7 +155,8 @@ def get_lookup_wizard_data(table_name):
             "success": True,
             "source_fields": source_fields,
             "target_tables": target_tables,
-            "current_doctype": target_doctype
+            "current_doctype": target_doctype,
+            "catalog_version": catalog.version
         }
         
     except Exception as e:
@@ -234,21 +226,20 @@ def get_target_table_fields(target_doctype):
 def get_rollup_wizard_data(table_name):
     """Get data for rollup field wizard (renamed from summary)"""
     try:
-        # Get current table info
-        flansa_table = frappe.get_doc("Flansa Table", table_name)
-        target_doctype = flansa_table.doctype_name if hasattr(flansa_table, 'doctype_name') and flansa_table.doctype_name else flansa_table.table_name
+        from flansa.flansa_core.metadata_catalog_service import get_catalog_for_table
+
+        catalog = get_catalog_for_table(table_name)
+        target_doctype = catalog.table_doctype(table_name)
         
         # Get child tables (Table fields in current DocType)
-        meta = frappe.get_meta(target_doctype)
-        child_tables = []
-        
-        for field in meta.get("fields"):
-            if field.fieldtype == "Table":
-                child_tables.append({
-                    "fieldname": field.fieldname,
-                    "label": field.label,
-                    "options": field.options  # Child DocType name
-                })
+        child_tables = [
+            {
+                "fieldname": field["fieldname"],
+                "label": field["label"],
+                "options": field["options"]  # Child DocType name
+            }
+            for field in catalog.get_fields(target_doctype, ["Table"])
+        ]
         
         # Summary operations
         operations = [
@@ -263,7 +254,8 @@ def get_rollup_wizard_data(table_name):
             "success": True,
             "child_tables": child_tables,
             "operations": operations,
-            "current_doctype": target_doctype
+            "current_doctype": target_doctype,
+            "catalog_version": catalog.version
         }
         
     except Exception as e:
@@ -313,23 +305,22 @@ def get_suitable_operations(fieldtype):
 def get_formula_wizard_data(table_name):
     """Get data for formula field wizard"""
     try:
-        # Get current table info
-        flansa_table = frappe.get_doc("Flansa Table", table_name)
-        target_doctype = flansa_table.doctype_name if hasattr(flansa_table, 'doctype_name') and flansa_table.doctype_name else flansa_table.table_name
+        from flansa.flansa_core.metadata_catalog_service import get_catalog_for_table
+
+        catalog = get_catalog_for_table(table_name)
+        target_doctype = catalog.table_doctype(table_name)
         
         # Get all useful fields from current table for formula building
-        meta = frappe.get_meta(target_doctype)
-        available_fields = []
-        
-        for field in meta.get("fields"):
+        available_fields = [
+            {
+                "fieldname": field["fieldname"],
+                "label": field["label"],
+                "fieldtype": field["fieldtype"],
+                "category": "numeric" if field["fieldtype"] in ["Int", "Float", "Currency"] else "other"
+            }
             # Include fields that can be used in formulas
-            if field.fieldtype in ["Int", "Float", "Currency", "Data", "Select", "Check", "Date", "Datetime"]:
-                available_fields.append({
-                    "fieldname": field.fieldname,
-                    "label": field.label,
-                    "fieldtype": field.fieldtype,
-                    "category": "numeric" if field.fieldtype in ["Int", "Float", "Currency"] else "other"
-                })
+            for field in catalog.get_fields(target_doctype, ["Int", "Float", "Currency", "Data", "Select", "Check", "Date", "Datetime"])
+        ]
         
         # Mathematical operators
         operators = [
@@ -583,9 +574,6 @@ def debug_table_structure(table_name=None):
 def get_link_wizard_data(table_name=None):
     """Get data for link field wizard"""
     try:
-        # Debug: Log API call for troubleshooting
-        frappe.logger().debug(f"get_link_wizard_data called with table_name: {table_name}")
-        
         if not table_name:
             return {
                 "success": False,
@@ -618,136 +606,41 @@ def get_link_wizard_data(table_name=None):
             friendly = re.sub(r'\s+', ' ', friendly).strip()
             
             return friendly
-            
-        # Get current table info to determine the current app
-        current_flansa_table = frappe.get_doc("Flansa Table", table_name)
-        current_table_name = current_flansa_table.table_label or current_flansa_table.name
-        
-        # Debug: Current table processing
-        frappe.logger().debug(f"Processing table: {table_name} ({current_table_name})")
-        
-        # Check if there's a direct app field in the Flansa Table
-        current_app_name = None
-        app_related_fields = ['app', 'app_name', 'application', 'application_name', 'parent_app', 'module']
-        
-        for field in app_related_fields:
-            if hasattr(current_flansa_table, field):
-                value = getattr(current_flansa_table, field)
-                if value:
-                    # Check if this value is a link to a Flansa Application record
-                    if frappe.db.exists("Flansa Application", value):
-                        try:
-                            app_record = frappe.get_doc("Flansa Application", value)
-                            # Use the app title or name from the linked record
-                            current_app_name = getattr(app_record, 'title', None) or getattr(app_record, 'app_name', None) or getattr(app_record, 'application_name', None) or value
-                            print(f"Found linked current app: {value} → {current_app_name}", flush=True)
-                        except Exception as e:
-                            print(f"Error reading current Flansa Application {value}: {e}", flush=True)
-                            current_app_name = value
-                    else:
-                        current_app_name = value
-                        print(f"Found app from {field}: {current_app_name}", flush=True)
-                    break
-        
-        # If no direct app field found, use table name itself as app (no hardcoded patterns)
-        if not current_app_name:
-            # Simply use the table name itself as the app name
-            current_app_name = current_table_name
-            print(f"Using table name as app name: {current_app_name}", flush=True)
-        
-        # Store the raw current app name for comparison
-        raw_current_app_name = current_app_name
-        # Apply friendly naming to current app for display
-        current_app_name_friendly = get_friendly_app_name(current_app_name)
-        
-        # Get all Flansa Tables
-        flansa_tables = frappe.get_all("Flansa Table",
-                                      fields=["name", "table_label", "doctype_name"])
+        
+        from flansa.flansa_core.metadata_catalog_service import get_catalog_for_table, get_system_doctypes
+
+        # Workspace tables and their applications come from the metadata catalog,
+        # grouped by the application of the current table
+        catalog = get_catalog_for_table(table_name)
+        raw_current_app_name = catalog.app_name_for_table(table_name)
         
         current_app_tables = []
         other_app_tables = []
         
-        # Group tables based on their app association
-        for ft in flansa_tables:
-            if ft.doctype_name:
-                ft_label = ft.table_label or ft.name
-                
-                # Get the full table record to check its app
-                try:
-                    ft_record = frappe.get_doc("Flansa Table", ft.name)
-                    ft_app_name = None
-                    
-                    # Check for app field in this table
-                    for field in app_related_fields:
-                        if hasattr(ft_record, field):
-                            value = getattr(ft_record, field)
-                            if value:
-                                # Check if this value is a link to a Flansa Application record
-                                if frappe.db.exists("Flansa Application", value):
-                                    try:
-                                        app_record = frappe.get_doc("Flansa Application", value)
-                                        # Use the app title or name from the linked record
-                                        ft_app_name = getattr(app_record, 'title', None) or getattr(app_record, 'app_name', None) or getattr(app_record, 'application_name', None) or value
-                                        print(f"Found linked app: {value} → {ft_app_name}", flush=True)
-                                    except Exception as e:
-                                        print(f"Error reading Flansa Application {value}: {e}", flush=True)
-                                        ft_app_name = value
-                                else:
-                                    ft_app_name = value
-                                break
-                    
-                    # If no app field, use table label as app name (no hardcoded patterns)
-                    if not ft_app_name:
-                        ft_app_name = ft_label
-                    
-                    table_info = {
-                        "value": ft.name,  # Use Flansa Table ID instead of DocType name
-                        "label": ft_label,
-                        "type": "flansa_table",
-                        "doctype_name": ft.doctype_name,  # Keep DocType name for reference
-                        "app_name": ft_app_name,  # Keep raw app name for comparison
-                        "app_name_friendly": get_friendly_app_name(ft_app_name)  # Add friendly name
-                    }
-                    
-                    # Group by raw app name comparison
-                    if ft_app_name == raw_current_app_name:
-                        current_app_tables.append(table_info)
-                        print(f"Added '{ft_label}' to current app (app: {ft_app_name})", flush=True)
-                    else:
-                        other_app_tables.append(table_info)
-                        print(f"Added '{ft_label}' to other apps (app: {ft_app_name})", flush=True)
-                        
-                except Exception as e:
-                    print(f"Error processing table {ft.name}: {e}", flush=True)
-                    # Add to other_app_tables as fallback
-                    table_info = {
-                        "value": ft.name,  # Use Flansa Table ID instead of DocType name
-                        "label": ft_label,
-                        "type": "flansa_table",
-                        "doctype_name": ft.doctype_name  # Keep DocType name for reference
-                    }
-                    other_app_tables.append(table_info)
-        
-        print(f"Grouped by app '{current_app_name_friendly}' (raw: {raw_current_app_name}):", flush=True)
-        print(f"  Current app tables: {[t['label'] for t in current_app_tables]}", flush=True)
-        print(f"  Other app tables: {[t['label'] + ' (' + t.get('app_name_friendly', t.get('app_name', 'Unknown')) + ')' for t in other_app_tables[:3]]}..." if len(other_app_tables) > 3 else f"  Other app tables: {[t['label'] + ' (' + t.get('app_name_friendly', t.get('app_name', 'Unknown')) + ')' for t in other_app_tables]}", flush=True)
+        for ft_name, ft in catalog.tables.items():
+            if not ft["doctype_name"]:
+                continue
+            
+            ft_app_name = catalog.app_name_for_table(ft_name)
+            table_info = {
+                "value": ft_name,  # Use Flansa Table ID instead of DocType name
+                "label": ft["table_label"] or ft_name,
+                "type": "flansa_table",
+                "doctype_name": ft["doctype_name"],  # Keep DocType name for reference
+                "app_name": ft_app_name,  # Keep raw app name for comparison
+                "app_name_friendly": get_friendly_app_name(ft_app_name)  # Add friendly name
+            }
+            
+            # Group by raw app name comparison
+            if ft_app_name == raw_current_app_name:
+                current_app_tables.append(table_info)
+            else:
+                other_app_tables.append(table_info)
         
         # Get system tables dynamically (no hardcoded DocType names)
         system_tables = []
-        system_found = 0
         
         try:
-            # Query for all standard DocTypes that are not custom and not tables
-            # Use SQL query instead of frappe.get_all to bypass potential permission filtering
-            system_doctypes = frappe.db.sql("""
-                SELECT name, module
-                FROM `tabDocType`
-                WHERE custom = 0 
-                AND istable = 0 
-                AND issingle = 0
-                ORDER BY name
-            """, as_dict=True)
-            
             # Filter out DocTypes that are already in Flansa tables
             existing_flansa_doctypes = [ft["value"] for ft in current_app_tables + other_app_tables]
             
@@ -756,23 +649,22 @@ def get_link_wizard_data(table_name=None):
             common_link_targets = {"User", "Role", "Company", "Customer", "Supplier", "Item", "Employee"}
             
             # Sort DocTypes: priority ones first, then alphabetical
-            filtered_doctypes = [dt for dt in system_doctypes if dt.name not in existing_flansa_doctypes]
+            filtered_doctypes = [dt for dt in get_system_doctypes() if dt["name"] not in existing_flansa_doctypes]
             
             # Separate priority and regular DocTypes
-            priority_dts = [dt for dt in filtered_doctypes if dt.name in common_link_targets]
-            regular_dts = [dt for dt in filtered_doctypes if dt.name not in common_link_targets]
+            priority_dts = [dt for dt in filtered_doctypes if dt["name"] in common_link_targets]
+            regular_dts = [dt for dt in filtered_doctypes if dt["name"] not in common_link_targets]
             
             # Add all DocTypes (priority first, then regular)
             for dt in priority_dts + regular_dts:
-                is_priority = dt.name in common_link_targets
+                is_priority = dt["name"] in common_link_targets
                 system_tables.append({
-                    "value": dt.name,
-                    "label": dt.name,
+                    "value": dt["name"],
+                    "label": dt["name"],
                     "type": "system",
-                    "module": dt.module,
+                    "module": dt["module"],
                     **({"priority": True} if is_priority else {})
                 })
-                system_found += 1
                         
         except Exception as e:
             frappe.logger().error(f"Error querying system DocTypes: {str(e)}")
@@ -783,15 +675,8 @@ def get_link_wizard_data(table_name=None):
         other_apps_grouped = {}
         available_apps = []
         
-        print(f"Raw app names before mapping: {[t.get('app_name') for t in other_app_tables[:3]]}", flush=True)
-        
         for table in other_app_tables:
-            # Use the pre-calculated friendly name
             display_app_name = table.get("app_name_friendly", "Unknown App")
-            raw_app_name = table.get("app_name", "Unknown App")
-            
-            print(f"App name mapping: '{raw_app_name}' → '{display_app_name}'", flush=True)
-            
             if display_app_name not in other_apps_grouped:
                 other_apps_grouped[display_app_name] = []
                 available_apps.append(display_app_name)
@@ -807,7 +692,8 @@ def get_link_wizard_data(table_name=None):
             "other_app_tables": other_app_tables,  # Keep for backward compatibility
             "other_apps_grouped": other_apps_grouped,
             "available_apps": available_apps,
-            "system_tables": system_tables
+            "system_tables": system_tables,
+            "catalog_version": catalog.version
         }
         
     except Exception as e:
@@ -821,33 +707,33 @@ def get_link_wizard_data(table_name=None):
 def get_fetch_wizard_data(table_name=None):
     """Get data for fetch field wizard"""
     try:
-        print(f"get_fetch_wizard_data called with table_name: {table_name}", flush=True)
-        
         if not table_name:
             return {
                 "success": False,
                 "error": "table_name parameter is required"
             }
-        # Get current table info
-        flansa_table = frappe.get_doc("Flansa Table", table_name)
-        target_doctype = flansa_table.doctype_name if hasattr(flansa_table, 'doctype_name') and flansa_table.doctype_name else flansa_table.table_name
+
+        from flansa.flansa_core.metadata_catalog_service import get_catalog_for_table
+
+        catalog = get_catalog_for_table(table_name)
+        target_doctype = catalog.table_doctype(table_name)
         
         # Get existing Link fields in current table
-        meta = frappe.get_meta(target_doctype)
-        link_fields = []
-        
-        for field in meta.get("fields"):
-            if field.fieldtype == "Link" and field.options:
-                link_fields.append({
-                    "fieldname": field.fieldname,
-                    "label": field.label,
-                    "options": field.options  # Linked DocType
-                })
+        link_fields = [
+            {
+                "fieldname": field["fieldname"],
+                "label": field["label"],
+                "options": field["options"]  # Linked DocType
+            }
+            for field in catalog.get_fields(target_doctype, ["Link"])
+            if field["options"]
+        ]
         
         return {
             "success": True,
             "link_fields": link_fields,
-            "current_doctype": target_doctype
+            "current_doctype": target_doctype,
+            "catalog_version": catalog.version
         }
         
     except Exception as e:
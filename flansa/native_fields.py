@@ -10,6 +10,7 @@ import hashlib
 import re
 from datetime import datetime, timedelta
 from frappe.utils import now, cstr, flt, cint
+from flansa.flansa_core.field_calculator_service import check_formula, check_summary
 
 # ==============================================================================
 # HELPER FUNCTIONS
@@ -471,6 +472,11 @@ def add_formula_field_native(table_name, formula_config):
         
         doctype_doc = frappe.get_doc("DocType", table_doc.doctype_name)
         
+        # Reject formulas the DocType's calculator could not compile
+        formula_error = check_formula(table_doc.doctype_name, formula_config["formula"])
+        if formula_error:
+            return {"success": False, "error": formula_error}
+        
         # Extract dependencies from formula
         dependencies = extract_formula_dependencies(formula_config["formula"])
         
@@ -490,16 +496,13 @@ def add_formula_field_native(table_name, formula_config):
         doctype_doc.append("fields", field_def)
         doctype_doc.save()
         
-        # Create server script for formula calculation
-        script_result = create_formula_server_script(table_doc.doctype_name, formula_config, dependencies)
-        
+        # The DocType's field calculator picks the new field up from its description
         return {
             "success": True,
             "message": f"Formula field '{formula_config['field_label']}' created with runtime calculation",
-            "method": "virtual_field_plus_server_script",
+            "method": "virtual_field_plus_calculator",
             "formula": formula_config["formula"],
-            "dependencies": dependencies,
-            "script_created": script_result["success"]
+            "dependencies": dependencies
         }
         
     except Exception as e:
@@ -522,6 +525,10 @@ def add_summary_field_native(table_name, summary_config):
         
         doctype_doc = frappe.get_doc("DocType", table_doc.doctype_name)
         
+        summary_error = check_summary(summary_config)
+        if summary_error:
+            return {"success": False, "error": summary_error}
+        
         # Determine field type based on summary type
         field_type = "Float" if summary_config["summary_type"] in ["Sum", "Average"] else "Int"
         
@@ -539,15 +546,12 @@ def add_summary_field_native(table_name, summary_config):
         doctype_doc.append("fields", field_def)
         doctype_doc.save()
         
-        # Create server script for summary calculation
-        script_result = create_summary_server_script(table_doc.doctype_name, summary_config)
-        
+        # The DocType's field calculator picks the new field up from its description
         return {
             "success": True,
             "message": f"Summary field '{summary_config['field_label']}' created with automatic calculation",
-            "method": "stored_field_plus_server_script", 
-            "summary_type": summary_config["summary_type"],
-            "script_created": script_result["success"]
+            "method": "stored_field_plus_calculator",
+            "summary_type": summary_config["summary_type"]
         }
         
     except Exception as e:
@@ -998,129 +1002,6 @@ def extract_formula_dependencies(formula):
     
     return dependencies
 
-def create_formula_server_script(doctype_name, config, dependencies):
-    """Create server script for formula field calculation"""
-    try:
-        script_name = f"Formula_{doctype_name}_{config['field_name']}"
-        
-        # Generate safe formula calculation code
-        safe_formula = convert_formula_to_safe_python(config["formula"], dependencies)
-        
-        script_code = f'''# Auto-generated formula field calculation
-import math
-from datetime import datetime, timedelta
-
-def calculate_formula(doc, method):
-    """Calculate formula: {config["formula"]}"""
-    try:
-        # Get field values safely
-        {generate_field_getters(dependencies)}
-        
-        # Calculate formula
-        result = {safe_formula}
-        
-        # Set result on document
-        doc.{config["field_name"]} = result if result is not None else 0
-        
-    except Exception as e:
-        frappe.log_error(f"Formula calculation error in {config['field_name']}: {{str(e)}}", "Formula Field")
-        doc.{config["field_name"]} = 0  # Safe fallback
-'''
-        
-        # Create or update server script
-        if frappe.db.exists("Server Script", script_name):
-            server_script = frappe.get_doc("Server Script", script_name)
-            server_script.script = script_code
-        else:
-            server_script = frappe.get_doc({
-                "doctype": "Server Script",
-                "name": script_name,
-                "script_type": "DocType Event",
-                "reference_doctype": doctype_name,
-                "event_frequency": "Before Save",
-                "script": script_code,
-                "enabled": 1
-            })
-        
-        server_script.save()
-        return {"success": True, "script_name": script_name}
-        
-    except Exception as e:
-        frappe.log_error(f"Error creating formula server script: {str(e)}", "Native Fields")
-        return {"success": False, "error": str(e)}
-
-def create_summary_server_script(doctype_name, config):
-    """Create server script for summary field calculation"""
-    try:
-        script_name = f"Summary_{doctype_name}_{config['field_name']}"
-        
-        # Generate calculation code based on summary type
-        calc_code = generate_summary_calculation_code(config)
-        
-        script_code = f'''# Auto-generated summary field calculation
-def calculate_summary(doc, method):
-    """Calculate {config["summary_type"]} of {config["summary_field"]} from {config["target_doctype"]}"""
-    try:
-        if doc.{config.get("source_field", "name")}:
-            # Get related records
-            related_records = frappe.get_all(
-                "{config["target_doctype"]}",
-                filters={{"{config["filter_field"]}": doc.{config.get("source_field", "name")}}},
-                fields=["{config["summary_field"]}"]
-            )
-            
-            # Calculate {config["summary_type"].lower()}
-            {calc_code}
-            
-        else:
-            doc.{config["field_name"]} = 0
-            
-    except Exception as e:
-        frappe.log_error(f"Summary calculation error in {config['field_name']}: {{str(e)}}", "Summary Field") 
-        doc.{config["field_name"]} = 0  # Safe fallback
-'''
-        
-        # Create or update server script
-        if frappe.db.exists("Server Script", script_name):
-            server_script = frappe.get_doc("Server Script", script_name)
-            server_script.script = script_code
-        else:
-            server_script = frappe.get_doc({
-                "doctype": "Server Script",
-                "name": script_name,
-                "script_type": "DocType Event",
-                "reference_doctype": doctype_name,
-                "event_frequency": "Before Save", 
-                "script": script_code,
-                "enabled": 1
-            })
-        
-        server_script.save()
-        return {"success": True, "script_name": script_name}
-        
-    except Exception as e:
-        frappe.log_error(f"Error creating summary server script: {str(e)}", "Native Fields")
-        return {"success": False, "error": str(e)}
-
-def generate_summary_calculation_code(config):
-    """Generate summary calculation code based on type"""
-    summary_type = config["summary_type"]
-    field_name = config["field_name"]
-    summary_field = config["summary_field"]
-    
-    if summary_type == "Sum":
-        return f"doc.{field_name} = sum([float(r.{summary_field} or 0) for r in related_records])"
-    elif summary_type == "Average":
-        return f"doc.{field_name} = sum([float(r.{summary_field} or 0) for r in related_records]) / len(related_records) if related_records else 0"
-    elif summary_type == "Count":
-        return f"doc.{field_name} = len(related_records)"
-    elif summary_type == "Max":
-        return f"doc.{field_name} = max([float(r.{summary_field} or 0) for r in related_records]) if related_records else 0"
-    elif summary_type == "Min":
-        return f"doc.{field_name} = min([float(r.{summary_field} or 0) for r in related_records]) if related_records else 0"
-    else:
-        return f"doc.{field_name} = 0"
-
 def convert_formula_to_safe_python(formula, dependencies):
     """Convert Flansa formula to safe Python expression"""
     python_expr = formula
@@ -1144,15 +1025,8 @@ def convert_formula_to_safe_python(formula, dependencies):
     
     return python_expr
 
-def generate_field_getters(dependencies):
-    """Generate safe field getter code for dependencies"""
-    getters = []
-    for field in dependencies:
-        getters.append(f"        {field} = doc.get('{field}', 0)")
-    return "\n".join(getters)
-
 def cleanup_field_server_scripts(doctype_name, field_name):
-    """Clean up server scripts associated with a field"""
+    """Clean up the per-field server scripts older versions generated for formula and summary fields"""
     try:
         # Look for formula and summary scripts
         script_names = [
@@ -1513,6 +1387,11 @@ def update_gallery_field_db(doctype_name, doc_name, field_name, gallery_data):
         # Update field value directly in database without modifying timestamps
         frappe.db.set_value(doctype_name, doc_name, field_name, gallery_data or "", update_modified=False)
         
+        # Render thumbnails for new images in the background (after the commit below)
+        from flansa.flansa_core.utils.image_derivatives import gallery_needs_thumbnails, enqueue_gallery_thumbnails
+        if gallery_needs_thumbnails(gallery_data):
+            enqueue_gallery_thumbnails(doctype_name, doc_name, field_name)
+        
         # Commit to database immediately
         frappe.db.commit()
         
@@ -0,0 +1,10 @@
+import frappe
+
+def execute():
+    """Index tombstones by DocType and creation for change feed reads on sites that already had the table"""
+    
+    if not frappe.db.table_exists("Flansa Deleted Record"):
+        return
+    
+    # add_index is a no-op when the index exists
+    frappe.db.add_index("Flansa Deleted Record", ["reference_doctype", "creation"])
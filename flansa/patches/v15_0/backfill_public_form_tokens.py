@@ -0,0 +1,20 @@
+import frappe
+from flansa.flansa_public.doctype.flansa_public_form.flansa_public_form import get_token_from_url
+
+def execute():
+    """Populate the indexed form_token column from existing public URLs"""
+    
+    if not frappe.db.has_column("Flansa Public Form", "form_token"):
+        return
+    
+    forms = frappe.get_all("Flansa Public Form",
+        filters={"form_token": ["is", "not set"]},
+        fields=["name", "public_url"]
+    )
+    
+    for form in forms:
+        token = get_token_from_url(form.public_url)
+        if token:
+            frappe.db.set_value("Flansa Public Form", form.name, "form_token", token, update_modified=False)
+    
+    frappe.db.commit()
@@ -0,0 +1,20 @@
+import frappe
+
+def execute():
+    """Copy the base table's workspace onto saved reports that have none, so listings can filter on it directly"""
+    
+    if not frappe.db.has_column("Flansa Saved Report", "workspace_id"):
+        return
+    
+    frappe.db.sql("""
+        UPDATE `tabFlansa Saved Report`
+        SET workspace_id = (
+            SELECT t.workspace_id FROM `tabFlansa Table` t
+            WHERE t.name = `tabFlansa Saved Report`.base_table
+        )
+        WHERE (workspace_id IS NULL OR workspace_id = '')
+            AND base_table IS NOT NULL
+    """)
+    
+    frappe.db.add_index("Flansa Saved Report", ["workspace_id", "created_on"])
+    frappe.db.commit()
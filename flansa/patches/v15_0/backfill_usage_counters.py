@@ -0,0 +1,9 @@
+import frappe
+from flansa.flansa_core.usage_service import reconcile_workspace
+
+def execute():
+    """Count the existing usage of every workspace into Flansa Usage Counter"""
+    
+    for workspace_id in frappe.get_all("Flansa Workspace", pluck="name"):
+        reconcile_workspace(workspace_id)
+        frappe.db.commit()
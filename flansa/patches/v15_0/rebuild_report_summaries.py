@@ -0,0 +1,16 @@
+import frappe
+
+def execute():
+    """Mark ready report summaries stale so the hourly job rebuilds them with normalized buckets"""
+    
+    if not frappe.db.has_column("Flansa Saved Report", "summary_status"):
+        return
+    
+    frappe.db.set_value(
+        "Flansa Saved Report",
+        {"summary_status": "Ready"},
+        "summary_status",
+        "Stale",
+        update_modified=False
+    )
+    frappe.db.commit()
@@ -0,0 +1,21 @@
+import frappe
+
+def execute():
+    """Delete the per-field server scripts formula and summary fields used before the compiled field calculator"""
+    
+    if not frappe.db.table_exists("Server Script"):
+        return
+    
+    scripts = frappe.get_all("Server Script",
+        filters=[
+            ["script_type", "=", "DocType Event"],
+            ["script", "like", "# Auto-generated % field calculation%"]
+        ],
+        pluck="name"
+    )
+    
+    for name in scripts:
+        if name.startswith(("Formula_", "Summary_")):
+            frappe.delete_doc("Server Script", name, ignore_permissions=True, force=True)
+    
+    frappe.db.commit()
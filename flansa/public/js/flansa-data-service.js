@@ -26,18 +26,18 @@ class FlansaDataService {
         }
 
         try {
-            const response = await frappe.call({
-                method: 'flansa.flansa_core.api.table_api.get_table_metadata',
-                args: { table_name: tableName }
-            });
+            const message = await this.callConditional(
+                'flansa.flansa_core.api.table_api.get_table_metadata',
+                { table_name: tableName }
+            );
 
-            if (response.message && response.message.success) {
+            if (message && message.success) {
                 const metadata = {
                     tableName: tableName,
-                    doctype: response.message.doctype_name,
-                    fields: response.message.fields,
-                    permissions: response.message.permissions || {},
-                    settings: response.message.settings || {}
+                    doctype: message.doctype_name,
+                    fields: message.fields,
+                    permissions: message.permissions || {},
+                    settings: message.settings || {}
                 };
 
                 // Cache the result
@@ -49,7 +49,7 @@ class FlansaDataService {
                 return metadata;
             }
             
-            throw new Error(response.message?.error || 'Failed to load metadata');
+            throw new Error(message?.error || 'Failed to load metadata');
             
         } catch (error) {
             console.error('❌ Error loading table metadata:', error);
@@ -467,6 +467,155 @@ class FlansaDataService {
         }
     }
 
+    /**
+     * Call a metadata endpoint with GET + If-None-Match
+     * Unchanged payloads come back as an empty 304 and are served from sessionStorage;
+     * resolves to the method's message like frappe.call's r.message
+     */
+    async callConditional(method, args = {}) {
+        const params = new URLSearchParams();
+        Object.entries(args).forEach(([key, value]) => {
+            if (value !== undefined && value !== null) {
+                params.append(key, typeof value === 'object' ? JSON.stringify(value) : value);
+            }
+        });
+        const url = `/api/method/${method}?${params.toString()}`;
+        const storageKey = `flansa_conditional_${frappe.session.user}_${url}`;
+
+        let cached = null;
+        try {
+            cached = JSON.parse(sessionStorage.getItem(storageKey) || 'null');
+        } catch (e) {
+            cached = null;
+        }
+
+        try {
+            const headers = { 'Accept': 'application/json' };
+            if (cached && cached.etag) {
+                headers['If-None-Match'] = cached.etag;
+            }
+
+            const response = await fetch(url, { headers: headers, credentials: 'same-origin' });
+            if (response.status === 304 && cached) {
+                return cached.message;
+            }
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+
+            const data = await response.json();
+            const etag = response.headers.get('ETag');
+            if (etag) {
+                try {
+                    sessionStorage.setItem(storageKey, JSON.stringify({ etag: etag, message: data.message }));
+                } catch (e) {
+                    // Storage full: the payload is simply fetched again next time
+                }
+            }
+            return data.message;
+        } catch (error) {
+            // Fall back to the regular call, which reports server errors as usual
+            const response = await frappe.call({ method: method, args: args });
+            return response.message || { success: false, error: 'No response' };
+        }
+    }
+
+    /**
+     * Records changed and deleted since a cursor (delta sync)
+     * Call without a cursor after loading a table to get the starting cursor
+     */
+    async getChangesSince(tableName, cursor = null, fields = null) {
+        const changes = [];
+        const deleted = [];
+        let result;
+
+        do {
+            const response = await frappe.call({
+                method: 'flansa.flansa_core.change_feed_service.get_changes_since',
+                args: {
+                    table_name: tableName,
+                    cursor: cursor,
+                    fields: fields ? JSON.stringify(fields) : null
+                }
+            });
+
+            result = response.message;
+            if (!result || !result.success) {
+                throw new Error(result?.error || 'Failed to load changes');
+            }
+            if (result.reset) {
+                // Cursor too old: the caller must reload the table
+                return { reset: true, cursor: result.cursor, changes: [], deleted: [] };
+            }
+
+            changes.push(...result.changes);
+            deleted.push(...result.deleted);
+            cursor = result.cursor;
+        } while (result.has_more);
+
+        return { reset: false, cursor, changes, deleted };
+    }
+
+    /**
+     * Keep a table in sync: pull deltas whenever the server announces a change
+     * Requires flansa_realtime_changes in site config; returns a function that stops watching
+     */
+    async watchTable(tableName, doctype, onChanges, fields = null) {
+        let { cursor } = await this.getChangesSince(tableName, null, fields);
+        let timer = null;
+        // The server re-sends its last few seconds of changes: skip what the previous pull
+        // delivered (a re-sent record always came in the pull right before)
+        let delivered = new Map();
+
+        const pull = async () => {
+            timer = null;
+            try {
+                const delta = await this.getChangesSince(tableName, cursor, fields);
+                cursor = delta.cursor;
+                if (delta.reset) {
+                    delivered = new Map();
+                }
+
+                const seen = delivered;
+                delivered = new Map();
+                delta.changes = delta.changes.filter((row) => {
+                    const key = `change|${row.name}`;
+                    delivered.set(key, String(row.modified));
+                    return seen.get(key) !== String(row.modified);
+                });
+                delta.deleted = delta.deleted.filter((name) => {
+                    const key = `delete|${name}`;
+                    delivered.set(key, true);
+                    return !seen.has(key);
+                });
+
+                if (delta.reset || delta.changes.length || delta.deleted.length) {
+                    this.clearTableCache(tableName);
+                    onChanges(delta);
+                    $(document).trigger('flansa:records-changed', { table: tableName, ...delta });
+                }
+            } catch (error) {
+                console.error('❌ Error syncing table changes:', error);
+            }
+        };
+
+        const handler = (data) => {
+            // Bursts of saves are pulled with one request
+            if (data.doctype === doctype && !timer) {
+                timer = setTimeout(pull, 500);
+            }
+        };
+
+        frappe.realtime.doctype_subscribe(doctype);
+        frappe.realtime.on('flansa_record_change', handler);
+
+        return () => {
+            clearTimeout(timer);
+            frappe.realtime.off('flansa_record_change', handler);
+            frappe.realtime.doctype_unsubscribe(doctype);
+        };
+    }
+
     // Cache management methods
     clearRecordCache(tableName, recordId) {
         const cacheKey = `record_${tableName}_${recordId}`;
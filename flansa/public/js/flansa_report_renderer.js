@@ -113,6 +113,15 @@ window.FlansaReportRenderer = {
      * Render table for a single group
      */
     renderGroupTable(group, fields, showActions, tableClass, onRecordClick) {
+        if (group.from_summary) {
+            return `
+                <div class="empty-group">
+                    <i class="fa fa-table"></i>
+                    <p>Totals come from the report summary; filter on this group to see its records</p>
+                </div>
+            `;
+        }
+
         if (!group.records || group.records.length === 0) {
             return `
                 <div class="empty-group">
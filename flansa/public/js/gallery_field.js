@@ -163,8 +163,8 @@ frappe.ui.form.ControlGallery = class ControlGallery extends frappe.ui.form.Cont
 
     render_gallery_item(item, index) {
         const self = this;
-        // Use enhanced image URL processing
-        const image_src = this.get_enhanced_image_src(item);
+        // Prefer the server-rendered thumbnail, fall back to enhanced image URL processing
+        const image_src = (item.thumbnails && item.thumbnails.medium) || this.get_enhanced_image_src(item);
         const $item = $(`
             <div class="gallery-item" data-index="${index || this.gallery_data.length - 1}">
                 <div class="gallery-image">
@@ -10,9 +10,192 @@ import operator
 import re
 import json
 from datetime import datetime, date
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Any, Dict, List, Optional, Union
 import math
 
+from flansa.flansa_core.utils.formula_context import COMPILE_CACHE_SIZE, DocumentContext, compile_expression
+
+# SUM([Child.Field]) and friends aggregate the values of related child records
+AGGREGATE_PATTERN = r'(SUM|AVERAGE|AVG|COUNT|MIN|MAX)\(\[([^.\]]+)\.([^\]]+)\]\)'
+# [Table.Field] reads a field of a related record
+RELATED_PATTERN = r'\[([^.\]]+)\.([^\]]+)\]'
+
+
+class FormulaPrefetch:
+    """
+    Related records the formulas of a document or batch of documents read
+
+    Formulas are scanned for [Table.Field] and SUM([Child.Field]) references
+    before they run. Each referenced relationship is then loaded once for all
+    documents with only the referenced columns: parent records through the
+    shared link resolver identity map, child records with one IN query per
+    relationship. Evaluating another formula only loads what is still missing.
+    """
+
+    def __init__(self, doctype, docs, formulas=None):
+        self.doctype = doctype
+        self.docs = list(docs)
+        self._relationships = None
+        self._fields = {}
+        self._children = {}
+        if formulas:
+            self.plan(formulas)
+
+    def plan(self, formulas):
+        """Load everything the formulas reference that is not loaded yet"""
+        if isinstance(formulas, str):
+            formulas = [formulas]
+
+        needed = {}
+        for formula in formulas:
+            for table, field in re.findall(RELATED_PATTERN, formula or ""):
+                rel = self._get_relationship(table)
+                if rel:
+                    needed.setdefault(table.lower(), set()).add(field.lower())
+
+        for key, fields in needed.items():
+            missing = fields - self._fields.get(key, set())
+            if missing:
+                self._load(key, self._fields.get(key, set()) | fields)
+
+    def related_value(self, doc, table, field):
+        rel = self._get_relationship(table)
+        if not rel or rel["kind"] != "parent":
+            return None
+        key = doc.get(rel["link_field"])
+        if not key:
+            return None
+
+        from flansa.flansa_core.utils.link_resolver import get_row, load_rows
+        self.plan(f"[{table}.{field}]")
+        # No query when the row is already in the identity map
+        load_rows(rel["doctype"], {key}, {field.lower()})
+        return (get_row(rel["doctype"], key) or {}).get(field.lower())
+
+    def child_values(self, doc, table, field):
+        rel = self._get_relationship(table)
+        if not rel or rel["kind"] != "child":
+            return []
+        self.plan(f"[{table}.{field}]")
+
+        rows = self._children.get(table.lower(), {}).get(str(doc.name), [])
+        return [row.get(field.lower()) for row in rows]
+
+    def _load(self, key, fields):
+        rel = self._get_relationship(key)
+        self._fields[key] = set(fields)
+        meta = frappe.get_meta(rel["doctype"])
+        fields = {f for f in fields if f == "name" or meta.has_field(f)}
+        if not fields:
+            return
+
+        if rel["kind"] == "parent":
+            from flansa.flansa_core.utils.link_resolver import load_rows
+            load_rows(rel["doctype"], {doc.get(rel["link_field"]) for doc in self.docs}, fields)
+            return
+
+        parent_names = [doc.name for doc in self.docs if doc.name and not doc.get("__islocal")]
+        children = {}
+        if parent_names:
+            for row in frappe.get_all(
+                rel["doctype"],
+                filters={rel["link_field"]: ["in", parent_names]},
+                fields=list({"name", rel["link_field"], *fields}),
+                order_by="creation asc"
+            ):
+                children.setdefault(str(row.get(rel["link_field"])), []).append(row)
+        self._children[key] = children
+
+    def _get_relationship(self, table):
+        if self._relationships is None:
+            self._relationships = _get_formula_relationships(self.doctype)
+        return self._relationships.get(table.lower())
+
+
+def _get_formula_relationships(doctype):
+    """
+    {name: {"kind", "doctype", "link_field"}} of the relationships a formula on doctype may reference
+
+    A relationship is addressed by the related table's name or label, or by the
+    relationship's own name. "parent" relationships point at one record through
+    a link field of this DocType, "child" relationships at the records linking here.
+    """
+    from flansa.flansa_core.relationship_graph_service import get_relationship_graph_for_doctype
+
+    graph = get_relationship_graph_for_doctype(doctype)
+    table_name = graph.table_for_doctype(doctype) if graph else None
+    if not table_name:
+        return {}
+
+    relationships = {}
+
+    def add(rel, kind, related_table_id, related_doctype):
+        if not related_doctype or not rel["link_fields"]:
+            return
+        related_table = graph.get_table(related_table_id) or {}
+        spec = {"kind": kind, "doctype": related_doctype, "link_field": rel["link_fields"][0]["fieldname"]}
+        for name in (related_table.get("table_name"), related_table.get("table_label"), rel.get("relationship_name")):
+            if name:
+                relationships.setdefault(name.lower(), spec)
+
+    for rel in graph.parent_relationships(table_name):
+        add(rel, "parent", rel["parent_table"], rel["parent_doctype"])
+    for rel in graph.child_relationships(table_name):
+        add(rel, "child", rel["child_table"], rel["child_doctype"])
+    return relationships
+
+
+def prefetch_formulas(doctype, docs, formulas):
+    """FormulaPrefetch for a batch; pass it to every FlansaFormulaEngine evaluating these documents"""
+    return FormulaPrefetch(doctype, docs, formulas)
+
+
+def get_formula_fields(doctype):
+    """{fieldname: formula} of the formula fields of a DocType"""
+    formulas = {}
+    for df in frappe.get_meta(doctype).fields:
+        if not df.options or not df.options.lstrip().startswith("{"):
+            continue
+        try:
+            formula = json.loads(df.options).get("formula")
+        except (ValueError, AttributeError):
+            continue
+        if formula:
+            formulas[df.fieldname] = formula
+    return formulas
+
+
+def get_document_prefetch(doc, doctype=None):
+    """The prefetch shared by every formula of a document, kept on doc.flags for the life of the object"""
+    doctype = doctype or doc.doctype
+    flags = getattr(doc, "flags", None)
+    prefetch = flags.get("flansa_formula_prefetch") if flags is not None else None
+    if prefetch is None:
+        # Planned for all of the DocType's formulas: their references load together
+        prefetch = FormulaPrefetch(doctype, [doc], list(get_formula_fields(doctype).values()))
+        if flags is not None:
+            flags.flansa_formula_prefetch = prefetch
+    return prefetch
+
+
+def evaluate_formula_fields(doctype, docs):
+    """Values of every formula field for a batch of documents: {name: {fieldname: value}}"""
+    formulas = get_formula_fields(doctype)
+    if not formulas or not docs:
+        return {}
+
+    prefetch = prefetch_formulas(doctype, docs, list(formulas.values()))
+    values = {}
+    for doc in docs:
+        engine = FlansaFormulaEngine(doc, doctype, prefetch=prefetch)
+        values[doc.name] = {
+            fieldname: engine.evaluate_quickbase_formula(formula) for fieldname, formula in formulas.items()
+        }
+    return values
+
+
 class FlansaFormulaEngine:
     """
     Safe formula evaluation engine that can traverse relationships
@@ -54,112 +237,32 @@ class FlansaFormulaEngine:
         'days_between': lambda d1, d2: (frappe.utils.getdate(d2) - frappe.utils.getdate(d1)).days,
     }
     
-    def __init__(self, doc, doctype):
+    def __init__(self, doc, doctype, prefetch=None):
         self.doc = doc
         self.doctype = doctype
-        self.context = {}
-        self.relationship_cache = {}
-        self._build_enhanced_context()
+        # Lazy view over the document's fields; functions come from FORMULA_FUNCTIONS
+        self.context = FormulaContext(doc, self)
+        # Shared by every engine evaluating the same document or batch
+        self._prefetch = prefetch
     
-    def _build_enhanced_context(self):
-        """Build comprehensive context with relationships and QuickBase-style functions"""
-        # Core document fields
-        self.context.update(self.doc.as_dict())
-        
-        # Enhanced function library
-        self.context.update({
-            # Math functions
-            'ABS': lambda x: abs(x) if x is not None else 0,
-            'ROUND': lambda x, decimals=0: round(x, decimals) if x is not None else 0,
-            'SQRT': lambda x: math.sqrt(x) if x and x >= 0 else 0,
-            'POWER': lambda x, y: pow(x, y) if x is not None and y is not None else 0,
-            
-            # Aggregation functions
-            'SUM': self._enhanced_sum,
-            'AVERAGE': self._enhanced_average,
-            'AVG': self._enhanced_average,
-            'COUNT': self._enhanced_count,
-            'MIN': self._enhanced_min,
-            'MAX': self._enhanced_max,
-            
-            # Conditional functions
-            'IF': lambda condition, true_val, false_val: true_val if condition else false_val,
-            'IIF': lambda condition, true_val, false_val: true_val if condition else false_val,
-            
-            # Text functions
-            'CONCATENATE': self._concatenate,
-            'UPPER': lambda text: str(text).upper() if text is not None else '',
-            'LOWER': lambda text: str(text).lower() if text is not None else '',
-            'LEN': lambda text: len(str(text)) if text is not None else 0,
-            
-            # Date functions
-            'TODAY': lambda: frappe.utils.today(),
-            'NOW': lambda: frappe.utils.now(),
-            'DAYS_BETWEEN': self._days_between,
-            'YEAR': lambda date_val: frappe.utils.getdate(date_val).year if date_val else None,
-            'MONTH': lambda date_val: frappe.utils.getdate(date_val).month if date_val else None,
-            
-            # Helper functions for QuickBase syntax
-            'get_current_value': self._get_current_value,
-            'get_related_value': self._get_related_value,
-            'get_child_values': self._get_child_values,
-        })
-    
-    def _add_relationship_accessors(self, context):
-        """Add relationship data accessors to context"""
-        # Get all relationships for this table
-        table_name = frappe.db.get_value("DocType", self.doctype, "module")
-        if not table_name:
-            return
-        
-        relationships = frappe.get_all("Flansa Relationship",
-            filters=[
-                ["from_table", "=", table_name],
-                ["or", "to_table", "=", table_name]
-            ],
-            fields=["name", "from_table", "to_table", "relationship_type"]
-        )
-        
-        for rel in relationships:
-            rel_doc = frappe.get_doc("Flansa Relationship", rel.name)
-            
-            if rel.from_table == table_name:
-                # Outgoing relationship
-                related_table = frappe.get_doc("Flansa Table", rel.to_table)
-                accessor_name = related_table.table_name.lower()
-                
-                # Create accessor function
-                def make_accessor(relationship, target_doctype):
-                    def accessor():
-                        return self._get_related_data(relationship, target_doctype)
-                    return accessor
-                
-                context[accessor_name] = make_accessor(rel_doc, related_table.doctype_name)
-    
-    def _get_related_data(self, relationship, target_doctype):
-        """Get related data based on relationship type"""
-        if relationship.relationship_type == "One to Many":
-            # Get child records
-            link_field = relationship.to_field or relationship.get_clean_field_name(relationship.from_table)
-            return frappe.get_all(target_doctype,
-                filters={link_field: self.doc.name},
-                fields=["*"]
-            )
-        # Add other relationship types...
-        return []
+    @property
+    def prefetch(self):
+        if self._prefetch is None:
+            self._prefetch = get_document_prefetch(self.doc, self.doctype)
+        return self._prefetch
     
     def evaluate_quickbase_formula(self, formula):
         """Evaluate QuickBase-style formula with [Field] and [Table.Field] syntax"""
         try:
-            # Preprocess QuickBase syntax
-            processed_formula = self._preprocess_quickbase_formula(formula)
+            # Load the related records the formula references before it runs
+            if '[' in formula and '.' in formula:
+                self.prefetch.plan(formula)
             
-            # Create safe evaluation environment
-            safe_dict = {"__builtins__": {}, **self.context}
+            # Preprocess QuickBase syntax (cached per formula)
+            processed_formula = preprocess_quickbase_formula(formula)
             
             # Evaluate the processed formula
-            result = eval(processed_formula, safe_dict)
-            return result
+            return eval(compile_expression(processed_formula), FORMULA_GLOBALS, self.context)
             
         except Exception as e:
             frappe.log_error(f"Formula evaluation error: {str(e)}\nFormula: {formula}", "Enhanced Formula Engine")
@@ -241,6 +344,175 @@ class FlansaFormulaEngine:
         
         return getattr(obj, attr, None)
 
+
+    def _preprocess_quickbase_formula(self, formula):
+        """Convert QuickBase syntax to Python syntax"""
+        return preprocess_quickbase_formula(formula)
+    
+    @staticmethod
+    def _enhanced_sum(data_list):
+        """Enhanced SUM with null handling"""
+        if not isinstance(data_list, (list, tuple)):
+            return data_list if data_list is not None else 0
+        total = 0
+        for item in data_list:
+            if item is not None and str(item).replace('.','').replace('-','').isdigit():
+                total += float(item)
+        return total
+    
+    @staticmethod
+    def _enhanced_average(data_list):
+        """Enhanced AVERAGE function"""
+        if not isinstance(data_list, (list, tuple)):
+            return data_list if data_list is not None else 0
+        valid_items = [float(item) for item in data_list 
+                      if item is not None and str(item).replace('.','').replace('-','').isdigit()]
+        return sum(valid_items) / len(valid_items) if valid_items else 0
+    
+    @staticmethod
+    def _enhanced_count(data_list):
+        """Enhanced COUNT function"""
+        if not isinstance(data_list, (list, tuple)):
+            return 1 if data_list is not None else 0
+        return len([item for item in data_list if item is not None and item != ''])
+    
+    @staticmethod
+    def _enhanced_min(data_list):
+        """Enhanced MIN function"""
+        if not isinstance(data_list, (list, tuple)):
+            return data_list if data_list is not None else 0
+        valid_items = [float(item) for item in data_list 
+                      if item is not None and str(item).replace('.','').replace('-','').isdigit()]
+        return min(valid_items) if valid_items else 0
+    
+    @staticmethod
+    def _enhanced_max(data_list):
+        """Enhanced MAX function"""
+        if not isinstance(data_list, (list, tuple)):
+            return data_list if data_list is not None else 0
+        valid_items = [float(item) for item in data_list 
+                      if item is not None and str(item).replace('.','').replace('-','').isdigit()]
+        return max(valid_items) if valid_items else 0
+    
+    @staticmethod
+    def _concatenate(*args):
+        """CONCATENATE function"""
+        result = ''
+        for arg in args:
+            if arg is not None:
+                result += str(arg)
+        return result
+    
+    @staticmethod
+    def _days_between(date1, date2):
+        """Calculate days between dates"""
+        try:
+            d1 = frappe.utils.getdate(date1)
+            d2 = frappe.utils.getdate(date2)
+            return (d2 - d1).days
+        except:
+            return 0
+    
+    def _get_current_value(self, field_name):
+        """Get value from current document"""
+        return self.doc.get(field_name)
+    
+    def _get_related_value(self, table_name, field_name):
+        """Get a field of the record this document links to"""
+        return self.prefetch.related_value(self.doc, table_name, field_name)
+    
+    def _get_child_values(self, table_name, field_name):
+        """Get the values of a field across the child records linking to this document"""
+        return self.prefetch.child_values(self.doc, table_name, field_name)
+
+# Shared by every engine; built once at import and never mutated
+FORMULA_FUNCTIONS = MappingProxyType({
+    # Math functions
+    'ABS': lambda x: abs(x) if x is not None else 0,
+    'ROUND': lambda x, decimals=0: round(x, decimals) if x is not None else 0,
+    'SQRT': lambda x: math.sqrt(x) if x and x >= 0 else 0,
+    'POWER': lambda x, y: pow(x, y) if x is not None and y is not None else 0,
+    
+    # Aggregation functions
+    'SUM': FlansaFormulaEngine._enhanced_sum,
+    'AVERAGE': FlansaFormulaEngine._enhanced_average,
+    'AVG': FlansaFormulaEngine._enhanced_average,
+    'COUNT': FlansaFormulaEngine._enhanced_count,
+    'MIN': FlansaFormulaEngine._enhanced_min,
+    'MAX': FlansaFormulaEngine._enhanced_max,
+    
+    # Conditional functions
+    'IF': lambda condition, true_val, false_val: true_val if condition else false_val,
+    'IIF': lambda condition, true_val, false_val: true_val if condition else false_val,
+    
+    # Text functions
+    'CONCATENATE': FlansaFormulaEngine._concatenate,
+    'UPPER': lambda text: str(text).upper() if text is not None else '',
+    'LOWER': lambda text: str(text).lower() if text is not None else '',
+    'LEN': lambda text: len(str(text)) if text is not None else 0,
+    
+    # Date functions
+    'TODAY': lambda: frappe.utils.today(),
+    'NOW': lambda: frappe.utils.now(),
+    'DAYS_BETWEEN': FlansaFormulaEngine._days_between,
+    'YEAR': lambda date_val: frappe.utils.getdate(date_val).year if date_val else None,
+    'MONTH': lambda date_val: frappe.utils.getdate(date_val).month if date_val else None,
+})
+FORMULA_GLOBALS = {"__builtins__": {}, **FORMULA_FUNCTIONS}
+
+# Helpers the preprocessed QuickBase syntax calls; they need the engine of the document
+ENGINE_HELPERS = {
+    'get_current_value': '_get_current_value',
+    'get_related_value': '_get_related_value',
+    'get_child_values': '_get_child_values',
+}
+
+
+class FormulaContext(DocumentContext):
+    """Document fields plus the per-document QuickBase helpers, resolved on first use"""
+    
+    __slots__ = ("_engine",)
+    
+    def __init__(self, doc, engine):
+        super().__init__(doc)
+        self._engine = engine
+    
+    def __getitem__(self, key):
+        if key in FORMULA_FUNCTIONS:
+            # Function names win over fields, as they did when both shared one dict
+            raise KeyError(key)
+        if key in ENGINE_HELPERS:
+            return getattr(self._engine, ENGINE_HELPERS[key])
+        return super().__getitem__(key)
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def preprocess_quickbase_formula(formula):
+    """Convert QuickBase syntax to Python syntax"""
+    processed = formula
+
+    # Handle aggregation functions: SUM([Child.Field])
+    def replace_agg(match):
+        func, table, field = match.groups()
+        return f"{func}(get_child_values('{table.lower()}', '{field.lower()}'))"
+    processed = re.sub(AGGREGATE_PATTERN, replace_agg, processed, flags=re.IGNORECASE)
+
+    # Handle relationship references: [Table.Field]
+    def replace_rel(match):
+        table, field = match.groups()
+        return f"get_related_value('{table.lower()}', '{field.lower()}')"
+    processed = re.sub(RELATED_PATTERN, replace_rel, processed, flags=re.IGNORECASE)
+
+    # Handle current field references: [Field]
+    field_pattern = r'\[([^\.\]]+)\]'
+    def replace_field(match):
+        field = match.group(1)
+        return f"get_current_value('{field.lower()}')"
+    processed = re.sub(field_pattern, replace_field, processed, flags=re.IGNORECASE)
+
+    return processed
+
+
 # Formula field type for DocTypes
 class FormulaField:
     """Custom field type that evaluates formulas"""
@@ -258,6 +530,7 @@ class FormulaField:
             if not formula:
                 return None
             
+            # Reuses the document's prefetch: the other formula fields do not query again
             engine = FlansaFormulaEngine(doc, doc.doctype)
             return engine.evaluate(formula)
             
@@ -307,21 +580,17 @@ def get_formula_suggestions(doctype, partial_formula):
             })
     
     # Get relationships
-    table_name = frappe.db.get_value("DocType", doctype, "module")
+    from flansa.flansa_core.relationship_graph_service import get_relationship_graph_for_doctype
+    graph = get_relationship_graph_for_doctype(doctype)
+    table_name = graph.table_for_doctype(doctype) if graph else None
     if table_name:
-        relationships = frappe.get_all("Flansa Relationship",
-            filters=[
-                ["from_table", "=", table_name],
-                ["status", "=", "Active"]
-            ],
-            fields=["to_table"]
-        )
-        
-        for rel in relationships:
-            to_table = frappe.get_doc("Flansa Table", rel.to_table)
+        for rel in graph.child_relationships(table_name):
+            to_table = graph.get_table(rel["child_table"])
+            if rel["status"] != "Active" or not to_table:
+                continue
             suggestions.append({
-                'value': to_table.table_name.lower(),
-                'label': f"{to_table.table_label} (Relationship)",
+                'value': (to_table.get("table_name") or rel["child_table"]).lower(),
+                'label': f"{to_table.get('table_label')} (Relationship)",
                 'type': 'relationship'
             })
     
@@ -336,110 +605,6 @@ def get_formula_suggestions(doctype, partial_formula):
     return suggestions
 
 
-    def _preprocess_quickbase_formula(self, formula):
-        """Convert QuickBase syntax to Python syntax"""
-        processed = formula
-        
-        # Handle aggregation functions: SUM([Child.Field])
-        agg_pattern = r'(SUM|AVERAGE|AVG|COUNT|MIN|MAX)\(\[([^.\]]+)\.([^\]]+)\]\)'
-        def replace_agg(match):
-            func, table, field = match.groups()
-            return f"{func}(get_child_values('{table.lower()}', '{field.lower()}'))"
-        processed = re.sub(agg_pattern, replace_agg, processed, flags=re.IGNORECASE)
-        
-        # Handle relationship references: [Table.Field]
-        rel_pattern = r'\[([^.\]]+)\.([^\]]+)\]'
-        def replace_rel(match):
-            table, field = match.groups()
-            return f"get_related_value('{table.lower()}', '{field.lower()}')"
-        processed = re.sub(rel_pattern, replace_rel, processed, flags=re.IGNORECASE)
-        
-        # Handle current field references: [Field]
-        field_pattern = r'\[([^\.\]]+)\]'
-        def replace_field(match):
-            field = match.group(1)
-            return f"get_current_value('{field.lower()}')"
-        processed = re.sub(field_pattern, replace_field, processed, flags=re.IGNORECASE)
-        
-        return processed
-    
-    def _enhanced_sum(self, data_list):
-        """Enhanced SUM with null handling"""
-        if not isinstance(data_list, (list, tuple)):
-            return data_list if data_list is not None else 0
-        total = 0
-        for item in data_list:
-            if item is not None and str(item).replace('.','').replace('-','').isdigit():
-                total += float(item)
-        return total
-    
-    def _enhanced_average(self, data_list):
-        """Enhanced AVERAGE function"""
-        if not isinstance(data_list, (list, tuple)):
-            return data_list if data_list is not None else 0
-        valid_items = [float(item) for item in data_list 
-                      if item is not None and str(item).replace('.','').replace('-','').isdigit()]
-        return sum(valid_items) / len(valid_items) if valid_items else 0
-    
-    def _enhanced_count(self, data_list):
-        """Enhanced COUNT function"""
-        if not isinstance(data_list, (list, tuple)):
-            return 1 if data_list is not None else 0
-        return len([item for item in data_list if item is not None and item != ''])
-    
-    def _enhanced_min(self, data_list):
-        """Enhanced MIN function"""
-        if not isinstance(data_list, (list, tuple)):
-            return data_list if data_list is not None else 0
-        valid_items = [float(item) for item in data_list 
-                      if item is not None and str(item).replace('.','').replace('-','').isdigit()]
-        return min(valid_items) if valid_items else 0
-    
-    def _enhanced_max(self, data_list):
-        """Enhanced MAX function"""
-        if not isinstance(data_list, (list, tuple)):
-            return data_list if data_list is not None else 0
-        valid_items = [float(item) for item in data_list 
-                      if item is not None and str(item).replace('.','').replace('-','').isdigit()]
-        return max(valid_items) if valid_items else 0
-    
-    def _concatenate(self, *args):
-        """CONCATENATE function"""
-        result = ''
-        for arg in args:
-            if arg is not None:
-                result += str(arg)
-        return result
-    
-    def _days_between(self, date1, date2):
-        """Calculate days between dates"""
-        try:
-            d1 = frappe.utils.getdate(date1)
-            d2 = frappe.utils.getdate(date2)
-            return (d2 - d1).days
-        except:
-            return 0
-    
-    def _get_current_value(self, field_name):
-        """Get value from current document"""
-        return self.doc.get(field_name)
-    
-    def _get_related_value(self, table_name, field_name):
-        """Get single related value (placeholder - implement based on relationships)"""
-        try:
-            # Basic implementation - can be enhanced based on relationship definitions
-            return None
-        except:
-            return None
-    
-    def _get_child_values(self, table_name, field_name):
-        """Get list of values from child records (placeholder)"""
-        try:
-            # Basic implementation - can be enhanced based on relationship definitions
-            return []
-        except:
-            return []
-
 @frappe.whitelist()
 def evaluate_quickbase_formula_api(formula, doctype, doc_name=None):
     """API endpoint to evaluate QuickBase-style formula"""
@@ -485,7 +650,8 @@ def validate_quickbase_formula(formula, doctype):
         }
 
 # Export the main class for easy importing
-__all__ = ['FlansaFormulaEngine', 'FormulaField', 'validate_formula', 'get_formula_suggestions', 
+__all__ = ['FlansaFormulaEngine', 'FormulaPrefetch', 'prefetch_formulas', 'get_document_prefetch',
+           'evaluate_formula_fields', 'FormulaField', 'validate_formula', 'get_formula_suggestions', 
            'evaluate_quickbase_formula_api', 'validate_quickbase_formula']
 
 # Main formula engine instance